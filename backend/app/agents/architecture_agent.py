@@ -3,6 +3,7 @@ from typing import Dict, Any
 import json
 from ..services import get_vertex_ai_service, get_gcp_client_service
 from ..utils import ARCHITECTURE_DESIGN_PROMPT, ConversationState
+from ..models import ArchitecturePlan
 
 
 class ArchitectureAgent:
@@ -38,8 +39,10 @@ class ArchitectureAgent:
 
         try:
             # Get architecture plan from LLM
-            architecture_plan = await self.vertex_ai.generate_json_response(
-                prompt=prompt
+            architecture_plan = await self.vertex_ai.generate_validated_response(
+                prompt=prompt,
+                schema=ArchitecturePlan,
+                template="ARCHITECTURE_DESIGN_PROMPT"
             )
 
             # Enhance plan with cost estimates
@@ -73,7 +76,8 @@ class ArchitectureAgent:
         plan["estimated_cost"] = round(total_cost, 2)
         return plan
 
-    def validate_architecture(self, plan: Dict[str, Any]) -> tuple[bool, list[str]]:
+    @staticmethod
+    def validate_architecture(plan: Dict[str, Any]) -> tuple[bool, list[str]]:
         """
         Validate architecture plan for best practices
 
@@ -1,10 +1,26 @@
 """Deployment Agent"""
-from typing import Dict, Any, AsyncGenerator
+from typing import Dict, Any, AsyncGenerator, List, Optional, Tuple
 from pathlib import Path
-from ..services import get_terraform_service, get_gcp_client_service
-from ..utils import ConversationState
+from ..services import (
+    get_terraform_service,
+    get_gcp_client_service,
+    get_log_capture_service,
+    get_terraform_preflight_service,
+    get_workspace_lifecycle_service,
+    get_session_store,
+    get_admission_controller,
+    get_deployment_catalog,
+    LockBusyError,
+    TerraformState,
+    build_services,
+    build_connections
+)
+from ..utils import ConversationState, get_tenant_id
 from ..models import DeploymentStatus
 
+# Newest created-resource lines sent with each apply progress event
+RESOURCES_TAIL = 10
+
 
 class DeploymentAgent:
     """Agent responsible for deploying infrastructure"""
@@ -12,6 +28,12 @@ class DeploymentAgent:
     def __init__(self):
         self.terraform_service = get_terraform_service()
         self.gcp_client = get_gcp_client_service()
+        self.log_capture = get_log_capture_service()
+        self.preflight = get_terraform_preflight_service()
+        self.lifecycle = get_workspace_lifecycle_service()
+        self.store = get_session_store()
+        self.admission = get_admission_controller()
+        self.catalog = get_deployment_catalog()
         self.name = "Deployment Agent"
         self.id = "deployment"
 
@@ -22,6 +44,10 @@ class DeploymentAgent:
         """
         Deploy infrastructure using Terraform
 
+        The workspace is locked in the session store for the whole deployment,
+        so no other worker deploys, compacts or destroys it meanwhile. Each
+        status change is recorded in the deployment catalog.
+
         Args:
             state: Current conversation state
 
@@ -39,98 +65,225 @@ class DeploymentAgent:
             }
             return
 
-        workspace = Path(self.terraform_service.workspace_dir) / deployment_id
-
         try:
-            # Step 1: Initialize Terraform
+            async with self.store.hold_lock(f"workspace:{deployment_id}"):
+                await self._record_started(state, deployment_id)
+                status = "pending"
+                async for update in self._deploy(state, deployment_id):
+                    if update["status"] != status:
+                        status = update["status"]
+                        await self._record_update(deployment_id, update)
+                    yield update
+        except LockBusyError:
+            error_msg = "Another deployment of this workspace is in progress"
             yield {
-                "status": "planning",
-                "progress": 10,
-                "current_step": "Initializing Terraform workspace...",
+                "status": "failed",
+                "progress": 0,
+                "current_step": "Deployment failed",
+                "error": error_msg,
                 "logs": []
             }
+            state["errors"].append(f"Deployment failed: {error_msg}")
+            state["deployment_status"] = "failed"
+            state["current_step"] = "deployment_failed"
 
-            init_logs = []
-            async for log_line in self.terraform_service.terraform_init(workspace):
-                init_logs.append(log_line)
-                yield {
-                    "status": "planning",
-                    "progress": 20,
-                    "current_step": "Initializing Terraform workspace...",
-                    "logs": init_logs[-10:]  # Last 10 lines
-                }
-
-            # Step 2: Run terraform plan
-            yield {
-                "status": "planning",
-                "progress": 30,
-                "current_step": "Creating deployment plan...",
-                "logs": []
+    async def _record_started(self, state: ConversationState, deployment_id: str) -> None:
+        """Catalog a deployment about to start, with the plan's estimates"""
+        architecture_plan = state.get("architecture_plan") or {}
+        plan_labels = architecture_plan.get("labels")
+        await self.catalog.record(
+            deployment_id,
+            "pending",
+            labels={
+                **(plan_labels if isinstance(plan_labels, dict) else {}),
+                "managed_by": "vibe-devops",
+                **({"ephemeral": "true"} if state.get("ttl_hours") else {})
+            },
+            name=architecture_plan.get("name"),
+            session_id=state.get("session_id"),
+            tenant_id=get_tenant_id(),
+            project_id=state.get("project_id") or None,
+            region=state.get("region"),
+            resource_count=len(architecture_plan.get("resources", [])),
+            monthly_cost=architecture_plan.get("estimated_cost") or 0.0,
+            error=None
+        )
+
+    async def _record_update(self, deployment_id: str, update: Dict[str, Any]) -> None:
+        """Catalog a status change; completion replaces the estimates with what was deployed"""
+        fields: Dict[str, Any] = {}
+        if update["status"] == "completed":
+            fields["plan_action"] = update.get("plan_action")
+            architecture = update.get("architecture") or {}
+            stacks = architecture.get("application_stacks") or [{}]
+            if stacks[0].get("services"):
+                fields["resource_count"] = len(stacks[0]["services"])
+                fields["monthly_cost"] = architecture.get("total_cost", 0.0)
+            fields["labels"] = {
+                key: value for key, value in (stacks[0].get("labels") or {}).items()
+                if key != "deployment_id"
             }
+        elif update["status"] == "failed":
+            fields["error"] = update.get("error")
 
-            plan_logs = []
-            async for log_line in self.terraform_service.terraform_plan(workspace):
-                plan_logs.append(log_line)
-                yield {
-                    "status": "planning",
-                    "progress": 50,
-                    "current_step": "Creating deployment plan...",
-                    "logs": plan_logs[-10:]
-                }
+        await self.catalog.record(deployment_id, update["status"], **fields)
 
-            # Step 3: Apply infrastructure
-            yield {
-                "status": "applying",
-                "progress": 60,
-                "current_step": "Applying infrastructure changes...",
-                "logs": []
-            }
+    async def _deploy(
+        self,
+        state: ConversationState,
+        deployment_id: str
+    ) -> AsyncGenerator[Dict[str, Any], None]:
+        """Run init, plan and apply in a locked workspace"""
+        workspace = Path(self.terraform_service.workspace_dir) / deployment_id
 
-            apply_logs = []
-            resources_created = []
+        # Full output goes to the deployment log; events carry only the tail
+        log = self.log_capture.open(deployment_id)
 
-            async for log_line in self.terraform_service.terraform_apply(workspace):
-                apply_logs.append(log_line)
+        try:
+            # Unchanged configurations reuse their saved plan or skip Terraform
+            decision = await self.terraform_service.plan_decision(workspace)
+            if decision.reason:
+                log.write(f"# {decision.action}: {decision.reason}")
 
-                # Track resource creation
-                if "Creating..." in log_line or "Creation complete" in log_line:
-                    resources_created.append(log_line)
+            apply_lines = 0
+            resources_created = []
 
-                progress = min(60 + (len(apply_logs) / 10), 90)
+            if decision.action == "skip":
+                yield {
+                    "status": "planning",
+                    "progress": 50,
+                    "current_step": "No changes since the last deployment",
+                    "logs": log.tail(1)
+                }
+            else:
+                # Step 1: Initialize Terraform
+                yield {
+                    "status": "planning",
+                    "progress": 10,
+                    "current_step": "Initializing Terraform workspace...",
+                    "logs": []
+                }
 
+                log.write("$ terraform init")
+                init_lines = 0
+                async for log_line in self.terraform_service.terraform_init(workspace):
+                    log.write(log_line)
+                    init_lines += 1
+                    yield {
+                        "status": "planning",
+                        "progress": 20,
+                        "current_step": "Initializing Terraform workspace...",
+                        "logs": log.tail(min(init_lines, 10))  # Last 10 lines
+                    }
+
+                # Cache the provider schema for pre-flight checks of later
+                # deployments; the service keeps the background task
+                if workspace.is_dir():
+                    self.preflight.ensure_schema(workspace)
+
+                # Step 2: Run terraform plan (targeted for small edits)
                 yield {
-                    "status": "applying",
-                    "progress": progress,
-                    "current_step": "Applying infrastructure changes...",
-                    "logs": apply_logs[-10:],
-                    "resources_created": resources_created
+                    "status": "planning",
+                    "progress": 30,
+                    "current_step": (
+                        "Reusing saved deployment plan..." if decision.action == "reuse"
+                        else "Creating deployment plan..."
+                    ),
+                    "logs": []
                 }
 
+                if decision.action != "reuse":
+                    log.write(" ".join(
+                        ["$ terraform plan"] + [f"-target={target}" for target in decision.targets]
+                    ))
+                    plan_lines = 0
+                    async for log_line in self.terraform_service.terraform_plan(workspace, decision):
+                        log.write(log_line)
+                        plan_lines += 1
+                        yield {
+                            "status": "planning",
+                            "progress": 50,
+                            "current_step": "Creating deployment plan...",
+                            "logs": log.tail(min(plan_lines, 10))
+                        }
+
+                # Step 3: Apply infrastructure (a limited number at a time)
+                if not self.admission.apply_slot_free():
+                    yield {
+                        "status": "planning",
+                        "progress": 55,
+                        "current_step": "Waiting for other deployments to finish applying...",
+                        "logs": []
+                    }
+
+                async with self.admission.apply_slot():
+                    yield {
+                        "status": "applying",
+                        "progress": 60,
+                        "current_step": "Applying infrastructure changes...",
+                        "logs": []
+                    }
+
+                    log.write("$ terraform apply")
+                    async for log_line in self.terraform_service.terraform_apply(workspace):
+                        log.write(log_line)
+                        apply_lines += 1
+
+                        # Track resource creation
+                        if "Creating..." in log_line or "Creation complete" in log_line:
+                            resources_created.append(log_line)
+
+                        progress = min(60 + (apply_lines / 10), 90)
+
+                        # Progress events carry a count and the newest entries;
+                        # the full list is only in the final event
+                        yield {
+                            "status": "applying",
+                            "progress": progress,
+                            "current_step": "Applying infrastructure changes...",
+                            "logs": log.tail(10),
+                            "resources_created": resources_created[-RESOURCES_TAIL:],
+                            "resources_created_count": len(resources_created)
+                        }
+
             # Step 4: Get outputs and verify
             yield {
                 "status": "applying",
                 "progress": 95,
                 "current_step": "Verifying deployment...",
-                "logs": apply_logs[-10:]
+                "logs": log.tail(min(apply_lines, 10))
             }
 
-            outputs = await self.terraform_service.get_terraform_outputs(workspace)
+            # Read what was actually created from the local state; remote
+            # backends keep no local state, so fall back to `terraform output`
+            deployed_state = await self.terraform_service.read_state(workspace)
+            if deployed_state is not None:
+                outputs = deployed_state.outputs
+            else:
+                outputs = await self.terraform_service.get_terraform_outputs(workspace)
 
             # Step 5: Build architecture visualization
             gcp_architecture = await self._build_architecture_from_deployment(
                 state,
-                outputs
+                outputs,
+                deployed_state
             )
 
             state["gcp_architecture"] = gcp_architecture
 
+            if state.get("ttl_hours"):
+                await self.lifecycle.mark_ephemeral(deployment_id, state["ttl_hours"])
+
             # Final status
             yield {
                 "status": "completed",
                 "progress": 100,
                 "current_step": "Deployment completed successfully!",
-                "logs": apply_logs[-20:],
+                "logs": log.tail(min(apply_lines, 20)),
+                "log_lines": log.line_count,
+                "plan_action": decision.action,
                 "resources_created": resources_created,
+                "resources_created_count": len(resources_created),
                 "outputs": outputs,
                 "architecture": gcp_architecture
             }
@@ -145,50 +298,57 @@ class DeploymentAgent:
                 "progress": 0,
                 "current_step": "Deployment failed",
                 "error": error_msg,
-                "logs": []
+                "logs": log.tail(20),
+                "log_lines": log.line_count
             }
 
             state["errors"].append(f"Deployment failed: {error_msg}")
             state["deployment_status"] = "failed"
             state["current_step"] = "deployment_failed"
 
+        finally:
+            await self.log_capture.close(deployment_id)
+
     async def _build_architecture_from_deployment(
         self,
         state: ConversationState,
-        outputs: Dict[str, Any]
+        outputs: Dict[str, Any],
+        deployed_state: Optional[TerraformState] = None
     ) -> Dict[str, Any]:
-        """Build architecture visualization from deployed resources"""
+        """
+        Build architecture visualization from deployed resources
+
+        Services and connections come from the Terraform state when it is
+        available, and from the architecture plan otherwise.
+        """
         architecture_plan = state.get("architecture_plan", {})
         deployment_id = state.get("deployment_id")
         project_id = state.get("project_id")
 
-        # Build application stack from architecture plan
-        services = []
-        total_cost = 0.0
-
-        for resource in architecture_plan.get("resources", []):
-            service = {
-                "id": f"{resource.get('name', 'resource')}-{deployment_id[:8]}",
-                "name": resource.get("name", "Unknown Resource"),
-                "type": resource.get("type"),
-                "status": "running",
-                "region": resource.get("region", state.get("region", "us-central1")),
-                "project_id": project_id,
-                "description": f"Deployed {resource.get('type')} resource",
-                "configuration": resource.get("config", {}),
-                "cost_estimate": {
-                    "monthly": resource.get("estimated_monthly_cost", 0.0),
-                    "breakdown": f"{resource.get('type')} monthly cost",
+        services, connections = [], []
+        if deployed_state is not None:
+            services = build_services(
+                deployed_state,
+                project_id=project_id,
+                default_region=state.get("region", "us-central1"),
+                labels={"deployment_id": deployment_id, "managed_by": "vibe-devops"}
+            )
+            connections = build_connections(deployed_state)
+
+        if services:
+            total_cost = 0.0
+            for service in services:
+                config = dict(service["configuration"])
+                config.update(config.pop("additional_config", None) or {})
+                cost = self.gcp_client.estimate_resource_cost(service["type"], config)
+                service["cost_estimate"] = {
+                    "monthly": cost,
+                    "breakdown": f"{service['type']} monthly cost",
                     "currency": "USD"
-                },
-                "health_status": "healthy",
-                "labels": {
-                    "deployment_id": deployment_id,
-                    "managed_by": "vibe-devops"
                 }
-            }
-            services.append(service)
-            total_cost += resource.get("estimated_monthly_cost", 0.0)
+                total_cost += cost
+        else:
+            services, total_cost = self._services_from_plan(state)
 
         application_stack = {
             "id": deployment_id,
@@ -212,7 +372,7 @@ class DeploymentAgent:
             "description": "Live GCP architecture deployed by Vibe DevOps",
             "project_id": project_id,
             "application_stacks": [application_stack],
-            "connections": [],
+            "connections": connections,
             "total_cost": round(total_cost, 2),
             "cost_breakdown": {
                 application_stack["name"]: round(total_cost, 2)
@@ -222,3 +382,38 @@ class DeploymentAgent:
         }
 
         return architecture
+
+    def _services_from_plan(self, state: ConversationState) -> Tuple[List[Dict[str, Any]], float]:
+        """Services and total cost from the architecture plan"""
+        architecture_plan = state.get("architecture_plan", {})
+        deployment_id = state.get("deployment_id")
+        project_id = state.get("project_id")
+
+        services = []
+        total_cost = 0.0
+
+        for resource in architecture_plan.get("resources", []):
+            service = {
+                "id": f"{resource.get('name', 'resource')}-{deployment_id[:8]}",
+                "name": resource.get("name", "Unknown Resource"),
+                "type": resource.get("type"),
+                "status": "running",
+                "region": resource.get("region", state.get("region", "us-central1")),
+                "project_id": project_id,
+                "description": f"Deployed {resource.get('type')} resource",
+                "configuration": resource.get("config", {}),
+                "cost_estimate": {
+                    "monthly": resource.get("estimated_monthly_cost", 0.0),
+                    "breakdown": f"{resource.get('type')} monthly cost",
+                    "currency": "USD"
+                },
+                "health_status": "healthy",
+                "labels": {
+                    "deployment_id": deployment_id,
+                    "managed_by": "vibe-devops"
+                }
+            }
+            services.append(service)
+            total_cost += resource.get("estimated_monthly_cost", 0.0)
+
+        return services, total_cost
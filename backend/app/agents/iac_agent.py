@@ -1,9 +1,26 @@
 """Infrastructure as Code Generation Agent"""
 from typing import Dict, Any
 import json
+import time
 import uuid
-from ..services import get_vertex_ai_service, get_terraform_service
-from ..utils import IAC_GENERATION_PROMPT, ConversationState
+import asyncio
+from ..services import (
+    get_vertex_ai_service,
+    get_terraform_service,
+    get_terraform_preflight_service,
+    PreflightResult,
+    GOOGLE_PROVIDER_REQUIREMENTS
+)
+from ..utils import (
+    IAC_GENERATION_PROMPT,
+    TERRAFORM_REPAIR_PROMPT,
+    ConversationState,
+    observe_preflight,
+    start_span,
+    set_span_attributes
+)
+from ..models import TerraformConfig
+from .architecture_agent import ArchitectureAgent
 
 
 class IaCAgent:
@@ -12,6 +29,7 @@ class IaCAgent:
     def __init__(self):
         self.vertex_ai = get_vertex_ai_service()
         self.terraform_service = get_terraform_service()
+        self.preflight_service = get_terraform_preflight_service()
         self.name = "IaC Generation Agent"
         self.id = "iac-generation"
 
@@ -39,8 +57,10 @@ class IaCAgent:
 
         try:
             # Get Terraform configuration from LLM
-            terraform_config = await self.vertex_ai.generate_json_response(
-                prompt=prompt
+            terraform_config = await self.vertex_ai.generate_validated_response(
+                prompt=prompt,
+                schema=TerraformConfig,
+                template="IAC_GENERATION_PROMPT"
             )
 
             # Generate deployment ID if not present
@@ -50,9 +70,19 @@ class IaCAgent:
             # Add provider configuration if not present
             terraform_config = self._add_provider_config(terraform_config, state)
 
+            # Reject or repair broken configuration before the slow init/plan
+            result = await self._preflight_with_repair(terraform_config, architecture_plan)
+            if not result.ok:
+                state["errors"].append(
+                    "Terraform pre-flight validation failed:\n" + "\n".join(result.errors[:20])
+                )
+                state["current_step"] = "iac_failed"
+                return state
+            terraform_config["preflight_warnings"] = result.warnings
+
             # Write Terraform files to workspace
             deployment_id = terraform_config["deployment_id"]
-            workspace = self.terraform_service.write_terraform_files(
+            workspace = await self.terraform_service.write_terraform_files(
                 deployment_id=deployment_id,
                 files=terraform_config["files"]
             )
@@ -69,6 +99,77 @@ class IaCAgent:
             state["current_step"] = "iac_failed"
             return state
 
+    async def preflight(
+        self,
+        files: Dict[str, str],
+        architecture_plan: Dict[str, Any]
+    ) -> PreflightResult:
+        """
+        Run the pre-flight checks concurrently
+
+        The HCL parse and provider schema check, the syntax checks and the
+        architecture best-practice checks run at the same time; architecture
+        findings are reported as warnings.
+
+        Args:
+            files: Dictionary of Terraform files
+            architecture_plan: Architecture plan the files implement
+
+        Returns:
+            Combined errors and warnings
+        """
+        result, (_, syntax_errors), (_, warnings) = await asyncio.gather(
+            self.preflight_service.check_files(files),
+            asyncio.to_thread(self.validate_terraform_syntax, files),
+            asyncio.to_thread(ArchitectureAgent.validate_architecture, architecture_plan)
+        )
+        for filename, error in syntax_errors:
+            result.add_error(filename, error)
+        result.warnings.extend(warnings)
+        return result
+
+    async def _preflight_with_repair(
+        self,
+        terraform_config: Dict[str, Any],
+        architecture_plan: Dict[str, Any]
+    ) -> PreflightResult:
+        """Pre-flight the files, sending failing files back to the model (LLM_REPAIR_MAX_ATTEMPTS times)"""
+        started = time.perf_counter()
+        repairs = 0
+
+        with start_span("iac.preflight") as span:
+            result = await self.preflight(terraform_config["files"], architecture_plan)
+            while not result.ok and repairs < self.vertex_ai.max_repair_attempts:
+                repairs += 1
+                repaired = await self._repair_files(terraform_config["files"], result)
+                terraform_config["files"].update(repaired)
+                result = await self.preflight(terraform_config["files"], architecture_plan)
+
+            outcome = "rejected" if not result.ok else "repaired" if repairs else "passed"
+            set_span_attributes(span, {
+                "preflight.outcome": outcome,
+                "preflight.repairs": repairs,
+                "preflight.schema_checked": result.schema_checked
+            })
+
+        observe_preflight(time.perf_counter() - started, outcome)
+        return result
+
+    async def _repair_files(self, files: Dict[str, str], result: PreflightResult) -> Dict[str, str]:
+        """Ask the model to fix the files the errors are about (all files if none exists yet)"""
+        names = result.failing_files
+        failing = {name: content for name, content in files.items() if name in names} or files
+
+        repaired = await self.vertex_ai.generate_validated_response(
+            prompt=TERRAFORM_REPAIR_PROMPT.format(
+                errors="\n".join(f"- {error}" for error in result.errors),
+                files=json.dumps(failing, indent=2)
+            ),
+            schema=TerraformConfig,
+            template="TERRAFORM_REPAIR_PROMPT"
+        )
+        return repaired["files"]
+
     def _add_provider_config(
         self,
         config: Dict[str, Any],
@@ -80,15 +181,7 @@ class IaCAgent:
 
         # Create provider.tf if not present
         if "provider.tf" not in config["files"]:
-            provider_config = f'''terraform {{
-  required_providers {{
-    google = {{
-      source  = "hashicorp/google"
-      version = "~> 5.0"
-    }}
-  }}
-}}
-
+            provider_config = GOOGLE_PROVIDER_REQUIREMENTS + f'''
 provider "google" {{
   project = "{project_id}"
   region  = "{region}"
@@ -98,7 +191,8 @@ provider "google" {{
 
         return config
 
-    def validate_terraform_syntax(self, files: Dict[str, str]) -> tuple[bool, list[str]]:
+    @staticmethod
+    def validate_terraform_syntax(files: Dict[str, str]) -> tuple[bool, list[tuple[str, str]]]:
         """
         Validate Terraform syntax (basic validation)
 
@@ -106,7 +200,7 @@ provider "google" {{
             files: Dictionary of Terraform files
 
         Returns:
-            Tuple of (is_valid, list of errors)
+            Tuple of (is_valid, list of (filename, error))
         """
         errors = []
         is_valid = True
@@ -115,19 +209,19 @@ provider "google" {{
         required_files = ["main.tf"]
         for file in required_files:
             if file not in files:
-                errors.append(f"Missing required file: {file}")
+                errors.append((file, f"Missing required file: {file}"))
                 is_valid = False
 
         # Check for basic Terraform syntax
         for filename, content in files.items():
             if not content.strip():
-                errors.append(f"File {filename} is empty")
+                errors.append((filename, f"File {filename} is empty"))
                 is_valid = False
 
             # Check for basic terraform blocks
             if filename == "main.tf":
                 if "resource" not in content and "data" not in content:
-                    errors.append("main.tf should contain resource or data blocks")
+                    errors.append((filename, "main.tf should contain resource or data blocks"))
                     is_valid = False
 
         return is_valid, errors
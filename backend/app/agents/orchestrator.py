@@ -1,10 +1,21 @@
 """LangGraph Orchestrator for coordinating agents"""
 import os
-from typing import AsyncGenerator, Dict, Any
+import time
+import uuid
+import asyncio
+import logging
+from typing import AsyncGenerator, Dict, Any, Optional
 import json
 from datetime import datetime
-from langgraph.graph import StateGraph, END
-from ..utils import ConversationState
+from ..utils import (
+    ConversationState,
+    observe_stage,
+    start_span,
+    set_span_attributes,
+    bind_session_id,
+    bind_deployment_id,
+    bind_tenant_id
+)
 from . import (
     RequirementsAgent,
     ArchitectureAgent,
@@ -15,9 +26,12 @@ from ..models import (
     AgentStatusEvent,
     TextChunkEvent,
     ArchitectureEvent,
-    DeploymentStatusEvent
+    DeploymentStatusEvent,
+    TimingEvent
 )
 
+logger = logging.getLogger(__name__)
+
 
 class AgentOrchestrator:
     """Orchestrates the multi-agent workflow using LangGraph"""
@@ -35,20 +49,23 @@ class AgentOrchestrator:
         self.project_id = os.getenv("GCP_PROJECT_ID", "")
         self.region = os.getenv("GCP_REGION", "us-central1")
 
-    def _build_workflow(self) -> StateGraph:
+    def _build_workflow(self):
         """Build the LangGraph workflow"""
+        # Imported here so the API can start serving before LangGraph is loaded
+        from langgraph.graph import StateGraph, END
+
         workflow = StateGraph(ConversationState)
 
-        # Add nodes for each agent
-        workflow.add_node("requirements", self._requirements_node)
-        workflow.add_node("architecture", self._architecture_node)
+        # Add nodes for each agent (names must not clash with state keys)
+        workflow.add_node("requirements_analysis", self._requirements_node)
+        workflow.add_node("architecture_design", self._architecture_node)
         workflow.add_node("iac_generation", self._iac_node)
         workflow.add_node("deployment", self._deployment_node)
 
         # Define edges (workflow sequence)
-        workflow.set_entry_point("requirements")
-        workflow.add_edge("requirements", "architecture")
-        workflow.add_edge("architecture", "iac_generation")
+        workflow.set_entry_point("requirements_analysis")
+        workflow.add_edge("requirements_analysis", "architecture_design")
+        workflow.add_edge("architecture_design", "iac_generation")
         workflow.add_edge("iac_generation", "deployment")
         workflow.add_edge("deployment", END)
 
@@ -56,15 +73,37 @@ class AgentOrchestrator:
 
     async def _requirements_node(self, state: ConversationState) -> ConversationState:
         """Requirements analysis node"""
-        return await self.requirements_agent.analyze(state)
+        with start_span("agent.requirements_analysis") as span:
+            state = await self.requirements_agent.analyze(state)
+            requirements = state.get("requirements") or {}
+            set_span_attributes(span, {
+                "requirements.service_count": len(requirements.get("services_needed", [])),
+                "agent.errors": len(state.get("errors", []))
+            })
+            return state
 
     async def _architecture_node(self, state: ConversationState) -> ConversationState:
         """Architecture design node"""
-        return await self.architecture_agent.design(state)
+        with start_span("agent.architecture_design") as span:
+            state = await self.architecture_agent.design(state)
+            plan = state.get("architecture_plan") or {}
+            set_span_attributes(span, {
+                "architecture.resource_count": len(plan.get("resources", [])),
+                "agent.errors": len(state.get("errors", []))
+            })
+            return state
 
     async def _iac_node(self, state: ConversationState) -> ConversationState:
         """IaC generation node"""
-        return await self.iac_agent.generate(state)
+        with start_span("agent.iac_generation") as span:
+            state = await self.iac_agent.generate(state)
+            terraform_config = state.get("terraform_config") or {}
+            set_span_attributes(span, {
+                "deployment.id": state.get("deployment_id"),
+                "terraform.file_count": len(terraform_config.get("files", {})),
+                "agent.errors": len(state.get("errors", []))
+            })
+            return state
 
     async def _deployment_node(self, state: ConversationState) -> ConversationState:
         """Deployment node - special handling for streaming"""
@@ -76,7 +115,10 @@ class AgentOrchestrator:
     async def process_stream(
         self,
         user_message: str,
-        conversation_history: list = None
+        conversation_history: list = None,
+        session_id: str = None,
+        ttl_hours: float = None,
+        tenant_id: str = None
     ) -> AsyncGenerator[Dict[str, Any], None]:
         """
         Process user message through agent workflow with streaming updates
@@ -84,12 +126,21 @@ class AgentOrchestrator:
         Args:
             user_message: User's message
             conversation_history: Previous conversation messages
+            session_id: Client session identifier (generated if not provided)
+            ttl_hours: Destroy the deployment this many hours after it completes
+            tenant_id: Tenant the session belongs to, for fair sharing of LLM quota
 
         Yields:
             Stream events (agent status, text, architecture, deployment updates)
         """
+        session_id = session_id or f"session-{uuid.uuid4().hex[:12]}"
+        bind_session_id(session_id)
+        bind_deployment_id(None)
+        bind_tenant_id(tenant_id)
+
         # Initialize state
         state: ConversationState = {
+            "session_id": session_id,
             "user_message": user_message,
             "conversation_history": conversation_history or [],
             "requirements": None,
@@ -98,6 +149,7 @@ class AgentOrchestrator:
             "deployment_id": None,
             "deployment_status": None,
             "deployment_logs": [],
+            "ttl_hours": ttl_hours,
             "gcp_architecture": None,
             "current_step": "started",
             "errors": [],
@@ -105,139 +157,199 @@ class AgentOrchestrator:
             "region": self.region
         }
 
-        try:
-            # Step 1: Requirements Analysis
-            yield self._create_agent_status_event(
-                self.requirements_agent.id,
-                self.requirements_agent.name,
-                "working",
-                "Analyzing your requirements..."
-            )
-
-            state = await self._requirements_node(state)
-
-            if state.get("errors"):
-                yield self._create_error_event("\n".join(state["errors"]))
-                return
-
-            requirements = state.get("requirements", {})
-            summary = requirements.get("summary", "Requirements analyzed")
-
-            yield self._create_text_event(
-                f"✓ **Requirements Analysis Complete**\n\n{summary}\n\n",
-                self.requirements_agent.id
-            )
-
-            yield self._create_agent_status_event(
-                self.requirements_agent.id,
-                self.requirements_agent.name,
-                "completed",
-                None
-            )
-
-            # Step 2: Architecture Design
-            yield self._create_agent_status_event(
-                self.architecture_agent.id,
-                self.architecture_agent.name,
-                "working",
-                "Designing optimal GCP architecture..."
-            )
-
-            state = await self._architecture_node(state)
-
-            if state.get("errors"):
-                yield self._create_error_event("\n".join(state["errors"]))
-                return
-
-            architecture_plan = state.get("architecture_plan", {})
-            explanation = architecture_plan.get("explanation", "Architecture designed")
-            estimated_cost = architecture_plan.get("estimated_cost", 0)
-
-            yield self._create_text_event(
-                f"✓ **Architecture Design Complete**\n\n{explanation}\n\n"
-                f"**Estimated Monthly Cost:** ${estimated_cost:.2f}\n\n",
-                self.architecture_agent.id
-            )
-
-            yield self._create_agent_status_event(
-                self.architecture_agent.id,
-                self.architecture_agent.name,
-                "completed",
-                None
-            )
-
-            # Step 3: IaC Generation
-            yield self._create_agent_status_event(
-                self.iac_agent.id,
-                self.iac_agent.name,
-                "working",
-                "Generating Terraform configuration..."
-            )
-
-            state = await self._iac_node(state)
-
-            if state.get("errors"):
-                yield self._create_error_event("\n".join(state["errors"]))
-                return
-
-            terraform_config = state.get("terraform_config", {})
-            deployment_id = state.get("deployment_id")
-
-            yield self._create_text_event(
-                f"✓ **Terraform Configuration Generated**\n\n"
-                f"**Deployment ID:** `{deployment_id}`\n\n"
-                f"Generated {len(terraform_config.get('files', {}))} Terraform files\n\n",
-                self.iac_agent.id
-            )
-
-            yield self._create_agent_status_event(
-                self.iac_agent.id,
-                self.iac_agent.name,
-                "completed",
-                None
-            )
-
-            # Step 4: Deployment
-            yield self._create_agent_status_event(
-                self.deployment_agent.id,
-                self.deployment_agent.name,
-                "working",
-                "Deploying infrastructure to GCP..."
-            )
-
-            yield self._create_text_event(
-                f"🚀 **Starting Deployment**\n\nDeploying infrastructure to GCP...\n\n",
-                self.deployment_agent.id
-            )
-
-            # Stream deployment updates
-            async for deployment_update in self.deployment_agent.deploy(state):
-                # Send deployment status event
-                yield self._create_deployment_status_event(deployment_update)
-
-                # If deployment completed, send architecture
-                if deployment_update.get("status") == "completed":
-                    if deployment_update.get("architecture"):
-                        yield self._create_architecture_event(
-                            deployment_update["architecture"]
-                        )
-
-                    yield self._create_text_event(
-                        f"\n\n✅ **Deployment Complete!**\n\n"
-                        f"Your infrastructure is now live on GCP.\n"
-                        f"Check the Architecture Dashboard to view your resources.\n",
-                        self.deployment_agent.id
-                    )
-
-            yield self._create_agent_status_event(
-                self.deployment_agent.id,
-                self.deployment_agent.name,
-                "completed",
-                None
-            )
-
-        except Exception as e:
-            yield self._create_error_event(f"Orchestration error: {str(e)}")
+        # One trace per chat session
+        with start_span("chat_session", {
+            "session.id": session_id,
+            "chat.message_chars": len(user_message),
+            "chat.history_length": len(state["conversation_history"])
+        }, new_trace=True) as session_span:
+            try:
+                # Step 1: Requirements Analysis
+                yield self._create_agent_status_event(
+                    self.requirements_agent.id,
+                    self.requirements_agent.name,
+                    "working",
+                    "Analyzing your requirements..."
+                )
+
+                started_at, started = datetime.now(), time.perf_counter()
+                state = await self._requirements_node(state)
+                yield self._finish_stage(
+                    "requirements", self.requirements_agent.id, started_at, started, state
+                )
+
+                if state.get("errors"):
+                    yield self._create_error_event("\n".join(state["errors"]))
+                    return
+
+                requirements = state.get("requirements", {})
+                summary = requirements.get("summary", "Requirements analyzed")
+
+                yield self._create_text_event(
+                    f"✓ **Requirements Analysis Complete**\n\n{summary}\n\n",
+                    self.requirements_agent.id
+                )
+
+                yield self._create_agent_status_event(
+                    self.requirements_agent.id,
+                    self.requirements_agent.name,
+                    "completed",
+                    None
+                )
+
+                # Step 2: Architecture Design
+                yield self._create_agent_status_event(
+                    self.architecture_agent.id,
+                    self.architecture_agent.name,
+                    "working",
+                    "Designing optimal GCP architecture..."
+                )
+
+                started_at, started = datetime.now(), time.perf_counter()
+                state = await self._architecture_node(state)
+                yield self._finish_stage(
+                    "architecture", self.architecture_agent.id, started_at, started, state
+                )
+
+                if state.get("errors"):
+                    yield self._create_error_event("\n".join(state["errors"]))
+                    return
+
+                architecture_plan = state.get("architecture_plan", {})
+                explanation = architecture_plan.get("explanation", "Architecture designed")
+                estimated_cost = architecture_plan.get("estimated_cost", 0)
+
+                yield self._create_text_event(
+                    f"✓ **Architecture Design Complete**\n\n{explanation}\n\n"
+                    f"**Estimated Monthly Cost:** ${estimated_cost:.2f}\n\n",
+                    self.architecture_agent.id
+                )
+
+                yield self._create_agent_status_event(
+                    self.architecture_agent.id,
+                    self.architecture_agent.name,
+                    "completed",
+                    None
+                )
+
+                # Step 3: IaC Generation
+                yield self._create_agent_status_event(
+                    self.iac_agent.id,
+                    self.iac_agent.name,
+                    "working",
+                    "Generating Terraform configuration..."
+                )
+
+                started_at, started = datetime.now(), time.perf_counter()
+                state = await self._iac_node(state)
+                yield self._finish_stage(
+                    "iac_generation", self.iac_agent.id, started_at, started, state
+                )
+
+                if state.get("errors"):
+                    yield self._create_error_event("\n".join(state["errors"]))
+                    return
+
+                terraform_config = state.get("terraform_config", {})
+                deployment_id = state.get("deployment_id")
+                bind_deployment_id(deployment_id)
+                set_span_attributes(session_span, {
+                    "deployment.id": deployment_id,
+                    "architecture.resource_count": len(
+                        state["architecture_plan"].get("resources", [])
+                    ),
+                    "terraform.file_count": len(terraform_config.get("files", {}))
+                })
+
+                warnings = "".join(
+                    f"- {warning}\n" for warning in terraform_config.get("preflight_warnings", [])
+                )
+                yield self._create_text_event(
+                    f"✓ **Terraform Configuration Generated**\n\n"
+                    f"**Deployment ID:** `{deployment_id}`\n\n"
+                    f"Generated {len(terraform_config.get('files', {}))} Terraform files\n\n"
+                    + (f"**Pre-flight warnings:**\n{warnings}\n" if warnings else ""),
+                    self.iac_agent.id
+                )
+
+                yield self._create_agent_status_event(
+                    self.iac_agent.id,
+                    self.iac_agent.name,
+                    "completed",
+                    None
+                )
+
+                # Step 4: Deployment
+                yield self._create_agent_status_event(
+                    self.deployment_agent.id,
+                    self.deployment_agent.name,
+                    "working",
+                    "Deploying infrastructure to GCP..."
+                )
+
+                yield self._create_text_event(
+                    f"🚀 **Starting Deployment**\n\nDeploying infrastructure to GCP...\n\n",
+                    self.deployment_agent.id
+                )
+
+                # Stream deployment updates
+                started_at, started = datetime.now(), time.perf_counter()
+                with start_span("agent.deployment", {"deployment.id": deployment_id}) as span:
+                    async for deployment_update in self.deployment_agent.deploy(state):
+                        # Send deployment status event
+                        yield self._create_deployment_status_event(deployment_update)
+
+                        # If deployment completed, send architecture
+                        if deployment_update.get("status") == "completed":
+                            if deployment_update.get("architecture"):
+                                yield self._create_architecture_event(
+                                    deployment_update["architecture"]
+                                )
+
+                            yield self._create_text_event(
+                                f"\n\n✅ **Deployment Complete!**\n\n"
+                                f"Your infrastructure is now live on GCP.\n"
+                                f"Check the Architecture Dashboard to view your resources.\n",
+                                self.deployment_agent.id
+                            )
+
+                    set_span_attributes(span, {
+                        "deployment.status": state.get("deployment_status")
+                    })
+
+                yield self._finish_stage(
+                    "deployment", self.deployment_agent.id, started_at, started, state
+                )
+
+                yield self._create_agent_status_event(
+                    self.deployment_agent.id,
+                    self.deployment_agent.name,
+                    "completed",
+                    None
+                )
+
+            except Exception as e:
+                logger.exception("Orchestration failed")
+                yield self._create_error_event(f"Orchestration error: {str(e)}")
+
+    def _finish_stage(
+        self,
+        stage: str,
+        agent_id: str,
+        started_at: datetime,
+        started: float,
+        state: ConversationState
+    ) -> Dict[str, Any]:
+        """Record stage latency and build the matching timing event"""
+        duration = time.perf_counter() - started
+        outcome = "error" if state.get("errors") else "success"
+        observe_stage(stage, duration, outcome)
+        logger.info(
+            "Stage %s finished (%s)", stage, outcome,
+            extra={"stage": stage, "outcome": outcome, "duration_ms": round(duration * 1000, 1)}
+        )
+
+        return self._create_timing_event(stage, agent_id, started_at, duration, outcome)
 
     def _create_agent_status_event(
         self,
@@ -292,6 +404,25 @@ class AgentOrchestrator:
             "timestamp": datetime.now().isoformat()
         }
 
+    def _create_timing_event(
+        self,
+        stage: str,
+        agent_id: str,
+        started_at: datetime,
+        duration: float,
+        outcome: str
+    ) -> Dict[str, Any]:
+        """Create a stage timing event for the UI waterfall"""
+        return {
+            "type": "timing",
+            "stage": stage,
+            "agent_id": agent_id,
+            "started_at": started_at.isoformat(),
+            "duration_ms": round(duration * 1000, 1),
+            "outcome": outcome,
+            "timestamp": datetime.now().isoformat()
+        }
+
     def _create_error_event(
         self,
         message: str
@@ -302,3 +433,36 @@ class AgentOrchestrator:
             "message": message,
             "timestamp": datetime.now().isoformat()
         }
+
+
+# Singleton instance. Building the agents loads the LLM and GCP SDKs, so it
+# runs in a worker thread while the API already serves other requests.
+_orchestrator: Optional[asyncio.Task] = None
+
+
+def load_orchestrator() -> asyncio.Task:
+    """Start building the orchestrator singleton in the background, unless built or building"""
+    global _orchestrator
+    if _orchestrator is None or (
+        _orchestrator.done() and (_orchestrator.cancelled() or _orchestrator.exception() is not None)
+    ):
+        # First use, or the last build failed
+        _orchestrator = asyncio.ensure_future(asyncio.to_thread(AgentOrchestrator))
+    return _orchestrator
+
+
+async def get_orchestrator() -> AgentOrchestrator:
+    """Get the orchestrator singleton, waiting for it to be built"""
+    # A cancelled request must not cancel the build for everyone else
+    return await asyncio.shield(load_orchestrator())
+
+
+def orchestrator_status() -> str:
+    """'not_started', 'loading', 'ready' or 'failed'"""
+    if _orchestrator is None:
+        return "not_started"
+    if not _orchestrator.done():
+        return "loading"
+    if _orchestrator.cancelled() or _orchestrator.exception() is not None:
+        return "failed"
+    return "ready"
@@ -1,7 +1,8 @@
 """Requirements Analysis Agent"""
 from typing import Dict, Any
-from ..services import get_vertex_ai_service
+from ..services import get_vertex_ai_service, get_conversation_memory
 from ..utils import REQUIREMENTS_ANALYSIS_PROMPT, ConversationState
+from ..models import RequirementsAnalysis
 
 
 class RequirementsAgent:
@@ -9,6 +10,7 @@ class RequirementsAgent:
 
     def __init__(self):
         self.vertex_ai = get_vertex_ai_service()
+        self.memory = get_conversation_memory()
         self.name = "Requirements Analysis Agent"
         self.id = "requirements-analysis"
 
@@ -25,22 +27,24 @@ class RequirementsAgent:
         user_message = state["user_message"]
         conversation_history = state.get("conversation_history", [])
 
-        # Format conversation history for context
-        history_str = "\n".join([
-            f"{msg['role']}: {msg['content']}"
-            for msg in conversation_history[-5:]  # Last 5 messages
-        ])
+        try:
+            # Pack conversation history into the token budget
+            history_str = await self.memory.build_history(
+                state["session_id"],
+                conversation_history
+            )
 
-        # Create prompt
-        prompt = REQUIREMENTS_ANALYSIS_PROMPT.format(
-            user_message=user_message,
-            conversation_history=history_str
-        )
+            # Create prompt
+            prompt = REQUIREMENTS_ANALYSIS_PROMPT.format(
+                user_message=user_message,
+                conversation_history=history_str
+            )
 
-        try:
             # Get structured response from LLM
-            requirements = await self.vertex_ai.generate_json_response(
-                prompt=prompt
+            requirements = await self.vertex_ai.generate_validated_response(
+                prompt=prompt,
+                schema=RequirementsAnalysis,
+                template="REQUIREMENTS_ANALYSIS_PROMPT"
             )
 
             # Update state
@@ -1,15 +1,44 @@
 """API routes"""
-from fastapi import APIRouter, HTTPException
-from fastapi.responses import StreamingResponse
+import uuid
+from typing import List, Optional
+from fastapi import APIRouter, HTTPException, Query
+from fastapi.responses import JSONResponse, StreamingResponse
 from ..models import ChatMessage
-from ..agents.orchestrator import AgentOrchestrator
+from ..agents.orchestrator import get_orchestrator, load_orchestrator, orchestrator_status
 from .streaming import create_sse_stream
-from ..services import get_gcp_client_service
+from ..services import (
+    get_gcp_client_service,
+    get_usage_ledger,
+    get_log_capture_service,
+    get_workspace_lifecycle_service,
+    get_session_store,
+    get_chat_job_runner,
+    get_admission_controller,
+    get_warmup_service,
+    get_deployment_catalog,
+    get_drift_engine,
+    parse_label_filters,
+    workspace_summary,
+    LockBusyError,
+    AdmissionRejected
+)
+from ..utils import get_event_loop_monitor, bind_session_id
 
 router = APIRouter()
 
-# Initialize orchestrator
-orchestrator = AgentOrchestrator()
+SSE_HEADERS = {
+    "Cache-Control": "no-cache",
+    "Connection": "keep-alive",
+    "X-Accel-Buffering": "no"
+}
+
+
+def _rejected(error: AdmissionRejected) -> HTTPException:
+    return HTTPException(
+        status_code=error.status_code,
+        detail=error.reason,
+        headers={"Retry-After": str(error.retry_after)}
+    )
 
 
 @router.post("/chat")
@@ -18,41 +47,153 @@ async def chat(message: ChatMessage):
     Chat endpoint with SSE streaming
 
     Processes user message through agent workflow and streams updates
+
+    The workflow runs as a background job of the session; this response
+    follows it, and GET /sessions/{session_id}/events can follow it from any
+    worker, e.g. after a dropped connection.
+
+    When all pipeline slots are busy the chat waits in a bounded queue and
+    streams "queue" events with its position; beyond that, or while the
+    worker is overloaded, it is rejected with 429/503 and Retry-After.
+
+    An optional metadata.tenant_id groups sessions for fair sharing of the
+    Vertex AI quota; sessions without one are treated as their own tenant.
     """
+    metadata = message.metadata or {}
+    ttl_hours = metadata.get("ttl_hours")
+    if ttl_hours is not None:
+        try:
+            ttl_hours = float(ttl_hours)
+        except (TypeError, ValueError):
+            raise HTTPException(status_code=400, detail="ttl_hours must be a number")
+
+    session_id = metadata.get("session_id") or f"session-{uuid.uuid4().hex[:12]}"
+    bind_session_id(session_id)
+    runner = get_chat_job_runner()
+    admission = get_admission_controller()
+
+    try:
+        admission.check_stream()
+        ticket = admission.reserve()
+    except AdmissionRejected as e:
+        raise _rejected(e)
+
     try:
         # Get event stream from orchestrator
+        orchestrator = await get_orchestrator()
         event_stream = orchestrator.process_stream(
             user_message=message.content,
-            conversation_history=message.metadata.get("conversation_history", [])
-            if message.metadata else []
-        )
-
-        # Convert to SSE format
-        sse_stream = create_sse_stream(event_stream)
-
-        return StreamingResponse(
-            sse_stream,
-            media_type="text/event-stream",
-            headers={
-                "Cache-Control": "no-cache",
-                "Connection": "keep-alive",
-                "X-Accel-Buffering": "no"
-            }
+            conversation_history=metadata.get("conversation_history", []),
+            session_id=session_id,
+            ttl_hours=ttl_hours,
+            tenant_id=metadata.get("tenant_id")
         )
+        job = await runner.start(session_id, admission.run_pipeline(ticket, event_stream))
 
+    except LockBusyError:
+        admission.release(ticket)
+        raise HTTPException(status_code=409, detail="This session already has a chat in progress")
     except Exception as e:
+        admission.release(ticket)
         raise HTTPException(status_code=500, detail=str(e))
 
+    # Convert to SSE format
+    sse_stream = create_sse_stream(
+        admission.stream(runner.follow(session_id, job["job_id"], job["first_seq"] - 1))
+    )
+
+    return StreamingResponse(
+        sse_stream,
+        media_type="text/event-stream",
+        headers={**SSE_HEADERS, "X-Session-Id": session_id, "X-Job-Id": job["job_id"]}
+    )
+
+
+@router.get("/sessions/{session_id}")
+async def get_session(session_id: str):
+    """A session and its latest chat job"""
+    store = get_session_store()
+    session = await store.get_session(session_id)
+    if session is None:
+        raise HTTPException(status_code=404, detail="Session not found")
+
+    session.pop("summary", None)
+    job = await store.get_job(session["job_id"]) if session.get("job_id") else None
+    return {"session_id": session_id, **session, "job": job}
+
+
+@router.get("/sessions/{session_id}/events")
+async def get_session_events(session_id: str, after: Optional[int] = Query(None, ge=0)):
+    """
+    Stream the events of a session's latest chat job as SSE
+
+    Events carry a "seq"; pass the last one received as `after` to resume.
+    Without it the latest job is streamed from its start.
+    """
+    bind_session_id(session_id)
+    store = get_session_store()
+    session = await store.get_session(session_id)
+    job = await store.get_job(session["job_id"]) if session and session.get("job_id") else None
+    if job is None:
+        raise HTTPException(status_code=404, detail="Session not found")
+
+    admission = get_admission_controller()
+    try:
+        admission.check_stream()
+    except AdmissionRejected as e:
+        raise _rejected(e)
+
+    if after is None:
+        after = job["first_seq"] - 1
+    return StreamingResponse(
+        create_sse_stream(admission.stream(get_chat_job_runner().follow(session_id, job["job_id"], after))),
+        media_type="text/event-stream",
+        headers=SSE_HEADERS
+    )
+
 
 @router.get("/health")
 async def health_check():
     """Health check endpoint"""
     return {
         "status": "healthy",
-        "service": "vibe-devops-backend"
+        "service": "vibe-devops-backend",
+        "orchestrator": orchestrator_status(),
+        "warmup": get_warmup_service().stats(),
+        "event_loop": get_event_loop_monitor().stats(),
+        "admission": get_admission_controller().stats()
     }
 
 
+@router.get("/health/live")
+async def liveness():
+    """Liveness probe: the process is up and its event loop responds"""
+    return {"status": "alive"}
+
+
+@router.get("/health/ready")
+async def readiness():
+    """
+    Readiness probe: 503 until the agents are built and warm-up has finished,
+    so load balancers only route chats to warm instances
+    """
+    status = orchestrator_status()
+    if status == "failed":
+        # Retry the build; the probe stays unready meanwhile
+        load_orchestrator()
+
+    warmup = get_warmup_service()
+    ready = status == "ready" and warmup.finished
+    body = {
+        "status": "ready" if ready else "starting",
+        "orchestrator": status,
+        "warmup": warmup.stats()
+    }
+    if not ready:
+        return JSONResponse(status_code=503, content=body)
+    return body
+
+
 @router.get("/gcp/resources")
 async def get_gcp_resources():
     """Get current GCP resources"""
@@ -62,3 +203,181 @@ async def get_gcp_resources():
         return resources
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.get("/llm/usage")
+async def get_llm_usage(
+    group_by: str = "template",
+    session_id: Optional[str] = None,
+    template: Optional[str] = None,
+    since: Optional[str] = None
+):
+    """Aggregate LLM usage by session, template, day or model"""
+    try:
+        return await get_usage_ledger().aggregate(
+            group_by=group_by,
+            session_id=session_id,
+            template=template,
+            since=since
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@router.get("/deployments")
+async def list_deployments(
+    status: Optional[List[str]] = Query(None),
+    project_id: Optional[str] = None,
+    session_id: Optional[str] = None,
+    tenant_id: Optional[str] = None,
+    label: Optional[List[str]] = Query(None),
+    min_cost: Optional[float] = Query(None, ge=0),
+    max_cost: Optional[float] = Query(None, ge=0),
+    created_after: Optional[str] = None,
+    created_before: Optional[str] = None,
+    sort: str = "created_at",
+    order: str = Query("desc", pattern="^(asc|desc)$"),
+    limit: int = Query(50, ge=1, le=500),
+    cursor: Optional[str] = None
+):
+    """
+    Page through the deployment catalog
+
+    status may be repeated or comma-separated, label is repeated as
+    key=value (all must match). Pass next_cursor back as cursor for the
+    following page.
+    """
+    try:
+        return await get_deployment_catalog().list(
+            status=[s for value in status or [] for s in value.split(",") if s],
+            project_id=project_id,
+            session_id=session_id,
+            tenant_id=tenant_id,
+            labels=parse_label_filters(label or []),
+            min_cost=min_cost,
+            max_cost=max_cost,
+            created_after=created_after,
+            created_before=created_before,
+            sort=sort,
+            descending=order == "desc",
+            limit=limit,
+            cursor=cursor
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@router.get("/deployments/summary")
+async def get_deployments_summary():
+    """Deployment counts by status and by project"""
+    return await get_deployment_catalog().summary()
+
+
+@router.get("/deployments/{deployment_id}")
+async def get_deployment(deployment_id: str):
+    """A deployment from the catalog"""
+    deployment = await get_deployment_catalog().get(deployment_id)
+    if deployment is None:
+        raise HTTPException(status_code=404, detail="Deployment not found")
+    return deployment
+
+
+@router.get("/deployments/{deployment_id}/logs")
+async def get_deployment_logs(
+    deployment_id: str,
+    offset: int = Query(0, ge=0),
+    limit: int = Query(500, ge=1, le=5000)
+):
+    """Read a range of a deployment's Terraform output"""
+    try:
+        logs = await get_log_capture_service().read(deployment_id, offset, limit)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    if logs is None:
+        raise HTTPException(status_code=404, detail="No logs for this deployment")
+    return logs
+
+
+@router.get("/drift")
+async def get_drift_summary():
+    """Resources per drift status and the deployments that drifted"""
+    return await get_drift_engine().summary()
+
+
+@router.get("/drift/resources")
+async def list_drift_resources(
+    deployment_id: Optional[str] = None,
+    status: Optional[str] = None,
+    limit: int = Query(100, ge=1, le=1000),
+    cursor: Optional[str] = None
+):
+    """Page through tracked resources with their attribute differences"""
+    try:
+        return await get_drift_engine().resources(deployment_id, status, limit, cursor)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@router.post("/drift/sweep")
+async def sweep_drift(deployment_id: Optional[str] = None):
+    """Check all workspaces (or one) for drift now, against a fresh inventory"""
+    try:
+        return await get_drift_engine().sweep(deployment_id=deployment_id, refresh_inventory=True)
+    except LockBusyError:
+        raise HTTPException(status_code=409, detail="A drift sweep is already running")
+
+
+@router.get("/drift/events")
+async def get_drift_events(after: Optional[int] = Query(None, ge=0)):
+    """
+    Stream drift changes as SSE
+
+    The first event is the current summary. Changes carry a "seq"; pass
+    the last one received as `after` to resume.
+    """
+    admission = get_admission_controller()
+    try:
+        admission.check_stream()
+    except AdmissionRejected as e:
+        raise _rejected(e)
+
+    return StreamingResponse(
+        create_sse_stream(admission.stream(get_drift_engine().follow(after))),
+        media_type="text/event-stream",
+        headers=SSE_HEADERS
+    )
+
+
+@router.get("/workspaces")
+async def list_workspaces():
+    """Deployment workspaces with their disk usage, least recently used first"""
+    lifecycle = get_workspace_lifecycle_service()
+    workspaces = await lifecycle.list_workspaces()
+    return {
+        "workspaces": [workspace_summary(workspace) for workspace in workspaces],
+        "usage_bytes": sum(workspace.size_bytes for workspace in workspaces),
+        "quota_bytes": lifecycle.quota_bytes or None
+    }
+
+
+@router.post("/workspaces/collect")
+async def collect_workspaces():
+    """Apply the retention and quota policies now"""
+    return await get_workspace_lifecycle_service().collect()
+
+
+@router.post("/workspaces/destroy-expired")
+async def destroy_expired_workspaces():
+    """Destroy expired ephemeral deployments, streaming progress as SSE"""
+    admission = get_admission_controller()
+    try:
+        admission.check_stream()
+    except AdmissionRejected as e:
+        raise _rejected(e)
+
+    return StreamingResponse(
+        create_sse_stream(admission.stream(get_workspace_lifecycle_service().destroy_expired())),
+        media_type="text/event-stream",
+        headers=SSE_HEADERS
+    )
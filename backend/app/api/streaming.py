@@ -1,7 +1,12 @@
 """SSE streaming utilities"""
 import json
+import time
+import asyncio
+import logging
 from typing import AsyncGenerator, Dict, Any
 
+logger = logging.getLogger(__name__)
+
 
 async def create_sse_stream(
     event_generator: AsyncGenerator[Dict[str, Any], None]
@@ -15,13 +20,25 @@ async def create_sse_stream(
     Yields:
         SSE-formatted strings
     """
+    started = time.perf_counter()
+    events = 0
+    outcome = "completed"
+    logger.info("Event stream opened")
+
     try:
         async for event in event_generator:
             # Format as SSE
             event_json = json.dumps(event)
+            events += 1
             yield f"data: {event_json}\n\n"
 
+    except (GeneratorExit, asyncio.CancelledError):
+        outcome = "disconnected"
+        raise
+
     except Exception as e:
+        outcome = "error"
+        logger.warning("Event stream failed: %s", e)
         # Send error event
         error_event = {
             "type": "error",
@@ -30,5 +47,13 @@ async def create_sse_stream(
         yield f"data: {json.dumps(error_event)}\n\n"
 
     finally:
+        logger.info(
+            "Event stream closed (%s)", outcome,
+            extra={
+                "outcome": outcome,
+                "events": events,
+                "duration_ms": round((time.perf_counter() - started) * 1000, 1)
+            }
+        )
         # Send completion signal
         yield "data: [DONE]\n\n"
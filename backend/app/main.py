@@ -1,18 +1,72 @@
 """FastAPI main application"""
 import os
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import Response
 from dotenv import load_dotenv
 from .api import router
+from .agents.orchestrator import load_orchestrator
+from .utils import (
+    render_metrics,
+    configure_tracing,
+    configure_logging,
+    get_event_loop_monitor
+)
+from .services import (
+    get_workspace_lifecycle_service,
+    get_chat_job_runner,
+    get_session_store,
+    get_warmup_service,
+    get_drift_engine
+)
 
 # Load environment variables
 load_dotenv()
 
+# Install the tracer provider before any spans are started
+configure_tracing()
+
+# Structured logs, written on a background thread (flushed at exit)
+configure_logging()
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Start and stop background services"""
+    loop_monitor = get_event_loop_monitor()
+    if os.getenv("LOOP_MONITOR_ENABLED", "True").lower() == "true":
+        loop_monitor.start()
+
+    workspace_lifecycle = get_workspace_lifecycle_service()
+    workspace_lifecycle.start()
+
+    drift_engine = get_drift_engine()
+    if os.getenv("DRIFT_ENABLED", "True").lower() == "true":
+        drift_engine.start()
+
+    # Build the agents in the background so the server starts accepting
+    # requests without waiting for the LLM and GCP SDKs to load, then warm
+    # up connections and caches; /api/health/ready reports when both are done
+    warmup = get_warmup_service()
+    warmup.start(after=load_orchestrator())
+
+    yield
+
+    await warmup.stop()
+    await drift_engine.stop()
+    await workspace_lifecycle.stop()
+    await get_chat_job_runner().shutdown()
+    await get_session_store().close()
+    await loop_monitor.stop()
+
+
 # Create FastAPI app
 app = FastAPI(
     title="Vibe DevOps GCP",
     description="Agentic Cloud Architect for GCP",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
 # Configure CORS
@@ -40,6 +94,13 @@ async def root():
     }
 
 
+@app.get("/metrics")
+async def metrics():
+    """Prometheus metrics endpoint"""
+    body, content_type = render_metrics()
+    return Response(content=body, media_type=content_type)
+
+
 if __name__ == "__main__":
     import uvicorn
 
@@ -20,6 +20,8 @@ from .conversation import (
     TextChunkEvent,
     ArchitectureEvent,
     DeploymentStatusEvent,
+    TimingEvent,
+    QueueEvent,
     ErrorEvent
 )
 
@@ -42,5 +44,7 @@ __all__ = [
     "TextChunkEvent",
     "ArchitectureEvent",
     "DeploymentStatusEvent",
+    "TimingEvent",
+    "QueueEvent",
     "ErrorEvent"
 ]
@@ -50,6 +50,23 @@ class DeploymentStatusEvent(StreamEvent):
     data: Dict[str, Any]
 
 
+class TimingEvent(StreamEvent):
+    """Stage timing event for latency waterfalls"""
+    type: Literal["timing"] = "timing"
+    stage: str
+    agent_id: str
+    started_at: datetime
+    duration_ms: float
+    outcome: Literal["success", "error"]
+
+
+class QueueEvent(StreamEvent):
+    """Position of a chat waiting for a free pipeline slot"""
+    type: Literal["queue"] = "queue"
+    position: int
+    queued: int
+
+
 class ErrorEvent(StreamEvent):
     """Error event"""
     type: Literal["error"] = "error"
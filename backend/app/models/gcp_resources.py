@@ -97,29 +97,32 @@ class GCPArchitecture(BaseModel):
 class RequirementsAnalysis(BaseModel):
     """Output from Requirements Analysis Agent"""
     services_needed: List[str]
-    constraints: Dict[str, any]
-    dependencies: List[Dict[str, str]]
+    constraints: Dict[str, Any]
+    dependencies: List[Dict[str, str]] = Field(default_factory=list)
     estimated_traffic: Optional[str] = None
     security_requirements: Optional[List[str]] = None
     compliance_needs: Optional[List[str]] = None
+    summary: Optional[str] = None
 
 
 class ArchitecturePlan(BaseModel):
     """Output from Cloud Architecture Agent"""
-    resources: List[Dict[str, any]]
-    networking: Dict[str, any]
-    iam_roles: List[Dict[str, str]]
+    resources: List[Dict[str, Any]] = Field(min_length=1)
+    networking: Dict[str, Any] = Field(default_factory=dict)
+    iam_roles: List[Dict[str, str]] = Field(default_factory=list)
     region: str
-    estimated_cost: float
-    deployment_order: List[str]
+    estimated_cost: float = 0.0  # recomputed from per-resource estimates
+    deployment_order: List[str] = Field(min_length=1)
+    explanation: Optional[str] = None
 
 
 class TerraformConfig(BaseModel):
     """Generated Terraform configuration"""
-    deployment_id: str
-    files: Dict[str, str]  # filename -> content
-    variables: Dict[str, any]
-    outputs: Dict[str, str]
+    deployment_id: Optional[str] = None  # assigned by the IaC agent if missing
+    files: Dict[str, str] = Field(min_length=1)  # filename -> content
+    variables: Dict[str, Any] = Field(default_factory=dict)
+    outputs: Dict[str, str] = Field(default_factory=dict)
+    summary: Optional[str] = None
 
 
 class DeploymentStatus(BaseModel):
@@ -129,5 +132,6 @@ class DeploymentStatus(BaseModel):
     progress: float  # 0-100
     current_step: str
     logs: List[str]
-    resources_created: List[str]
+    resources_created: List[str]  # newest entries; the full list once completed
+    resources_created_count: int = 0
     error: Optional[str] = None
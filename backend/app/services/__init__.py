@@ -1,12 +1,111 @@
-from .vertex_ai import VertexAIService, get_vertex_ai_service
-from .terraform import TerraformService, get_terraform_service
+from .vertex_ai import (
+    VertexAIService,
+    InvalidJSONResponseError,
+    OutputValidationError,
+    get_vertex_ai_service
+)
+from .terraform import (
+    TerraformService,
+    TerraformCommandError,
+    GOOGLE_PROVIDER_REQUIREMENTS,
+    get_terraform_service
+)
 from .gcp_client import GCPClientService, get_gcp_client_service
+from .usage_ledger import UsageLedger, get_usage_ledger
+from .conversation_memory import ConversationMemory, get_conversation_memory
+from .terraform_state import (
+    TerraformState,
+    parse_state_file,
+    build_services,
+    build_connections
+)
+from .terraform_plan import PlanDecision
+from .terraform_preflight import (
+    TerraformPreflightService,
+    PreflightResult,
+    ProviderSchema,
+    get_terraform_preflight_service
+)
+from .workspace_lifecycle import (
+    WorkspaceLifecycleService,
+    WorkspaceInfo,
+    workspace_summary,
+    get_workspace_lifecycle_service
+)
+from .log_capture import LogCaptureService, get_log_capture_service
+from .deployment_catalog import DeploymentCatalog, parse_label_filters, get_deployment_catalog
+from .session_store import (
+    SessionStore,
+    SQLiteSessionStore,
+    RedisSessionStore,
+    LockBusyError,
+    get_session_store
+)
+from .chat_jobs import ChatJobRunner, get_chat_job_runner
+from .admission import (
+    AdmissionController,
+    AdmissionRejected,
+    get_admission_controller
+)
+from .warmup import WarmupService, get_warmup_service
+from .drift import DriftEngine, DRIFT_EVENTS, get_drift_engine
+from .llm_backends import (
+    LLMBackend,
+    LLMResponse,
+    FixtureStore,
+    create_backend
+)
 
 __all__ = [
     "VertexAIService",
+    "InvalidJSONResponseError",
+    "OutputValidationError",
     "get_vertex_ai_service",
     "TerraformService",
+    "TerraformCommandError",
+    "GOOGLE_PROVIDER_REQUIREMENTS",
     "get_terraform_service",
     "GCPClientService",
-    "get_gcp_client_service"
+    "get_gcp_client_service",
+    "UsageLedger",
+    "get_usage_ledger",
+    "ConversationMemory",
+    "get_conversation_memory",
+    "TerraformState",
+    "parse_state_file",
+    "build_services",
+    "build_connections",
+    "PlanDecision",
+    "TerraformPreflightService",
+    "PreflightResult",
+    "ProviderSchema",
+    "get_terraform_preflight_service",
+    "WorkspaceLifecycleService",
+    "WorkspaceInfo",
+    "workspace_summary",
+    "get_workspace_lifecycle_service",
+    "LogCaptureService",
+    "get_log_capture_service",
+    "DeploymentCatalog",
+    "parse_label_filters",
+    "get_deployment_catalog",
+    "SessionStore",
+    "SQLiteSessionStore",
+    "RedisSessionStore",
+    "LockBusyError",
+    "get_session_store",
+    "ChatJobRunner",
+    "get_chat_job_runner",
+    "AdmissionController",
+    "AdmissionRejected",
+    "get_admission_controller",
+    "WarmupService",
+    "get_warmup_service",
+    "DriftEngine",
+    "DRIFT_EVENTS",
+    "get_drift_engine",
+    "LLMBackend",
+    "LLMResponse",
+    "FixtureStore",
+    "create_backend"
 ]
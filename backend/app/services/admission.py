@@ -0,0 +1,293 @@
+"""Admission control and load shedding for chat pipelines"""
+import os
+import math
+import time
+import asyncio
+import logging
+from collections import deque
+from contextlib import asynccontextmanager
+from datetime import datetime
+from typing import Any, AsyncGenerator, AsyncIterator, Deque, Dict, Optional
+
+from ..utils import (
+    get_event_loop_monitor,
+    observe_admission,
+    observe_admission_wait,
+    set_admission_in_flight
+)
+
+logger = logging.getLogger(__name__)
+
+
+class AdmissionRejected(Exception):
+    """A request was turned away; status_code is 429 (over limits) or 503 (shedding)"""
+
+    def __init__(self, status_code: int, reason: str, retry_after: int):
+        super().__init__(reason)
+        self.status_code = status_code
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+class Ticket:
+    """A chat pipeline's place in the admission queue"""
+
+    def __init__(self):
+        self.admitted = False
+        self.enqueued_at = time.perf_counter()
+        self.changed = asyncio.Event()
+
+
+def process_rss_bytes() -> Optional[int]:
+    """Current resident set size of this process (None if unknown)"""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+class AdmissionController:
+    """
+    Bounds the work a worker takes on
+
+    - At most max_pipelines chat pipelines run at once; further chats wait in
+      a FIFO queue of queue_size and see their position as "queue" events.
+      Beyond the queue, chats are rejected with 429.
+    - At most max_streams SSE responses are open at once (429 beyond).
+    - At most max_applies Terraform applies run at once; deployments wait
+      for a slot.
+    - New chats are shed with 503 while the event loop lags more than
+      max_loop_lag_ms or the process uses more than max_memory_bytes.
+
+    Limits are per worker process. A limit of 0 disables it.
+    """
+
+    def __init__(
+        self,
+        max_pipelines: int = 8,
+        max_applies: int = 2,
+        max_streams: int = 200,
+        queue_size: int = 32,
+        max_loop_lag_ms: float = 500,
+        max_memory_bytes: int = 0,
+        retry_after_seconds: int = 5
+    ):
+        self.max_pipelines = max_pipelines
+        self.max_applies = max_applies
+        self.max_streams = max_streams
+        self.queue_size = queue_size
+        self.max_loop_lag = max_loop_lag_ms / 1000
+        self.max_memory_bytes = max_memory_bytes
+        self.retry_after = retry_after_seconds
+
+        self.pipelines = 0
+        self.applies = 0
+        self.streams = 0
+        self._queue: Deque[Ticket] = deque()
+        self._apply_waiters: Deque[asyncio.Future] = deque()
+        # Smoothed pipeline duration, for Retry-After estimates
+        self._pipeline_seconds = 60.0
+
+    def stats(self) -> Dict[str, Any]:
+        """Current usage against the limits"""
+        return {
+            "pipelines": self.pipelines,
+            "max_pipelines": self.max_pipelines,
+            "queued": len(self._queue),
+            "queue_size": self.queue_size,
+            "applies": self.applies,
+            "max_applies": self.max_applies,
+            "streams": self.streams,
+            "max_streams": self.max_streams
+        }
+
+    def _update_gauges(self) -> None:
+        set_admission_in_flight("pipelines", self.pipelines)
+        set_admission_in_flight("queued", len(self._queue))
+        set_admission_in_flight("applies", self.applies)
+        set_admission_in_flight("streams", self.streams)
+
+    def _shed_reason(self) -> Optional[str]:
+        """Why new work should be refused right now, if it should"""
+        if self.max_loop_lag:
+            monitor = get_event_loop_monitor()
+            if monitor.running and monitor.recent_lag > self.max_loop_lag:
+                return f"event loop lag {monitor.recent_lag * 1000:.0f} ms"
+        if self.max_memory_bytes:
+            rss = process_rss_bytes()
+            if rss is not None and rss > self.max_memory_bytes:
+                return f"memory use {rss // 2 ** 20} MiB"
+        return None
+
+    def _queue_retry_after(self) -> int:
+        """Seconds until a queue slot is likely to free up"""
+        waves = (len(self._queue) + 1) / max(1, self.max_pipelines)
+        return max(1, min(300, math.ceil(self._pipeline_seconds * waves)))
+
+    def check_stream(self) -> None:
+        """
+        Refuse a new SSE response when max_streams are open
+
+        Raises:
+            AdmissionRejected: Too many open streams
+        """
+        if self.max_streams and self.streams >= self.max_streams:
+            observe_admission("rejected_streams")
+            raise AdmissionRejected(429, "Too many open event streams", self.retry_after)
+
+    async def stream(self, events: AsyncGenerator[Any, None]) -> AsyncGenerator[Any, None]:
+        """Count an SSE response as open while it is being sent"""
+        self.streams += 1
+        self._update_gauges()
+        try:
+            async for event in events:
+                yield event
+        finally:
+            self.streams -= 1
+            self._update_gauges()
+            await events.aclose()
+
+    def reserve(self) -> Ticket:
+        """
+        Admit a chat pipeline or queue it
+
+        Raises:
+            AdmissionRejected: The worker is shedding load (503), or the
+                pipelines and queue are full (429)
+        """
+        reason = self._shed_reason()
+        if reason:
+            observe_admission("shed")
+            logger.warning("Shedding chat request: %s", reason)
+            raise AdmissionRejected(503, f"Server overloaded ({reason})", self.retry_after)
+
+        ticket = Ticket()
+        if not self.max_pipelines or (self.pipelines < self.max_pipelines and not self._queue):
+            ticket.admitted = True
+            self.pipelines += 1
+            observe_admission("admitted")
+        elif len(self._queue) < self.queue_size:
+            self._queue.append(ticket)
+            observe_admission("queued")
+        else:
+            observe_admission("rejected_queue_full")
+            raise AdmissionRejected(429, "Too many chats in progress", self._queue_retry_after())
+
+        self._update_gauges()
+        return ticket
+
+    def release(self, ticket: Ticket, duration: Optional[float] = None) -> None:
+        """Give back a ticket's pipeline slot (or its queue place) and admit the next chat"""
+        if ticket.admitted:
+            self.pipelines -= 1
+            if duration is not None:
+                self._pipeline_seconds = 0.8 * self._pipeline_seconds + 0.2 * duration
+        else:
+            try:
+                self._queue.remove(ticket)
+            except ValueError:
+                pass
+        self._admit_queued()
+
+    def _admit_queued(self) -> None:
+        while self._queue and (not self.max_pipelines or self.pipelines < self.max_pipelines):
+            ticket = self._queue.popleft()
+            ticket.admitted = True
+            self.pipelines += 1
+            ticket.changed.set()
+        # Positions moved for everyone still waiting
+        for ticket in self._queue:
+            ticket.changed.set()
+        self._update_gauges()
+
+    async def run_pipeline(
+        self,
+        ticket: Ticket,
+        events: AsyncGenerator[Dict[str, Any], None]
+    ) -> AsyncGenerator[Dict[str, Any], None]:
+        """
+        Run a chat pipeline once its ticket is admitted
+
+        Yields:
+            "queue" events with the position while waiting, then the
+            pipeline's events
+        """
+        started = None
+        try:
+            if not ticket.admitted:
+                while not ticket.admitted:
+                    ticket.changed.clear()
+                    yield {
+                        "type": "queue",
+                        "position": self._queue.index(ticket) + 1,
+                        "queued": len(self._queue),
+                        "timestamp": datetime.now().isoformat()
+                    }
+                    await ticket.changed.wait()
+                observe_admission_wait(time.perf_counter() - ticket.enqueued_at)
+
+            started = time.perf_counter()
+            async for event in events:
+                yield event
+        finally:
+            self.release(ticket, None if started is None else time.perf_counter() - started)
+            await events.aclose()
+
+    @asynccontextmanager
+    async def apply_slot(self) -> AsyncIterator[None]:
+        """Wait for one of the max_applies Terraform apply slots"""
+        if self.max_applies and self.applies >= self.max_applies:
+            waiter = asyncio.get_running_loop().create_future()
+            self._apply_waiters.append(waiter)
+            try:
+                # The releasing apply hands its slot over directly
+                await waiter
+            except BaseException:
+                if waiter.done() and not waiter.cancelled():
+                    # Cancelled right after being handed a slot: pass it on
+                    self._release_apply()
+                elif waiter in self._apply_waiters:
+                    self._apply_waiters.remove(waiter)
+                raise
+        else:
+            self.applies += 1
+            self._update_gauges()
+
+        try:
+            yield
+        finally:
+            self._release_apply()
+
+    def apply_slot_free(self) -> bool:
+        """Whether an apply could start without waiting"""
+        return not self.max_applies or self.applies < self.max_applies
+
+    def _release_apply(self) -> None:
+        while self._apply_waiters:
+            waiter = self._apply_waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                return
+        self.applies -= 1
+        self._update_gauges()
+
+
+# Singleton instance
+_admission_controller: Optional[AdmissionController] = None
+
+
+def get_admission_controller() -> AdmissionController:
+    """Get or create the admission controller singleton"""
+    global _admission_controller
+    if _admission_controller is None:
+        _admission_controller = AdmissionController(
+            max_pipelines=int(os.getenv("ADMISSION_MAX_PIPELINES", "8")),
+            max_applies=int(os.getenv("ADMISSION_MAX_APPLIES", "2")),
+            max_streams=int(os.getenv("ADMISSION_MAX_STREAMS", "200")),
+            queue_size=int(os.getenv("ADMISSION_QUEUE_SIZE", "32")),
+            max_loop_lag_ms=float(os.getenv("ADMISSION_MAX_LOOP_LAG_MS", "500")),
+            max_memory_bytes=int(float(os.getenv("ADMISSION_MAX_MEMORY_MB", "0")) * 2 ** 20),
+            retry_after_seconds=int(os.getenv("ADMISSION_RETRY_AFTER_SECONDS", "5"))
+        )
+    return _admission_controller
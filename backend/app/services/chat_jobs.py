@@ -0,0 +1,325 @@
+"""Chat jobs that run in the background and can be streamed from any worker"""
+import uuid
+import asyncio
+import logging
+from contextlib import AsyncExitStack
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from typing import Any, AsyncGenerator, Dict, List, Optional
+
+from .session_store import SessionStore, WORKER_ID, get_session_store
+
+logger = logging.getLogger(__name__)
+
+FINISHED = ("completed", "failed", "cancelled")
+
+# Deployment statuses whose events the next progress event supersedes
+PROGRESS_STATUSES = ("planning", "applying")
+
+
+def _is_progress(event: Dict[str, Any]) -> bool:
+    return (
+        event.get("type") == "deployment_status"
+        and (event.get("data") or {}).get("status") in PROGRESS_STATUSES
+    )
+
+
+@dataclass
+class _LocalJob:
+    """
+    A job running in this worker; its newest events are also served from memory
+
+    Consecutive progress events replace each other, and events that are
+    already stored are trimmed once more than max_events are kept.
+    """
+    job_id: str
+    session_id: str
+    first_seq: int
+    events: List[Dict[str, Any]] = field(default_factory=list)
+    pending: List[Dict[str, Any]] = field(default_factory=list)
+    stored_seq: int = 0     # newest seq handed to the store
+    trimmed_seq: int = 0    # newest seq dropped from events
+    done: bool = False
+    changed: asyncio.Condition = field(default_factory=asyncio.Condition)
+    dirty: asyncio.Event = field(default_factory=asyncio.Event)
+    task: Optional[asyncio.Task] = None
+
+
+def _now() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+
+class ChatJobRunner:
+    """
+    Runs chat event streams as jobs decoupled from the request
+
+    A job holds its session's lock while it runs, so a session has at most
+    one job across all workers. Every event gets a per-session "seq" and is
+    handed to followers in this worker immediately; a writer task appends
+    the events to the session store in batches, from which followers on
+    other workers (or reconnecting clients) read them.
+
+    Deployment progress is coalesced: only the latest progress event of each
+    batch is stored, and a batch is written at most every persist_interval
+    seconds, so a long apply stores a bounded number of progress events.
+    """
+
+    def __init__(
+        self,
+        store: SessionStore,
+        lock_ttl: float = 60,
+        poll_timeout: float = 1.0,
+        linger_seconds: float = 60,
+        persist_interval: float = 0.1,
+        max_local_events: int = 1000
+    ):
+        self.store = store
+        self.lock_ttl = lock_ttl
+        self.poll_timeout = poll_timeout
+        self.linger = linger_seconds
+        self.persist_interval = persist_interval
+        self.max_local_events = max_local_events
+        self._jobs: Dict[str, _LocalJob] = {}
+
+    async def start(
+        self,
+        session_id: str,
+        events: AsyncGenerator[Dict[str, Any], None]
+    ) -> Dict[str, Any]:
+        """
+        Start a job for a session
+
+        Args:
+            session_id: Chat session identifier
+            events: Event stream to run (e.g. AgentOrchestrator.process_stream)
+
+        Returns:
+            The job record
+
+        Raises:
+            LockBusyError: The session already has a running job
+        """
+        resources = AsyncExitStack()
+        try:
+            await resources.enter_async_context(
+                self.store.hold_lock(f"session:{session_id}", self.lock_ttl)
+            )
+            first_seq = await self.store.last_seq(session_id) + 1
+            job = {
+                "job_id": f"job-{uuid.uuid4().hex[:12]}",
+                "session_id": session_id,
+                "status": "running",
+                "worker": WORKER_ID,
+                "first_seq": first_seq,
+                "last_seq": None,
+                "started_at": _now(),
+                "finished_at": None
+            }
+            await self.store.put_job(job["job_id"], job)
+            await self.store.update_session(session_id, {
+                "job_id": job["job_id"],
+                "status": "running",
+                "updated_at": job["started_at"]
+            })
+        except BaseException:
+            await events.aclose()
+            await resources.aclose()
+            raise
+
+        local = _LocalJob(
+            job["job_id"], session_id, first_seq,
+            stored_seq=first_seq - 1, trimmed_seq=first_seq - 1
+        )
+        self._jobs[local.job_id] = local
+        local.task = asyncio.create_task(self._run(local, job, events, resources))
+        return job
+
+    async def _run(
+        self,
+        local: _LocalJob,
+        job: Dict[str, Any],
+        events: AsyncGenerator[Dict[str, Any], None],
+        resources: AsyncExitStack
+    ) -> None:
+        writer = asyncio.create_task(self._persist(local))
+        seq = local.first_seq - 1
+        status = "completed"
+
+        async def publish(event: Dict[str, Any]) -> None:
+            progress = _is_progress(event)
+            if progress and local.events and _is_progress(local.events[-1]):
+                local.events[-1] = event
+            else:
+                local.events.append(event)
+                if len(local.events) >= 2 * self.max_local_events:
+                    self._trim(local)
+            if progress and local.pending and _is_progress(local.pending[-1]):
+                local.pending[-1] = event
+            else:
+                local.pending.append(event)
+            local.dirty.set()
+            async with local.changed:
+                local.changed.notify_all()
+
+        try:
+            async for event in events:
+                seq += 1
+                if event.get("type") == "error":
+                    status = "failed"
+                await publish({**event, "seq": seq})
+        except asyncio.CancelledError:
+            status = "cancelled"
+            raise
+        except Exception as e:
+            logger.warning("Chat job %s failed: %s", local.job_id, e)
+            status = "failed"
+            seq += 1
+            await publish({"type": "error", "message": str(e), "seq": seq})
+        finally:
+            await events.aclose()
+            local.done = True
+            local.dirty.set()
+            async with local.changed:
+                local.changed.notify_all()
+            try:
+                # Events must be stored before the job is marked finished
+                await writer
+                job.update(status=status, last_seq=seq, finished_at=_now())
+                await self.store.put_job(local.job_id, job)
+                await self.store.update_session(local.session_id, {
+                    "status": status,
+                    "updated_at": job["finished_at"]
+                })
+            except Exception as e:
+                logger.warning("Recording chat job %s failed: %s", local.job_id, e)
+            finally:
+                await resources.aclose()
+                asyncio.get_running_loop().call_later(self.linger, self._jobs.pop, local.job_id, None)
+
+    def _trim(self, local: _LocalJob) -> None:
+        """Drop the oldest events beyond max_local_events, keeping those not stored yet"""
+        stored = 0
+        while stored < len(local.events) and local.events[stored]["seq"] <= local.stored_seq:
+            stored += 1
+        drop = min(stored, len(local.events) - self.max_local_events)
+        if drop > 0:
+            local.trimmed_seq = local.events[drop - 1]["seq"]
+            del local.events[:drop]
+
+    async def _persist(self, local: _LocalJob) -> None:
+        """
+        Append pending events to the store; events arriving during a write or
+        the pause after it form the next batch
+        """
+        while True:
+            await local.dirty.wait()
+            local.dirty.clear()
+            batch, local.pending = local.pending, []
+            if batch:
+                try:
+                    await self.store.append_events(local.session_id, batch)
+                except Exception as e:
+                    logger.warning("Storing %d events of %s failed: %s", len(batch), local.session_id, e)
+                # Failed batches are not retried, so memory does not wait for them
+                local.stored_seq = batch[-1]["seq"]
+            if local.done and not local.pending:
+                return
+            if not local.done:
+                await asyncio.sleep(self.persist_interval)
+
+    async def follow(
+        self,
+        session_id: str,
+        job_id: str,
+        after: int = 0
+    ) -> AsyncGenerator[Dict[str, Any], None]:
+        """
+        Stream a job's events with seq greater than after, until the job ends
+
+        Jobs running in this worker are served from memory, others are
+        tailed from the session store. Superseded progress events are
+        skipped, so seqs may have gaps.
+        """
+        local = self._jobs.get(job_id)
+        if local is not None:
+            while True:
+                if after < local.trimmed_seq:
+                    # Earlier jobs of the session, or events no longer in memory
+                    until = local.trimmed_seq
+                    async for event in self._read_range(session_id, after, until):
+                        yield event
+                    after = until
+                    continue
+
+                async with local.changed:
+                    await local.changed.wait_for(
+                        lambda: local.done or (local.events and local.events[-1]["seq"] > after)
+                    )
+                events = local.events
+                index = len(events)
+                while index > 0 and events[index - 1]["seq"] > after:
+                    index -= 1
+                for event in events[index:]:
+                    yield event
+                    after = event["seq"]
+                if local.done and (not local.events or local.events[-1]["seq"] <= after):
+                    return
+
+        while True:
+            events = await self.store.wait_events(session_id, after, self.poll_timeout)
+            job = await self.store.get_job(job_id)
+            if job is None:
+                return
+
+            last_seq = job.get("last_seq")
+            for event in events:
+                if last_seq is not None and event["seq"] > last_seq:
+                    return
+                yield event
+                after = event["seq"]
+
+            if job["status"] in FINISHED:
+                async for event in self._read_range(session_id, after, last_seq):
+                    yield event
+                return
+
+            if not events and await self.store.lock_owner(f"session:{session_id}") is None:
+                # The worker running the job died without recording its end
+                yield {"type": "error", "message": "The worker running this session stopped"}
+                return
+
+    async def _read_range(
+        self,
+        session_id: str,
+        after: int,
+        until: Optional[int]
+    ) -> AsyncGenerator[Dict[str, Any], None]:
+        """Stored events with after < seq <= until"""
+        while until is None or after < until:
+            events = await self.store.read_events(session_id, after)
+            if not events:
+                return
+            for event in events:
+                if until is not None and event["seq"] > until:
+                    return
+                yield event
+                after = event["seq"]
+
+    async def shutdown(self) -> None:
+        """Cancel the jobs running in this worker"""
+        tasks = [job.task for job in self._jobs.values() if job.task and not job.task.done()]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+
+# Singleton instance
+_chat_job_runner: Optional[ChatJobRunner] = None
+
+
+def get_chat_job_runner() -> ChatJobRunner:
+    """Get or create the chat job runner singleton"""
+    global _chat_job_runner
+    if _chat_job_runner is None:
+        _chat_job_runner = ChatJobRunner(get_session_store())
+    return _chat_job_runner
@@ -0,0 +1,228 @@
+"""Token-budgeted conversation memory with cached rolling summaries"""
+import os
+import asyncio
+import hashlib
+import logging
+import math
+from collections import OrderedDict
+from dataclasses import dataclass, asdict
+from typing import Any, Dict, List, Optional
+from ..utils import CONVERSATION_SUMMARY_PROMPT
+from .vertex_ai import VertexAIService, get_vertex_ai_service
+from .session_store import SessionStore, get_session_store
+
+logger = logging.getLogger(__name__)
+
+# Gemini tokenizes English prose at roughly four characters per token
+CHARS_PER_TOKEN = 4
+
+
+def estimate_tokens(text: str) -> int:
+    """Cheap token estimate used for budgeting (no API round trip)"""
+    return math.ceil(len(text) / CHARS_PER_TOKEN)
+
+
+@dataclass
+class SessionSummary:
+    """Rolling summary of the oldest messages of one session"""
+    covered: int = 0          # number of leading messages folded into the summary
+    prefix_hash: str = ""     # hash of those messages, to detect a different history
+    text: str = ""
+
+
+class ConversationMemory:
+    """
+    Packs conversation history into a token budget
+
+    Summaries are cached in memory and, when a session store is given, saved
+    with the session so any worker can continue a conversation.
+    """
+
+    def __init__(
+        self,
+        vertex_ai: VertexAIService,
+        store: Optional[SessionStore] = None,
+        token_budget: int = 2000,
+        message_token_limit: int = 500,
+        summary_max_words: int = 200,
+        max_sessions: int = 1000
+    ):
+        self.vertex_ai = vertex_ai
+        self.store = store
+        self.token_budget = token_budget
+        self.message_token_limit = message_token_limit
+        self.summary_max_words = summary_max_words
+        self.max_sessions = max_sessions
+
+        self._summaries: "OrderedDict[str, SessionSummary]" = OrderedDict()
+        self._locks: Dict[str, asyncio.Lock] = {}
+
+    async def build_history(
+        self,
+        session_id: str,
+        messages: List[Dict[str, Any]]
+    ) -> str:
+        """
+        Render conversation history for a prompt within the token budget
+
+        The newest messages are kept verbatim (oversized ones are truncated).
+        Older messages that do not fit are folded into a per-session rolling
+        summary, which is extended incrementally as the conversation grows.
+
+        Args:
+            session_id: Chat session identifier
+            messages: Full conversation history, oldest first
+
+        Returns:
+            History text for the prompt
+        """
+        lines = [self._format_message(message) for message in messages]
+
+        # Reserve room for the summary, then fill the rest newest-first
+        summary_budget = math.ceil(self.summary_max_words * 1.5)
+        recent_budget = self.token_budget - summary_budget
+        first_recent = len(lines)
+        used = 0
+
+        while first_recent > 0:
+            cost = estimate_tokens(lines[first_recent - 1]) + 1
+            if used + cost > recent_budget:
+                break
+            used += cost
+            first_recent -= 1
+
+        if first_recent == 0:
+            return "\n".join(lines)
+
+        # When folding, fold down to half the budget so the summary is not
+        # rewritten on every turn
+        fold_target = first_recent
+        while fold_target < len(lines) - 1 and used > recent_budget // 2:
+            used -= estimate_tokens(lines[fold_target]) + 1
+            fold_target += 1
+
+        async with self._lock_for(session_id):
+            summary = await self._fold_into_summary(
+                session_id, messages, first_recent, fold_target
+            )
+
+        # The cached summary may already cover some of the recent messages
+        first_recent = max(first_recent, summary.covered)
+        parts = []
+        if summary.text:
+            parts.append(f"Summary of earlier conversation: {summary.text}")
+        parts.extend(lines[first_recent:])
+
+        return "\n".join(parts)
+
+    async def _fold_into_summary(
+        self,
+        session_id: str,
+        messages: List[Dict[str, Any]],
+        required: int,
+        upto: int
+    ) -> SessionSummary:
+        """Extend the cached summary to messages[:upto] if it covers less than required"""
+        summary = self._summaries.get(session_id)
+        if summary is None and self.store is not None:
+            summary = await self._load_summary(session_id)
+        stored = summary
+
+        if summary is None or summary.prefix_hash != self._hash_messages(messages[:summary.covered]):
+            # New session, or the client sent a different history
+            summary = SessionSummary()
+
+        if required > summary.covered:
+            new_lines = "\n".join(
+                self._format_message(message) for message in messages[summary.covered:upto]
+            )
+            prompt = CONVERSATION_SUMMARY_PROMPT.format(
+                summary=summary.text or "(empty)",
+                messages=new_lines,
+                max_words=self.summary_max_words
+            )
+
+            try:
+                text = await self.vertex_ai.generate_response(
+                    prompt=prompt,
+                    template="CONVERSATION_SUMMARY_PROMPT"
+                )
+                summary = SessionSummary(
+                    covered=upto,
+                    prefix_hash=self._hash_messages(messages[:upto]),
+                    text=self._truncate(text.strip(), math.ceil(self.summary_max_words * 1.5))
+                )
+            except Exception as e:
+                # Keep the previous summary; older messages are simply dropped
+                logger.warning("Conversation summary update failed: %s", e)
+
+        if self.store is not None and summary is not stored and summary.covered:
+            try:
+                await self.store.update_session(session_id, {"summary": asdict(summary)})
+            except Exception as e:
+                logger.warning("Saving the conversation summary failed: %s", e)
+
+        self._summaries[session_id] = summary
+        self._summaries.move_to_end(session_id)
+        while len(self._summaries) > self.max_sessions:
+            evicted, _ = self._summaries.popitem(last=False)
+            self._locks.pop(evicted, None)
+
+        return summary
+
+    async def _load_summary(self, session_id: str) -> Optional[SessionSummary]:
+        """Summary saved by any worker for the session"""
+        try:
+            session = await self.store.get_session(session_id)
+        except Exception as e:
+            logger.warning("Loading the conversation summary failed: %s", e)
+            return None
+        if not session or not session.get("summary"):
+            return None
+        return SessionSummary(**session["summary"])
+
+    def _format_message(self, message: Dict[str, Any]) -> str:
+        """Render one message, truncating oversized content"""
+        content = self._truncate(str(message.get("content", "")), self.message_token_limit)
+        return f"{message.get('role', 'user')}: {content}"
+
+    def _truncate(self, text: str, max_tokens: int) -> str:
+        """Keep the head and tail of text that exceeds max_tokens"""
+        if estimate_tokens(text) <= max_tokens:
+            return text
+
+        keep = max_tokens * CHARS_PER_TOKEN // 2
+        dropped = estimate_tokens(text[keep:-keep])
+        return f"{text[:keep]} [... {dropped} tokens truncated ...] {text[-keep:]}"
+
+    def _hash_messages(self, messages: List[Dict[str, Any]]) -> str:
+        digest = hashlib.sha256()
+        for message in messages:
+            digest.update(str(message.get("role", "")).encode())
+            digest.update(b"\0")
+            digest.update(str(message.get("content", "")).encode())
+            digest.update(b"\0")
+        return digest.hexdigest()
+
+    def _lock_for(self, session_id: str) -> asyncio.Lock:
+        if session_id not in self._locks:
+            self._locks[session_id] = asyncio.Lock()
+        return self._locks[session_id]
+
+
+# Singleton instance
+_conversation_memory: Optional[ConversationMemory] = None
+
+
+def get_conversation_memory() -> ConversationMemory:
+    """Get or create the conversation memory singleton"""
+    global _conversation_memory
+    if _conversation_memory is None:
+        _conversation_memory = ConversationMemory(
+            vertex_ai=get_vertex_ai_service(),
+            store=get_session_store(),
+            token_budget=int(os.getenv("CONVERSATION_TOKEN_BUDGET", "2000")),
+            message_token_limit=int(os.getenv("CONVERSATION_MESSAGE_TOKEN_LIMIT", "500")),
+            summary_max_words=int(os.getenv("CONVERSATION_SUMMARY_MAX_WORDS", "200"))
+        )
+    return _conversation_memory
@@ -0,0 +1,370 @@
+"""Catalog of deployments and their lifecycle, queryable by the dashboard"""
+import os
+import json
+import time
+import base64
+import asyncio
+import sqlite3
+import threading
+import logging
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+STATUSES = ("pending", "planning", "applying", "completed", "failed", "destroyed", "unknown")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS deployments (
+    deployment_id TEXT PRIMARY KEY,
+    name TEXT,
+    status TEXT NOT NULL,
+    session_id TEXT,
+    tenant_id TEXT,
+    project_id TEXT,
+    region TEXT,
+    resource_count INTEGER NOT NULL DEFAULT 0,
+    monthly_cost REAL NOT NULL DEFAULT 0,
+    plan_action TEXT,
+    error TEXT,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL,
+    finished_at REAL
+);
+CREATE INDEX IF NOT EXISTS idx_deployments_created ON deployments (created_at, deployment_id);
+CREATE INDEX IF NOT EXISTS idx_deployments_status ON deployments (status, created_at, deployment_id);
+CREATE INDEX IF NOT EXISTS idx_deployments_project ON deployments (project_id, created_at, deployment_id);
+CREATE INDEX IF NOT EXISTS idx_deployments_session ON deployments (session_id);
+CREATE INDEX IF NOT EXISTS idx_deployments_cost ON deployments (monthly_cost, deployment_id);
+CREATE INDEX IF NOT EXISTS idx_deployments_updated ON deployments (updated_at, deployment_id);
+CREATE TABLE IF NOT EXISTS deployment_labels (
+    deployment_id TEXT NOT NULL,
+    key TEXT NOT NULL,
+    value TEXT NOT NULL,
+    PRIMARY KEY (deployment_id, key)
+);
+CREATE INDEX IF NOT EXISTS idx_deployment_labels ON deployment_labels (key, value, deployment_id);
+"""
+
+# Allowed sort keys -> column
+SORT_COLUMNS = {
+    "created_at": "created_at",
+    "updated_at": "updated_at",
+    "monthly_cost": "monthly_cost"
+}
+
+COLUMNS = (
+    "deployment_id", "name", "status", "session_id", "tenant_id", "project_id", "region",
+    "resource_count", "monthly_cost", "plan_action", "error", "created_at", "updated_at",
+    "finished_at"
+)
+
+
+def _parse_time(value: Optional[str]) -> Optional[float]:
+    """Epoch seconds from an ISO date or datetime (UTC unless it has an offset)"""
+    if not value:
+        return None
+    try:
+        parsed = datetime.fromisoformat(value)
+    except ValueError:
+        raise ValueError(f"Invalid date: {value}")
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed.timestamp()
+
+
+def _encode_cursor(value: Any, deployment_id: str) -> str:
+    return base64.urlsafe_b64encode(json.dumps([value, deployment_id]).encode()).decode()
+
+
+def _decode_cursor(cursor: str) -> Tuple[Any, str]:
+    try:
+        value, deployment_id = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+    except (ValueError, TypeError):
+        raise ValueError("Invalid cursor")
+    return value, deployment_id
+
+
+def parse_label_filters(labels: Iterable[str]) -> Dict[str, str]:
+    """Label filters given as key=value"""
+    filters = {}
+    for label in labels:
+        key, sep, value = label.partition("=")
+        if not sep or not key:
+            raise ValueError(f"Label filters must be key=value: {label}")
+        filters[key] = value
+    return filters
+
+
+class DeploymentCatalog:
+    """
+    SQLite-backed catalog of deployments
+
+    Deployments are written as their status changes, so a listing never
+    scans the workspace directory. Listings page with keyset cursors on the
+    sort column and deployment id rather than OFFSET, so every page costs
+    the same however deep it is, and every filter has an index.
+    """
+
+    def __init__(self, db_path: str = "./data/deployments.db"):
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.db_path), check_same_thread=False, timeout=10)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(SCHEMA)
+
+    async def record(
+        self,
+        deployment_id: str,
+        status: str,
+        labels: Optional[Dict[str, str]] = None,
+        **fields: Any
+    ) -> None:
+        """
+        Create or update a deployment
+
+        Only the given fields change; labels are merged into the existing
+        ones. Failures are logged and swallowed so the catalog never fails
+        a deployment.
+
+        Args:
+            deployment_id: Deployment to record
+            status: Its new status
+            labels: Labels to set
+            **fields: Other columns, e.g. project_id, monthly_cost, error
+        """
+        try:
+            unknown = set(fields) - set(COLUMNS)
+            if unknown:
+                raise ValueError(f"Unknown catalog fields: {', '.join(sorted(unknown))}")
+
+            fields["status"] = status
+            if status in ("completed", "failed", "destroyed") and "finished_at" not in fields:
+                fields["finished_at"] = time.time()
+
+            await asyncio.to_thread(self._upsert, deployment_id, fields, labels or {})
+        except Exception as e:
+            logger.warning("Failed to record deployment %s: %s", deployment_id, e)
+
+    def _upsert(self, deployment_id: str, fields: Dict[str, Any], labels: Dict[str, str]) -> None:
+        now = time.time()
+        fields = {"created_at": now, **fields, "updated_at": now}
+        columns = ["deployment_id", *fields]
+        updates = ", ".join(
+            f"{column} = excluded.{column}" for column in fields if column != "created_at"
+        )
+
+        with self._lock:
+            self._conn.execute(
+                f"INSERT INTO deployments ({', '.join(columns)}) "
+                f"VALUES ({', '.join('?' for _ in columns)}) "
+                f"ON CONFLICT (deployment_id) DO UPDATE SET {updates}",
+                (deployment_id, *fields.values())
+            )
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO deployment_labels (deployment_id, key, value) VALUES (?, ?, ?)",
+                [(deployment_id, key, str(value)) for key, value in labels.items()]
+            )
+            self._conn.commit()
+
+    async def backfill(self, deployments: List[Dict[str, Any]]) -> int:
+        """
+        Add deployments that predate the catalog, leaving known ones alone
+
+        Args:
+            deployments: Rows with deployment_id, status and created_at
+
+        Returns:
+            Number of deployments added
+        """
+        return await asyncio.to_thread(self._backfill, deployments)
+
+    def _backfill(self, deployments: List[Dict[str, Any]]) -> int:
+        with self._lock:
+            before = self._conn.total_changes
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO deployments "
+                "(deployment_id, status, created_at, updated_at) VALUES (?, ?, ?, ?)",
+                [
+                    (d["deployment_id"], d["status"], d["created_at"], d["created_at"])
+                    for d in deployments
+                ]
+            )
+            self._conn.commit()
+            return self._conn.total_changes - before
+
+    async def get(self, deployment_id: str) -> Optional[Dict[str, Any]]:
+        """A deployment with its labels, or None"""
+        rows = await asyncio.to_thread(
+            self._deployments,
+            f"SELECT {', '.join(COLUMNS)} FROM deployments WHERE deployment_id = ?",
+            (deployment_id,)
+        )
+        return rows[0] if rows else None
+
+    async def list(
+        self,
+        status: Optional[List[str]] = None,
+        project_id: Optional[str] = None,
+        session_id: Optional[str] = None,
+        tenant_id: Optional[str] = None,
+        labels: Optional[Dict[str, str]] = None,
+        min_cost: Optional[float] = None,
+        max_cost: Optional[float] = None,
+        created_after: Optional[str] = None,
+        created_before: Optional[str] = None,
+        sort: str = "created_at",
+        descending: bool = True,
+        limit: int = 50,
+        cursor: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """
+        One page of deployments matching all given filters
+
+        Args:
+            status: Any of these statuses
+            project_id: Only this GCP project
+            session_id: Only deployments from this chat session
+            tenant_id: Only this tenant
+            labels: Labels that must all match
+            min_cost: Lowest estimated monthly cost
+            max_cost: Highest estimated monthly cost
+            created_after: ISO date or datetime, inclusive
+            created_before: ISO date or datetime, exclusive
+            sort: One of 'created_at', 'updated_at', 'monthly_cost'
+            descending: Newest (or most expensive) first
+            limit: Page size
+            cursor: next_cursor of the previous page
+
+        Returns:
+            {"deployments": [...], "total": matches, "next_cursor": str or None};
+            total is only counted for the first page (None with a cursor)
+        """
+        if sort not in SORT_COLUMNS:
+            raise ValueError(f"sort must be one of {', '.join(SORT_COLUMNS)}")
+        unknown = [s for s in status or [] if s not in STATUSES]
+        if unknown:
+            raise ValueError(f"Unknown status: {', '.join(unknown)}; expected one of {', '.join(STATUSES)}")
+
+        filters, params = [], []
+        if status:
+            filters.append(f"status IN ({', '.join('?' for _ in status)})")
+            params += status
+        for column, value in (("project_id", project_id), ("session_id", session_id), ("tenant_id", tenant_id)):
+            if value:
+                filters.append(f"{column} = ?")
+                params.append(value)
+        for key, value in (labels or {}).items():
+            filters.append(
+                "deployment_id IN (SELECT deployment_id FROM deployment_labels WHERE key = ? AND value = ?)"
+            )
+            params += [key, value]
+        if min_cost is not None:
+            filters.append("monthly_cost >= ?")
+            params.append(min_cost)
+        if max_cost is not None:
+            filters.append("monthly_cost <= ?")
+            params.append(max_cost)
+        after, before = _parse_time(created_after), _parse_time(created_before)
+        if after is not None:
+            filters.append("created_at >= ?")
+            params.append(after)
+        if before is not None:
+            filters.append("created_at < ?")
+            params.append(before)
+
+        return await asyncio.to_thread(
+            self._list, filters, params, SORT_COLUMNS[sort], descending, limit, cursor
+        )
+
+    def _list(
+        self,
+        filters: List[str],
+        params: List[Any],
+        column: str,
+        descending: bool,
+        limit: int,
+        cursor: Optional[str]
+    ) -> Dict[str, Any]:
+        total = None
+        if not cursor:
+            where = f"WHERE {' AND '.join(filters)}" if filters else ""
+            total = self._query(f"SELECT COUNT(*) AS total FROM deployments {where}", tuple(params))[0]["total"]
+
+        page_filters, page_params = list(filters), list(params)
+        if cursor:
+            value, deployment_id = _decode_cursor(cursor)
+            page_filters.append(f"({column}, deployment_id) {'<' if descending else '>'} (?, ?)")
+            page_params += [value, deployment_id]
+        page_where = f"WHERE {' AND '.join(page_filters)}" if page_filters else ""
+        order = "DESC" if descending else "ASC"
+
+        # One row more than the page tells whether another page follows
+        rows = self._deployments(
+            f"SELECT {', '.join(COLUMNS)} FROM deployments {page_where} "
+            f"ORDER BY {column} {order}, deployment_id {order} LIMIT ?",
+            (*page_params, limit + 1)
+        )
+        next_cursor = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            next_cursor = _encode_cursor(rows[-1][column], rows[-1]["deployment_id"])
+
+        return {"deployments": rows, "total": total, "next_cursor": next_cursor}
+
+    async def summary(self) -> Dict[str, Any]:
+        """Deployment counts by status and counts and cost by project"""
+        return await asyncio.to_thread(self._summary)
+
+    def _summary(self) -> Dict[str, Any]:
+        by_status = self._query("SELECT status, COUNT(*) AS count FROM deployments GROUP BY status")
+        by_project = self._query(
+            "SELECT project_id, COUNT(*) AS count, "
+            "ROUND(SUM(CASE WHEN status = 'completed' THEN monthly_cost ELSE 0 END), 2) AS monthly_cost "
+            "FROM deployments GROUP BY project_id ORDER BY count DESC"
+        )
+        return {
+            "total": sum(row["count"] for row in by_status),
+            "by_status": {row["status"]: row["count"] for row in by_status},
+            "by_project": by_project
+        }
+
+    def _query(self, query: str, params: tuple = ()) -> List[Dict[str, Any]]:
+        with self._lock:
+            cursor = self._conn.execute(query, params)
+            columns = [description[0] for description in cursor.description]
+            return [dict(zip(columns, row)) for row in cursor.fetchall()]
+
+    def _deployments(self, query: str, params: tuple = ()) -> List[Dict[str, Any]]:
+        """Deployment rows with their labels attached"""
+        rows = self._query(query, params)
+        if not rows:
+            return rows
+
+        ids = [row["deployment_id"] for row in rows]
+        labels: Dict[str, Dict[str, str]] = {}
+        for label in self._query(
+            f"SELECT deployment_id, key, value FROM deployment_labels "
+            f"WHERE deployment_id IN ({', '.join('?' for _ in ids)})",
+            tuple(ids)
+        ):
+            labels.setdefault(label["deployment_id"], {})[label["key"]] = label["value"]
+        for row in rows:
+            row["labels"] = labels.get(row["deployment_id"], {})
+        return rows
+
+
+# Singleton instance
+_deployment_catalog: Optional[DeploymentCatalog] = None
+
+
+def get_deployment_catalog() -> DeploymentCatalog:
+    """Get or create the deployment catalog singleton"""
+    global _deployment_catalog
+    if _deployment_catalog is None:
+        _deployment_catalog = DeploymentCatalog(os.getenv("DEPLOYMENT_CATALOG_DB", "./data/deployments.db"))
+    return _deployment_catalog
@@ -0,0 +1,628 @@
+"""Incremental drift detection between Terraform state and the live GCP inventory"""
+import os
+import json
+import time
+import zlib
+import base64
+import asyncio
+import hashlib
+import sqlite3
+import threading
+import logging
+from pathlib import Path
+from typing import Any, AsyncGenerator, Callable, Dict, Iterable, List, Optional, Tuple
+
+from .gcp_client import GCPClientService, get_gcp_client_service
+from .terraform import get_terraform_service
+from .terraform_state import StateResource, parse_state_file, read_state_header
+from .session_store import SessionStore, LockBusyError, get_session_store
+from ..utils import (
+    observe_drift_sweep,
+    observe_drift_checks,
+    set_drift_resources,
+    start_span,
+    set_span_attributes
+)
+
+logger = logging.getLogger(__name__)
+
+# Event log (in the session store) that drift changes are published to
+DRIFT_EVENTS = "drift:events"
+SWEEP_LOCK = "drift-sweep"
+
+STATUSES = ("in_sync", "drifted", "missing", "unknown")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS drift_workspaces (
+    deployment_id TEXT PRIMARY KEY,
+    serial INTEGER,
+    lineage TEXT,
+    parsed_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS drift_resources (
+    deployment_id TEXT NOT NULL,
+    address TEXT NOT NULL,
+    type TEXT NOT NULL,
+    live_key TEXT NOT NULL,
+    expected TEXT NOT NULL,
+    state_hash TEXT NOT NULL,
+    live_hash TEXT,
+    status TEXT NOT NULL,
+    diff TEXT,
+    checked_at REAL,
+    changed_at REAL,
+    PRIMARY KEY (deployment_id, address)
+);
+CREATE INDEX IF NOT EXISTS idx_drift_status ON drift_resources (status, deployment_id, address);
+"""
+
+
+def _labels(labels: Optional[Dict[str, Any]]) -> Dict[str, str]:
+    # goog-* labels are added by GCP and the provider, not by the configuration
+    return {
+        key: str(value) for key, value in (labels or {}).items()
+        if not key.startswith("goog-")
+    }
+
+
+def _instance_state(attributes: Dict[str, Any]) -> Tuple[str, Dict[str, Any]]:
+    zone = str(attributes.get("zone", "")).split("/")[-1]
+    return f"{zone}/{attributes.get('name')}", {
+        "machine_type": str(attributes.get("machine_type", "")).split("/")[-1],
+        "zone": zone,
+        "status": str(attributes.get("current_status") or "RUNNING").lower(),
+        "labels": _labels(attributes.get("effective_labels") or attributes.get("labels"))
+    }
+
+
+def _instance_live(item: Dict[str, Any]) -> Tuple[str, Dict[str, Any]]:
+    return f"{item['zone']}/{item['name']}", {
+        "machine_type": item.get("machine_type"),
+        "zone": item["zone"],
+        "status": item.get("status"),
+        "labels": _labels(item.get("labels"))
+    }
+
+
+def _bucket_state(attributes: Dict[str, Any]) -> Tuple[str, Dict[str, Any]]:
+    return str(attributes.get("name")), {
+        "location": str(attributes.get("location", "")).upper(),
+        "storage_class": str(attributes.get("storage_class", "")).upper(),
+        "labels": _labels(attributes.get("effective_labels") or attributes.get("labels"))
+    }
+
+
+def _bucket_live(item: Dict[str, Any]) -> Tuple[str, Dict[str, Any]]:
+    return item["name"], {
+        "location": str(item.get("location") or "").upper(),
+        "storage_class": str(item.get("storage_class") or "").upper(),
+        "labels": _labels(item.get("labels"))
+    }
+
+
+# Terraform type -> (inventory listing, state attributes, live attributes);
+# each maps a resource to its inventory key and the attributes compared
+TRACKED_TYPES: Dict[str, Tuple[str, Callable, Callable]] = {
+    "google_compute_instance": ("compute_instances", _instance_state, _instance_live),
+    "google_storage_bucket": ("storage_buckets", _bucket_state, _bucket_live)
+}
+
+
+def fingerprint(attributes: Dict[str, Any]) -> str:
+    """Stable hash of compared attributes"""
+    return hashlib.sha256(json.dumps(attributes, sort_keys=True).encode()).hexdigest()[:16]
+
+
+def attribute_diff(expected: Dict[str, Any], actual: Dict[str, Any]) -> Dict[str, Dict[str, Any]]:
+    """Attributes whose live value differs from the state"""
+    return {
+        key: {"expected": expected.get(key), "actual": actual.get(key)}
+        for key in sorted(set(expected) | set(actual))
+        if expected.get(key) != actual.get(key)
+    }
+
+
+def partition(deployment_id: str, batches: int) -> int:
+    """Scheduler batch a workspace belongs to (stable across workers and restarts)"""
+    return zlib.crc32(deployment_id.encode()) % batches
+
+
+class DriftEngine:
+    """
+    Finds deployed resources that no longer match their Terraform state
+
+    Rather than running `terraform plan -refresh-only` per workspace, each
+    tracked resource's compared attributes are hashed on both sides: from
+    the workspace state (re-parsed only when its serial or lineage changes)
+    and from the cached GCP inventory. A sweep only diffs the resources
+    whose state or live fingerprint changed since they were last checked;
+    the rest are skipped.
+
+    Workspaces are split into `batches` by a hash of their id and one batch
+    is swept every interval/batches seconds, so each workspace is visited
+    once per interval and the work is spread evenly. Sweeps hold a lease in
+    the session store, so only one worker sweeps at a time. Status changes
+    are published to the DRIFT_EVENTS log of the session store, which any
+    worker can stream.
+
+    Statuses: in_sync, drifted (attributes differ), missing (not in the
+    inventory) and unknown (not checked yet). When a listing fails, the
+    resources it covers keep their last status.
+    """
+
+    def __init__(
+        self,
+        gcp_client: GCPClientService,
+        store: SessionStore,
+        workspace_dir: Path,
+        db_path: str = "./data/drift.db",
+        interval_seconds: float = 900,
+        batches: int = 10,
+        heartbeat_seconds: float = 30
+    ):
+        self.gcp_client = gcp_client
+        self.store = store
+        self.workspace_dir = Path(workspace_dir)
+        self.interval = interval_seconds
+        self.batches = max(1, batches)
+        self.heartbeat = heartbeat_seconds
+
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.db_path), check_same_thread=False, timeout=10)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(SCHEMA)
+
+        # Live fingerprints of the last inventory, rebuilt when it is refreshed
+        self._live_index: Dict[str, Optional[Dict[str, Tuple[Dict[str, Any], str]]]] = {}
+        self._live_fetched_at: Optional[float] = None
+        self._last_sweep: Optional[Dict[str, Any]] = None
+        self._task: Optional[asyncio.Task] = None
+
+    def _execute(self, query: str, params: tuple = ()) -> List[tuple]:
+        with self._lock:
+            rows = self._conn.execute(query, params).fetchall()
+            self._conn.commit()
+            return rows
+
+    def _workspace_ids(self) -> List[str]:
+        return sorted(
+            entry.name for entry in os.scandir(self.workspace_dir)
+            if not entry.name.startswith(".") and entry.is_dir(follow_symlinks=False)
+        )
+
+    async def sweep(
+        self,
+        deployment_id: Optional[str] = None,
+        batch: Optional[int] = None,
+        refresh_inventory: bool = False
+    ) -> Dict[str, Any]:
+        """
+        Check workspaces for drift
+
+        Args:
+            deployment_id: Only this workspace
+            batch: Only the workspaces of this scheduler batch
+            refresh_inventory: List the live resources again instead of
+                using the cached inventory
+
+        Returns:
+            Counts of resources per result and the changes found
+
+        Raises:
+            LockBusyError: Another worker is sweeping
+        """
+        started = time.perf_counter()
+        try:
+            async with self.store.hold_lock(SWEEP_LOCK):
+                with start_span("drift.sweep", {"drift.batch": batch}) as span:
+                    report = await self._sweep(deployment_id, batch, refresh_inventory)
+                    set_span_attributes(span, {
+                        "drift.workspaces": report["workspaces"],
+                        "drift.checked": report["checked"],
+                        "drift.changes": len(report["changes"])
+                    })
+        except LockBusyError:
+            raise
+        except Exception:
+            observe_drift_sweep(time.perf_counter() - started, "error")
+            raise
+
+        for status, count in (await self.counts()).items():
+            set_drift_resources(status, count)
+        duration = time.perf_counter() - started
+        observe_drift_sweep(duration, "success")
+        report["duration_ms"] = round(duration * 1000, 1)
+        self._last_sweep = {**report, "finished_at": time.time()}
+        return report
+
+    async def _sweep(
+        self,
+        deployment_id: Optional[str],
+        batch: Optional[int],
+        refresh_inventory: bool
+    ) -> Dict[str, Any]:
+        if deployment_id is not None:
+            is_workspace = (
+                Path(deployment_id).name == deployment_id and not deployment_id.startswith(".")
+                and (self.workspace_dir / deployment_id).is_dir()
+            )
+            deployment_ids = [deployment_id] if is_workspace else []
+        else:
+            deployment_ids = await asyncio.to_thread(self._workspace_ids)
+            await asyncio.to_thread(self._forget_removed, deployment_ids)
+            if batch is not None:
+                deployment_ids = [d for d in deployment_ids if partition(d, self.batches) == batch]
+
+        rows = await asyncio.to_thread(self._sync_states, deployment_ids)
+        report: Dict[str, Any] = {
+            "workspaces": len(deployment_ids),
+            "resources": len(rows),
+            "unchanged": 0,
+            "checked": 0,
+            "changes": []
+        }
+        if not rows:
+            return report
+
+        # Only list live resources when there is something to compare them with
+        inventory = await self.gcp_client.get_inventory(max_age=0 if refresh_inventory else None)
+        self._index_inventory(inventory)
+
+        now = time.time()
+        updates, results = [], {status: 0 for status in STATUSES}
+        for deployment, address, resource_type, live_key, expected, state_hash, live_hash, status in rows:
+            listing = self._live_index.get(TRACKED_TYPES[resource_type][0])
+            if listing is None:
+                # The listing failed: keep the last result rather than report everything gone
+                results["unknown"] += 1
+                continue
+
+            live = listing.get(live_key)
+            new_live_hash = live[1] if live else "missing"
+            if new_live_hash == live_hash:
+                report["unchanged"] += 1
+                continue
+            if live is None:
+                new_status, diff = "missing", None
+            else:
+                # Equal fingerprints mean equal attributes, so only differing ones are diffed
+                diff = attribute_diff(json.loads(expected), live[0]) if new_live_hash != state_hash else {}
+                new_status = "drifted" if diff else "in_sync"
+
+            report["checked"] += 1
+            results[new_status] += 1
+            changed = new_status != status
+            updates.append((
+                new_live_hash, new_status, json.dumps(diff) if diff else None, now,
+                now if changed else None, deployment, address
+            ))
+            # Resources found in sync on their first check are not news
+            if changed and (status != "unknown" or new_status != "in_sync"):
+                report["changes"].append({
+                    "type": "drift_changed",
+                    "deployment_id": deployment,
+                    "address": address,
+                    "resource_type": resource_type,
+                    "status": new_status,
+                    "previous_status": status,
+                    "diff": diff or None,
+                    "detected_at": now
+                })
+
+        observe_drift_checks("unchanged", report["unchanged"])
+        for status, count in results.items():
+            observe_drift_checks(status, count)
+        report.update(results)
+
+        await asyncio.to_thread(self._save_checks, updates)
+        await self._publish(report["changes"])
+        return report
+
+    def _forget_removed(self, deployment_ids: List[str]) -> None:
+        """Drop results of workspaces that no longer exist"""
+        present = set(deployment_ids)
+        known = [row[0] for row in self._execute("SELECT deployment_id FROM drift_workspaces")]
+        removed = [(deployment_id,) for deployment_id in known if deployment_id not in present]
+        if removed:
+            with self._lock:
+                self._conn.executemany("DELETE FROM drift_resources WHERE deployment_id = ?", removed)
+                self._conn.executemany("DELETE FROM drift_workspaces WHERE deployment_id = ?", removed)
+                self._conn.commit()
+
+    def _sync_states(self, deployment_ids: List[str]) -> List[tuple]:
+        """
+        Refresh the expected attributes of workspaces whose state changed
+
+        Returns:
+            The tracked resources of the workspaces
+        """
+        known = {
+            row[0]: (row[1], row[2])
+            for row in self._execute("SELECT deployment_id, serial, lineage FROM drift_workspaces")
+        }
+        for deployment_id in deployment_ids:
+            state_path = self.workspace_dir / deployment_id / "terraform.tfstate"
+            try:
+                header = read_state_header(state_path)
+                if deployment_id in known and known[deployment_id] == header:
+                    continue
+                state = parse_state_file(state_path)
+            except (OSError, ValueError) as e:
+                # E.g. a state being written; its last parsed version is used until the next sweep
+                logger.warning("Reading the state of %s failed: %s", deployment_id, e)
+                continue
+            self._store_state(deployment_id, header, state.resources.values() if state else [])
+
+        rows: List[tuple] = []
+        # Stay below SQLite's bound parameter limit
+        for start in range(0, len(deployment_ids), 500):
+            chunk = deployment_ids[start:start + 500]
+            rows += self._execute(
+                "SELECT deployment_id, address, type, live_key, expected, state_hash, live_hash, status "
+                f"FROM drift_resources WHERE deployment_id IN ({', '.join('?' for _ in chunk)})",
+                tuple(chunk)
+            )
+        return rows
+
+    def _store_state(
+        self,
+        deployment_id: str,
+        header: Tuple[Optional[int], Optional[str]],
+        resources: Iterable[StateResource]
+    ) -> None:
+        tracked = {}
+        for resource in resources:
+            if resource.mode != "managed" or resource.type not in TRACKED_TYPES:
+                continue
+            live_key, expected = TRACKED_TYPES[resource.type][1](resource.attributes)
+            tracked[resource.address] = (resource.type, live_key, expected, fingerprint(expected))
+
+        with self._lock:
+            previous = {
+                address: state_hash for address, state_hash in self._conn.execute(
+                    "SELECT address, state_hash FROM drift_resources WHERE deployment_id = ?",
+                    (deployment_id,)
+                )
+            }
+            removed = [(deployment_id, address) for address in previous if address not in tracked]
+            self._conn.executemany(
+                "DELETE FROM drift_resources WHERE deployment_id = ? AND address = ?", removed
+            )
+            for address, (resource_type, live_key, expected, state_hash) in tracked.items():
+                if previous.get(address) == state_hash:
+                    continue
+                # A changed state invalidates the live fingerprint, forcing a re-check
+                self._conn.execute(
+                    "INSERT INTO drift_resources "
+                    "(deployment_id, address, type, live_key, expected, state_hash, live_hash, status) "
+                    "VALUES (?, ?, ?, ?, ?, ?, NULL, 'unknown') "
+                    "ON CONFLICT (deployment_id, address) DO UPDATE SET "
+                    "type = excluded.type, live_key = excluded.live_key, expected = excluded.expected, "
+                    "state_hash = excluded.state_hash, live_hash = NULL",
+                    (deployment_id, address, resource_type, live_key, json.dumps(expected), state_hash)
+                )
+            self._conn.execute(
+                "INSERT OR REPLACE INTO drift_workspaces (deployment_id, serial, lineage, parsed_at) "
+                "VALUES (?, ?, ?, ?)",
+                (deployment_id, header[0], header[1], time.time())
+            )
+            self._conn.commit()
+
+    def _index_inventory(self, inventory: Dict[str, Any]) -> None:
+        """Live attributes and fingerprints by inventory key, per listing"""
+        if inventory["fetched_at"] == self._live_fetched_at:
+            return
+        index: Dict[str, Optional[Dict[str, Tuple[Dict[str, Any], str]]]] = {}
+        for listing, _, live_attributes in TRACKED_TYPES.values():
+            items = inventory.get(listing)
+            if items is None:
+                index[listing] = None
+                continue
+            index[listing] = {}
+            for item in items:
+                key, attributes = live_attributes(item)
+                index[listing][key] = (attributes, fingerprint(attributes))
+        self._live_index = index
+        self._live_fetched_at = inventory["fetched_at"]
+
+    def _save_checks(self, updates: List[tuple]) -> None:
+        with self._lock:
+            self._conn.executemany(
+                "UPDATE drift_resources SET live_hash = ?, status = ?, diff = ?, checked_at = ?, "
+                "changed_at = COALESCE(?, changed_at) WHERE deployment_id = ? AND address = ?",
+                updates
+            )
+            self._conn.commit()
+
+    async def _publish(self, changes: List[Dict[str, Any]]) -> None:
+        if not changes:
+            return
+        try:
+            # Numbered from the shared store under the sweep lease, so sweeps
+            # on any worker continue one sequence. The newest seq is also kept
+            # in a document next to the log, as old events expire from it.
+            meta = await self.store.get_session(DRIFT_EVENTS) or {}
+            first = max(await self.store.last_seq(DRIFT_EVENTS), meta.get("last_seq", 0)) + 1
+            await self.store.append_events(
+                DRIFT_EVENTS,
+                [{**change, "seq": first + i} for i, change in enumerate(changes)]
+            )
+            await self.store.update_session(DRIFT_EVENTS, {"last_seq": first + len(changes) - 1})
+        except Exception as e:
+            logger.warning("Publishing %d drift changes failed: %s", len(changes), e)
+
+    async def counts(self) -> Dict[str, int]:
+        """Tracked resources per status"""
+        rows = await asyncio.to_thread(
+            self._execute, "SELECT status, COUNT(*) FROM drift_resources GROUP BY status"
+        )
+        counts = {status: 0 for status in STATUSES}
+        counts.update(dict(rows))
+        return counts
+
+    async def summary(self) -> Dict[str, Any]:
+        """Resource counts, deployments with drift and the last sweep of this worker"""
+        rows = await asyncio.to_thread(
+            self._execute,
+            "SELECT deployment_id, status, COUNT(*), MAX(changed_at) FROM drift_resources "
+            "WHERE status IN ('drifted', 'missing') GROUP BY deployment_id, status"
+        )
+        deployments: Dict[str, Dict[str, Any]] = {}
+        for deployment_id, status, count, changed_at in rows:
+            entry = deployments.setdefault(
+                deployment_id, {"deployment_id": deployment_id, "drifted": 0, "missing": 0, "changed_at": None}
+            )
+            entry[status] = count
+            entry["changed_at"] = max(entry["changed_at"] or 0, changed_at or 0) or None
+
+        return {
+            "resources": await self.counts(),
+            "deployments": sorted(deployments.values(), key=lambda d: d["changed_at"] or 0, reverse=True),
+            "last_sweep": self._last_sweep,
+            "interval_seconds": self.interval,
+            "batches": self.batches
+        }
+
+    async def resources(
+        self,
+        deployment_id: Optional[str] = None,
+        status: Optional[str] = None,
+        limit: int = 100,
+        cursor: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """
+        One page of tracked resources with their drift
+
+        Args:
+            deployment_id: Only this deployment
+            status: Only this status
+            limit: Page size
+            cursor: next_cursor of the previous page
+
+        Returns:
+            {"resources": [...], "next_cursor": str or None}
+        """
+        if status is not None and status not in STATUSES:
+            raise ValueError(f"status must be one of {', '.join(STATUSES)}")
+
+        filters, params = [], []
+        if deployment_id:
+            filters.append("deployment_id = ?")
+            params.append(deployment_id)
+        if status:
+            filters.append("status = ?")
+            params.append(status)
+        if cursor:
+            try:
+                after = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+                filters.append("(deployment_id, address) > (?, ?)")
+                params += [str(after[0]), str(after[1])]
+            except (ValueError, TypeError, IndexError, KeyError):
+                raise ValueError("Invalid cursor")
+        where = f"WHERE {' AND '.join(filters)}" if filters else ""
+
+        rows = await asyncio.to_thread(
+            self._execute,
+            "SELECT deployment_id, address, type, status, expected, diff, checked_at, changed_at "
+            f"FROM drift_resources {where} ORDER BY deployment_id, address LIMIT ?",
+            (*params, limit + 1)
+        )
+        next_cursor = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            next_cursor = base64.urlsafe_b64encode(json.dumps(list(rows[-1][:2])).encode()).decode()
+
+        return {
+            "resources": [
+                {
+                    "deployment_id": row[0],
+                    "address": row[1],
+                    "type": row[2],
+                    "status": row[3],
+                    "expected": json.loads(row[4]),
+                    "diff": json.loads(row[5]) if row[5] else None,
+                    "checked_at": row[6],
+                    "changed_at": row[7]
+                }
+                for row in rows
+            ],
+            "next_cursor": next_cursor
+        }
+
+    async def follow(self, after: Optional[int] = None) -> AsyncGenerator[Dict[str, Any], None]:
+        """
+        Stream drift changes as they are published, by any worker
+
+        Starts with a "drift_summary" event; idle periods are filled with
+        "heartbeat" events every heartbeat_seconds.
+
+        Args:
+            after: Seq of the last change received, to resume without gaps
+        """
+        summary = await self.summary()
+        if after is None:
+            after = await self.store.last_seq(DRIFT_EVENTS)
+        yield {"type": "drift_summary", "seq": after, **summary}
+
+        while True:
+            events = await self.store.wait_events(DRIFT_EVENTS, after, self.heartbeat)
+            if not events:
+                yield {"type": "heartbeat", "seq": after}
+            for event in events:
+                after = event["seq"]
+                yield event
+
+    def start(self) -> None:
+        """Sweep one batch every interval/batches seconds"""
+        if self.interval > 0 and (self._task is None or self._task.done()):
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self) -> None:
+        tick = self.interval / self.batches
+        while True:
+            await asyncio.sleep(tick - time.time() % tick)
+            # Batches follow the clock, so workers taking turns continue the same rotation
+            batch = int(time.time() // tick) % self.batches
+            try:
+                report = await self.sweep(batch=batch)
+                if report["changes"]:
+                    logger.info(
+                        "Drift sweep of batch %d found %d changes", batch, len(report["changes"]),
+                        extra={"checked": report["checked"], "unchanged": report["unchanged"]}
+                    )
+            except LockBusyError:
+                continue
+            except Exception as e:
+                logger.warning("Drift sweep failed: %s", e)
+
+
+# Singleton instance
+_drift_engine: Optional[DriftEngine] = None
+
+
+def get_drift_engine() -> DriftEngine:
+    """Get or create the drift engine singleton"""
+    global _drift_engine
+    if _drift_engine is None:
+        _drift_engine = DriftEngine(
+            get_gcp_client_service(),
+            get_session_store(),
+            get_terraform_service().workspace_dir,
+            db_path=os.getenv("DRIFT_DB", "./data/drift.db"),
+            interval_seconds=float(os.getenv("DRIFT_INTERVAL_SECONDS", "900")),
+            batches=int(os.getenv("DRIFT_BATCHES", "10")),
+            heartbeat_seconds=float(os.getenv("DRIFT_HEARTBEAT_SECONDS", "30"))
+        )
+    return _drift_engine
@@ -1,9 +1,19 @@
 """GCP client service for resource management"""
 import os
-from typing import List, Dict, Optional
-from google.cloud import compute_v1
-from google.cloud import storage
+import time
+import asyncio
+import logging
+import threading
+from typing import Any, Callable, List, Dict, Optional
 from datetime import datetime
+from ..utils import (
+    observe_gcp_call,
+    start_span,
+    set_span_attributes,
+    record_span_error
+)
+
+logger = logging.getLogger(__name__)
 
 
 class GCPClientService:
@@ -13,58 +23,169 @@ class GCPClientService:
         self.project_id = os.getenv("GCP_PROJECT_ID")
         self.region = os.getenv("GCP_REGION", "us-central1")
 
-    async def list_compute_instances(self, zone: Optional[str] = None) -> List[Dict]:
-        """List Compute Engine instances"""
-        try:
-            instances_client = compute_v1.InstancesClient()
-            zone = zone or f"{self.region}-a"
+        # Clients are created once and reused, keeping their credentials and connections
+        self._clients: Dict[str, Any] = {}
+        self._clients_lock = threading.Lock()
 
-            request = compute_v1.ListInstancesRequest(
-                project=self.project_id,
-                zone=zone
-            )
+        # Inventory for background consumers such as drift detection
+        self.inventory_ttl = float(os.getenv("GCP_INVENTORY_TTL_SECONDS", "300"))
+        self._inventory: Optional[Dict[str, Any]] = None
+        self._inventory_refresh: Optional[asyncio.Task] = None
 
-            instances = []
-            for instance in instances_client.list(request=request):
-                instances.append({
-                    "id": instance.name,
-                    "name": instance.name,
-                    "type": "compute-engine",
-                    "status": instance.status.lower(),
-                    "machine_type": instance.machine_type.split("/")[-1],
-                    "zone": zone,
-                    "created": instance.creation_timestamp
-                })
+    def _client(self, name: str) -> Any:
+        """Shared Compute Engine ("compute") or Cloud Storage ("storage") client"""
+        with self._clients_lock:
+            if name not in self._clients:
+                # The Google Cloud SDKs take about a second to import; load them on first use
+                if name == "compute":
+                    from google.cloud import compute_v1
+                    self._clients[name] = compute_v1.InstancesClient()
+                else:
+                    from google.cloud import storage
+                    self._clients[name] = storage.Client(project=self.project_id)
+            return self._clients[name]
 
-            return instances
+    async def warm_up(self) -> None:
+        """Import the SDKs and authenticate the clients ahead of the first listing"""
+        await asyncio.to_thread(self._client, "compute")
+        await asyncio.to_thread(self._client, "storage")
 
+    async def _list(self, operation: str, fetch: Callable[..., List[Dict]], *args: Any) -> List[Dict]:
+        """Run a blocking listing in a worker thread, with a span and metrics; errors propagate"""
+        with start_span(f"gcp.{operation}", {"gcp.project_id": self.project_id}) as span:
+            started = time.perf_counter()
+            try:
+                # The Google clients are synchronous; keep them off the event loop
+                resources = await asyncio.to_thread(fetch, *args)
+            except Exception as e:
+                observe_gcp_call(operation, time.perf_counter() - started, "error")
+                record_span_error(span, e)
+                raise
+
+            observe_gcp_call(operation, time.perf_counter() - started, "success")
+            set_span_attributes(span, {"gcp.resource_count": len(resources)})
+            return resources
+
+    async def list_compute_instances(self, zone: Optional[str] = None) -> List[Dict]:
+        """List Compute Engine instances"""
+        try:
+            return await self._list(
+                "list_compute_instances", self._fetch_compute_instances, zone or f"{self.region}-a"
+            )
         except Exception as e:
-            print(f"Error listing compute instances: {str(e)}")
+            logger.warning("Listing compute instances failed: %s", e)
             return []
 
     async def list_storage_buckets(self) -> List[Dict]:
         """List Cloud Storage buckets"""
         try:
-            storage_client = storage.Client(project=self.project_id)
-            buckets = []
-
-            for bucket in storage_client.list_buckets():
-                buckets.append({
-                    "id": bucket.name,
-                    "name": bucket.name,
-                    "type": "cloud-storage",
-                    "status": "running",
-                    "location": bucket.location,
-                    "storage_class": bucket.storage_class,
-                    "created": bucket.time_created.isoformat() if bucket.time_created else None
-                })
-
-            return buckets
-
+            return await self._list("list_storage_buckets", self._fetch_storage_buckets)
         except Exception as e:
-            print(f"Error listing storage buckets: {str(e)}")
+            logger.warning("Listing storage buckets failed: %s", e)
             return []
 
+    async def get_inventory(self, max_age: Optional[float] = None) -> Dict[str, Any]:
+        """
+        Instances in every zone and buckets of the project, cached
+
+        Concurrent callers share one refresh. A listing that fails is None
+        (rather than empty), so callers can tell "gone" from "unknown".
+
+        Args:
+            max_age: Refresh when the cached inventory is older than this many
+                seconds (default: GCP_INVENTORY_TTL_SECONDS)
+
+        Returns:
+            {"compute_instances": [...] or None, "storage_buckets": [...] or None,
+            "fetched_at": epoch seconds}
+        """
+        max_age = self.inventory_ttl if max_age is None else max_age
+        if self._inventory is not None and time.time() - self._inventory["fetched_at"] <= max_age:
+            return self._inventory
+
+        if self._inventory_refresh is None or self._inventory_refresh.done():
+            self._inventory_refresh = asyncio.create_task(self._load_inventory())
+        self._inventory = await asyncio.shield(self._inventory_refresh)
+        return self._inventory
+
+    async def _load_inventory(self) -> Dict[str, Any]:
+        async def listing(operation: str, fetch: Callable[[], List[Dict]]) -> Optional[List[Dict]]:
+            try:
+                return await self._list(operation, fetch)
+            except Exception as e:
+                logger.warning("Inventory listing %s failed: %s", operation, e)
+                return None
+
+        instances, buckets = await asyncio.gather(
+            listing("list_all_compute_instances", self._fetch_all_compute_instances),
+            listing("list_storage_buckets", self._fetch_storage_buckets)
+        )
+        return {"compute_instances": instances, "storage_buckets": buckets, "fetched_at": time.time()}
+
+    @staticmethod
+    def _instance_summary(instance: Any, zone: str) -> Dict:
+        return {
+            "id": instance.name,
+            "name": instance.name,
+            "type": "compute-engine",
+            "status": instance.status.lower(),
+            "machine_type": instance.machine_type.split("/")[-1],
+            "zone": zone,
+            "labels": dict(instance.labels),
+            "created": instance.creation_timestamp
+        }
+
+    def _fetch_compute_instances(self, zone: str) -> List[Dict]:
+        """Blocking Compute Engine listing (run in a worker thread)"""
+        from google.cloud import compute_v1
+
+        instances_client = self._client("compute")
+
+        request = compute_v1.ListInstancesRequest(
+            project=self.project_id,
+            zone=zone
+        )
+
+        instances = []
+        for instance in instances_client.list(request=request):
+            instances.append(self._instance_summary(instance, zone))
+
+        return instances
+
+    def _fetch_all_compute_instances(self) -> List[Dict]:
+        """Blocking Compute Engine listing across all zones (run in a worker thread)"""
+        from google.cloud import compute_v1
+
+        request = compute_v1.AggregatedListInstancesRequest(project=self.project_id)
+
+        instances = []
+        for scope, scoped_list in self._client("compute").aggregated_list(request=request):
+            # Scopes are "zones/<zone>"
+            zone = scope.split("/")[-1]
+            for instance in scoped_list.instances:
+                instances.append(self._instance_summary(instance, zone))
+
+        return instances
+
+    def _fetch_storage_buckets(self) -> List[Dict]:
+        """Blocking Cloud Storage listing (run in a worker thread)"""
+        storage_client = self._client("storage")
+        buckets = []
+
+        for bucket in storage_client.list_buckets():
+            buckets.append({
+                "id": bucket.name,
+                "name": bucket.name,
+                "type": "cloud-storage",
+                "status": "running",
+                "location": bucket.location,
+                "storage_class": bucket.storage_class,
+                "labels": dict(bucket.labels or {}),
+                "created": bucket.time_created.isoformat() if bucket.time_created else None
+            })
+
+        return buckets
+
     async def get_project_resources(self) -> Dict:
         """Get all resources in the project"""
         resources = {
@@ -0,0 +1,305 @@
+"""Structural parser for Terraform HCL"""
+import re
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Tuple
+
+IDENT_PATTERN = re.compile(r"[A-Za-z_][A-Za-z0-9_-]*")
+NUMBER_PATTERN = re.compile(r"\d+(\.\d+)?([eE][+-]?\d+)?")
+HEREDOC_PATTERN = re.compile(r"<<(-?)([A-Za-z_][A-Za-z0-9_]*)[ \t]*\r?\n")
+OPERATORS = ("...", "==", "!=", "<=", ">=", "=>", "&&", "||")
+PUNCTUATION = "{}[]()=,:.?!<>+-*/%"
+BRACKETS = {"(": ")", "[": "]", "{": "}"}
+
+
+class HCLSyntaxError(Exception):
+    """Configuration that Terraform would reject while parsing"""
+
+    def __init__(self, message: str, line: int):
+        super().__init__(f"line {line}: {message}")
+        self.message = message
+        self.line = line
+
+
+@dataclass
+class HCLAttribute:
+    """An argument; kind is the literal type, or None for other expressions"""
+    name: str
+    kind: Optional[str]
+    value: Any
+    line: int
+
+
+@dataclass
+class HCLBlock:
+    """A block with its arguments and nested blocks"""
+    type: str
+    labels: List[str]
+    line: int
+    attributes: Dict[str, HCLAttribute] = field(default_factory=dict)
+    blocks: List["HCLBlock"] = field(default_factory=list)
+
+
+@dataclass
+class _Token:
+    kind: str          # ident, string, template, heredoc, number, punct, newline, eof
+    text: str
+    line: int
+
+
+def _scan_string(text: str, i: int, line: int) -> Tuple[int, bool]:
+    """End index (after the closing quote) of the string starting at i, and whether it interpolates"""
+    i += 1
+    interpolated = False
+    while i < len(text):
+        char = text[i]
+        if char == "\\":
+            i += 2
+            continue
+        if char == '"':
+            return i + 1, interpolated
+        if char == "\n":
+            break
+        if char in "$%" and text.startswith(char + "{", i + 1):
+            # $${ and %%{ are escaped literals
+            i += 3
+            continue
+        if char in "$%" and text.startswith("{", i + 1):
+            interpolated = True
+            i = _scan_template(text, i + 2, line)
+            continue
+        i += 1
+    raise HCLSyntaxError("Unterminated string", line)
+
+
+def _scan_template(text: str, i: int, line: int) -> int:
+    """End index of a ${...} sequence whose body starts at i"""
+    depth = 1
+    while i < len(text):
+        char = text[i]
+        if char == '"':
+            i, _ = _scan_string(text, i, line)
+            continue
+        if char == "{":
+            depth += 1
+        elif char == "}":
+            depth -= 1
+            if depth == 0:
+                return i + 1
+        i += 1
+    raise HCLSyntaxError("Unterminated template interpolation", line)
+
+
+def _tokenize(text: str) -> List[_Token]:
+    tokens = []
+    i = 0
+    line = 1
+    length = len(text)
+
+    while i < length:
+        char = text[i]
+        if char in " \t\r":
+            i += 1
+        elif char == "\n":
+            tokens.append(_Token("newline", "\n", line))
+            line += 1
+            i += 1
+        elif char == "#" or text.startswith("//", i):
+            end = text.find("\n", i)
+            i = length if end < 0 else end
+        elif text.startswith("/*", i):
+            end = text.find("*/", i + 2)
+            if end < 0:
+                raise HCLSyntaxError("Unterminated comment", line)
+            line += text.count("\n", i, end)
+            i = end + 2
+        elif char == '"':
+            end, interpolated = _scan_string(text, i, line)
+            tokens.append(_Token("template" if interpolated else "string", text[i + 1:end - 1], line))
+            i = end
+        elif text.startswith("<<", i) and HEREDOC_PATTERN.match(text, i):
+            heredoc = HEREDOC_PATTERN.match(text, i)
+            terminator = re.compile(rf"^[ \t]*{heredoc.group(2)}[ \t]*\r?$", re.MULTILINE)
+            end = terminator.search(text, heredoc.end())
+            if end is None:
+                raise HCLSyntaxError(f"Unterminated heredoc, missing {heredoc.group(2)}", line)
+            tokens.append(_Token("heredoc", text[heredoc.end():end.start()], line))
+            line += text.count("\n", i, end.end())
+            i = end.end()
+        elif char.isdigit():
+            match = NUMBER_PATTERN.match(text, i)
+            tokens.append(_Token("number", match.group(), line))
+            i = match.end()
+        elif IDENT_PATTERN.match(text, i):
+            match = IDENT_PATTERN.match(text, i)
+            tokens.append(_Token("ident", match.group(), line))
+            i = match.end()
+        else:
+            operator = next((op for op in OPERATORS if text.startswith(op, i)), None)
+            if operator is None and char not in PUNCTUATION + "&|":
+                raise HCLSyntaxError(f"Invalid character {char!r}", line)
+            operator = operator or char
+            tokens.append(_Token("punct", operator, line))
+            i += len(operator)
+
+    tokens.append(_Token("eof", "", line))
+    return tokens
+
+
+class _Parser:
+    def __init__(self, tokens: List[_Token]):
+        self.tokens = tokens
+        self.pos = 0
+
+    def peek(self, offset: int = 0) -> _Token:
+        return self.tokens[min(self.pos + offset, len(self.tokens) - 1)]
+
+    def next(self) -> _Token:
+        token = self.peek()
+        self.pos += 1
+        return token
+
+    def skip_newlines(self) -> None:
+        while self.peek().kind == "newline":
+            self.pos += 1
+
+    def body(self, block: Optional[HCLBlock]) -> Tuple[Dict[str, HCLAttribute], List[HCLBlock]]:
+        """Arguments and blocks up to the closing brace of block (or EOF at the top level)"""
+        attributes: Dict[str, HCLAttribute] = {}
+        blocks: List[HCLBlock] = []
+
+        while True:
+            self.skip_newlines()
+            token = self.peek()
+
+            if token.kind == "eof":
+                if block is not None:
+                    raise HCLSyntaxError(
+                        f"Unclosed block {block.type} (opened on line {block.line}), missing '}}'",
+                        token.line
+                    )
+                return attributes, blocks
+
+            if token.kind == "punct" and token.text == "}":
+                if block is None:
+                    raise HCLSyntaxError("Unexpected '}'", token.line)
+                self.next()
+                return attributes, blocks
+
+            if token.kind != "ident":
+                raise HCLSyntaxError(f"Expected an argument or block, found {token.text!r}", token.line)
+
+            following = self.peek(1)
+            if following.kind == "punct" and following.text == "=":
+                if block is None:
+                    raise HCLSyntaxError(f"Unexpected argument {token.text!r} outside a block", token.line)
+                if token.text in attributes:
+                    raise HCLSyntaxError(f"Argument {token.text!r} is defined twice", token.line)
+                self.pos += 2
+                kind, value = self.expression(token.line)
+                attributes[token.text] = HCLAttribute(token.text, kind, value, token.line)
+            else:
+                blocks.append(self.block())
+
+    def block(self) -> HCLBlock:
+        header = self.next()
+        labels = []
+        while self.peek().kind in ("string", "ident"):
+            labels.append(self.next().text)
+
+        opening = self.next()
+        if opening.kind != "punct" or opening.text != "{":
+            raise HCLSyntaxError(
+                f"Expected '{{' to open block {header.text}, found {opening.text.strip()!r}"
+                if opening.kind != "newline" else
+                f"Expected '=' or '{{' after {header.text!r}",
+                opening.line
+            )
+
+        block = HCLBlock(header.text, labels, header.line)
+        block.attributes, block.blocks = self.body(block)
+        return block
+
+    def expression(self, line: int) -> Tuple[Optional[str], Any]:
+        """Consume an expression up to the end of the line, returning its literal kind and value"""
+        start = self.pos
+        stack: List[_Token] = []
+
+        while True:
+            token = self.peek()
+            if token.kind == "eof":
+                if stack:
+                    raise HCLSyntaxError(f"Unclosed {stack[-1].text!r}", stack[-1].line)
+                break
+            if not stack and (token.kind == "newline" or token.text == "}"):
+                break
+            if token.kind == "punct":
+                if token.text in BRACKETS:
+                    stack.append(token)
+                elif token.text in BRACKETS.values():
+                    if not stack or BRACKETS[stack[-1].text] != token.text:
+                        raise HCLSyntaxError(f"Unexpected {token.text!r}", token.line)
+                    stack.pop()
+                elif token.text == "=" and (not stack or stack[-1].text != "{"):
+                    raise HCLSyntaxError("Missing newline after argument", token.line)
+            self.pos += 1
+
+        tokens = [token for token in self.tokens[start:self.pos] if token.kind != "newline"]
+        if not tokens:
+            raise HCLSyntaxError("Expected an expression", line)
+        return self._literal(tokens)
+
+    @staticmethod
+    def _literal(tokens: List[_Token]) -> Tuple[Optional[str], Any]:
+        first, last = tokens[0], tokens[-1]
+        if len(tokens) == 1:
+            if first.kind in ("string", "heredoc"):
+                return "string", first.text
+            if first.kind == "number":
+                return "number", first.text
+            if first.kind == "template":
+                # "${expr}" alone has the type of expr
+                whole = first.text.startswith("${") and first.text.endswith("}")
+                return (None, None) if whole else ("string", None)
+            if first.kind == "ident" and first.text in ("true", "false"):
+                return "bool", first.text == "true"
+            if first.kind == "ident" and first.text == "null":
+                return "null", None
+        if len(tokens) == 2 and first.text == "-" and last.kind == "number":
+            return "number", "-" + last.text
+        # A collection literal only if its opening bracket closes at the end;
+        # ["a", "b"][0] or [for x in y : x][0] are index expressions
+        if first.text in ("[", "{") and first.kind == "punct" and tokens[1].text != "for":
+            if _Parser._closing(tokens) == len(tokens) - 1:
+                return ("list" if first.text == "[" else "object"), None
+        return None, None
+
+    @staticmethod
+    def _closing(tokens: List[_Token]) -> int:
+        """Index of the bracket closing tokens[0]"""
+        depth = 0
+        for index, token in enumerate(tokens):
+            if token.kind != "punct":
+                continue
+            if token.text in BRACKETS:
+                depth += 1
+            elif token.text in BRACKETS.values():
+                depth -= 1
+                if depth == 0:
+                    return index
+        return len(tokens) - 1
+
+
+def parse_hcl(text: str) -> List[HCLBlock]:
+    """
+    Parse the top-level blocks of a Terraform configuration file
+
+    Only the structure is parsed: arguments keep their literal type (string,
+    number, bool, null, list, object) when they are literals, expressions
+    are checked for balanced brackets but not evaluated.
+
+    Raises:
+        HCLSyntaxError: The file is not valid HCL
+    """
+    parser = _Parser(_tokenize(text))
+    _, blocks = parser.body(None)
+    return blocks
@@ -0,0 +1,331 @@
+"""LLM backends: Vertex AI, fixture recording and offline replay"""
+import os
+import json
+import time
+import random
+import asyncio
+import hashlib
+import logging
+from abc import ABC, abstractmethod
+from dataclasses import dataclass, asdict
+from pathlib import Path
+from typing import Any, AsyncGenerator, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+BACKENDS = ("vertex", "record", "replay", "fake")
+
+# Canned responses used by the fake backend (and by replay on a fixture miss
+# when fallback is enabled). They satisfy the agent output schemas, so a whole
+# chat runs end to end without Gemini.
+FAKE_RESPONSES = {
+    "REQUIREMENTS_ANALYSIS_PROMPT": {
+        "services_needed": ["cloud-run", "cloud-storage"],
+        "constraints": {"budget": "low", "region": "us-central1"},
+        "dependencies": [{"from": "cloud-run", "to": "cloud-storage", "type": "data"}],
+        "estimated_traffic": "low",
+        "security_requirements": ["private bucket"],
+        "summary": "A small containerized web API that stores uploads in a bucket."
+    },
+    "ARCHITECTURE_DESIGN_PROMPT": {
+        "resources": [
+            {"type": "cloud-run", "name": "api", "config": {"memory": "512Mi", "cpu": "1"}},
+            {"type": "cloud-storage", "name": "uploads", "config": {"storage_class": "STANDARD"}}
+        ],
+        "networking": {},
+        "iam_roles": [{"member": "api", "role": "roles/storage.objectAdmin"}],
+        "region": "us-central1",
+        "estimated_cost": 0.0,
+        "deployment_order": ["uploads", "api"],
+        "explanation": "Cloud Run serves the API and writes uploads to a private bucket."
+    },
+    "IAC_GENERATION_PROMPT": {
+        "files": {
+            "main.tf": (
+                'resource "google_storage_bucket" "uploads" {\n'
+                '  name                        = "${var.project_id}-uploads"\n'
+                '  location                    = var.region\n'
+                '  uniform_bucket_level_access = true\n'
+                '}\n'
+            ),
+            "variables.tf": (
+                'variable "project_id" {\n  type = string\n}\n\n'
+                'variable "region" {\n  type    = string\n  default = "us-central1"\n}\n'
+            )
+        },
+        "variables": {"region": "us-central1"},
+        "outputs": {"bucket": "google_storage_bucket.uploads.name"},
+        "summary": "A private storage bucket for uploads."
+    },
+    "TERRAFORM_REPAIR_PROMPT": {
+        "files": {
+            "main.tf": (
+                'resource "google_storage_bucket" "uploads" {\n'
+                '  name                        = "${var.project_id}-uploads"\n'
+                '  location                    = var.region\n'
+                '  uniform_bucket_level_access = true\n'
+                '}\n'
+            )
+        }
+    },
+    "CONVERSATION_SUMMARY_PROMPT": (
+        "The user wants a small containerized web API on GCP that stores uploads."
+    )
+}
+
+
+@dataclass
+class LLMResponse:
+    """Backend-neutral model response"""
+    content: str
+    input_tokens: Optional[int] = None
+    output_tokens: Optional[int] = None
+
+
+def serialize_messages(messages: List) -> List[Dict[str, str]]:
+    """Plain role/content pairs for LangChain messages"""
+    return [
+        {"role": getattr(message, "type", "human"), "content": str(message.content)}
+        for message in messages
+    ]
+
+
+def fixture_key(model_name: str, messages: List) -> str:
+    """Deterministic fixture key for a model and message list"""
+    payload = json.dumps(
+        {"model": model_name, "messages": serialize_messages(messages)},
+        sort_keys=True
+    )
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+class FixtureStore:
+    """Directory of recorded prompt -> response pairs, one JSON file per key"""
+
+    def __init__(self, path: str = "./data/llm_fixtures"):
+        self.path = Path(path)
+        self.path.mkdir(parents=True, exist_ok=True)
+
+    async def get(self, key: str) -> Optional[Dict[str, Any]]:
+        return await asyncio.to_thread(self._read, key)
+
+    async def put(self, key: str, fixture: Dict[str, Any]) -> None:
+        await asyncio.to_thread(self._write, key, fixture)
+
+    def _read(self, key: str) -> Optional[Dict[str, Any]]:
+        file_path = self.path / f"{key}.json"
+        if not file_path.exists():
+            return None
+        return json.loads(file_path.read_text())
+
+    def _write(self, key: str, fixture: Dict[str, Any]) -> None:
+        # Write then rename so concurrent readers never see a partial file
+        file_path = self.path / f"{key}.json"
+        temp_path = file_path.with_suffix(f".{os.getpid()}.tmp")
+        temp_path.write_text(json.dumps(fixture, indent=2))
+        temp_path.replace(file_path)
+
+
+class LLMBackend(ABC):
+    """Interface for a model backend serving one model tier"""
+
+    def __init__(self, model_name: str):
+        self.model_name = model_name
+
+    @abstractmethod
+    async def ainvoke(self, messages: List, template: Optional[str] = None) -> LLMResponse:
+        """Generate the full response for messages"""
+
+    async def astream(
+        self,
+        messages: List,
+        template: Optional[str] = None
+    ) -> AsyncGenerator[str, None]:
+        """Stream the response; backends without streaming yield it whole"""
+        response = await self.ainvoke(messages, template)
+        yield response.content
+
+    async def warm_up(self) -> None:
+        """Set up connections ahead of the first request (nothing to do by default)"""
+
+
+class VertexBackend(LLMBackend):
+    """Gemini via LangChain's ChatVertexAI"""
+
+    def __init__(self, model_name: str, settings: Dict[str, Any], project: str, location: str):
+        super().__init__(model_name)
+        from langchain_google_vertexai import ChatVertexAI
+
+        self.client = ChatVertexAI(
+            model_name=model_name,
+            project=project,
+            location=location,
+            temperature=settings["temperature"],
+            max_output_tokens=settings["max_output_tokens"],
+        )
+
+    async def ainvoke(self, messages: List, template: Optional[str] = None) -> LLMResponse:
+        response = await self.client.ainvoke(messages)
+        input_tokens, output_tokens = self._extract_token_usage(response)
+        return LLMResponse(
+            content=response.content,
+            input_tokens=input_tokens,
+            output_tokens=output_tokens
+        )
+
+    async def astream(
+        self,
+        messages: List,
+        template: Optional[str] = None
+    ) -> AsyncGenerator[str, None]:
+        async for chunk in self.client.astream(messages):
+            if hasattr(chunk, 'content'):
+                yield chunk.content
+
+    async def warm_up(self) -> None:
+        """
+        Authenticate and open a channel with a free count_tokens call
+
+        The credentials are cached process-wide by the Vertex AI SDK, so the
+        first real request skips the token exchange.
+        """
+        await asyncio.to_thread(self.client.get_num_tokens, "warm-up")
+
+    def _extract_token_usage(self, response):
+        """Extract input/output token counts from a LangChain response"""
+        usage = getattr(response, "usage_metadata", None)
+        if usage:
+            return usage.get("input_tokens"), usage.get("output_tokens")
+
+        # Older langchain-google-vertexai releases only populate response_metadata
+        metadata = getattr(response, "response_metadata", None) or {}
+        usage = metadata.get("usage_metadata") or {}
+        return usage.get("prompt_token_count"), usage.get("candidates_token_count")
+
+
+class RecordingBackend(LLMBackend):
+    """Passes calls through to another backend and records them as fixtures"""
+
+    def __init__(self, inner: LLMBackend, store: FixtureStore):
+        super().__init__(inner.model_name)
+        self.inner = inner
+        self.store = store
+
+    async def ainvoke(self, messages: List, template: Optional[str] = None) -> LLMResponse:
+        started = time.perf_counter()
+        response = await self.inner.ainvoke(messages, template)
+
+        fixture = asdict(response)
+        fixture.update({
+            "model": self.model_name,
+            "template": template,
+            "messages": serialize_messages(messages),
+            "latency": round(time.perf_counter() - started, 4)
+        })
+        try:
+            await self.store.put(fixture_key(self.model_name, messages), fixture)
+        except Exception as e:
+            logger.warning("Failed to record LLM fixture: %s", e)
+
+        return response
+
+    async def warm_up(self) -> None:
+        await self.inner.warm_up()
+
+
+class ReplayBackend(LLMBackend):
+    """
+    Serves recorded fixtures (or canned responses) with synthetic latency
+
+    Latency is latency_ms plus uniform jitter, or the recorded latency scaled
+    by latency_scale when use_recorded_latency is set. On a fixture miss the
+    canned response for the template is served if fallback is enabled,
+    otherwise a LookupError is raised.
+    """
+
+    def __init__(
+        self,
+        model_name: str,
+        store: Optional[FixtureStore] = None,
+        latency_ms: float = 0.0,
+        jitter_ms: float = 0.0,
+        use_recorded_latency: bool = False,
+        latency_scale: float = 1.0,
+        fallback: bool = True
+    ):
+        super().__init__(model_name)
+        self.store = store
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.use_recorded_latency = use_recorded_latency
+        self.latency_scale = latency_scale
+        self.fallback = fallback
+
+    async def ainvoke(self, messages: List, template: Optional[str] = None) -> LLMResponse:
+        fixture = None
+        if self.store is not None:
+            fixture = await self.store.get(fixture_key(self.model_name, messages))
+
+        if fixture is None:
+            if not self.fallback:
+                raise LookupError(
+                    f"No LLM fixture for model {self.model_name} (template {template})"
+                )
+            fixture = self._fake_fixture(messages, template)
+
+        await asyncio.sleep(self._latency(fixture))
+        return LLMResponse(
+            content=fixture["content"],
+            input_tokens=fixture.get("input_tokens"),
+            output_tokens=fixture.get("output_tokens")
+        )
+
+    def _latency(self, fixture: Dict[str, Any]) -> float:
+        if self.use_recorded_latency and fixture.get("latency") is not None:
+            return fixture["latency"] * self.latency_scale
+        return max(0.0, self.latency_ms + random.uniform(-self.jitter_ms, self.jitter_ms)) / 1000
+
+    def _fake_fixture(self, messages: List, template: Optional[str]) -> Dict[str, Any]:
+        """Canned response for a template; unknown templates get an empty JSON object"""
+        body = FAKE_RESPONSES.get(template, {})
+        content = body if isinstance(body, str) else "```json\n" + json.dumps(body) + "\n```"
+        prompt_chars = sum(len(str(message.content)) for message in messages)
+        return {
+            "content": content,
+            "input_tokens": prompt_chars // 4,
+            "output_tokens": len(content) // 4
+        }
+
+
+def create_backend(
+    model_name: str,
+    settings: Dict[str, Any],
+    project: str,
+    location: str
+) -> LLMBackend:
+    """
+    Create the backend selected by LLM_BACKEND for one model tier
+
+    vertex (default) calls Gemini, record calls Gemini and writes fixtures to
+    LLM_FIXTURES_DIR, replay serves those fixtures and fails on a miss, and
+    fake serves fixtures when present and canned responses otherwise.
+    """
+    backend = os.getenv("LLM_BACKEND", "vertex").lower()
+    if backend not in BACKENDS:
+        raise ValueError(f"LLM_BACKEND must be one of {', '.join(BACKENDS)}")
+
+    if backend in ("vertex", "record"):
+        vertex = VertexBackend(model_name, settings, project, location)
+        if backend == "vertex":
+            return vertex
+        return RecordingBackend(vertex, FixtureStore(os.getenv("LLM_FIXTURES_DIR", "./data/llm_fixtures")))
+
+    return ReplayBackend(
+        model_name=model_name,
+        store=FixtureStore(os.getenv("LLM_FIXTURES_DIR", "./data/llm_fixtures")),
+        latency_ms=float(os.getenv("LLM_FAKE_LATENCY_MS", "0")),
+        jitter_ms=float(os.getenv("LLM_FAKE_LATENCY_JITTER_MS", "0")),
+        use_recorded_latency=os.getenv("LLM_REPLAY_RECORDED_LATENCY", "False").lower() == "true",
+        latency_scale=float(os.getenv("LLM_REPLAY_LATENCY_SCALE", "1.0")),
+        fallback=backend == "fake"
+    )
@@ -0,0 +1,296 @@
+"""Quota-aware rate limiting of LLM requests with fair sharing across sessions"""
+import os
+import math
+import heapq
+import time
+import asyncio
+import itertools
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+
+from ..utils import observe_llm_quota_wait, set_llm_quota_queue
+
+# Token estimates for prompts not yet sent (no tokenizer round trip)
+CHARS_PER_TOKEN = 4
+
+
+def estimate_request_tokens(prompt_chars: int, max_output_tokens: int) -> int:
+    """Tokens a request may consume against a TPM quota: its input plus the output cap"""
+    return math.ceil(prompt_chars / CHARS_PER_TOKEN) + max_output_tokens
+
+
+class TokenBucket:
+    """A budget of `per_minute` units, refilled continuously"""
+
+    def __init__(self, per_minute: float):
+        self.capacity = per_minute
+        self.rate = per_minute / 60
+        self.tokens = per_minute
+        self._updated = time.monotonic()
+
+    def refill(self, now: float) -> None:
+        self.tokens = min(self.capacity, self.tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def wait_time(self, amount: float) -> float:
+        """Seconds until amount is available (after refill)"""
+        return max(0.0, (amount - self.tokens) / self.rate)
+
+
+@dataclass
+class Reservation:
+    """Budget taken by one request, settled against its actual usage"""
+    tokens: int
+    waited: float = 0.0
+
+
+@dataclass(order=True)
+class _Waiter:
+    start_tag: float
+    order: int
+    flow: str = field(compare=False)
+    tokens: int = field(compare=False)
+    cost: float = field(compare=False)
+    future: asyncio.Future = field(compare=False)
+
+
+class QuotaLimiter:
+    """
+    Requests-per-minute and tokens-per-minute budgets for one model
+
+    Requests that cannot start immediately wait in a start-time fair queue:
+    each flow (tenant or session) gets a virtual start tag advanced by the
+    share of the quota its previous requests used, and waiters are served in
+    tag order. A session issuing a large IaC generation therefore waits
+    behind other sessions' small requests instead of starving them, and a
+    session that has been idle gets served promptly.
+
+    A request's tokens are reserved up front from an estimate (prompt plus
+    the output cap) and settled with the actual usage once it completes.
+    A limit of 0 disables that budget.
+    """
+
+    def __init__(self, model_name: str, rpm: float = 0, tpm: float = 0):
+        self.model_name = model_name
+        self.requests = TokenBucket(rpm) if rpm > 0 else None
+        self.tokens = TokenBucket(tpm) if tpm > 0 else None
+
+        self._waiters: List[_Waiter] = []
+        self._order = itertools.count()
+        self._virtual_time = 0.0
+        self._flow_finish: Dict[str, float] = {}
+        self._paused_until = 0.0
+        self._timer: Optional[asyncio.TimerHandle] = None
+
+    @property
+    def enabled(self) -> bool:
+        return self.requests is not None or self.tokens is not None
+
+    @property
+    def queued(self) -> int:
+        return len(self._waiters)
+
+    def _clamp(self, tokens: int) -> int:
+        # A request larger than the whole budget would otherwise wait forever
+        return min(tokens, int(self.tokens.capacity)) if self.tokens else tokens
+
+    def _cost(self, tokens: int) -> float:
+        """Share of a minute's quota a request uses"""
+        cost = 0.0
+        if self.requests:
+            cost += 1 / self.requests.capacity
+        if self.tokens:
+            cost += tokens / self.tokens.capacity
+        return cost
+
+    def _wait_time(self, tokens: int) -> float:
+        now = time.monotonic()
+        wait = max(0.0, self._paused_until - now)
+        for bucket, amount in ((self.requests, 1), (self.tokens, tokens)):
+            if bucket is not None:
+                bucket.refill(now)
+                wait = max(wait, bucket.wait_time(amount))
+        return wait
+
+    def _take(self, tokens: int) -> None:
+        if self.requests:
+            self.requests.tokens -= 1
+        if self.tokens:
+            self.tokens.tokens -= tokens
+
+    def _tag(self, flow: str, cost: float) -> float:
+        start = max(self._virtual_time, self._flow_finish.get(flow, 0.0))
+        self._flow_finish[flow] = start + cost
+        return start
+
+    def _untag(self, flow: str, cost: float) -> None:
+        """Give back the share of a request that gave up waiting"""
+        # Later requests of the flow keep their tags; only its finish moves back
+        if flow in self._flow_finish:
+            self._flow_finish[flow] -= cost
+
+    def _start(self, start_tag: float) -> None:
+        """Advance virtual time to the request being served and forget idle flows"""
+        self._virtual_time = max(self._virtual_time, start_tag)
+        if len(self._flow_finish) > 1000:
+            self._flow_finish = {
+                flow: finish for flow, finish in self._flow_finish.items()
+                if finish > self._virtual_time
+            }
+
+    async def acquire(self, flow: str, tokens: int, timeout: Optional[float] = None) -> Reservation:
+        """
+        Wait for budget for one request
+
+        Args:
+            flow: Fairness key (tenant or session id)
+            tokens: Estimated tokens of the request
+            timeout: Longest time to wait
+
+        Returns:
+            The reservation, to be passed to settle()
+
+        Raises:
+            asyncio.TimeoutError: No budget within timeout
+        """
+        tokens = self._clamp(tokens)
+        if not self.enabled:
+            return Reservation(tokens)
+
+        cost = self._cost(tokens)
+        start_tag = self._tag(flow, cost)
+
+        if not self._waiters and self._wait_time(tokens) == 0:
+            self._take(tokens)
+            self._start(start_tag)
+            observe_llm_quota_wait(self.model_name, 0.0, "immediate")
+            return Reservation(tokens)
+
+        waiter = _Waiter(
+            start_tag, next(self._order), flow, tokens, cost,
+            asyncio.get_running_loop().create_future()
+        )
+        heapq.heappush(self._waiters, waiter)
+        set_llm_quota_queue(self.model_name, len(self._waiters))
+        self._dispatch()
+
+        queued_at = time.perf_counter()
+        try:
+            await asyncio.wait_for(asyncio.shield(waiter.future), timeout)
+        except (asyncio.TimeoutError, asyncio.CancelledError) as e:
+            if waiter.future.done() and not waiter.future.cancelled():
+                # Granted at the last moment: hand the budget back
+                self.settle(Reservation(tokens), 0, requests=0)
+            else:
+                waiter.future.cancel()
+                self._remove(waiter)
+            self._untag(flow, cost)
+            outcome = "timeout" if isinstance(e, asyncio.TimeoutError) else "cancelled"
+            observe_llm_quota_wait(self.model_name, time.perf_counter() - queued_at, outcome)
+            raise
+
+        waited = time.perf_counter() - queued_at
+        observe_llm_quota_wait(self.model_name, waited, "queued")
+        return Reservation(tokens, waited=waited)
+
+    def try_acquire(self, flow: str, tokens: int) -> Optional[Reservation]:
+        """Take budget only if it is available now and nobody is waiting (e.g. for hedges)"""
+        tokens = self._clamp(tokens)
+        if not self.enabled:
+            return Reservation(tokens)
+        if self._waiters or self._wait_time(tokens) > 0:
+            return None
+        self._take(tokens)
+        self._start(self._tag(flow, self._cost(tokens)))
+        return Reservation(tokens)
+
+    def settle(self, reservation: Reservation, used_tokens: Optional[int], requests: int = 1) -> None:
+        """
+        Replace a reservation's estimate with the tokens actually used
+
+        Args:
+            reservation: Reservation returned by acquire()
+            used_tokens: Input plus output tokens reported by the model, None
+                to keep the estimate
+            requests: Requests to keep charged (0 refunds the request too)
+        """
+        if not self.enabled:
+            return
+        if self.tokens is not None and used_tokens is not None:
+            self.tokens.refill(time.monotonic())
+            self.tokens.tokens = min(
+                self.tokens.capacity,
+                self.tokens.tokens + reservation.tokens - used_tokens
+            )
+        if self.requests is not None and requests == 0:
+            self.requests.tokens = min(self.requests.capacity, self.requests.tokens + 1)
+        self._dispatch()
+
+    def pause(self, seconds: float) -> None:
+        """Hold all requests for a while, e.g. after the service reported an exhausted quota"""
+        self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+        self._schedule(seconds)
+
+    def _remove(self, waiter: _Waiter) -> None:
+        try:
+            self._waiters.remove(waiter)
+            heapq.heapify(self._waiters)
+        except ValueError:
+            pass
+        set_llm_quota_queue(self.model_name, len(self._waiters))
+        self._dispatch()
+
+    def _dispatch(self) -> None:
+        """Grant budget to waiters in start-tag order while it lasts"""
+        while self._waiters:
+            head = self._waiters[0]
+            if head.future.done():
+                heapq.heappop(self._waiters)
+                continue
+            wait = self._wait_time(head.tokens)
+            if wait > 0:
+                self._schedule(wait)
+                break
+            heapq.heappop(self._waiters)
+            self._take(head.tokens)
+            self._start(head.start_tag)
+            head.future.set_result(None)
+        set_llm_quota_queue(self.model_name, len(self._waiters))
+
+    def _schedule(self, delay: float) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return
+        self._timer = loop.call_later(delay, self._dispatch)
+
+
+def quota_limiters(tiers: Dict[str, Dict]) -> Dict[str, QuotaLimiter]:
+    """
+    One limiter per model of the tier pool, from <PREFIX>_RPM / <PREFIX>_TPM
+
+    The strong tier reads VERTEX_AI_RPM / VERTEX_AI_TPM and the fast tier
+    VERTEX_AI_FAST_RPM / VERTEX_AI_FAST_TPM. Tiers sharing a model share its
+    limiter (the first tier's limits apply). Limits are per worker process,
+    so set them to the project quota divided by the number of workers.
+
+    Args:
+        tiers: Tier name -> settings with "model_name"
+
+    Returns:
+        Model name -> limiter
+    """
+    limiters: Dict[str, QuotaLimiter] = {}
+    for tier, settings in tiers.items():
+        model_name = settings["model_name"]
+        if model_name in limiters:
+            continue
+        prefix = "VERTEX_AI" if tier == "strong" else f"VERTEX_AI_{tier.upper()}"
+        limiters[model_name] = QuotaLimiter(
+            model_name,
+            rpm=float(os.getenv(f"{prefix}_RPM", "0")),
+            tpm=float(os.getenv(f"{prefix}_TPM", "0"))
+        )
+    return limiters
@@ -0,0 +1,121 @@
+"""Retry, deadline and hedging helpers for LLM requests"""
+import os
+import random
+import threading
+from collections import deque
+from dataclasses import dataclass
+from typing import Deque, Optional
+
+# Exception class names (google.api_core / transport) worth retrying.
+# Matched by name so the Google SDKs need not be imported here.
+RETRYABLE_ERRORS = {
+    "TimeoutError",
+    "ConnectionError",
+    "ServiceUnavailable",
+    "ResourceExhausted",
+    "DeadlineExceeded",
+    "InternalServerError",
+    "TooManyRequests",
+    "BadGateway",
+    "GatewayTimeout",
+    "Aborted",
+}
+RETRYABLE_STATUS_CODES = {429, 500, 502, 503, 504}
+
+# Failures meaning the model's RPM/TPM quota is exhausted
+QUOTA_ERRORS = {"ResourceExhausted", "TooManyRequests"}
+
+
+@dataclass
+class RetryPolicy:
+    """Retry and deadline settings for a single LLM call"""
+    max_attempts: int = 3
+    base_delay: float = 0.5
+    max_delay: float = 8.0
+    attempt_timeout: float = 60.0
+    total_deadline: float = 180.0
+
+    @classmethod
+    def from_env(cls) -> "RetryPolicy":
+        return cls(
+            max_attempts=int(os.getenv("LLM_MAX_ATTEMPTS", "3")),
+            base_delay=float(os.getenv("LLM_RETRY_BASE_DELAY_SECONDS", "0.5")),
+            max_delay=float(os.getenv("LLM_RETRY_MAX_DELAY_SECONDS", "8")),
+            attempt_timeout=float(os.getenv("LLM_ATTEMPT_TIMEOUT_SECONDS", "60")),
+            total_deadline=float(os.getenv("LLM_TOTAL_DEADLINE_SECONDS", "180"))
+        )
+
+    def backoff(self, attempt: int) -> float:
+        """Jittered exponential backoff before retry number `attempt` (1-based)"""
+        ceiling = min(self.max_delay, self.base_delay * (2 ** (attempt - 1)))
+        return random.uniform(ceiling / 2, ceiling)
+
+
+def _status_code(error: BaseException) -> Optional[int]:
+    code = getattr(error, "code", None)
+    if callable(code):
+        try:
+            code = code()
+        except Exception:
+            code = None
+    return getattr(code, "value", code)
+
+
+def is_retryable(error: BaseException) -> bool:
+    """Whether an LLM call failure is transient"""
+    for cls in type(error).__mro__:
+        if cls.__name__ in RETRYABLE_ERRORS:
+            return True
+    return _status_code(error) in RETRYABLE_STATUS_CODES
+
+
+def is_quota_error(error: BaseException) -> bool:
+    """Whether an LLM call failed because the quota is exhausted (HTTP 429)"""
+    for cls in type(error).__mro__:
+        if cls.__name__ in QUOTA_ERRORS:
+            return True
+    return _status_code(error) == 429
+
+
+class LatencyTracker:
+    """Sliding window of successful call latencies"""
+
+    def __init__(self, window: int = 200, min_samples: int = 20):
+        self.min_samples = min_samples
+        self._samples: Deque[float] = deque(maxlen=window)
+
+    def observe(self, latency: float) -> None:
+        self._samples.append(latency)
+
+    def percentile(self, q: float) -> Optional[float]:
+        """Latency at quantile q, or None until enough samples are collected"""
+        if len(self._samples) < self.min_samples:
+            return None
+        ordered = sorted(self._samples)
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+class HedgeBudget:
+    """
+    Token bucket limiting hedged requests to a fraction of primary requests
+
+    Every primary request earns `ratio` tokens (capped at `burst`) and every
+    hedge spends one, so hedging cannot multiply load during an outage.
+    """
+
+    def __init__(self, ratio: float = 0.1, burst: float = 10.0):
+        self.ratio = ratio
+        self.burst = burst
+        self._tokens = burst
+        self._lock = threading.Lock()
+
+    def earn(self) -> None:
+        with self._lock:
+            self._tokens = min(self.burst, self._tokens + self.ratio)
+
+    def try_spend(self) -> bool:
+        with self._lock:
+            if self._tokens >= 1.0:
+                self._tokens -= 1.0
+                return True
+            return False
@@ -0,0 +1,260 @@
+"""Bounded capture of deployment logs with a compressed on-disk copy"""
+import os
+import re
+import gzip
+import json
+import asyncio
+import logging
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+DEPLOYMENT_ID_PATTERN = re.compile(r"^[A-Za-z0-9_.-]+$")
+
+# Terraform output is repetitive, so level 1 compresses about as well as level 9
+COMPRESS_LEVEL = 1
+
+
+class DeploymentLog:
+    """
+    Log of a single deployment
+
+    The newest lines are kept in a fixed-size ring buffer for live progress
+    events. All lines are appended to <deployment_id>.log.gz in batches, one
+    gzip member per batch, and <deployment_id>.idx records the first line and
+    byte offset of every member so ranged reads can seek instead of
+    decompressing the whole file.
+    """
+
+    def __init__(
+        self,
+        deployment_id: str,
+        log_dir: Path,
+        tail_size: int = 200,
+        flush_lines: int = 500
+    ):
+        self.deployment_id = deployment_id
+        self.log_path = log_dir / f"{deployment_id}.log.gz"
+        self.index_path = log_dir / f"{deployment_id}.idx"
+        self.flush_lines = flush_lines
+
+        # Ring buffer trimmed in bulk so tail reads are plain slices
+        self.tail_size = tail_size
+        self._tail: List[str] = []
+        self._pending: List[str] = []
+        self._flushed = 0
+        self._lock = asyncio.Lock()
+        self._flush_task: Optional[asyncio.Task] = None
+
+        # Continue an existing log (e.g. a re-deploy of the same workspace)
+        self._members = read_index(self.index_path)
+        if self._members:
+            self._flushed = self._members[-1]["first_line"] + self._members[-1]["lines"]
+
+    @property
+    def line_count(self) -> int:
+        return self._flushed + len(self._pending)
+
+    def write(self, line: str) -> None:
+        """Append a line, flushing a batch to disk in the background when enough are pending"""
+        self._tail.append(line)
+        if len(self._tail) >= 2 * self.tail_size:
+            del self._tail[:-self.tail_size]
+
+        self._pending.append(line)
+        if len(self._pending) >= self.flush_lines and (
+            self._flush_task is None or self._flush_task.done()
+        ):
+            self._flush_task = asyncio.ensure_future(self.flush())
+
+    def tail(self, count: int) -> List[str]:
+        """The newest `count` lines (at most the ring buffer size)"""
+        return self._tail[-min(count, self.tail_size):] if count > 0 else []
+
+    async def flush(self) -> None:
+        """Compress pending lines into a new gzip member"""
+        async with self._lock:
+            if not self._pending:
+                return
+
+            # Lines stay pending (and readable) until their member is on disk
+            lines = list(self._pending)
+            try:
+                member = await asyncio.to_thread(self._write_member, lines, self._flushed)
+            except OSError as e:
+                # Losing log lines must not fail the deployment
+                logger.warning("Failed to write deployment log %s: %s", self.deployment_id, e)
+                del self._pending[:len(lines)]
+                return
+
+            del self._pending[:len(lines)]
+            self._members.append(member)
+            self._flushed += len(lines)
+
+    def pending_lines(self, start: int, end: int) -> List[str]:
+        """Lines in [start, end) that have not been flushed yet"""
+        start = max(start, self._flushed)
+        return self._pending[start - self._flushed:end - self._flushed]
+
+    def _write_member(self, lines: List[str], first_line: int) -> Dict[str, int]:
+        data = gzip.compress(
+            ("\n".join(lines) + "\n").encode("utf-8"),
+            compresslevel=COMPRESS_LEVEL
+        )
+
+        with open(self.log_path, "ab") as f:
+            offset = f.tell()
+            f.write(data)
+
+        member = {"first_line": first_line, "lines": len(lines), "offset": offset}
+        with open(self.index_path, "a") as f:
+            f.write(json.dumps(member) + "\n")
+
+        return member
+
+
+def read_index(index_path: Path) -> List[Dict[str, int]]:
+    """Member index of a deployment log (empty if it does not exist)"""
+    if not index_path.exists():
+        return []
+    with open(index_path) as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def read_log_range(log_path: Path, members: List[Dict[str, int]], start: int, end: int) -> List[str]:
+    """Read lines [start, end) from a log, starting at the member containing start"""
+    member = next(
+        (m for m in reversed(members) if m["first_line"] <= start),
+        None
+    )
+    if member is None or start >= end:
+        return []
+
+    lines = []
+    with open(log_path, "rb") as f:
+        f.seek(member["offset"])
+        # GzipFile reads across the following members as one stream
+        with gzip.GzipFile(fileobj=f) as stream:
+            line_number = member["first_line"]
+            for raw in stream:
+                if line_number >= end:
+                    break
+                if line_number >= start:
+                    lines.append(raw.decode("utf-8", errors="replace").rstrip("\n"))
+                line_number += 1
+
+    return lines
+
+
+class LogCaptureService:
+    """Creates deployment logs and serves ranged reads of them"""
+
+    def __init__(
+        self,
+        log_dir: str = "./data/deployment_logs",
+        tail_size: int = 200,
+        flush_lines: int = 500
+    ):
+        self.log_dir = Path(log_dir)
+        self.log_dir.mkdir(parents=True, exist_ok=True)
+        self.tail_size = tail_size
+        self.flush_lines = flush_lines
+        self._active: Dict[str, DeploymentLog] = {}
+
+    def open(self, deployment_id: str) -> DeploymentLog:
+        """Start (or continue) capturing the log of a deployment"""
+        self._validate_id(deployment_id)
+        if deployment_id not in self._active:
+            self._active[deployment_id] = DeploymentLog(
+                deployment_id,
+                self.log_dir,
+                tail_size=self.tail_size,
+                flush_lines=self.flush_lines
+            )
+        return self._active[deployment_id]
+
+    def is_live(self, deployment_id: str) -> bool:
+        """Whether a deployment is currently writing its log"""
+        return deployment_id in self._active
+
+    async def close(self, deployment_id: str) -> None:
+        """Flush the remaining lines and stop tracking the deployment as live"""
+        log = self._active.pop(deployment_id, None)
+        if log is not None:
+            await log.flush()
+
+    async def read(
+        self,
+        deployment_id: str,
+        offset: int = 0,
+        limit: int = 500
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Read a range of log lines
+
+        Args:
+            deployment_id: Deployment identifier
+            offset: Index of the first line to return
+            limit: Maximum number of lines to return
+
+        Returns:
+            Lines with the total line count, or None if the deployment has no log
+        """
+        self._validate_id(deployment_id)
+        live = self._active.get(deployment_id)
+
+        if live is not None:
+            members = list(live._members)
+            flushed = live._flushed
+            total = live.line_count
+        else:
+            members = await asyncio.to_thread(read_index, self.log_dir / f"{deployment_id}.idx")
+            if not members:
+                return None
+            flushed = total = members[-1]["first_line"] + members[-1]["lines"]
+
+        end = min(offset + limit, total)
+
+        # Take unflushed lines before awaiting, while they still line up with `flushed`
+        pending = live.pending_lines(offset, end) if live is not None else []
+
+        lines = []
+        if offset < flushed:
+            lines = await asyncio.to_thread(
+                read_log_range,
+                self.log_dir / f"{deployment_id}.log.gz",
+                members,
+                offset,
+                min(end, flushed)
+            )
+        lines.extend(pending)
+
+        return {
+            "deployment_id": deployment_id,
+            "offset": offset,
+            "lines": lines,
+            "total": total,
+            "live": live is not None
+        }
+
+    def _validate_id(self, deployment_id: str) -> None:
+        # Deployment ids become file names
+        if not DEPLOYMENT_ID_PATTERN.match(deployment_id):
+            raise ValueError(f"Invalid deployment id: {deployment_id}")
+
+
+# Singleton instance
+_log_capture_service: Optional[LogCaptureService] = None
+
+
+def get_log_capture_service() -> LogCaptureService:
+    """Get or create the log capture service singleton"""
+    global _log_capture_service
+    if _log_capture_service is None:
+        _log_capture_service = LogCaptureService(
+            log_dir=os.getenv("DEPLOYMENT_LOG_DIR", "./data/deployment_logs"),
+            tail_size=int(os.getenv("DEPLOYMENT_LOG_TAIL_LINES", "200")),
+            flush_lines=int(os.getenv("DEPLOYMENT_LOG_FLUSH_LINES", "500"))
+        )
+    return _log_capture_service
@@ -0,0 +1,456 @@
+"""Session state shared by all workers: sessions, jobs, event logs and locks"""
+import os
+import json
+import time
+import uuid
+import socket
+import asyncio
+import sqlite3
+import threading
+import logging
+from abc import ABC, abstractmethod
+from contextlib import asynccontextmanager
+from pathlib import Path
+from typing import Any, AsyncIterator, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+STORES = ("sqlite", "redis")
+
+# Identifies this process as the owner of jobs and locks
+WORKER_ID = f"{socket.gethostname()}-{os.getpid()}"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS sessions (
+    session_id TEXT PRIMARY KEY,
+    data TEXT NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS events (
+    session_id TEXT NOT NULL,
+    seq INTEGER NOT NULL,
+    data TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    PRIMARY KEY (session_id, seq)
+);
+CREATE INDEX IF NOT EXISTS idx_events_created ON events (created_at);
+CREATE TABLE IF NOT EXISTS jobs (
+    job_id TEXT PRIMARY KEY,
+    data TEXT NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS locks (
+    name TEXT PRIMARY KEY,
+    owner TEXT NOT NULL,
+    expires_at REAL NOT NULL
+);
+"""
+
+
+class LockBusyError(Exception):
+    """The lock is held by another owner"""
+
+    def __init__(self, name: str):
+        super().__init__(f"{name} is busy")
+        self.name = name
+
+
+class SessionStore(ABC):
+    """
+    Interface for state that must be visible to every worker
+
+    Sessions and jobs are JSON documents, events are an append-only log per
+    session numbered by seq, and locks are leases that expire unless their
+    owner renews them.
+    """
+
+    @abstractmethod
+    async def get_session(self, session_id: str) -> Optional[Dict[str, Any]]:
+        """Session document, None if the session does not exist"""
+
+    @abstractmethod
+    async def update_session(self, session_id: str, fields: Dict[str, Any]) -> None:
+        """Merge fields into the session document, creating it if needed"""
+
+    @abstractmethod
+    async def append_events(self, session_id: str, events: List[Dict[str, Any]]) -> None:
+        """
+        Append events, each carrying an increasing "seq", to the session's log
+
+        Events are serialized off the event loop, so they must not be changed
+        once handed over.
+        """
+
+    @abstractmethod
+    async def read_events(self, session_id: str, after: int = 0, limit: int = 500) -> List[Dict[str, Any]]:
+        """Events with seq greater than after, oldest first"""
+
+    @abstractmethod
+    async def wait_events(self, session_id: str, after: int, timeout: float) -> List[Dict[str, Any]]:
+        """Like read_events, but wait up to timeout seconds for new events"""
+
+    @abstractmethod
+    async def last_seq(self, session_id: str) -> int:
+        """Seq of the newest event of a session (0 if none)"""
+
+    @abstractmethod
+    async def get_job(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Job document, None if the job does not exist"""
+
+    @abstractmethod
+    async def put_job(self, job_id: str, job: Dict[str, Any]) -> None:
+        """Create or replace a job document"""
+
+    @abstractmethod
+    async def acquire_lock(self, name: str, owner: str, ttl: float) -> bool:
+        """Take or renew a lease; fails while another owner holds an unexpired one"""
+
+    @abstractmethod
+    async def release_lock(self, name: str, owner: str) -> None:
+        """Release a lease if owner still holds it"""
+
+    @abstractmethod
+    async def lock_owner(self, name: str) -> Optional[str]:
+        """Owner of an unexpired lease, None if the lock is free"""
+
+    async def close(self) -> None:
+        pass
+
+    @asynccontextmanager
+    async def hold_lock(self, name: str, ttl: float = 60) -> AsyncIterator[str]:
+        """
+        Hold a lock for the duration of the block, renewing it in the background
+
+        Raises:
+            LockBusyError: Another owner holds the lock
+        """
+        owner = f"{WORKER_ID}:{uuid.uuid4().hex[:8]}"
+        if not await self.acquire_lock(name, owner, ttl):
+            raise LockBusyError(name)
+
+        async def renew() -> None:
+            while True:
+                await asyncio.sleep(ttl / 3)
+                try:
+                    if not await self.acquire_lock(name, owner, ttl):
+                        logger.warning("Lost lock %s", name)
+                        return
+                except Exception as e:
+                    logger.warning("Renewing lock %s failed: %s", name, e)
+
+        renewal = asyncio.create_task(renew())
+        try:
+            yield owner
+        finally:
+            renewal.cancel()
+            try:
+                await self.release_lock(name, owner)
+            except Exception as e:
+                logger.warning("Releasing lock %s failed: %s", name, e)
+
+
+class SQLiteSessionStore(SessionStore):
+    """
+    Session store in a local SQLite database
+
+    Workers on the same host share the database file. Waiters poll for events
+    appended by other processes and are woken immediately for events
+    appended by this one.
+    """
+
+    def __init__(
+        self,
+        db_path: str = "./data/sessions.db",
+        event_ttl_seconds: float = 86400,
+        poll_interval: float = 0.1
+    ):
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self.event_ttl = event_ttl_seconds
+        self.poll_interval = poll_interval
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.db_path), check_same_thread=False, timeout=10)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(SCHEMA)
+        self._waiters: Dict[str, List[asyncio.Event]] = {}
+        self._last_prune = 0.0
+
+    def _execute(self, query: str, params: tuple = ()) -> List[tuple]:
+        with self._lock:
+            rows = self._conn.execute(query, params).fetchall()
+            self._conn.commit()
+            return rows
+
+    async def get_session(self, session_id: str) -> Optional[Dict[str, Any]]:
+        rows = await asyncio.to_thread(
+            self._execute, "SELECT data FROM sessions WHERE session_id = ?", (session_id,)
+        )
+        return json.loads(rows[0][0]) if rows else None
+
+    async def update_session(self, session_id: str, fields: Dict[str, Any]) -> None:
+        # json_patch merges like JSON Merge Patch: null values remove keys
+        await asyncio.to_thread(
+            self._execute,
+            "INSERT INTO sessions (session_id, data, updated_at) VALUES (?, ?, ?) "
+            "ON CONFLICT (session_id) DO UPDATE SET "
+            "data = json_patch(sessions.data, excluded.data), updated_at = excluded.updated_at",
+            (session_id, json.dumps(fields), time.time())
+        )
+
+    async def append_events(self, session_id: str, events: List[Dict[str, Any]]) -> None:
+        if not events:
+            return
+        await asyncio.to_thread(self._insert_events, session_id, events, time.time())
+        for waiter in self._waiters.get(session_id, []):
+            waiter.set()
+
+    def _insert_events(self, session_id: str, events: List[Dict[str, Any]], now: float) -> None:
+        rows = [(session_id, event["seq"], json.dumps(event), now) for event in events]
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO events (session_id, seq, data, created_at) VALUES (?, ?, ?, ?)",
+                rows
+            )
+            if self.event_ttl and now - self._last_prune > 60:
+                self._conn.execute("DELETE FROM events WHERE created_at < ?", (now - self.event_ttl,))
+                self._last_prune = now
+            self._conn.commit()
+
+    async def read_events(self, session_id: str, after: int = 0, limit: int = 500) -> List[Dict[str, Any]]:
+        rows = await asyncio.to_thread(
+            self._execute,
+            "SELECT data FROM events WHERE session_id = ? AND seq > ? ORDER BY seq LIMIT ?",
+            (session_id, after, limit)
+        )
+        return [json.loads(row[0]) for row in rows]
+
+    async def wait_events(self, session_id: str, after: int, timeout: float) -> List[Dict[str, Any]]:
+        deadline = time.monotonic() + timeout
+        waiter = asyncio.Event()
+        self._waiters.setdefault(session_id, []).append(waiter)
+        try:
+            while True:
+                waiter.clear()
+                events = await self.read_events(session_id, after)
+                remaining = deadline - time.monotonic()
+                if events or remaining <= 0:
+                    return events
+                try:
+                    await asyncio.wait_for(waiter.wait(), min(self.poll_interval, remaining))
+                except asyncio.TimeoutError:
+                    pass
+        finally:
+            waiters = self._waiters[session_id]
+            waiters.remove(waiter)
+            if not waiters:
+                del self._waiters[session_id]
+
+    async def last_seq(self, session_id: str) -> int:
+        rows = await asyncio.to_thread(
+            self._execute, "SELECT MAX(seq) FROM events WHERE session_id = ?", (session_id,)
+        )
+        return rows[0][0] or 0
+
+    async def get_job(self, job_id: str) -> Optional[Dict[str, Any]]:
+        rows = await asyncio.to_thread(self._execute, "SELECT data FROM jobs WHERE job_id = ?", (job_id,))
+        return json.loads(rows[0][0]) if rows else None
+
+    async def put_job(self, job_id: str, job: Dict[str, Any]) -> None:
+        await asyncio.to_thread(
+            self._execute,
+            "INSERT OR REPLACE INTO jobs (job_id, data, updated_at) VALUES (?, ?, ?)",
+            (job_id, json.dumps(job), time.time())
+        )
+
+    async def acquire_lock(self, name: str, owner: str, ttl: float) -> bool:
+        return await asyncio.to_thread(self._acquire, name, owner, ttl)
+
+    def _acquire(self, name: str, owner: str, ttl: float) -> bool:
+        now = time.time()
+        with self._lock:
+            # A single upsert, so concurrent workers cannot both win
+            cursor = self._conn.execute(
+                "INSERT INTO locks (name, owner, expires_at) VALUES (?, ?, ?) "
+                "ON CONFLICT (name) DO UPDATE SET owner = excluded.owner, expires_at = excluded.expires_at "
+                "WHERE locks.owner = excluded.owner OR locks.expires_at < ?",
+                (name, owner, now + ttl, now)
+            )
+            self._conn.commit()
+            return cursor.rowcount == 1
+
+    async def release_lock(self, name: str, owner: str) -> None:
+        await asyncio.to_thread(
+            self._execute, "DELETE FROM locks WHERE name = ? AND owner = ?", (name, owner)
+        )
+
+    async def lock_owner(self, name: str) -> Optional[str]:
+        rows = await asyncio.to_thread(
+            self._execute,
+            "SELECT owner FROM locks WHERE name = ? AND expires_at >= ?",
+            (name, time.time())
+        )
+        return rows[0][0] if rows else None
+
+    async def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+class RedisSessionStore(SessionStore):
+    """
+    Session store in Redis (or anything speaking its protocol)
+
+    Sessions are hashes of JSON fields, jobs and locks are plain keys with an
+    expiry, and each session's events are a stream whose entry ids are
+    0-<seq>, so readers block on XREAD instead of polling.
+    """
+
+    def __init__(
+        self,
+        url: str = "redis://localhost:6379/0",
+        client: Any = None,
+        event_ttl_seconds: float = 86400,
+        prefix: str = "vibe"
+    ):
+        if client is None:
+            # Optional dependency: redis
+            import redis.asyncio as redis
+            client = redis.from_url(url, decode_responses=True)
+        self.client = client
+        self.event_ttl = int(event_ttl_seconds)
+        self.prefix = prefix
+
+    def _key(self, kind: str, name: str) -> str:
+        return f"{self.prefix}:{kind}:{name}"
+
+    async def get_session(self, session_id: str) -> Optional[Dict[str, Any]]:
+        fields = await self.client.hgetall(self._key("session", session_id))
+        if not fields:
+            return None
+        return {name: json.loads(value) for name, value in fields.items()}
+
+    async def update_session(self, session_id: str, fields: Dict[str, Any]) -> None:
+        key = self._key("session", session_id)
+        removed = [name for name, value in fields.items() if value is None]
+        async with self.client.pipeline(transaction=True) as pipe:
+            updated = {name: json.dumps(value) for name, value in fields.items() if value is not None}
+            if updated:
+                pipe.hset(key, mapping=updated)
+            if removed:
+                pipe.hdel(key, *removed)
+            if self.event_ttl:
+                pipe.expire(key, self.event_ttl)
+            await pipe.execute()
+
+    async def append_events(self, session_id: str, events: List[Dict[str, Any]]) -> None:
+        if not events:
+            return
+        key = self._key("events", session_id)
+        payloads = await asyncio.to_thread(lambda: [json.dumps(event) for event in events])
+        async with self.client.pipeline(transaction=False) as pipe:
+            for event, payload in zip(events, payloads):
+                pipe.xadd(key, {"data": payload}, id=f"0-{event['seq']}")
+            if self.event_ttl:
+                pipe.expire(key, self.event_ttl)
+            await pipe.execute()
+
+    async def read_events(self, session_id: str, after: int = 0, limit: int = 500) -> List[Dict[str, Any]]:
+        entries = await self.client.xrange(
+            self._key("events", session_id), min=f"(0-{after}", max="+", count=limit
+        )
+        return [json.loads(fields["data"]) for _, fields in entries]
+
+    async def wait_events(self, session_id: str, after: int, timeout: float) -> List[Dict[str, Any]]:
+        result = await self.client.xread(
+            {self._key("events", session_id): f"0-{after}"},
+            count=500,
+            block=max(1, int(timeout * 1000))
+        )
+        return [json.loads(fields["data"]) for _, entries in result or [] for _, fields in entries]
+
+    async def last_seq(self, session_id: str) -> int:
+        entries = await self.client.xrevrange(self._key("events", session_id), count=1)
+        return int(entries[0][0].split("-")[1]) if entries else 0
+
+    async def get_job(self, job_id: str) -> Optional[Dict[str, Any]]:
+        value = await self.client.get(self._key("job", job_id))
+        return json.loads(value) if value else None
+
+    async def put_job(self, job_id: str, job: Dict[str, Any]) -> None:
+        await self.client.set(self._key("job", job_id), json.dumps(job), ex=self.event_ttl or None)
+
+    async def acquire_lock(self, name: str, owner: str, ttl: float) -> bool:
+        key = self._key("lock", name)
+        ttl_ms = max(1, int(ttl * 1000))
+        if await self.client.set(key, owner, nx=True, px=ttl_ms):
+            return True
+
+        # Renewal: extend only if we still own the lock
+        from redis.exceptions import WatchError
+        async with self.client.pipeline(transaction=True) as pipe:
+            try:
+                await pipe.watch(key)
+                current = await pipe.get(key)
+                if current is None:
+                    pipe.multi()
+                    pipe.set(key, owner, nx=True, px=ttl_ms)
+                    return bool((await pipe.execute())[0])
+                if current != owner:
+                    return False
+                pipe.multi()
+                pipe.pexpire(key, ttl_ms)
+                await pipe.execute()
+                return True
+            except WatchError:
+                return False
+
+    async def release_lock(self, name: str, owner: str) -> None:
+        key = self._key("lock", name)
+        from redis.exceptions import WatchError
+        async with self.client.pipeline(transaction=True) as pipe:
+            try:
+                await pipe.watch(key)
+                if await pipe.get(key) == owner:
+                    pipe.multi()
+                    pipe.delete(key)
+                    await pipe.execute()
+            except WatchError:
+                pass
+
+    async def lock_owner(self, name: str) -> Optional[str]:
+        return await self.client.get(self._key("lock", name))
+
+    async def close(self) -> None:
+        await self.client.aclose()
+
+
+# Singleton instance
+_session_store: Optional[SessionStore] = None
+
+
+def get_session_store() -> SessionStore:
+    """
+    Get or create the session store singleton
+
+    SESSION_STORE selects the implementation: sqlite (default, workers on
+    one host share SESSION_STORE_DB) or redis (REDIS_URL).
+    """
+    global _session_store
+    if _session_store is None:
+        kind = os.getenv("SESSION_STORE", "sqlite").lower()
+        ttl = float(os.getenv("SESSION_TTL_SECONDS", "86400"))
+        if kind == "sqlite":
+            _session_store = SQLiteSessionStore(
+                os.getenv("SESSION_STORE_DB", "./data/sessions.db"),
+                event_ttl_seconds=ttl
+            )
+        elif kind == "redis":
+            _session_store = RedisSessionStore(
+                os.getenv("REDIS_URL", "redis://localhost:6379/0"),
+                event_ttl_seconds=ttl
+            )
+        else:
+            raise ValueError(f"SESSION_STORE must be one of {', '.join(STORES)}")
+    return _session_store
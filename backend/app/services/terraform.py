@@ -1,18 +1,124 @@
 """Terraform service for IaC generation and deployment"""
 import os
 import subprocess
+import signal
 import asyncio
-from typing import Dict, List, Optional, AsyncGenerator
+import logging
+import time
+from collections import deque
+from typing import Any, Awaitable, Callable, Dict, List, Optional, AsyncGenerator
 from pathlib import Path
 import json
+from ..utils import (
+    TERRAFORM_OUTPUT_LOGGER,
+    OutputSampler,
+    observe_terraform_command,
+    start_span,
+    set_span_attributes
+)
+from .terraform_state import TerraformState, parse_state_file
+from .terraform_workspace import BlobStore, atomic_write, materialize_files
+from .terraform_plan import (
+    PLAN_FILE,
+    PlanDecision,
+    decide_plan,
+    discard_plan,
+    record_plan,
+    record_apply
+)
+
+logger = logging.getLogger(__name__)
+# Output lines, sampled per command before logging
+output_logger = logging.getLogger(TERRAFORM_OUTPUT_LOGGER)
+
+# Bytes read from Terraform's stdout per chunk
+OUTPUT_CHUNK_SIZE = 64 * 1024
+# Time Terraform gets to exit after an interrupt before it is killed
+STOP_TIMEOUT_SECONDS = 10
+
+# Provider requirements added to every generated configuration
+GOOGLE_PROVIDER_REQUIREMENTS = '''terraform {
+  required_providers {
+    google = {
+      source  = "hashicorp/google"
+      version = "~> 5.0"
+    }
+  }
+}
+'''
+
+# Workspace initialized at warm-up to fill the provider plugin cache
+TEMPLATE_WORKSPACE = ".template"
+
+# Output lines quoted in the error of a failed command
+ERROR_OUTPUT_LINES = 5
+
+
+class TerraformCommandError(RuntimeError):
+    """A Terraform subcommand exited with a non-zero status"""
+
+    def __init__(self, command: str, exit_code: int, output: List[str]):
+        detail = f": {' '.join(output)}" if output else ""
+        super().__init__(f"terraform {command} exited with status {exit_code}{detail}")
+        self.command = command
+        self.exit_code = exit_code
+        self.output = output
 
 
 class TerraformService:
     """Service for generating and applying Terraform configurations"""
 
-    def __init__(self, workspace_dir: str = "./terraform/outputs"):
+    def __init__(
+        self,
+        workspace_dir: str = "./terraform/outputs",
+        plan_reuse: bool = True,
+        max_targets: int = 10,
+        plugin_cache_dir: Optional[str] = None
+    ):
         self.workspace_dir = Path(workspace_dir)
         self.workspace_dir.mkdir(parents=True, exist_ok=True)
+        self.blobs = BlobStore(self.workspace_dir / ".blobs")
+        self.plan_reuse = plan_reuse
+        self.max_targets = max_targets
+
+        # Providers are downloaded once and linked into every workspace
+        self.plugin_cache_dir = Path(plugin_cache_dir or self.workspace_dir / ".plugin-cache")
+        self.plugin_cache_dir.mkdir(parents=True, exist_ok=True)
+
+    def _env(self) -> Dict[str, str]:
+        """Environment for Terraform subprocesses"""
+        return {
+            **os.environ,
+            "TF_PLUGIN_CACHE_DIR": str(self.plugin_cache_dir.resolve()),
+            # New workspaces have no lock file; without this Terraform would
+            # download providers again instead of using the cache
+            "TF_PLUGIN_CACHE_MAY_BREAK_DEPENDENCY_LOCK_FILE": "true"
+        }
+
+    async def warm_up(self) -> Path:
+        """
+        Initialize a template workspace requiring the Google provider
+
+        This downloads the provider into the plugin cache ahead of the first
+        deployment, whose terraform init then only links it.
+
+        Returns:
+            The initialized template workspace
+
+        Raises:
+            TerraformCommandError: terraform init failed
+        """
+        workspace = self.workspace_dir / TEMPLATE_WORKSPACE
+        await asyncio.to_thread(workspace.mkdir, parents=True, exist_ok=True)
+        await asyncio.to_thread(
+            atomic_write, workspace / "provider.tf", GOOGLE_PROVIDER_REQUIREMENTS.encode()
+        )
+
+        async for _ in self._run_command(
+            "init", ["init", "-backend=false", "-input=false"], workspace
+        ):
+            pass
+        return workspace
 
     def create_deployment_workspace(self, deployment_id: str) -> Path:
         """Create a workspace directory for a deployment"""
@@ -20,7 +126,7 @@ class TerraformService:
         deployment_path.mkdir(parents=True, exist_ok=True)
         return deployment_path
 
-    def write_terraform_files(
+    async def write_terraform_files(
         self,
         deployment_id: str,
         files: Dict[str, str]
@@ -28,6 +134,10 @@ class TerraformService:
         """
         Write Terraform configuration files to deployment workspace
 
+        Files are written off the event loop, atomically, and only when
+        their content changed; identical files are shared between
+        workspaces through the blob store.
+
         Args:
             deployment_id: Unique deployment identifier
             files: Dictionary of filename -> content
@@ -35,89 +145,114 @@ class TerraformService:
         Returns:
             Path to deployment workspace
         """
-        workspace = self.create_deployment_workspace(deployment_id)
-
-        for filename, content in files.items():
-            file_path = workspace / filename
-            with open(file_path, 'w') as f:
-                f.write(content)
-
+        with start_span("terraform.write_files", {"deployment.id": deployment_id}) as span:
+            workspace = await asyncio.to_thread(self.create_deployment_workspace, deployment_id)
+            counts = await asyncio.to_thread(materialize_files, workspace, files, self.blobs)
+            set_span_attributes(span, {
+                "terraform.files_written": counts["written"],
+                "terraform.files_unchanged": counts["unchanged"]
+            })
         return workspace
 
     async def terraform_init(
         self,
         workspace: Path
     ) -> AsyncGenerator[str, None]:
-        """Initialize Terraform workspace"""
-        process = await asyncio.create_subprocess_exec(
-            'terraform', 'init',
-            cwd=str(workspace),
-            stdout=asyncio.subprocess.PIPE,
-            stderr=asyncio.subprocess.STDOUT
-        )
-
-        async for line in self._stream_process_output(process):
+        """Initialize Terraform workspace, raising TerraformCommandError if it fails"""
+        async for line in self._run_command("init", ["init"], workspace):
             yield line
 
+    async def plan_decision(self, workspace: Path) -> PlanDecision:
+        """
+        Compare the workspace with its last plan and apply
+
+        Returns:
+            "skip" when configuration and state are unchanged since the last
+            apply, "reuse" when the saved plan is still valid, "targeted" when
+            only a few resources changed, otherwise "full"
+        """
+        with start_span("terraform.plan_decision", {"deployment.id": workspace.name}) as span:
+            if self.plan_reuse:
+                decision = await asyncio.to_thread(decide_plan, workspace, self.max_targets)
+            else:
+                decision = PlanDecision("full", "")
+            set_span_attributes(span, {
+                "terraform.plan_action": decision.action,
+                "terraform.plan_targets": len(decision.targets)
+            })
+        return decision
+
     async def terraform_plan(
         self,
-        workspace: Path
+        workspace: Path,
+        decision: Optional[PlanDecision] = None
     ) -> AsyncGenerator[str, None]:
-        """Run terraform plan"""
-        process = await asyncio.create_subprocess_exec(
-            'terraform', 'plan', '-out=tfplan',
-            cwd=str(workspace),
-            stdout=asyncio.subprocess.PIPE,
-            stderr=asyncio.subprocess.STDOUT
-        )
+        """
+        Run terraform plan, limited to the decision's targets if any
+
+        A failed plan deletes the saved plan and raises TerraformCommandError.
+        """
+        args = ["plan", f"-out={PLAN_FILE}"]
+        if decision is not None:
+            args += [f"-target={target}" for target in decision.targets]
 
-        async for line in self._stream_process_output(process):
+        async for line in self._run_command(
+            "plan", args, workspace,
+            on_success=lambda: asyncio.to_thread(record_plan, workspace, decision),
+            on_failure=lambda: asyncio.to_thread(discard_plan, workspace)
+        ):
             yield line
 
     async def terraform_apply(
         self,
         workspace: Path
     ) -> AsyncGenerator[str, None]:
-        """Apply Terraform configuration"""
-        process = await asyncio.create_subprocess_exec(
-            'terraform', 'apply', '-auto-approve', 'tfplan',
-            cwd=str(workspace),
-            stdout=asyncio.subprocess.PIPE,
-            stderr=asyncio.subprocess.STDOUT
-        )
+        """
+        Apply the saved plan
 
-        async for line in self._stream_process_output(process):
+        A failed apply deletes the saved plan, which no longer matches the
+        state, and raises TerraformCommandError.
+        """
+        async for line in self._run_command(
+            "apply", ["apply", "-auto-approve", PLAN_FILE], workspace,
+            on_success=lambda: asyncio.to_thread(record_apply, workspace),
+            on_failure=lambda: asyncio.to_thread(discard_plan, workspace)
+        ):
             yield line
 
     async def terraform_destroy(
         self,
         workspace: Path
     ) -> AsyncGenerator[str, None]:
-        """Destroy Terraform-managed infrastructure"""
-        process = await asyncio.create_subprocess_exec(
-            'terraform', 'destroy', '-auto-approve',
-            cwd=str(workspace),
-            stdout=asyncio.subprocess.PIPE,
-            stderr=asyncio.subprocess.STDOUT
-        )
-
-        async for line in self._stream_process_output(process):
+        """Destroy Terraform-managed infrastructure, raising TerraformCommandError if it fails"""
+        async for line in self._run_command(
+            "destroy", ["destroy", "-auto-approve"], workspace
+        ):
             yield line
 
     async def get_terraform_outputs(
         self,
         workspace: Path
-    ) -> Dict[str, any]:
+    ) -> Dict[str, Any]:
         """Get Terraform outputs as JSON"""
         try:
-            process = await asyncio.create_subprocess_exec(
-                'terraform', 'output', '-json',
-                cwd=str(workspace),
-                stdout=asyncio.subprocess.PIPE,
-                stderr=asyncio.subprocess.PIPE
-            )
+            with start_span("terraform.output", {"deployment.id": workspace.name}) as span:
+                started = time.perf_counter()
+                process = await asyncio.create_subprocess_exec(
+                    'terraform', 'output', '-json',
+                    cwd=str(workspace),
+                    env=self._env(),
+                    stdout=asyncio.subprocess.PIPE,
+                    stderr=asyncio.subprocess.PIPE
+                )
 
-            stdout, stderr = await process.communicate()
+                stdout, stderr = await process.communicate()
+                observe_terraform_command(
+                    "output",
+                    time.perf_counter() - started,
+                    process.returncode
+                )
+                set_span_attributes(span, {"terraform.exit_code": process.returncode})
 
             if process.returncode == 0:
                 return json.loads(stdout.decode())
@@ -127,14 +262,138 @@ class TerraformService:
         except Exception as e:
             raise Exception(f"Error getting Terraform outputs: {str(e)}")
 
+    async def read_state(self, workspace: Path) -> Optional[TerraformState]:
+        """
+        Read the local terraform.tfstate of a workspace without running Terraform
+
+        Returns:
+            Indexed state, or None when there is no local state (e.g. remote backends)
+        """
+        with start_span("terraform.read_state", {"deployment.id": workspace.name}) as span:
+            state = await asyncio.to_thread(parse_state_file, workspace / "terraform.tfstate")
+            set_span_attributes(span, {
+                "terraform.state_resources": len(state.resources) if state else 0
+            })
+        return state
+
+    async def _run_command(
+        self,
+        command: str,
+        args: List[str],
+        workspace: Path,
+        on_success: Optional[Callable[[], Awaitable[None]]] = None,
+        on_failure: Optional[Callable[[], Awaitable[None]]] = None
+    ) -> AsyncGenerator[str, None]:
+        """
+        Run a Terraform subcommand, streaming its output and recording metrics
+
+        on_success is awaited after the command exits with status 0. Any
+        other status awaits on_failure and then raises TerraformCommandError.
+        """
+        with start_span(f"terraform.{command}", {
+            "deployment.id": workspace.name,
+            "terraform.args": " ".join(args)
+        }) as span:
+            started = time.perf_counter()
+            process = await asyncio.create_subprocess_exec(
+                'terraform', *args,
+                cwd=str(workspace),
+                env=self._env(),
+                stdout=asyncio.subprocess.PIPE,
+                stderr=asyncio.subprocess.STDOUT
+            )
+
+            line_count = 0
+            last_lines: deque = deque(maxlen=ERROR_OUTPUT_LINES)
+            log_lines = output_logger.isEnabledFor(logging.INFO)
+            sampler = OutputSampler()
+            try:
+                async for line in self._stream_process_output(process):
+                    line_count += 1
+                    if line:
+                        last_lines.append(line)
+                        if "Error:" in line:
+                            output_logger.warning(line, extra={"command": command})
+                        elif log_lines:
+                            sample_rate = sampler.sample_rate()
+                            if sample_rate == 1:
+                                output_logger.info(line, extra={"command": command})
+                            elif sample_rate:
+                                output_logger.info(line, extra={"command": command, "sample_rate": sample_rate})
+                    yield line
+            finally:
+                sampler.close()
+                # The consumer stopped reading early or was cancelled: stop
+                # Terraform before the caller releases the workspace lock
+                if process.returncode is None:
+                    await self._stop_process(process)
+                duration = time.perf_counter() - started
+                observe_terraform_command(command, duration, process.returncode)
+                logger.log(
+                    logging.INFO if process.returncode == 0 else logging.WARNING,
+                    "terraform %s exited with %s", command, process.returncode,
+                    extra={
+                        "command": command,
+                        "exit_code": process.returncode,
+                        "duration_ms": round(duration * 1000, 1),
+                        "output_lines": line_count
+                    }
+                )
+                set_span_attributes(span, {
+                    "terraform.exit_code": process.returncode,
+                    "terraform.output_lines": line_count
+                })
+
+            if process.returncode == 0:
+                if on_success is not None:
+                    await on_success()
+            else:
+                if on_failure is not None:
+                    await on_failure()
+                raise TerraformCommandError(command, process.returncode, list(last_lines))
+
+    async def _stop_process(self, process: asyncio.subprocess.Process) -> None:
+        """Interrupt Terraform so it can release its state lock, killing it if it does not exit"""
+        try:
+            process.send_signal(signal.SIGINT)
+            # Keep draining stdout so Terraform cannot block on a full pipe
+            await asyncio.wait_for(process.communicate(), STOP_TIMEOUT_SECONDS)
+        except (ProcessLookupError, asyncio.TimeoutError):
+            pass
+        finally:
+            if process.returncode is None:
+                process.kill()
+                await process.wait()
+
     async def _stream_process_output(
         self,
         process: asyncio.subprocess.Process
     ) -> AsyncGenerator[str, None]:
-        """Stream output from a subprocess"""
+        """
+        Stream output from a subprocess line by line
+
+        Output is read in large chunks and each batch of complete lines is
+        decoded at once, which also avoids the StreamReader line-length limit.
+        """
         if process.stdout:
-            async for line in process.stdout:
-                yield line.decode().strip()
+            remainder = b""
+            while True:
+                chunk = await process.stdout.read(OUTPUT_CHUNK_SIZE)
+                if not chunk:
+                    break
+
+                data = remainder + chunk
+                cut = data.rfind(b"\n")
+                if cut < 0:
+                    remainder = data
+                    continue
+
+                remainder = data[cut + 1:]
+                for line in data[:cut].decode("utf-8", errors="replace").split("\n"):
+                    yield line.strip()
+
+            if remainder:
+                yield remainder.decode("utf-8", errors="replace").strip()
 
         await process.wait()
 
@@ -159,5 +418,9 @@ def get_terraform_service() -> TerraformService:
     """Get or create the Terraform service singleton"""
     global _terraform_service
     if _terraform_service is None:
-        _terraform_service = TerraformService()
+        _terraform_service = TerraformService(
+            plan_reuse=os.getenv("TERRAFORM_PLAN_REUSE", "true").lower() == "true",
+            max_targets=int(os.getenv("TERRAFORM_MAX_TARGETS", "10")),
+            plugin_cache_dir=os.getenv("TF_PLUGIN_CACHE_DIR")
+        )
     return _terraform_service
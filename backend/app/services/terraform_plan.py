@@ -0,0 +1,285 @@
+"""Workspace fingerprints for reusing Terraform plans"""
+import re
+import json
+import hashlib
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from .terraform_state import read_state_header
+
+# Per-workspace record of the last plan and apply
+MANIFEST_FILE = ".vibe-plan.json"
+PLAN_FILE = "tfplan"
+
+# Files whose content determines the plan
+CONFIG_SUFFIXES = (".tf", ".tf.json", ".tfvars", ".tfvars.json")
+
+HEREDOC_PATTERN = re.compile(r'<<-?\s*"?([A-Za-z_][A-Za-z0-9_]*)"?[ \t]*\n')
+REFERENCE_PATTERN = re.compile(r"\b((?:data\.)?[a-z][\w-]*\.[\w-]+)\b")
+
+
+@dataclass
+class PlanDecision:
+    """How a deployment should plan and apply its workspace"""
+    action: str                           # "full", "targeted", "reuse" or "skip"
+    fingerprint: str
+    targets: List[str] = field(default_factory=list)
+    reason: str = ""
+
+
+def config_files(workspace: Path) -> List[Path]:
+    """Terraform configuration files of a workspace, sorted by name"""
+    return sorted(
+        path for path in workspace.iterdir()
+        if path.is_file() and path.name.endswith(CONFIG_SUFFIXES)
+    )
+
+
+def split_blocks(text: str) -> Dict[str, str]:
+    """
+    Split HCL into top-level blocks
+
+    Returns:
+        Block key (e.g. "resource.google_storage_bucket.assets",
+        "variable.region") -> normalized block text. Blocks without labels
+        (locals, terraform) and repeated headers (aliased providers) are keyed
+        by their position as well, e.g. "locals#2". Strings, comments and
+        heredocs are skipped while matching braces.
+    """
+    blocks = {}
+    index = 0
+    depth = 0
+    start = 0
+    i = 0
+    length = len(text)
+
+    while i < length:
+        char = text[i]
+        if char == '"':
+            i += 1
+            while i < length and text[i] != '"':
+                i += 2 if text[i] == "\\" else 1
+        elif char == "#" or text.startswith("//", i):
+            i = text.find("\n", i)
+            if i < 0:
+                break
+            if depth == 0:
+                start = i + 1
+        elif text.startswith("/*", i):
+            i = text.find("*/", i)
+            if i < 0:
+                break
+            i += 1
+            if depth == 0:
+                start = i + 1
+        elif text.startswith("<<", i) and HEREDOC_PATTERN.match(text, i):
+            heredoc = HEREDOC_PATTERN.match(text, i)
+            end = re.compile(rf"^\s*{heredoc.group(1)}\s*$", re.MULTILINE).search(text, heredoc.end())
+            i = end.end() if end else length
+            continue
+        elif char == "{":
+            depth += 1
+        elif char == "}":
+            depth -= 1
+            if depth == 0:
+                block = text[start:i + 1].strip()
+                key = _block_key(block)
+                if "." not in key or key in blocks:
+                    key = f"{key}#{index}"
+                blocks[key] = " ".join(block.split())
+                index += 1
+                start = i + 1
+        i += 1
+
+    return blocks
+
+
+def _block_key(block: str) -> str:
+    header = block.split("{", 1)[0]
+    labels = [part.strip('"') for part in header.split()]
+    return ".".join(labels)
+
+
+def block_address(key: str) -> Optional[str]:
+    """Resource address of a resource or data block key, None for other blocks"""
+    if "#" in key:
+        return None
+    kind, _, rest = key.partition(".")
+    if kind == "resource" and rest.count(".") == 1:
+        return rest
+    if kind == "data" and rest.count(".") == 1:
+        return f"data.{rest}"
+    return None
+
+
+def fingerprint_workspace(workspace: Path) -> Tuple[str, Dict[str, Dict[str, str]], Optional[int]]:
+    """
+    Fingerprint the configuration and state of a workspace
+
+    Returns:
+        Fingerprint, per-file block hashes and the state serial
+    """
+    digest = hashlib.sha256()
+    files = {}
+
+    for path in config_files(workspace):
+        content = path.read_bytes()
+        digest.update(path.name.encode() + b"\0" + hashlib.sha256(content).digest())
+        if path.name.endswith(".tf"):
+            files[path.name] = {
+                key: hashlib.sha256(block.encode()).hexdigest()
+                for key, block in split_blocks(content.decode("utf-8", errors="replace")).items()
+            }
+        else:
+            # Variables and JSON configuration can affect any resource
+            files[path.name] = {"*": hashlib.sha256(content).hexdigest()}
+
+    serial, lineage = read_state_header(workspace / "terraform.tfstate")
+    digest.update(f"\0state:{lineage}:{serial}".encode())
+    return digest.hexdigest(), files, serial
+
+
+def changed_addresses(
+    previous: Dict[str, Dict[str, str]],
+    current: Dict[str, Dict[str, str]],
+    workspace: Path
+) -> Optional[Set[str]]:
+    """
+    Resource addresses affected by a configuration change
+
+    Returns:
+        Changed, added and removed resources plus the resources that reference
+        them, or None when a non-resource block (variable, provider, module,
+        locals, ...) changed and only a full plan is safe
+    """
+    # Keyed by file as well: locals or provider blocks in different files
+    # share a header but are separate blocks
+    def flatten(files: Dict[str, Dict[str, str]]) -> Dict[Tuple[str, str], str]:
+        return {
+            (name, key): block_hash
+            for name, blocks in files.items()
+            for key, block_hash in blocks.items()
+        }
+
+    before, after = flatten(previous), flatten(current)
+    changed = set()
+    for name, key in before.keys() | after.keys():
+        if before.get((name, key)) == after.get((name, key)):
+            continue
+        address = block_address(key)
+        if address is None:
+            return None
+        changed.add(address)
+
+    # Dependents are not included by -target; follow references in the new config
+    references: Dict[str, Set[str]] = {}
+    for path in config_files(workspace):
+        if not path.name.endswith(".tf"):
+            continue
+        for key, block in split_blocks(path.read_text(encoding="utf-8", errors="replace")).items():
+            address = block_address(key)
+            if address is not None:
+                references[address] = set(REFERENCE_PATTERN.findall(block))
+
+    pending = list(changed)
+    while pending:
+        target = pending.pop()
+        for address, referenced in references.items():
+            if address not in changed and target in referenced:
+                changed.add(address)
+                pending.append(address)
+
+    return changed
+
+
+def load_manifest(workspace: Path) -> Dict[str, Any]:
+    """Last plan/apply record of a workspace (empty if none)"""
+    path = workspace / MANIFEST_FILE
+    if not path.exists():
+        return {}
+    try:
+        return json.loads(path.read_text())
+    except ValueError:
+        return {}
+
+
+def save_manifest(workspace: Path, manifest: Dict[str, Any]) -> None:
+    """Replace the plan/apply record of a workspace"""
+    path = workspace / MANIFEST_FILE
+    temp_path = path.with_suffix(".tmp")
+    temp_path.write_text(json.dumps(manifest))
+    temp_path.replace(path)
+
+
+def decide_plan(workspace: Path, max_targets: int = 10) -> PlanDecision:
+    """
+    Decide whether a workspace needs a full plan, a targeted plan, can reuse
+    its saved plan, or has nothing to do
+
+    Args:
+        workspace: Deployment workspace
+        max_targets: Largest number of affected resources planned with -target
+
+    Returns:
+        Plan decision with the current fingerprint
+    """
+    fingerprint, files, serial = fingerprint_workspace(workspace)
+    manifest = load_manifest(workspace)
+
+    if manifest.get("applied_fingerprint") == fingerprint:
+        return PlanDecision("skip", fingerprint, reason="configuration and state unchanged since the last apply")
+
+    if manifest.get("plan_fingerprint") == fingerprint and (workspace / PLAN_FILE).exists():
+        return PlanDecision(
+            "reuse",
+            fingerprint,
+            targets=manifest.get("plan_targets", []),
+            reason="saved plan matches the configuration and state"
+        )
+
+    applied_files = manifest.get("applied_files")
+    # Targeting only helps when the state is the one the last apply produced
+    if applied_files and manifest.get("applied_serial") == serial:
+        targets = changed_addresses(applied_files, files, workspace)
+        if targets and len(targets) <= max_targets:
+            return PlanDecision(
+                "targeted",
+                fingerprint,
+                targets=sorted(targets),
+                reason=f"{len(targets)} resource(s) changed since the last apply"
+            )
+
+    return PlanDecision("full", fingerprint)
+
+
+def record_plan(workspace: Path, decision: Optional[PlanDecision]) -> None:
+    """Remember the fingerprint the saved plan was created for"""
+    manifest = load_manifest(workspace)
+    manifest["plan_fingerprint"] = decision.fingerprint if decision else None
+    manifest["plan_targets"] = decision.targets if decision else []
+    save_manifest(workspace, manifest)
+
+
+def record_apply(workspace: Path) -> None:
+    """Remember the configuration and resulting state of a successful apply"""
+    # Fingerprint again: the apply changed the state serial
+    fingerprint, files, serial = fingerprint_workspace(workspace)
+    manifest = load_manifest(workspace)
+    manifest.update(
+        applied_fingerprint=fingerprint,
+        applied_files=files,
+        applied_serial=serial,
+        plan_fingerprint=None,    # a saved plan can only be applied once
+        plan_targets=[]
+    )
+    save_manifest(workspace, manifest)
+
+
+def discard_plan(workspace: Path) -> None:
+    """Delete the saved plan after a failed plan or apply so it is never reused"""
+    (workspace / PLAN_FILE).unlink(missing_ok=True)
+    manifest = load_manifest(workspace)
+    if manifest.get("plan_fingerprint") is not None:
+        manifest.update(plan_fingerprint=None, plan_targets=[])
+        save_manifest(workspace, manifest)
@@ -0,0 +1,400 @@
+"""Pre-flight validation of generated Terraform against the provider schema"""
+import os
+import re
+import json
+import asyncio
+import logging
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Set
+
+from .hcl_parser import HCLBlock, HCLSyntaxError, parse_hcl
+from .terraform import TerraformService, get_terraform_service
+from .terraform_workspace import atomic_write
+from ..utils import start_span, set_span_attributes
+
+logger = logging.getLogger(__name__)
+
+LOCK_PROVIDER_PATTERN = re.compile(
+    r'provider\s+"([^"]+)"\s*\{[^}]*?version\s*=\s*"([^"]+)"', re.DOTALL
+)
+
+# Arguments and blocks Terraform accepts on every resource / data source
+META_ARGUMENTS = {"count", "for_each", "depends_on", "provider"}
+META_BLOCKS = {"lifecycle", "provisioner", "connection"}
+
+
+@dataclass
+class PreflightResult:
+    """Outcome of a pre-flight check"""
+    errors: List[str] = field(default_factory=list)
+    warnings: List[str] = field(default_factory=list)
+    schema_checked: bool = False
+    # File each error is about, in the same order as errors
+    error_files: List[str] = field(default_factory=list)
+
+    @property
+    def ok(self) -> bool:
+        return not self.errors
+
+    @property
+    def failing_files(self) -> Set[str]:
+        return set(self.error_files)
+
+    def add_error(self, filename: str, message: str) -> None:
+        self.errors.append(message)
+        self.error_files.append(filename)
+
+
+def _index_block(block: Dict[str, Any]) -> Dict[str, Any]:
+    """Keep only what the checks need from a provider schema block"""
+    attributes = {}
+    for name, attribute in block.get("attributes", {}).items():
+        entry = {"type": attribute.get("type", "dynamic")}
+        if attribute.get("required"):
+            entry["required"] = True
+        elif attribute.get("computed") and not attribute.get("optional"):
+            entry["read_only"] = True
+        attributes[name] = entry
+
+    blocks = {}
+    for name, nested in block.get("block_types", {}).items():
+        blocks[name] = {
+            "min": nested.get("min_items", 0),
+            "max": nested.get("max_items", 0) if nested.get("nesting_mode") not in ("single", "group") else 1,
+            "block": _index_block(nested.get("block", {}))
+        }
+
+    return {"attributes": attributes, "blocks": blocks}
+
+
+class ProviderSchema:
+    """
+    Index of resource and data source schemas
+
+    Built once from `terraform providers schema -json` and kept in a compact
+    JSON file, so checks do not need Terraform or network access.
+    """
+
+    def __init__(
+        self,
+        resources: Dict[str, Dict[str, Any]],
+        data_sources: Dict[str, Dict[str, Any]],
+        versions: Dict[str, str]
+    ):
+        self.resources = resources
+        self.data_sources = data_sources
+        self.versions = versions
+        # Type prefixes covered by the schema (e.g. "google")
+        self.prefixes: Set[str] = {
+            name.split("_", 1)[0] for name in list(resources) + list(data_sources)
+        }
+
+    @classmethod
+    def from_terraform(cls, raw: Dict[str, Any], versions: Dict[str, str]) -> "ProviderSchema":
+        """Index the output of `terraform providers schema -json`"""
+        resources: Dict[str, Dict[str, Any]] = {}
+        data_sources: Dict[str, Dict[str, Any]] = {}
+        # Sorted so google-beta (a superset) wins over google for shared types
+        for _, provider in sorted(raw.get("provider_schemas", {}).items()):
+            for name, schema in provider.get("resource_schemas", {}).items():
+                resources[name] = _index_block(schema.get("block", {}))
+            for name, schema in provider.get("data_source_schemas", {}).items():
+                data_sources[name] = _index_block(schema.get("block", {}))
+        return cls(resources, data_sources, versions)
+
+    @classmethod
+    def load(cls, path: Path) -> Optional["ProviderSchema"]:
+        if not path.exists():
+            return None
+        with open(path) as f:
+            data = json.load(f)
+        return cls(data["resources"], data["data_sources"], data.get("versions", {}))
+
+    def save(self, path: Path) -> None:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        atomic_write(path, json.dumps({
+            "versions": self.versions,
+            "resources": self.resources,
+            "data_sources": self.data_sources
+        }).encode("utf-8"))
+
+    def check(self, block: HCLBlock, filename: str) -> List[str]:
+        """Schema errors of a resource or data block (empty for other blocks)"""
+        if block.type not in ("resource", "data") or len(block.labels) != 2:
+            return []
+
+        resource_type, name = block.labels
+        schemas = self.resources if block.type == "resource" else self.data_sources
+        address = f"{resource_type}.{name}" if block.type == "resource" else f"data.{resource_type}.{name}"
+
+        schema = schemas.get(resource_type)
+        if schema is None:
+            if resource_type.split("_", 1)[0] in self.prefixes:
+                kind = "resource type" if block.type == "resource" else "data source"
+                return [f"{filename}:{block.line}: {address}: unknown {kind} {resource_type!r}"]
+            return []  # provider not in the cached schema
+
+        errors: List[str] = []
+        self._check_body(block, schema, f"{filename}:{block.line}: {address}", errors, top_level=True)
+        return errors
+
+    def _check_body(
+        self,
+        block: HCLBlock,
+        schema: Dict[str, Any],
+        where: str,
+        errors: List[str],
+        top_level: bool = False
+    ) -> None:
+        attributes, blocks = schema["attributes"], schema["blocks"]
+
+        for name, attribute in block.attributes.items():
+            if top_level and name in META_ARGUMENTS:
+                continue
+            if name not in attributes:
+                if name in blocks:
+                    errors.append(f"{where}: {name!r} is a block, write it as {name} {{ ... }}")
+                else:
+                    errors.append(f"{where}: unsupported argument {name!r}")
+                continue
+            if attributes[name].get("read_only"):
+                errors.append(f"{where}: {name!r} is read-only and cannot be set")
+                continue
+            problem = _type_mismatch(attribute.kind, attribute.value, attributes[name]["type"])
+            if problem:
+                errors.append(f"{where}: {name!r} {problem}")
+
+        present: Dict[str, int] = {}
+        dynamic: Set[str] = set()
+        for nested in block.blocks:
+            if nested.type == "dynamic" and nested.labels:
+                dynamic.add(nested.labels[0])
+                name = nested.labels[0]
+            else:
+                name = nested.type
+            present[name] = present.get(name, 0) + 1
+
+            if top_level and name in META_BLOCKS:
+                continue
+            if name not in blocks:
+                # Attributes of object lists may also be written as blocks
+                attribute_type = attributes.get(name, {}).get("type")
+                if not (isinstance(attribute_type, list) and attribute_type[0] in ("list", "set")):
+                    errors.append(f"{where}: unsupported block {name!r}")
+                continue
+            if nested.type != "dynamic":
+                self._check_body(nested, blocks[name]["block"], f"{where}.{name}", errors)
+
+        for name, attribute in attributes.items():
+            if attribute.get("required") and name not in block.attributes:
+                errors.append(f"{where}: missing required argument {name!r}")
+        for name, nested in blocks.items():
+            if name in dynamic:
+                continue
+            count = present.get(name, 0)
+            if count < nested["min"]:
+                errors.append(f"{where}: missing required block {name!r}")
+            elif nested["max"] and count > nested["max"]:
+                errors.append(f"{where}: at most {nested['max']} {name!r} block(s) allowed, found {count}")
+
+
+def _type_mismatch(kind: Optional[str], value: Any, expected: Any) -> Optional[str]:
+    """Why a literal cannot be converted to a schema type (None if it can)"""
+    if kind is None or kind == "null" or expected == "dynamic":
+        return None
+    base = expected[0] if isinstance(expected, list) else expected
+
+    if base == "string":
+        return None if kind in ("string", "number", "bool") else f"must be a string, not a {kind}"
+    if base == "number":
+        if kind == "number" or (kind == "string" and value is not None and _is_number(value)):
+            return None
+        return f"must be a number, not {value!r}" if kind == "string" else f"must be a number, not a {kind}"
+    if base == "bool":
+        if kind == "bool" or (kind == "string" and value in ("true", "false")):
+            return None
+        return f"must be true or false, not {value!r}" if kind == "string" else f"must be a bool, not a {kind}"
+    if base in ("list", "set", "tuple"):
+        return None if kind == "list" else f"must be a list, not a {kind}"
+    if base in ("map", "object"):
+        return None if kind == "object" else f"must be a map, not a {kind}"
+    return None
+
+
+def _is_number(value: str) -> bool:
+    try:
+        float(value)
+        return True
+    except ValueError:
+        return False
+
+
+def locked_provider_versions(workspace: Path) -> Dict[str, str]:
+    """Provider versions pinned in a workspace's .terraform.lock.hcl"""
+    lock_path = workspace / ".terraform.lock.hcl"
+    if not lock_path.exists():
+        return {}
+    return dict(LOCK_PROVIDER_PATTERN.findall(lock_path.read_text()))
+
+
+class TerraformPreflightService:
+    """Parses generated Terraform and checks it against the cached provider schema"""
+
+    def __init__(
+        self,
+        schema_path: str = "./data/provider_schema.json",
+        schema_timeout: float = 120.0,
+        terraform_service: Optional[TerraformService] = None
+    ):
+        self.schema_path = Path(schema_path)
+        self.schema_timeout = schema_timeout
+        self._schema: Optional[ProviderSchema] = None
+        self._schema_loaded = False
+        self._load_lock = asyncio.Lock()
+        # Runs Terraform with the same plugin cache as deployments
+        self.terraform_service = terraform_service or get_terraform_service()
+        self._refresh_task: Optional[asyncio.Task] = None
+        self._attempted_versions: Optional[Dict[str, str]] = None
+
+    async def get_schema(self) -> Optional[ProviderSchema]:
+        """The cached provider schema, loaded from disk on first use"""
+        if not self._schema_loaded:
+            async with self._load_lock:
+                if not self._schema_loaded:
+                    try:
+                        self._schema = await asyncio.to_thread(ProviderSchema.load, self.schema_path)
+                    except (OSError, ValueError, KeyError) as e:
+                        logger.warning("Ignoring unreadable provider schema cache %s: %s", self.schema_path, e)
+                    self._schema_loaded = True
+        return self._schema
+
+    async def check_files(self, files: Dict[str, str]) -> PreflightResult:
+        """
+        Parse Terraform files and check resources against the provider schema
+
+        Args:
+            files: Dictionary of filename -> content
+
+        Returns:
+            Errors found; schema checks are skipped until a schema is cached
+        """
+        schema = await self.get_schema()
+        with start_span("iac.preflight.check_files", {"terraform.file_count": len(files)}) as span:
+            result = await asyncio.to_thread(self._check_files, files, schema)
+            set_span_attributes(span, {
+                "preflight.errors": len(result.errors),
+                "preflight.schema_checked": result.schema_checked
+            })
+        return result
+
+    def _check_files(self, files: Dict[str, str], schema: Optional[ProviderSchema]) -> PreflightResult:
+        result = PreflightResult(schema_checked=schema is not None)
+        for filename, content in sorted(files.items()):
+            if filename.endswith(".tf.json"):
+                try:
+                    json.loads(content)
+                except ValueError as e:
+                    result.add_error(filename, f"{filename}: invalid JSON: {e}")
+                continue
+            if not filename.endswith(".tf"):
+                continue
+
+            try:
+                blocks = parse_hcl(content)
+            except HCLSyntaxError as e:
+                result.add_error(filename, f"{filename}:{e.line}: {e.message}")
+                continue
+
+            if schema is not None:
+                for block in blocks:
+                    for error in schema.check(block, filename):
+                        result.add_error(filename, error)
+        return result
+
+    def ensure_schema(self, workspace: Path) -> Optional[asyncio.Task]:
+        """
+        Refresh the schema cache in the background from an initialized workspace
+
+        Runs only when there is no cache yet or the workspace pins provider
+        versions other than the cached ones.
+
+        Returns:
+            The refresh task (kept until it finishes), None if the workspace
+            does not exist or a refresh is already running
+        """
+        if self._refresh_task is not None and not self._refresh_task.done():
+            return None
+        if not workspace.is_dir():
+            return None
+        self._refresh_task = asyncio.ensure_future(self._refresh(workspace))
+        self._refresh_task.add_done_callback(self._refresh_done)
+        return self._refresh_task
+
+    @staticmethod
+    def _refresh_done(task: asyncio.Task) -> None:
+        if not task.cancelled() and task.exception() is not None:
+            logger.warning("Refreshing the provider schema failed: %s", task.exception())
+
+    async def _refresh(self, workspace: Path) -> None:
+        versions = await asyncio.to_thread(locked_provider_versions, workspace)
+        schema = await self.get_schema()
+        if schema is not None and (not versions or versions == schema.versions):
+            return
+        # Do not retry a failed extraction until the pinned versions change
+        if versions == self._attempted_versions:
+            return
+        self._attempted_versions = versions
+
+        with start_span("terraform.providers_schema", {"deployment.id": workspace.name}) as span:
+            process = None
+            try:
+                process = await asyncio.create_subprocess_exec(
+                    "terraform", "providers", "schema", "-json",
+                    cwd=str(workspace),
+                    env=self.terraform_service._env(),
+                    stdout=asyncio.subprocess.PIPE,
+                    stderr=asyncio.subprocess.DEVNULL
+                )
+                stdout, _ = await asyncio.wait_for(process.communicate(), self.schema_timeout)
+            except (OSError, asyncio.TimeoutError) as e:
+                logger.warning(
+                    "Could not read the provider schema: %s",
+                    str(e) or f"timed out after {self.schema_timeout}s"
+                )
+                if process is not None and process.returncode is None:
+                    process.kill()
+                    await process.wait()
+                return
+
+            set_span_attributes(span, {"terraform.exit_code": process.returncode})
+            if process.returncode != 0:
+                logger.warning("terraform providers schema exited with %s", process.returncode)
+                return
+
+            def index_and_save() -> ProviderSchema:
+                indexed = ProviderSchema.from_terraform(json.loads(stdout), versions)
+                indexed.save(self.schema_path)
+                return indexed
+
+            try:
+                self._schema = await asyncio.to_thread(index_and_save)
+            except (OSError, ValueError) as e:
+                logger.warning("Could not cache the provider schema: %s", e)
+                return
+            set_span_attributes(span, {"terraform.schema_resources": len(self._schema.resources)})
+
+
+# Singleton instance
+_terraform_preflight_service: Optional[TerraformPreflightService] = None
+
+
+def get_terraform_preflight_service() -> TerraformPreflightService:
+    """Get or create the Terraform pre-flight service singleton"""
+    global _terraform_preflight_service
+    if _terraform_preflight_service is None:
+        _terraform_preflight_service = TerraformPreflightService(
+            schema_path=os.getenv("TERRAFORM_SCHEMA_CACHE", "./data/provider_schema.json"),
+            schema_timeout=float(os.getenv("TERRAFORM_SCHEMA_TIMEOUT_SECONDS", "120"))
+        )
+    return _terraform_preflight_service
@@ -0,0 +1,374 @@
+"""Incremental reader for Terraform state files"""
+import json
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Set, TextIO, Tuple
+
+# Characters read per chunk; resources are decoded one at a time, so memory
+# stays proportional to the largest resource rather than the whole state
+STATE_CHUNK_SIZE = 64 * 1024
+
+# Terraform resource types that appear as services on the dashboard
+SERVICE_TYPES = {
+    "google_cloud_run_service": "cloud-run",
+    "google_cloud_run_v2_service": "cloud-run",
+    "google_compute_instance": "compute-engine",
+    "google_sql_database_instance": "cloud-sql",
+    "google_storage_bucket": "cloud-storage",
+    "google_cloudfunctions_function": "cloud-functions",
+    "google_cloudfunctions2_function": "cloud-functions",
+    "google_redis_instance": "memorystore",
+    "google_container_cluster": "gke",
+    "google_compute_url_map": "cloud-load-balancer",
+    "google_compute_network": "vpc",
+    "google_firestore_database": "firestore",
+    "google_cloud_tasks_queue": "cloud-tasks",
+    "google_cloud_scheduler_job": "cloud-scheduler"
+}
+
+# Service types that hold data; edges into them are data connections
+DATA_SERVICES = {"cloud-sql", "cloud-storage", "memorystore", "firestore"}
+
+
+@dataclass
+class StateResource:
+    """One resource instance from the state"""
+    address: str
+    type: str
+    name: str
+    mode: str
+    attributes: Dict[str, Any]
+    dependencies: List[str] = field(default_factory=list)
+    base_address: str = ""    # address without the count/for_each index
+
+
+@dataclass
+class TerraformState:
+    """Resources of a state indexed by address, plus its outputs"""
+    serial: Optional[int] = None
+    lineage: Optional[str] = None
+    outputs: Dict[str, Any] = field(default_factory=dict)
+    resources: Dict[str, StateResource] = field(default_factory=dict)
+
+
+class _ChunkedJSONReader:
+    """Decodes JSON values one at a time from a file read in chunks"""
+
+    def __init__(self, stream: TextIO, chunk_size: int = STATE_CHUNK_SIZE):
+        self.stream = stream
+        self.chunk_size = chunk_size
+        self.decoder = json.JSONDecoder()
+        self.buffer = ""
+        self.pos = 0
+        self.eof = False
+
+    def _fill(self, size: Optional[int] = None) -> bool:
+        data = self.stream.read(size or self.chunk_size)
+        if not data:
+            self.eof = True
+            return False
+        self.buffer = self.buffer[self.pos:] + data
+        self.pos = 0
+        return True
+
+    def peek(self) -> str:
+        """Next non-whitespace character, without consuming it ('' at EOF)"""
+        while True:
+            while self.pos < len(self.buffer) and self.buffer[self.pos] in " \t\r\n":
+                self.pos += 1
+            if self.pos < len(self.buffer) or not self._fill():
+                return self.buffer[self.pos:self.pos + 1]
+
+    def expect(self, char: str) -> None:
+        if self.peek() != char:
+            raise ValueError(f"Expected '{char}' in Terraform state at offset {self.pos}")
+        self.pos += 1
+
+    def skip(self, char: str) -> bool:
+        if self.peek() == char:
+            self.pos += 1
+            return True
+        return False
+
+    def value(self) -> Any:
+        """Decode the next complete JSON value, reading more input as needed"""
+        self.peek()
+        while True:
+            try:
+                value, end = self.decoder.raw_decode(self.buffer, self.pos)
+                # A number ending at the buffer edge may continue in the next chunk
+                if end < len(self.buffer) or self.eof:
+                    self.pos = end
+                    return value
+            except json.JSONDecodeError:
+                if self.eof:
+                    raise
+            # Grow geometrically so a huge value is not re-decoded per chunk
+            self._fill(max(self.chunk_size, len(self.buffer) - self.pos))
+
+
+def _iter_state(stream: TextIO) -> Iterator[Tuple[str, Any]]:
+    """Yield (key, value) for top-level fields and ('resource', item) per resource"""
+    reader = _ChunkedJSONReader(stream)
+    reader.expect("{")
+
+    while not reader.skip("}"):
+        key = reader.value()
+        reader.expect(":")
+
+        if key == "resources":
+            reader.expect("[")
+            while not reader.skip("]"):
+                yield "resource", reader.value()
+                reader.skip(",")
+        else:
+            yield key, reader.value()
+
+        reader.skip(",")
+
+
+def _resource_address(resource: Dict[str, Any], instance: Dict[str, Any]) -> Tuple[str, str]:
+    """Instance address and base address (without index) of a resource"""
+    base = f"{resource['type']}.{resource['name']}"
+    if resource.get("mode") == "data":
+        base = f"data.{base}"
+    if resource.get("module"):
+        base = f"{resource['module']}.{base}"
+
+    index = instance.get("index_key")
+    if isinstance(index, str):
+        return f'{base}["{index}"]', base
+    elif index is not None:
+        return f"{base}[{index}]", base
+    return base, base
+
+
+def parse_state_file(path: Path) -> Optional[TerraformState]:
+    """
+    Parse a terraform.tfstate file incrementally
+
+    Args:
+        path: Path to the state file
+
+    Returns:
+        Indexed state, or None if the file does not exist or is empty
+    """
+    if not path.exists() or path.stat().st_size == 0:
+        return None
+
+    state = TerraformState()
+    with open(path, encoding="utf-8") as f:
+        for key, value in _iter_state(f):
+            if key == "serial":
+                state.serial = value
+            elif key == "lineage":
+                state.lineage = value
+            elif key == "outputs":
+                state.outputs = value or {}
+            elif key == "resource":
+                for instance in value.get("instances", []):
+                    address, base_address = _resource_address(value, instance)
+                    state.resources[address] = StateResource(
+                        address=address,
+                        type=value["type"],
+                        name=value["name"],
+                        mode=value.get("mode", "managed"),
+                        attributes=instance.get("attributes") or {},
+                        dependencies=instance.get("dependencies") or [],
+                        base_address=base_address
+                    )
+
+    return state
+
+
+def read_state_header(path: Path) -> Tuple[Optional[int], Optional[str]]:
+    """
+    Serial and lineage of a state file, without decoding its resources
+
+    Returns:
+        (serial, lineage), both None if the file does not exist or is empty
+    """
+    serial = lineage = None
+    if not path.exists() or path.stat().st_size == 0:
+        return serial, lineage
+
+    with open(path, encoding="utf-8") as f:
+        # Terraform writes serial and lineage before outputs and resources
+        for key, value in _iter_state(f):
+            if key == "serial":
+                serial = value
+            elif key == "lineage":
+                lineage = value
+            if key in ("outputs", "resource") or (serial is not None and lineage is not None):
+                break
+
+    return serial, lineage
+
+
+def has_managed_resources(path: Path) -> bool:
+    """Whether a state file still tracks managed resources (stops at the first one)"""
+    if not path.exists() or path.stat().st_size == 0:
+        return False
+
+    with open(path, encoding="utf-8") as f:
+        for key, value in _iter_state(f):
+            if key == "resource" and value.get("mode", "managed") == "managed" and value.get("instances"):
+                return True
+    return False
+
+
+def _region(attributes: Dict[str, Any], default: str) -> str:
+    if attributes.get("region"):
+        return attributes["region"]
+    if attributes.get("zone"):
+        return attributes["zone"].rsplit("-", 1)[0]
+    if attributes.get("location"):
+        return str(attributes["location"]).lower()
+    return default
+
+
+def _configuration(service_type: str, attributes: Dict[str, Any]) -> Dict[str, Any]:
+    """Service configuration fields available in the state attributes"""
+    config = {}
+    if attributes.get("machine_type"):
+        config["instance_type"] = attributes["machine_type"].split("/")[-1]
+
+    settings = attributes.get("settings")
+    if isinstance(settings, list) and settings and settings[0].get("tier"):
+        config["tier"] = settings[0]["tier"]
+    elif attributes.get("tier"):
+        config["tier"] = attributes["tier"]
+
+    additional = {}
+    if attributes.get("memory_size_gb"):
+        additional["memory_size_gb"] = attributes["memory_size_gb"]
+    if service_type == "cloud-storage" and attributes.get("storage_class"):
+        additional["storage_class"] = attributes["storage_class"].lower()
+    if additional:
+        config["additional_config"] = additional
+    return config
+
+
+def build_services(
+    state: TerraformState,
+    project_id: str,
+    default_region: str,
+    labels: Dict[str, str]
+) -> List[Dict[str, Any]]:
+    """GCPService entries for the managed service resources in a state"""
+    services = []
+    for resource in state.resources.values():
+        service_type = SERVICE_TYPES.get(resource.type)
+        if resource.mode != "managed" or service_type is None:
+            continue
+
+        attributes = resource.attributes
+        services.append({
+            "id": resource.address,
+            "name": attributes.get("name") or resource.name,
+            "type": service_type,
+            "status": "running",
+            "region": _region(attributes, default_region),
+            "project_id": attributes.get("project") or project_id,
+            "description": f"{resource.type} {resource.address}",
+            "configuration": _configuration(service_type, attributes),
+            "health_status": "healthy",
+            "labels": {**(attributes.get("labels") or {}), **labels},
+            "resource_url": attributes.get("uri") or attributes.get("url") or attributes.get("self_link"),
+            "arn": attributes.get("id")
+        })
+    return services
+
+
+def build_connections(state: TerraformState) -> List[Dict[str, Any]]:
+    """
+    GCPConnection edges between service resources
+
+    Direct dependencies between services always become edges. Paths through
+    non-service resources (IAM members, service accounts, subnets, databases
+    inside an instance, ...) only connect a compute service to a data or
+    network service, so e.g. a Cloud Run service granted access to a bucket
+    is connected to it, but two services sharing a subnet are not.
+    """
+    services = {
+        address for address, resource in state.resources.items()
+        if resource.mode == "managed" and resource.type in SERVICE_TYPES
+    }
+
+    # Dependencies name base addresses; map them to every instance
+    instances: Dict[str, List[str]] = {}
+    for address, resource in state.resources.items():
+        instances.setdefault(resource.base_address, []).append(address)
+
+    # Undirected adjacency: IAM members depend on both ends of a grant
+    neighbours: Dict[str, Set[str]] = {address: set() for address in state.resources}
+    depends_on: Set[Tuple[str, str]] = set()
+    for address, resource in state.resources.items():
+        for dependency in resource.dependencies:
+            for target in instances.get(dependency, [dependency] if dependency in neighbours else []):
+                neighbours[address].add(target)
+                neighbours[target].add(address)
+                depends_on.add((address, target))
+
+    stateful = DATA_SERVICES | {"vpc"}
+    connections = []
+    seen: Set[Tuple[str, str]] = set()
+
+    for source in sorted(services):
+        source_stateful = SERVICE_TYPES[state.resources[source].type] in stateful
+        stack = [(neighbour, False) for neighbour in neighbours[source]]
+        visited = {source}
+
+        # Walk through non-service resources until services are reached
+        while stack:
+            address, via_iam = stack.pop()
+            if address in visited:
+                continue
+            visited.add(address)
+            via_iam = via_iam or "_iam_" in state.resources[address].type
+
+            if address not in services:
+                stack.extend((neighbour, via_iam) for neighbour in neighbours[address])
+                continue
+
+            pair = tuple(sorted((source, address)))
+            target_stateful = SERVICE_TYPES[state.resources[address].type] in stateful
+            if (source, address) in depends_on:
+                edge = (source, address)
+            elif (address, source) in depends_on:
+                edge = (address, source)
+            elif source_stateful != target_stateful:
+                # Indirect edges point from compute towards data and networks
+                edge = (address, source) if source_stateful else (source, address)
+            else:
+                continue
+
+            if pair in seen:
+                continue
+            seen.add(pair)
+            connections.append(_connection(state, *edge, via_iam))
+
+    return connections
+
+
+def _connection(state: TerraformState, source: str, target: str, via_iam: bool) -> Dict[str, Any]:
+    """Connection from the dependent service to the one it uses"""
+    source_type = SERVICE_TYPES[state.resources[source].type]
+    target_type = SERVICE_TYPES[state.resources[target].type]
+
+    if via_iam:
+        connection_type = "iam"
+    elif target_type == "vpc":
+        connection_type = "network"
+    elif target_type in DATA_SERVICES:
+        connection_type = "data"
+    else:
+        connection_type = "api"
+
+    return {
+        "id": f"{source}->{target}",
+        "source": source,
+        "target": target,
+        "connection_type": connection_type,
+        "description": f"{source_type} to {target_type}"
+    }
@@ -0,0 +1,107 @@
+"""Atomic, content-addressed materialization of Terraform workspaces"""
+import os
+import secrets
+import hashlib
+import tempfile
+from pathlib import Path
+from typing import Dict
+
+
+def atomic_write(path: Path, data: bytes, mode: int = 0o644) -> None:
+    """Write a file via a temp file and rename, so readers never see a partial file"""
+    fd, temp_name = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.chmod(temp_name, mode)
+        os.replace(temp_name, path)
+    except BaseException:
+        try:
+            os.unlink(temp_name)
+        except FileNotFoundError:
+            pass
+        raise
+
+
+class BlobStore:
+    """
+    Content-addressed file store
+
+    Blobs live at <root>/<sha256[:2]>/<sha256> and are read-only, so
+    workspaces can hardlink them: identical files across deployments share
+    one inode and are never rewritten.
+    """
+
+    def __init__(self, root: Path):
+        self.root = root
+        self.root.mkdir(parents=True, exist_ok=True)
+
+    def path(self, digest: str) -> Path:
+        return self.root / digest[:2] / digest
+
+    def put(self, data: bytes) -> Path:
+        """Store data (if not already stored) and return its blob path"""
+        path = self.path(hashlib.sha256(data).hexdigest())
+        if not path.exists():
+            path.parent.mkdir(exist_ok=True)
+            atomic_write(path, data, mode=0o444)
+        return path
+
+    def collect_garbage(self) -> int:
+        """Delete blobs no workspace links to any more; returns the number deleted"""
+        removed = 0
+        for path in self.root.glob("*/*"):
+            try:
+                if path.stat().st_nlink == 1:
+                    path.unlink()
+                    removed += 1
+            except FileNotFoundError:
+                continue
+        return removed
+
+
+def materialize_files(workspace: Path, files: Dict[str, str], blobs: BlobStore) -> Dict[str, int]:
+    """
+    Make the workspace contain the given files
+
+    Each file is hardlinked from the blob store with an atomic rename and is
+    left untouched when it already has the same content. Files are copied
+    instead when hardlinks are not possible (e.g. another filesystem).
+
+    Args:
+        workspace: Deployment workspace directory
+        files: Filename -> content
+        blobs: Blob store shared by all workspaces
+
+    Returns:
+        Counts of "written" and "unchanged" files
+    """
+    counts = {"written": 0, "unchanged": 0}
+
+    for filename, content in files.items():
+        # File names come from the model; keep them inside the workspace
+        if not filename or Path(filename).name != filename or filename.startswith("."):
+            raise ValueError(f"Invalid Terraform file name: {filename!r}")
+
+        data = content.encode("utf-8")
+        blob = blobs.put(data)
+        target = workspace / filename
+
+        if target.exists() and (
+            os.path.samefile(target, blob) or target.read_bytes() == data
+        ):
+            counts["unchanged"] += 1
+            continue
+
+        temp_path = workspace / f".{filename}.{secrets.token_hex(4)}.link"
+        try:
+            os.link(blob, temp_path)
+            os.replace(temp_path, target)
+        except OSError:
+            temp_path.unlink(missing_ok=True)
+            atomic_write(target, data)
+        counts["written"] += 1
+
+    return counts
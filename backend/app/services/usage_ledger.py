@@ -0,0 +1,179 @@
+"""Local ledger of LLM usage per prompt template and session"""
+import os
+import asyncio
+import sqlite3
+import threading
+import logging
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS llm_calls (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    created_at TEXT NOT NULL,
+    day TEXT NOT NULL,
+    session_id TEXT,
+    template TEXT,
+    model TEXT NOT NULL,
+    outcome TEXT NOT NULL,
+    input_tokens INTEGER,
+    output_tokens INTEGER,
+    prompt_chars INTEGER NOT NULL,
+    response_chars INTEGER NOT NULL,
+    latency_ms REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_llm_calls_session ON llm_calls (session_id);
+CREATE INDEX IF NOT EXISTS idx_llm_calls_template ON llm_calls (template, day);
+CREATE INDEX IF NOT EXISTS idx_llm_calls_day ON llm_calls (day);
+"""
+
+# Allowed aggregation keys -> column
+GROUP_BY_COLUMNS = {
+    "session": "session_id",
+    "template": "template",
+    "day": "day",
+    "model": "model"
+}
+
+
+class UsageLedger:
+    """SQLite-backed ledger of per-call LLM usage"""
+
+    def __init__(self, db_path: str = "./data/llm_usage.db"):
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.db_path), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(SCHEMA)
+
+    async def record(
+        self,
+        model: str,
+        outcome: str,
+        latency: float,
+        prompt_chars: int,
+        response_chars: int = 0,
+        input_tokens: Optional[int] = None,
+        output_tokens: Optional[int] = None,
+        template: Optional[str] = None,
+        session_id: Optional[str] = None
+    ) -> None:
+        """
+        Record a single LLM call
+
+        Failures are logged and swallowed so the ledger never fails a request.
+        """
+        now = datetime.now(timezone.utc)
+        row = (
+            now.isoformat(), now.date().isoformat(), session_id, template, model,
+            outcome, input_tokens, output_tokens, prompt_chars, response_chars,
+            round(latency * 1000, 2)
+        )
+
+        try:
+            await asyncio.to_thread(self._insert, row)
+        except Exception as e:
+            logger.warning("Failed to record LLM usage: %s", e)
+
+    def _insert(self, row: tuple) -> None:
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO llm_calls (created_at, day, session_id, template, model, "
+                "outcome, input_tokens, output_tokens, prompt_chars, response_chars, "
+                "latency_ms) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                row
+            )
+            self._conn.commit()
+
+    async def aggregate(
+        self,
+        group_by: str = "template",
+        session_id: Optional[str] = None,
+        template: Optional[str] = None,
+        since: Optional[str] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Aggregate usage by session, template, day or model
+
+        Args:
+            group_by: One of 'session', 'template', 'day', 'model'
+            session_id: Only include calls from this session
+            template: Only include calls for this prompt template
+            since: Only include calls on or after this day (YYYY-MM-DD)
+
+        Returns:
+            One row per group with call counts, tokens, latency and prompt sizes
+        """
+        if group_by not in GROUP_BY_COLUMNS:
+            raise ValueError(
+                f"group_by must be one of {', '.join(GROUP_BY_COLUMNS)}"
+            )
+
+        return await asyncio.to_thread(
+            self._aggregate, GROUP_BY_COLUMNS[group_by], session_id, template, since
+        )
+
+    def _aggregate(
+        self,
+        column: str,
+        session_id: Optional[str],
+        template: Optional[str],
+        since: Optional[str]
+    ) -> List[Dict[str, Any]]:
+        filters, params = [], []
+        if session_id:
+            filters.append("session_id = ?")
+            params.append(session_id)
+        if template:
+            filters.append("template = ?")
+            params.append(template)
+        if since:
+            filters.append("day >= ?")
+            params.append(since)
+        where = f"WHERE {' AND '.join(filters)}" if filters else ""
+
+        query = f"""
+            SELECT {column} AS key,
+                   COUNT(*) AS calls,
+                   SUM(outcome = 'error') AS errors,
+                   COALESCE(SUM(input_tokens), 0) AS input_tokens,
+                   COALESCE(SUM(output_tokens), 0) AS output_tokens,
+                   AVG(latency_ms) AS avg_latency_ms,
+                   MAX(latency_ms) AS max_latency_ms,
+                   AVG(prompt_chars) AS avg_prompt_chars,
+                   MAX(prompt_chars) AS max_prompt_chars
+            FROM llm_calls {where}
+            GROUP BY {column}
+            ORDER BY SUM(latency_ms) DESC
+        """
+
+        with self._lock:
+            cursor = self._conn.execute(query, params)
+            columns = [description[0] for description in cursor.description]
+            rows = cursor.fetchall()
+
+        results = []
+        for row in rows:
+            result = dict(zip(columns, row))
+            for key in ("avg_latency_ms", "avg_prompt_chars"):
+                result[key] = round(result[key] or 0.0, 2)
+            results.append(result)
+
+        return results
+
+
+# Singleton instance
+_usage_ledger: Optional[UsageLedger] = None
+
+
+def get_usage_ledger() -> UsageLedger:
+    """Get or create the usage ledger singleton"""
+    global _usage_ledger
+    if _usage_ledger is None:
+        _usage_ledger = UsageLedger(os.getenv("LLM_USAGE_DB", "./data/llm_usage.db"))
+    return _usage_ledger
@@ -1,9 +1,122 @@
 """Vertex AI service for LLM interactions"""
 import os
-from typing import AsyncGenerator, Optional
+import re
+import time
+import asyncio
+from typing import Any, AsyncGenerator, Dict, List, Optional, Tuple, Type
 import json
-from langchain_google_vertexai import ChatVertexAI
-from langchain_core.messages import HumanMessage, SystemMessage, AIMessage
+from pydantic import BaseModel, ValidationError
+from ..utils import (
+    JSON_SYNTAX_REPAIR_PROMPT,
+    OUTPUT_REPAIR_PROMPT,
+    observe_llm_call,
+    observe_llm_route,
+    observe_llm_repair,
+    observe_llm_retry,
+    observe_llm_hedge,
+    start_span,
+    set_span_attributes,
+    get_session_id,
+    get_tenant_id
+)
+from .usage_ledger import get_usage_ledger
+from .llm_resilience import RetryPolicy, LatencyTracker, HedgeBudget, is_retryable, is_quota_error
+from .llm_rate_limit import QuotaLimiter, estimate_request_tokens, quota_limiters
+from .llm_backends import LLMBackend, LLMResponse, create_backend
+
+# Model tier used for each prompt template; anything else goes to "strong".
+# Requirements extraction and summaries are simple, latency-sensitive tasks.
+DEFAULT_ROUTES = {
+    "REQUIREMENTS_ANALYSIS_PROMPT": "fast",
+    "CONVERSATION_SUMMARY_PROMPT": "fast",
+    "ARCHITECTURE_DESIGN_PROMPT": "strong",
+    "IAC_GENERATION_PROMPT": "strong",
+    "JSON_SYNTAX_REPAIR_PROMPT": "fast",
+    "OUTPUT_REPAIR_PROMPT": "fast",
+    "TERRAFORM_REPAIR_PROMPT": "strong"
+}
+
+
+class InvalidJSONResponseError(Exception):
+    """The model returned a response that could not be parsed as JSON"""
+
+    def __init__(
+        self,
+        message: str,
+        response: str = "",
+        parse_error: str = "",
+        position: Optional[int] = None
+    ):
+        super().__init__(message)
+        self.response = response
+        self.parse_error = parse_error
+        self.position = position
+
+
+class OutputValidationError(Exception):
+    """The model output still failed schema validation after repair attempts"""
+
+
+def extract_json_block(content: str) -> str:
+    """Extract JSON from a markdown code block, if the response has one"""
+    if "```json" in content:
+        return content.split("```json")[1].split("```")[0].strip()
+    elif "```" in content:
+        return content.split("```")[1].split("```")[0].strip()
+    return content
+
+
+def response_tokens(response: LLMResponse) -> Optional[int]:
+    """Tokens a response actually used, or None if the backend did not report them"""
+    if response.input_tokens is None or response.output_tokens is None:
+        return None
+    return response.input_tokens + response.output_tokens
+
+
+def parse_json_response(response: str) -> dict:
+    """Parse a JSON response, falling back to the outermost {...} block"""
+    try:
+        return json.loads(response)
+    except json.JSONDecodeError as e:
+        # If JSON parsing fails, try to extract JSON from text
+        json_match = re.search(r'\{.*\}', response, re.DOTALL)
+        if json_match:
+            try:
+                return json.loads(json_match.group())
+            except json.JSONDecodeError:
+                pass
+        raise InvalidJSONResponseError(
+            f"Failed to parse JSON response: {str(e)}\nResponse: {response}",
+            response=response,
+            parse_error=str(e),
+            position=e.pos
+        )
+
+
+def error_window(text: str, position: Optional[int], context_lines: int = 2) -> Tuple[int, int]:
+    """
+    Character range of the lines around a parse error
+
+    Covers the line holding position plus context_lines on either side. A
+    missing position, or one past the end (truncated output), selects the
+    last lines of the text.
+    """
+    if position is None or position >= len(text):
+        position = max(0, len(text) - 1)
+
+    start = text.rfind("\n", 0, position) + 1
+    for _ in range(context_lines):
+        if start == 0:
+            break
+        start = text.rfind("\n", 0, start - 1) + 1
+
+    end = text.find("\n", position)
+    for _ in range(context_lines):
+        if end == -1:
+            break
+        end = text.find("\n", end + 1)
+
+    return start, len(text) if end == -1 else end
 
 
 class VertexAIService:
@@ -14,19 +127,85 @@ class VertexAIService:
         self.location = os.getenv("VERTEX_AI_LOCATION", "us-central1")
         self.model_name = os.getenv("VERTEX_AI_MODEL", "gemini-1.5-pro")
 
-        self.llm = ChatVertexAI(
-            model_name=self.model_name,
-            project=self.project_id,
-            location=self.location,
-            temperature=0.7,
-            max_output_tokens=2048,
+        # Model pool: tier -> model name and generation settings
+        self.tiers: Dict[str, Dict] = {
+            "fast": {
+                "model_name": os.getenv("VERTEX_AI_FAST_MODEL", "gemini-1.5-flash"),
+                "temperature": float(os.getenv("VERTEX_AI_FAST_TEMPERATURE", "0.2")),
+                "max_output_tokens": int(os.getenv("VERTEX_AI_FAST_MAX_OUTPUT_TOKENS", "2048"))
+            },
+            "strong": {
+                "model_name": self.model_name,
+                "temperature": float(os.getenv("VERTEX_AI_TEMPERATURE", "0.7")),
+                "max_output_tokens": int(os.getenv("VERTEX_AI_MAX_OUTPUT_TOKENS", "2048"))
+            }
+        }
+        self.routes = self._load_routes()
+        self.escalate_invalid_json = (
+            os.getenv("VERTEX_AI_ESCALATE_INVALID_JSON", "True").lower() == "true"
+        )
+        self.max_repair_attempts = int(os.getenv("LLM_REPAIR_MAX_ATTEMPTS", "2"))
+
+        # One backend per tier (Vertex AI, record, replay or fake; see LLM_BACKEND)
+        self._backends: Dict[str, LLMBackend] = {}
+        self.llm = self._get_backend("strong")
+
+        # Tail latency control
+        self.retry_policy = RetryPolicy.from_env()
+        self.hedging_enabled = os.getenv("LLM_HEDGING_ENABLED", "False").lower() == "true"
+        self.hedge_percentile = float(os.getenv("LLM_HEDGE_PERCENTILE", "0.95"))
+        self.hedge_budget = HedgeBudget(
+            ratio=float(os.getenv("LLM_HEDGE_BUDGET_RATIO", "0.1")),
+            burst=float(os.getenv("LLM_HEDGE_BUDGET_BURST", "10"))
         )
+        self.latency = {tier: LatencyTracker() for tier in self.tiers}
+
+        # RPM/TPM budgets per model, shared fairly between sessions
+        self.limiters: Dict[str, QuotaLimiter] = quota_limiters(self.tiers)
+
+        self.usage_ledger = get_usage_ledger()
+
+    def _load_routes(self) -> Dict[str, str]:
+        """
+        Template -> tier routes, overridable with VERTEX_AI_ROUTES
+
+        Example: VERTEX_AI_ROUTES="REQUIREMENTS_ANALYSIS_PROMPT=strong,IAC_GENERATION_PROMPT=fast"
+        """
+        routes = dict(DEFAULT_ROUTES)
+
+        for entry in os.getenv("VERTEX_AI_ROUTES", "").split(","):
+            if "=" not in entry:
+                continue
+            template, tier = (part.strip() for part in entry.split("=", 1))
+            if tier not in self.tiers:
+                raise ValueError(f"Unknown model tier '{tier}' in VERTEX_AI_ROUTES")
+            routes[template] = tier
+
+        return routes
+
+    def _get_backend(self, tier: str) -> LLMBackend:
+        """Get or create the pooled backend for a model tier"""
+        if tier not in self._backends:
+            settings = self.tiers[tier]
+            self._backends[tier] = create_backend(
+                model_name=settings["model_name"],
+                settings=settings,
+                project=self.project_id,
+                location=self.location
+            )
+        return self._backends[tier]
+
+    def route(self, template: Optional[str]) -> str:
+        """Model tier for a prompt template"""
+        return self.routes.get(template, "strong")
 
     async def generate_response(
         self,
         prompt: str,
         system_prompt: Optional[str] = None,
-        response_format: str = "text"
+        response_format: str = "text",
+        template: Optional[str] = None,
+        tier: Optional[str] = None
     ) -> str:
         """
         Generate a response from Vertex AI
@@ -35,95 +214,614 @@ class VertexAIService:
             prompt: The user prompt
             system_prompt: Optional system prompt for context
             response_format: 'text' or 'json'
+            template: Name of the prompt template, used for routing and observability
+            tier: Model tier override ('fast' or 'strong')
 
         Returns:
             Generated response as string
         """
-        messages = []
+        tier = tier or self.route(template)
+        model_name = self.tiers[tier]["model_name"]
+        messages = self._build_messages(prompt, system_prompt)
+        prompt_chars = len(prompt) + len(system_prompt or "")
+        started = time.perf_counter()
 
-        if system_prompt:
-            messages.append(SystemMessage(content=system_prompt))
+        try:
+            with start_span("vertex_ai.generate", {
+                "llm.model": model_name,
+                "llm.tier": tier,
+                "llm.template": template,
+                "llm.prompt_chars": prompt_chars
+            }) as span:
+                response = await self._invoke(tier, messages, template)
+                content = response.content
 
-        messages.append(HumanMessage(content=prompt))
+                input_tokens, output_tokens = response.input_tokens, response.output_tokens
+                set_span_attributes(span, {
+                    "llm.response_chars": len(content),
+                    "llm.input_tokens": input_tokens,
+                    "llm.output_tokens": output_tokens
+                })
 
-        try:
-            response = await self.llm.ainvoke(messages)
-            content = response.content
+            await self._record_usage(
+                model_name=model_name,
+                template=template,
+                duration=time.perf_counter() - started,
+                outcome="success",
+                prompt_chars=prompt_chars,
+                response_chars=len(content),
+                input_tokens=input_tokens,
+                output_tokens=output_tokens
+            )
 
             if response_format == "json":
-                # Try to extract JSON from markdown code blocks
-                if "```json" in content:
-                    content = content.split("```json")[1].split("```")[0].strip()
-                elif "```" in content:
-                    content = content.split("```")[1].split("```")[0].strip()
+                content = extract_json_block(content)
 
             return content
 
-        except Exception as e:
-            raise Exception(f"Error generating response from Vertex AI: {str(e)}")
+        except Exception:
+            await self._record_usage(
+                model_name=model_name,
+                template=template,
+                duration=time.perf_counter() - started,
+                outcome="error",
+                prompt_chars=prompt_chars
+            )
+            raise
+
+    async def _invoke(self, tier: str, messages: List, template: Optional[str] = None) -> LLMResponse:
+        """
+        Call the model with retries, deadlines and optional hedging
+
+        Each attempt first waits for the model's RPM/TPM quota, queued fairly
+        against other tenants and sessions, and is then bounded by the
+        attempt timeout and the remaining total deadline. Transient failures
+        are retried with jittered exponential backoff; anything else fails
+        immediately.
+        """
+        policy = self.retry_policy
+        settings = self.tiers[tier]
+        model_name = settings["model_name"]
+        limiter = self.limiters[model_name]
+        flow = get_tenant_id() or get_session_id() or "anonymous"
+        tokens = estimate_request_tokens(
+            sum(len(message.content) for message in messages),
+            settings["max_output_tokens"]
+        )
+        deadline = time.monotonic() + policy.total_deadline
+        attempt = 0
+
+        while True:
+            attempt += 1
+            try:
+                reservation = await limiter.acquire(
+                    flow, tokens, timeout=max(0.0, deadline - time.monotonic())
+                )
+            except asyncio.TimeoutError:
+                raise TimeoutError(f"No {model_name} quota available before the request deadline")
+
+            used_tokens = None
+            remaining = deadline - time.monotonic()
+            try:
+                response = await asyncio.wait_for(
+                    self._hedged_invoke(tier, messages, template, flow, tokens),
+                    timeout=max(0.0, min(policy.attempt_timeout, remaining))
+                )
+                used_tokens = response_tokens(response)
+                return response
+            except Exception as e:
+                delay = policy.backoff(attempt)
+                if is_quota_error(e):
+                    # Our budget overestimates what the service allows right now
+                    limiter.pause(delay)
+                if (
+                    attempt >= policy.max_attempts
+                    or not is_retryable(e)
+                    or time.monotonic() + delay >= deadline
+                ):
+                    raise
+
+                observe_llm_retry(model_name, type(e).__name__)
+                await asyncio.sleep(delay)
+            finally:
+                limiter.settle(reservation, used_tokens)
+
+    async def _hedged_invoke(
+        self,
+        tier: str,
+        messages: List,
+        template: Optional[str] = None,
+        flow: str = "anonymous",
+        tokens: int = 0
+    ) -> LLMResponse:
+        """
+        Single attempt, hedged with a duplicate request once it runs past the
+        observed latency percentile; the first result wins and the loser is
+        cancelled. A hedge is only sent if quota is available right away.
+        """
+        backend = self._get_backend(tier)
+        model_name = self.tiers[tier]["model_name"]
+        tracker = self.latency[tier]
+        started = time.perf_counter()
+
+        self.hedge_budget.earn()
+        hedge_after = tracker.percentile(self.hedge_percentile) if self.hedging_enabled else None
+
+        primary = asyncio.ensure_future(backend.ainvoke(messages, template))
+        tasks = {primary}
+        limiter = self.limiters[model_name]
+        hedge, hedge_reservation = None, None
+
+        try:
+            if hedge_after is not None:
+                done, _ = await asyncio.wait(tasks, timeout=hedge_after)
+                if not done:
+                    reservation = limiter.try_acquire(flow, tokens)
+                    if reservation is None:
+                        observe_llm_hedge(model_name, "rate_limited")
+                    elif self.hedge_budget.try_spend():
+                        hedge, hedge_reservation = asyncio.ensure_future(backend.ainvoke(messages, template)), reservation
+                        tasks.add(hedge)
+                    else:
+                        limiter.settle(reservation, 0, requests=0)
+                        observe_llm_hedge(model_name, "budget_exhausted")
+            while tasks:
+                done, tasks = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+                winner = next((task for task in done if task.exception() is None), None)
+
+                if winner is not None:
+                    tracker.observe(time.perf_counter() - started)
+                    if winner is not primary:
+                        observe_llm_hedge(model_name, "won")
+                    elif tasks:
+                        observe_llm_hedge(model_name, "lost")
+                    return winner.result()
+
+                # Every finished request failed; fall back to any still running
+                if not tasks:
+                    raise next(iter(done)).exception()
+        finally:
+            # Settle the hedge's reservation: actual usage if it answered,
+            # nothing if it was cancelled, the estimate if it failed
+            if hedge is not None:
+                if not hedge.done() or hedge.cancelled():
+                    used_tokens = 0
+                elif hedge.exception() is None:
+                    used_tokens = response_tokens(hedge.result())
+                else:
+                    used_tokens = None
+                limiter.settle(hedge_reservation, used_tokens)
+            for task in tasks:
+                task.cancel()
+
+    async def warm_up(self) -> None:
+        """Create every tier's backend and open its connection ahead of the first chat"""
+        # Also loads LangChain's message classes off the event loop
+        await asyncio.to_thread(self._build_messages, "warm-up", None)
+        for tier in self.tiers:
+            await self._get_backend(tier).warm_up()
+
+    def _build_messages(self, prompt: str, system_prompt: Optional[str]) -> List:
+        """Build the LangChain message list"""
+        from langchain_core.messages import HumanMessage, SystemMessage
+
+        messages = []
+
+        if system_prompt:
+            messages.append(SystemMessage(content=system_prompt))
+
+        messages.append(HumanMessage(content=prompt))
+        return messages
+
+    async def _record_usage(
+        self,
+        model_name: str,
+        template: Optional[str],
+        duration: float,
+        outcome: str,
+        prompt_chars: int,
+        response_chars: int = 0,
+        input_tokens: Optional[int] = None,
+        output_tokens: Optional[int] = None
+    ) -> None:
+        """Record a call in the Prometheus metrics and the usage ledger"""
+        observe_llm_call(
+            model=model_name,
+            duration=duration,
+            outcome=outcome,
+            prompt_chars=prompt_chars,
+            response_chars=response_chars,
+            input_tokens=input_tokens,
+            output_tokens=output_tokens
+        )
+
+        await self.usage_ledger.record(
+            model=model_name,
+            outcome=outcome,
+            latency=duration,
+            prompt_chars=prompt_chars,
+            response_chars=response_chars,
+            input_tokens=input_tokens,
+            output_tokens=output_tokens,
+            template=template,
+            session_id=get_session_id()
+        )
 
     async def generate_json_response(
         self,
         prompt: str,
-        system_prompt: Optional[str] = None
+        system_prompt: Optional[str] = None,
+        template: Optional[str] = None
     ) -> dict:
         """
         Generate a JSON response from Vertex AI
 
+        Requests routed to the fast tier are retried once on the strong tier
+        if the fast model does not produce valid JSON.
+
         Args:
             prompt: The user prompt
             system_prompt: Optional system prompt
+            template: Name of the prompt template, used for routing and observability
 
         Returns:
             Parsed JSON response as dict
         """
+        tier = self.route(template)
+
+        try:
+            result = await self._generate_json_with_tier(prompt, system_prompt, template, tier)
+        except InvalidJSONResponseError:
+            self._observe_route(template, tier, "invalid_json")
+            if tier == "strong" or not self.escalate_invalid_json:
+                raise
+
+            tier = "strong"
+            try:
+                result = await self._generate_json_with_tier(
+                    prompt, system_prompt, template, tier
+                )
+            except Exception:
+                self._observe_route(template, tier, "escalation_failed")
+                raise
+
+            self._observe_route(template, tier, "escalated")
+            return result
+        except Exception:
+            self._observe_route(template, tier, "error")
+            raise
+
+        self._observe_route(template, tier, "success")
+        return result
+
+    async def _generate_json_with_tier(
+        self,
+        prompt: str,
+        system_prompt: Optional[str],
+        template: Optional[str],
+        tier: str
+    ) -> dict:
+        """Generate and parse a JSON response on a specific tier"""
         response = await self.generate_response(
             prompt=prompt,
             system_prompt=system_prompt,
-            response_format="json"
+            response_format="json",
+            template=template,
+            tier=tier
         )
+        return parse_json_response(response)
+
+    async def generate_validated_response(
+        self,
+        prompt: str,
+        schema: Type[BaseModel],
+        system_prompt: Optional[str] = None,
+        template: Optional[str] = None
+    ) -> dict:
+        """
+        Generate a JSON response validated against a Pydantic model
+
+        Invalid output is repaired in a bounded loop (LLM_REPAIR_MAX_ATTEMPTS)
+        that sends only the broken text or the invalid fields together with
+        their validation errors back to the model, instead of regenerating.
+
+        Args:
+            prompt: The user prompt
+            schema: Pydantic model the response must satisfy
+            system_prompt: Optional system prompt
+            template: Name of the prompt template, used for routing and observability
+
+        Returns:
+            Validated response as dict (fields outside the schema are preserved)
+        """
+        attempts = 0
 
         try:
-            return json.loads(response)
-        except json.JSONDecodeError as e:
-            # If JSON parsing fails, try to extract JSON from text
-            import re
-            json_match = re.search(r'\{.*\}', response, re.DOTALL)
-            if json_match:
+            data = await self.generate_json_response(
+                prompt=prompt,
+                system_prompt=system_prompt,
+                template=template
+            )
+        except InvalidJSONResponseError as e:
+            error = e
+            data = None
+            while data is None:
+                if attempts >= self.max_repair_attempts:
+                    observe_llm_repair(template or "none", "syntax", "exhausted")
+                    raise
+                attempts += 1
                 try:
-                    return json.loads(json_match.group())
-                except:
-                    pass
-            raise Exception(f"Failed to parse JSON response: {str(e)}\nResponse: {response}")
+                    data = await self._repair_syntax(error)
+                    observe_llm_repair(template or "none", "syntax", "repaired")
+                except InvalidJSONResponseError as retry_error:
+                    error = retry_error
+
+        schema_repaired = False
+        while True:
+            errors = self._validation_errors(schema, data)
+            if not errors:
+                if schema_repaired:
+                    observe_llm_repair(template or "none", "schema", "repaired")
+                return data
+
+            if attempts >= self.max_repair_attempts or not isinstance(data, dict):
+                observe_llm_repair(template or "none", "schema", "exhausted")
+                details = "; ".join(
+                    f"{'.'.join(str(part) for part in err['loc']) or '<root>'}: {err['msg']}"
+                    for err in errors
+                )
+                raise OutputValidationError(
+                    f"Response does not match {schema.__name__}: {details}"
+                )
+
+            attempts += 1
+            schema_repaired = True
+            data = await self._repair_fields(data, errors, schema)
+
+    async def _repair_syntax(self, error: InvalidJSONResponseError) -> dict:
+        """Ask the model to fix only the lines around the parse error and splice them back"""
+        text = error.response
+        start, end = error_window(text, error.position)
+
+        fixed = await self.generate_response(
+            prompt=JSON_SYNTAX_REPAIR_PROMPT.format(
+                error=error.parse_error,
+                start=start,
+                end=end,
+                length=len(text),
+                fragment=text[start:end]
+            ),
+            response_format="json",
+            template="JSON_SYNTAX_REPAIR_PROMPT"
+        )
+        return parse_json_response(text[:start] + fixed + text[end:])
+
+    def _validation_errors(self, schema: Type[BaseModel], data: Any) -> List[Dict]:
+        """Pydantic validation errors for data (empty when valid)"""
+        try:
+            schema.model_validate(data)
+            return []
+        except ValidationError as e:
+            return e.errors()
+
+    async def _repair_fields(
+        self,
+        data: dict,
+        errors: List[Dict],
+        schema: Type[BaseModel]
+    ) -> dict:
+        """Ask the model to fix only the invalid fields and patch them into data"""
+        paths = self._invalid_paths(data, errors)
+        fields = {path[0] for path in paths}
+        properties = schema.model_json_schema().get("properties", {})
+
+        fragments = "\n".join(
+            f"{json.dumps(list(path))}: {json.dumps(self._get_path(data, path))}"
+            for path in paths
+        )
+        error_lines = "\n".join(
+            f"- {'.'.join(str(part) for part in err['loc'])}: {err['msg']}"
+            for err in errors
+        )
+        schema_fragment = json.dumps(
+            {field: properties.get(field, {}) for field in sorted(fields, key=str)},
+            indent=2
+        )
+
+        patch = await self.generate_json_response(
+            prompt=OUTPUT_REPAIR_PROMPT.format(
+                fragments=fragments,
+                errors=error_lines,
+                schema=schema_fragment
+            ),
+            template="OUTPUT_REPAIR_PROMPT"
+        )
+
+        for fix in patch.get("fixes", []):
+            path = tuple(fix.get("path") or ())
+            if path in paths and "value" in fix:
+                self._set_path(data, path, fix["value"])
+
+        return data
+
+    def _invalid_paths(self, data: dict, errors: List[Dict]) -> List[Tuple]:
+        """
+        Smallest patchable paths covering the errors
+
+        Errors inside a list item or dict entry map to that item, so one bad
+        resource or file is repaired without resending its siblings.
+        """
+        paths = []
+        for err in errors:
+            loc = tuple(err["loc"])
+            if not loc:
+                continue
+
+            container = data.get(loc[0])
+            path = loc[:1]
+            if len(loc) > 1 and (
+                (isinstance(container, dict) and loc[1] in container)
+                or (isinstance(container, list) and isinstance(loc[1], int)
+                    and loc[1] < len(container))
+            ):
+                path = loc[:2]
+
+            if path not in paths:
+                paths.append(path)
+
+        # A whole field being replaced makes its item-level paths redundant
+        whole_fields = {path[0] for path in paths if len(path) == 1}
+        return [path for path in paths if len(path) == 1 or path[0] not in whole_fields]
+
+    def _get_path(self, data: dict, path: Tuple) -> Any:
+        value = data.get(path[0])
+        if len(path) > 1 and value is not None:
+            value = value[path[1]]
+        return value
+
+    def _set_path(self, data: dict, path: Tuple, value: Any) -> None:
+        if len(path) == 1:
+            data[path[0]] = value
+        else:
+            data[path[0]][path[1]] = value
+
+    def _observe_route(self, template: Optional[str], tier: str, outcome: str) -> None:
+        observe_llm_route(
+            template=template or "none",
+            tier=tier,
+            model=self.tiers[tier]["model_name"],
+            outcome=outcome
+        )
 
     async def stream_response(
         self,
         prompt: str,
-        system_prompt: Optional[str] = None
+        system_prompt: Optional[str] = None,
+        template: Optional[str] = None
     ) -> AsyncGenerator[str, None]:
         """
         Stream a response from Vertex AI token by token
 
+        Goes through the same quota limiter and total deadline as
+        generate_response. Opening the stream is retried like a regular call
+        until the first chunk arrives; after that a failure is raised, since
+        the caller has already consumed part of the response.
+
         Args:
             prompt: The user prompt
             system_prompt: Optional system prompt
+            template: Name of the prompt template, used for routing and observability
 
         Yields:
             Response tokens as they are generated
         """
-        messages = []
+        tier = self.route(template)
+        model_name = self.tiers[tier]["model_name"]
+        messages = self._build_messages(prompt, system_prompt)
+        prompt_chars = len(prompt) + len(system_prompt or "")
+        response_chars = 0
+        started = time.perf_counter()
 
-        if system_prompt:
-            messages.append(SystemMessage(content=system_prompt))
+        try:
+            with start_span("vertex_ai.stream", {
+                "llm.model": model_name,
+                "llm.tier": tier,
+                "llm.template": template,
+                "llm.prompt_chars": prompt_chars
+            }) as span:
+                async for chunk in self._stream(tier, messages, template):
+                    response_chars += len(chunk)
+                    yield chunk
 
-        messages.append(HumanMessage(content=prompt))
+                set_span_attributes(span, {"llm.response_chars": response_chars})
 
-        try:
-            async for chunk in self.llm.astream(messages):
-                if hasattr(chunk, 'content'):
-                    yield chunk.content
-        except Exception as e:
-            raise Exception(f"Error streaming from Vertex AI: {str(e)}")
+            await self._record_usage(
+                model_name=model_name,
+                template=template,
+                duration=time.perf_counter() - started,
+                outcome="success",
+                prompt_chars=prompt_chars,
+                response_chars=response_chars
+            )
+        except Exception:
+            await self._record_usage(
+                model_name=model_name,
+                template=template,
+                duration=time.perf_counter() - started,
+                outcome="error",
+                prompt_chars=prompt_chars
+            )
+            raise
+
+    async def _stream(
+        self,
+        tier: str,
+        messages: List,
+        template: Optional[str] = None
+    ) -> AsyncGenerator[str, None]:
+        """Stream from the backend under the quota limiter, retry policy and deadline"""
+        policy = self.retry_policy
+        settings = self.tiers[tier]
+        model_name = settings["model_name"]
+        limiter = self.limiters[model_name]
+        flow = get_tenant_id() or get_session_id() or "anonymous"
+        tokens = estimate_request_tokens(
+            sum(len(message.content) for message in messages),
+            settings["max_output_tokens"]
+        )
+        deadline = time.monotonic() + policy.total_deadline
+        attempt = 0
+
+        while True:
+            attempt += 1
+            try:
+                reservation = await limiter.acquire(
+                    flow, tokens, timeout=max(0.0, deadline - time.monotonic())
+                )
+            except asyncio.TimeoutError:
+                raise TimeoutError(f"No {model_name} quota available before the request deadline")
+
+            stream = self._get_backend(tier).astream(messages, template)
+            try:
+                remaining = deadline - time.monotonic()
+                first = await asyncio.wait_for(
+                    stream.__anext__(),
+                    timeout=max(0.0, min(policy.attempt_timeout, remaining))
+                )
+            except StopAsyncIteration:
+                limiter.settle(reservation, None)
+                return
+            except Exception as e:
+                limiter.settle(reservation, None)
+                await stream.aclose()
+                delay = policy.backoff(attempt)
+                if is_quota_error(e):
+                    limiter.pause(delay)
+                if (
+                    attempt >= policy.max_attempts
+                    or not is_retryable(e)
+                    or time.monotonic() + delay >= deadline
+                ):
+                    raise
+
+                observe_llm_retry(model_name, type(e).__name__)
+                await asyncio.sleep(delay)
+                continue
+
+            try:
+                yield first
+                while True:
+                    try:
+                        chunk = await asyncio.wait_for(
+                            stream.__anext__(),
+                            timeout=max(0.0, deadline - time.monotonic())
+                        )
+                    except StopAsyncIteration:
+                        return
+                    yield chunk
+            finally:
+                limiter.settle(reservation, None)
+                await stream.aclose()
 
 
 # Singleton instance
@@ -0,0 +1,141 @@
+"""Warm-up of connections and caches after start-up"""
+import os
+import time
+import asyncio
+import logging
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from ..utils import observe_warmup
+from .vertex_ai import get_vertex_ai_service
+from .gcp_client import get_gcp_client_service
+from .terraform import get_terraform_service
+from .terraform_preflight import get_terraform_preflight_service
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_STEPS = ("llm", "gcp", "terraform", "caches")
+
+
+async def _warm_llm() -> None:
+    await get_vertex_ai_service().warm_up()
+
+
+async def _warm_gcp() -> None:
+    await get_gcp_client_service().warm_up()
+
+
+async def _warm_terraform() -> None:
+    workspace = await get_terraform_service().warm_up()
+    # The template workspace pins the provider versions deployments will use
+    get_terraform_preflight_service().ensure_schema(workspace)
+
+
+async def _load_caches() -> None:
+    await get_terraform_preflight_service().get_schema()
+
+
+STEPS: Dict[str, Callable[[], Awaitable[None]]] = {
+    "llm": _warm_llm,
+    "gcp": _warm_gcp,
+    "terraform": _warm_terraform,
+    "caches": _load_caches
+}
+
+
+class WarmupService:
+    """
+    Pays the first chat's one-time costs in the background after start-up
+
+    - llm: create the model clients and authenticate against Vertex AI
+    - gcp: create and authenticate the Compute Engine and Storage clients
+    - terraform: initialize a template workspace, filling the provider
+      plugin cache, and refresh the provider schema from it
+    - caches: load the provider schema cache from disk
+
+    Steps run concurrently, each bounded by timeout. A failed step only
+    means the first chat pays for it; warm-up still counts as finished.
+    """
+
+    def __init__(self, steps: List[str], enabled: bool = True, timeout: float = 120.0):
+        unknown = [step for step in steps if step not in STEPS]
+        if unknown:
+            raise ValueError(f"Unknown warm-up steps: {', '.join(unknown)}")
+
+        self.enabled = enabled
+        self.timeout = timeout
+        self.steps: Dict[str, Dict[str, Any]] = {
+            step: {"status": "pending"} for step in (steps if enabled else [])
+        }
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def finished(self) -> bool:
+        """Whether warm-up has run (or is disabled)"""
+        return all(step["status"] not in ("pending", "running") for step in self.steps.values())
+
+    def stats(self) -> Dict[str, Any]:
+        return {"enabled": self.enabled, "finished": self.finished, "steps": self.steps}
+
+    def start(self, after: Optional[Awaitable[Any]] = None) -> None:
+        """
+        Start warming up in the background
+
+        Args:
+            after: Awaited first, e.g. the orchestrator build, so that the
+                singletons it creates are not built twice concurrently
+        """
+        if self._task is None and self.steps:
+            self._task = asyncio.create_task(self._run(after))
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def _run(self, after: Optional[Awaitable[Any]]) -> None:
+        if after is not None:
+            try:
+                await after
+            except Exception as e:
+                logger.warning("Warming up without the orchestrator: %s", e)
+
+        await asyncio.gather(*(self._run_step(name) for name in self.steps))
+        logger.info("Warm-up finished: %s", {name: step["status"] for name, step in self.steps.items()})
+
+    async def _run_step(self, name: str) -> None:
+        step = self.steps[name]
+        step["status"] = "running"
+        started = time.perf_counter()
+        try:
+            await asyncio.wait_for(STEPS[name](), self.timeout)
+            step["status"] = "done"
+        except asyncio.TimeoutError:
+            step["status"] = "timeout"
+        except Exception as e:
+            logger.warning("Warm-up step %s failed: %s", name, e)
+            step.update(status="failed", error=str(e))
+
+        duration = time.perf_counter() - started
+        step["duration_ms"] = round(duration * 1000, 1)
+        observe_warmup(name, duration, step["status"])
+
+
+# Singleton instance
+_warmup_service: Optional[WarmupService] = None
+
+
+def get_warmup_service() -> WarmupService:
+    """Get or create the warm-up service singleton"""
+    global _warmup_service
+    if _warmup_service is None:
+        _warmup_service = WarmupService(
+            steps=[
+                step.strip()
+                for step in os.getenv("WARMUP_STEPS", ",".join(DEFAULT_STEPS)).split(",")
+                if step.strip()
+            ],
+            enabled=os.getenv("WARMUP_ENABLED", "True").lower() == "true",
+            timeout=float(os.getenv("WARMUP_TIMEOUT_SECONDS", "120"))
+        )
+    return _warmup_service
@@ -0,0 +1,517 @@
+"""Retention, compaction and teardown of Terraform workspaces"""
+import os
+import json
+import time
+import shutil
+import asyncio
+import logging
+from dataclasses import dataclass, asdict
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, AsyncGenerator, Dict, List, Optional
+
+from .terraform import TerraformService, TerraformCommandError, get_terraform_service
+from .log_capture import LogCaptureService, get_log_capture_service
+from .session_store import SessionStore, LockBusyError, WORKER_ID, get_session_store
+from .deployment_catalog import DeploymentCatalog, get_deployment_catalog
+from .terraform_state import has_managed_resources
+from .terraform_workspace import atomic_write
+from ..utils import observe_workspace_gc, start_span, set_span_attributes, bind_deployment_id
+
+logger = logging.getLogger(__name__)
+
+LIFECYCLE_FILE = ".vibe-lifecycle.json"
+PROVIDER_DIR = ".terraform"
+
+
+@dataclass
+class WorkspaceInfo:
+    """Disk usage and activity of one deployment workspace"""
+    deployment_id: str
+    path: str
+    size_bytes: int
+    provider_bytes: int          # size of .terraform
+    last_activity: float         # epoch seconds
+    has_resources: bool
+    live: bool
+    expires_at: Optional[float] = None
+
+    @property
+    def compacted(self) -> bool:
+        return self.provider_bytes == 0
+
+
+class DestroySweep:
+    """
+    A teardown of expired deployments running in the background
+
+    Events are kept for the lifetime of the sweep, so every observer sees
+    them from the start and observers can come and go without affecting it.
+    """
+
+    def __init__(self):
+        self.events: List[Dict[str, Any]] = []
+        self.error: Optional[BaseException] = None
+        self.done = False
+        self.task: Optional[asyncio.Task] = None
+        self._changed = asyncio.Event()
+
+    def publish(self, event: Dict[str, Any]) -> None:
+        self.events.append(event)
+        self._notify()
+
+    def finish(self, error: Optional[BaseException] = None) -> None:
+        self.error = error
+        self.done = True
+        self._notify()
+
+    def _notify(self) -> None:
+        changed, self._changed = self._changed, asyncio.Event()
+        changed.set()
+
+    async def follow(self) -> AsyncGenerator[Dict[str, Any], None]:
+        """Events from the start of the sweep until it finishes"""
+        index = 0
+        while True:
+            changed = self._changed
+            while index < len(self.events):
+                yield self.events[index]
+                index += 1
+            if self.done:
+                if self.error is not None:
+                    raise self.error
+                return
+            await changed.wait()
+
+
+def _tree_size(path: Path) -> int:
+    """Bytes used by the regular files under path (symlinks are not followed)"""
+    total = 0
+    stack = [path]
+    while stack:
+        try:
+            entries = list(os.scandir(stack.pop()))
+        except OSError:
+            continue
+        for entry in entries:
+            try:
+                if entry.is_dir(follow_symlinks=False):
+                    stack.append(Path(entry.path))
+                elif entry.is_file(follow_symlinks=False):
+                    total += entry.stat(follow_symlinks=False).st_size
+            except OSError:
+                continue
+    return total
+
+
+def _inspect(path: Path, live: bool) -> WorkspaceInfo:
+    """Measure a workspace; activity is the newest top-level modification"""
+    provider_bytes = _tree_size(path / PROVIDER_DIR)
+    last_activity = path.stat().st_mtime
+    for entry in os.scandir(path):
+        try:
+            last_activity = max(last_activity, entry.stat(follow_symlinks=False).st_mtime)
+        except OSError:
+            continue
+
+    expires_at = None
+    lifecycle_path = path / LIFECYCLE_FILE
+    if lifecycle_path.exists():
+        try:
+            expires_at = json.loads(lifecycle_path.read_text()).get("expires_at")
+        except ValueError:
+            pass
+
+    return WorkspaceInfo(
+        deployment_id=path.name,
+        path=str(path),
+        size_bytes=_tree_size(path),
+        provider_bytes=provider_bytes,
+        last_activity=last_activity,
+        has_resources=has_managed_resources(path / "terraform.tfstate"),
+        live=live,
+        expires_at=expires_at
+    )
+
+
+class WorkspaceLifecycleService:
+    """
+    Keeps the workspace directory within its retention policies
+
+    - Workspaces idle for compact_after_hours lose their .terraform provider
+      copy; configuration, state and lock file are kept, so a later deploy
+      only needs `terraform init` again.
+    - Workspaces older than max_age_days are deleted if their state tracks
+      no resources (never applied, or destroyed) and compacted otherwise.
+    - Above the disk quota, the least recently used workspaces are
+      compacted, then resource-free ones deleted, until usage fits.
+    - Ephemeral deployments are destroyed once they expire.
+
+    Workspaces of running deployments are never touched (their lock is held
+    in the session store, so this holds across workers), and workspaces
+    whose state still tracks resources are never deleted. Only one worker
+    runs the periodic collection at a time.
+    """
+
+    def __init__(
+        self,
+        terraform_service: TerraformService,
+        log_capture: LogCaptureService,
+        store: SessionStore,
+        catalog: DeploymentCatalog,
+        max_age_days: float = 30,
+        compact_after_hours: float = 24,
+        quota_bytes: int = 0,
+        destroy_concurrency: int = 2,
+        interval_seconds: float = 3600
+    ):
+        self.terraform_service = terraform_service
+        self.log_capture = log_capture
+        self.store = store
+        self.catalog = catalog
+        self.max_age = max_age_days * 86400
+        self.compact_after = compact_after_hours * 3600
+        self.quota_bytes = quota_bytes
+        self.destroy_concurrency = max(1, destroy_concurrency)
+        self.interval = interval_seconds
+        self._lock = asyncio.Lock()
+        self._task: Optional[asyncio.Task] = None
+        self._sweep: Optional[DestroySweep] = None
+
+    @property
+    def workspace_dir(self) -> Path:
+        return Path(self.terraform_service.workspace_dir)
+
+    async def list_workspaces(self) -> List[WorkspaceInfo]:
+        """All deployment workspaces, least recently used first"""
+        def scan() -> List[WorkspaceInfo]:
+            workspaces = []
+            for entry in os.scandir(self.workspace_dir):
+                # Dot directories hold shared data such as the blob store
+                if entry.name.startswith(".") or not entry.is_dir(follow_symlinks=False):
+                    continue
+                workspaces.append(_inspect(Path(entry.path), self.log_capture.is_live(entry.name)))
+            return sorted(workspaces, key=lambda workspace: workspace.last_activity)
+
+        return await asyncio.to_thread(scan)
+
+    async def mark_ephemeral(self, deployment_id: str, ttl_hours: float) -> None:
+        """Schedule a deployment for teardown ttl_hours from now"""
+        path = self.workspace_dir / deployment_id
+        expires_at = time.time() + ttl_hours * 3600
+        await asyncio.to_thread(
+            atomic_write,
+            path / LIFECYCLE_FILE,
+            json.dumps({
+                "expires_at": expires_at,
+                "expires": datetime.fromtimestamp(expires_at, timezone.utc).isoformat()
+            }).encode("utf-8")
+        )
+
+    async def collect(self) -> Dict[str, Any]:
+        """
+        Apply the age and quota policies once
+
+        Returns:
+            Report with the compacted and deleted workspaces, bytes freed and
+            the usage remaining
+        """
+        async with self._lock:
+            with start_span("workspaces.collect") as span:
+                report = await self._collect()
+                set_span_attributes(span, {
+                    "workspaces.compacted": len(report["compacted"]),
+                    "workspaces.deleted": len(report["deleted"]),
+                    "workspaces.freed_bytes": report["freed_bytes"]
+                })
+            return report
+
+    async def _collect(self) -> Dict[str, Any]:
+        now = time.time()
+        workspaces = [workspace for workspace in await self.list_workspaces() if not workspace.live]
+        report: Dict[str, Any] = {"compacted": [], "deleted": [], "freed_bytes": 0}
+
+        async def compact(workspace: WorkspaceInfo) -> None:
+            # A deployment or teardown may have started since the scan
+            if self.log_capture.is_live(workspace.deployment_id):
+                return
+            try:
+                async with self.store.hold_lock(f"workspace:{workspace.deployment_id}"):
+                    await asyncio.to_thread(shutil.rmtree, Path(workspace.path) / PROVIDER_DIR, True)
+            except LockBusyError:
+                return
+            report["compacted"].append(workspace.deployment_id)
+            report["freed_bytes"] += workspace.provider_bytes
+            observe_workspace_gc("compacted", workspace.provider_bytes)
+            workspace.size_bytes -= workspace.provider_bytes
+            workspace.provider_bytes = 0
+
+        async def delete(workspace: WorkspaceInfo) -> None:
+            if self.log_capture.is_live(workspace.deployment_id):
+                return
+            try:
+                async with self.store.hold_lock(f"workspace:{workspace.deployment_id}"):
+                    await asyncio.to_thread(shutil.rmtree, workspace.path, True)
+            except LockBusyError:
+                return
+            report["deleted"].append(workspace.deployment_id)
+            report["freed_bytes"] += workspace.size_bytes
+            observe_workspace_gc("deleted", workspace.size_bytes)
+            workspace.size_bytes = workspace.provider_bytes = 0
+
+        # Age policies
+        for workspace in workspaces:
+            idle = now - workspace.last_activity
+            if self.max_age and idle > self.max_age and not workspace.has_resources:
+                await delete(workspace)
+            elif self.compact_after and idle > self.compact_after and not workspace.compacted:
+                await compact(workspace)
+
+        # Quota: compact, then delete resource-free workspaces, oldest first
+        if self.quota_bytes:
+            usage = sum(workspace.size_bytes for workspace in workspaces)
+            for workspace in workspaces:
+                if usage <= self.quota_bytes:
+                    break
+                if not workspace.compacted:
+                    await compact(workspace)
+                    usage = sum(workspace.size_bytes for workspace in workspaces)
+            for workspace in workspaces:
+                if usage <= self.quota_bytes:
+                    break
+                if workspace.size_bytes and not workspace.has_resources:
+                    await delete(workspace)
+                    usage = sum(workspace.size_bytes for workspace in workspaces)
+            if usage > self.quota_bytes:
+                logger.warning(
+                    "Workspaces use %d bytes, above the %d byte quota; the rest hold deployed state",
+                    usage, self.quota_bytes
+                )
+
+        if report["deleted"]:
+            await asyncio.to_thread(self.terraform_service.blobs.collect_garbage)
+
+        report["usage_bytes"] = sum(workspace.size_bytes for workspace in workspaces)
+        return report
+
+    async def destroy_expired(self) -> AsyncGenerator[Dict[str, Any], None]:
+        """
+        Destroy expired ephemeral deployments, streaming the progress
+
+        The teardown runs as a background sweep shared by concurrent callers;
+        closing this stream only stops following it, so a client disconnect
+        never interrupts a running terraform destroy.
+
+        Yields:
+            Progress events: one "destroy_started" and "destroy_finished" per
+            deployment, "destroy_output" per Terraform line, and a final
+            "destroy_summary"
+        """
+        if self._sweep is None or self._sweep.done:
+            sweep = DestroySweep()
+            sweep.task = asyncio.get_running_loop().create_task(self._run_sweep(sweep))
+            self._sweep = sweep
+
+        async for event in self._sweep.follow():
+            yield event
+
+    async def _run_sweep(self, sweep: DestroySweep) -> None:
+        try:
+            async for event in self._destroy_expired():
+                sweep.publish(event)
+        except Exception as e:
+            logger.warning("Destroying expired deployments failed: %s", e)
+            sweep.finish(e)
+        except asyncio.CancelledError:
+            sweep.finish(RuntimeError("Destroying expired deployments was cancelled"))
+            raise
+        else:
+            sweep.finish()
+
+    async def _destroy_expired(self) -> AsyncGenerator[Dict[str, Any], None]:
+        """Run the teardown, destroy_concurrency deployments at a time"""
+        now = time.time()
+        expired = [
+            workspace for workspace in await self.list_workspaces()
+            if workspace.expires_at and workspace.expires_at <= now
+            and workspace.has_resources and not workspace.live
+        ]
+        events: asyncio.Queue = asyncio.Queue()
+        semaphore = asyncio.Semaphore(self.destroy_concurrency)
+        total = len(expired)
+        results: Dict[str, str] = {}
+
+        async def worker(workspace: WorkspaceInfo) -> None:
+            # Each worker is its own task, so this only tags its logs and spans
+            bind_deployment_id(workspace.deployment_id)
+            async with semaphore:
+                await events.put({
+                    "type": "destroy_started",
+                    "deployment_id": workspace.deployment_id,
+                    "completed": len(results),
+                    "total": total
+                })
+                try:
+                    async with self.store.hold_lock(f"workspace:{workspace.deployment_id}"):
+                        status = await self._destroy(workspace, events)
+                except LockBusyError:
+                    status = "busy"
+                except Exception as e:
+                    logger.warning("Destroying %s failed: %s", workspace.deployment_id, e)
+                    status = "failed"
+                results[workspace.deployment_id] = status
+                if status != "busy":
+                    observe_workspace_gc("destroyed" if status == "destroyed" else "destroy_failed", 0)
+                await events.put({
+                    "type": "destroy_finished",
+                    "deployment_id": workspace.deployment_id,
+                    "status": status,
+                    "completed": len(results),
+                    "total": total
+                })
+
+        with start_span("workspaces.destroy_expired", {"workspaces.expired": total}):
+            tasks = [asyncio.create_task(worker(workspace)) for workspace in expired]
+            try:
+                while len(results) < total or not events.empty():
+                    yield await events.get()
+            finally:
+                for task in tasks:
+                    task.cancel()
+                await asyncio.gather(*tasks, return_exceptions=True)
+
+        yield {
+            "type": "destroy_summary",
+            "destroyed": sorted(d for d, status in results.items() if status == "destroyed"),
+            "failed": sorted(d for d, status in results.items() if status == "failed"),
+            "busy": sorted(d for d, status in results.items() if status == "busy"),
+            "total": total
+        }
+
+    async def _destroy(self, workspace: WorkspaceInfo, events: asyncio.Queue) -> str:
+        """Destroy one deployment, re-initializing compacted workspaces first"""
+        path = Path(workspace.path)
+        log = self.log_capture.open(workspace.deployment_id)
+        try:
+            commands = []
+            if workspace.compacted:
+                commands.append(("init", self.terraform_service.terraform_init))
+            commands.append(("destroy", self.terraform_service.terraform_destroy))
+
+            for name, command in commands:
+                log.write(f"$ terraform {name}")
+                async for line in command(path):
+                    log.write(line)
+                    await events.put({
+                        "type": "destroy_output",
+                        "deployment_id": workspace.deployment_id,
+                        "line": line
+                    })
+        except TerraformCommandError as e:
+            logger.warning("Destroying %s: %s", workspace.deployment_id, e)
+        finally:
+            await self.log_capture.close(workspace.deployment_id)
+
+        # Success is judged by the state, not by parsing Terraform's output
+        if await asyncio.to_thread(has_managed_resources, path / "terraform.tfstate"):
+            return "failed"
+        await asyncio.to_thread((path / LIFECYCLE_FILE).unlink, True)
+        await self.catalog.record(workspace.deployment_id, "destroyed")
+        return "destroyed"
+
+    async def backfill_catalog(self) -> int:
+        """
+        Add workspaces created before the deployment catalog existed
+
+        Only names, modification times and state files are read, so this
+        stays cheap for large workspace directories.
+
+        Returns:
+            Number of deployments added to the catalog
+        """
+        def scan() -> List[Dict[str, Any]]:
+            deployments = []
+            for entry in os.scandir(self.workspace_dir):
+                if entry.name.startswith(".") or not entry.is_dir(follow_symlinks=False):
+                    continue
+                path = Path(entry.path)
+                deployments.append({
+                    "deployment_id": entry.name,
+                    "status": "completed" if has_managed_resources(path / "terraform.tfstate") else "unknown",
+                    "created_at": entry.stat(follow_symlinks=False).st_mtime
+                })
+            return deployments
+
+        added = await self.catalog.backfill(await asyncio.to_thread(scan))
+        if added:
+            logger.info("Added %d existing workspaces to the deployment catalog", added)
+        return added
+
+    def start(self) -> None:
+        """Backfill the catalog, then run collection and expired teardown every interval_seconds"""
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self) -> None:
+        for task in (self._task, self._sweep.task if self._sweep else None):
+            if task:
+                task.cancel()
+                try:
+                    await task
+                except asyncio.CancelledError:
+                    pass
+        self._task = None
+        self._sweep = None
+
+    async def _run(self) -> None:
+        try:
+            await self.backfill_catalog()
+        except Exception as e:
+            logger.warning("Deployment catalog backfill failed: %s", e)
+
+        while self.interval > 0:
+            await asyncio.sleep(self.interval)
+            try:
+                # The lease outlives the run, so one worker collects per interval
+                if not await self.store.acquire_lock("workspace-gc", WORKER_ID, self.interval * 0.9):
+                    continue
+                async for event in self.destroy_expired():
+                    if event["type"] == "destroy_finished":
+                        logger.info("Ephemeral deployment %s: %s", event["deployment_id"], event["status"])
+                report = await self.collect()
+                logger.info(
+                    "Workspace collection freed %d bytes (%d compacted, %d deleted)",
+                    report["freed_bytes"], len(report["compacted"]), len(report["deleted"])
+                )
+            except Exception as e:
+                logger.warning("Workspace collection failed: %s", e)
+
+
+def workspace_summary(workspace: WorkspaceInfo) -> Dict[str, Any]:
+    """JSON-friendly view of a workspace"""
+    summary = asdict(workspace)
+    summary.pop("path")
+    summary["compacted"] = workspace.compacted
+    return summary
+
+
+# Singleton instance
+_workspace_lifecycle_service: Optional[WorkspaceLifecycleService] = None
+
+
+def get_workspace_lifecycle_service() -> WorkspaceLifecycleService:
+    """Get or create the workspace lifecycle service singleton"""
+    global _workspace_lifecycle_service
+    if _workspace_lifecycle_service is None:
+        _workspace_lifecycle_service = WorkspaceLifecycleService(
+            get_terraform_service(),
+            get_log_capture_service(),
+            get_session_store(),
+            get_deployment_catalog(),
+            max_age_days=float(os.getenv("WORKSPACE_MAX_AGE_DAYS", "30")),
+            compact_after_hours=float(os.getenv("WORKSPACE_COMPACT_AFTER_HOURS", "24")),
+            quota_bytes=int(float(os.getenv("WORKSPACE_QUOTA_GB", "0")) * 1024 ** 3),
+            destroy_concurrency=int(os.getenv("WORKSPACE_DESTROY_CONCURRENCY", "2")),
+            interval_seconds=float(os.getenv("WORKSPACE_GC_INTERVAL_SECONDS", "3600"))
+        )
+    return _workspace_lifecycle_service
@@ -3,15 +3,104 @@ from .prompts import (
     REQUIREMENTS_ANALYSIS_PROMPT,
     ARCHITECTURE_DESIGN_PROMPT,
     IAC_GENERATION_PROMPT,
+    CONVERSATION_SUMMARY_PROMPT,
+    JSON_SYNTAX_REPAIR_PROMPT,
+    OUTPUT_REPAIR_PROMPT,
+    TERRAFORM_REPAIR_PROMPT,
     DEPLOYMENT_PROMPT,
     ORCHESTRATOR_SYSTEM_PROMPT
 )
+from .metrics import (
+    observe_stage,
+    observe_llm_call,
+    observe_llm_route,
+    observe_llm_repair,
+    observe_llm_retry,
+    observe_llm_hedge,
+    observe_llm_quota_wait,
+    set_llm_quota_queue,
+    observe_terraform_command,
+    observe_preflight,
+    observe_workspace_gc,
+    observe_admission,
+    observe_admission_wait,
+    set_admission_in_flight,
+    observe_warmup,
+    observe_log_dropped,
+    observe_drift_sweep,
+    observe_drift_checks,
+    set_drift_resources,
+    observe_gcp_call,
+    render_metrics
+)
+from .logging_config import (
+    TERRAFORM_OUTPUT_LOGGER,
+    OutputSampler,
+    configure_logging,
+    shutdown_logging
+)
+from .loop_monitor import EventLoopMonitor, get_event_loop_monitor
+from .context import (
+    get_session_id,
+    get_deployment_id,
+    get_tenant_id,
+    bind_session_id,
+    bind_deployment_id,
+    bind_tenant_id
+)
+from .tracing import (
+    configure_tracing,
+    start_span,
+    set_span_attributes,
+    record_span_error
+)
 
 __all__ = [
     "ConversationState",
     "REQUIREMENTS_ANALYSIS_PROMPT",
     "ARCHITECTURE_DESIGN_PROMPT",
     "IAC_GENERATION_PROMPT",
+    "CONVERSATION_SUMMARY_PROMPT",
+    "JSON_SYNTAX_REPAIR_PROMPT",
+    "OUTPUT_REPAIR_PROMPT",
+    "TERRAFORM_REPAIR_PROMPT",
     "DEPLOYMENT_PROMPT",
-    "ORCHESTRATOR_SYSTEM_PROMPT"
+    "ORCHESTRATOR_SYSTEM_PROMPT",
+    "observe_stage",
+    "observe_llm_call",
+    "observe_llm_route",
+    "observe_llm_repair",
+    "observe_llm_retry",
+    "observe_llm_hedge",
+    "observe_llm_quota_wait",
+    "set_llm_quota_queue",
+    "observe_terraform_command",
+    "observe_preflight",
+    "observe_workspace_gc",
+    "observe_admission",
+    "observe_admission_wait",
+    "set_admission_in_flight",
+    "observe_warmup",
+    "observe_log_dropped",
+    "observe_drift_sweep",
+    "observe_drift_checks",
+    "set_drift_resources",
+    "observe_gcp_call",
+    "render_metrics",
+    "TERRAFORM_OUTPUT_LOGGER",
+    "OutputSampler",
+    "configure_logging",
+    "shutdown_logging",
+    "EventLoopMonitor",
+    "get_event_loop_monitor",
+    "get_session_id",
+    "get_deployment_id",
+    "get_tenant_id",
+    "bind_session_id",
+    "bind_deployment_id",
+    "bind_tenant_id",
+    "configure_tracing",
+    "start_span",
+    "set_span_attributes",
+    "record_span_error"
 ]
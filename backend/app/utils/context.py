@@ -0,0 +1,37 @@
+"""Request-scoped context (session, deployment and tenant ids) shared via contextvars"""
+from contextvars import ContextVar, Token
+from typing import Optional
+
+session_id_var: ContextVar[Optional[str]] = ContextVar("session_id", default=None)
+deployment_id_var: ContextVar[Optional[str]] = ContextVar("deployment_id", default=None)
+tenant_id_var: ContextVar[Optional[str]] = ContextVar("tenant_id", default=None)
+
+
+def get_session_id() -> Optional[str]:
+    """Session id of the chat currently being processed"""
+    return session_id_var.get()
+
+
+def get_deployment_id() -> Optional[str]:
+    """Deployment id of the chat currently being processed"""
+    return deployment_id_var.get()
+
+
+def get_tenant_id() -> Optional[str]:
+    """Tenant the chat currently being processed belongs to, if known"""
+    return tenant_id_var.get()
+
+
+def bind_session_id(session_id: Optional[str]) -> Token:
+    """Bind the session id for the current context"""
+    return session_id_var.set(session_id)
+
+
+def bind_deployment_id(deployment_id: Optional[str]) -> Token:
+    """Bind the deployment id for the current context"""
+    return deployment_id_var.set(deployment_id)
+
+
+def bind_tenant_id(tenant_id: Optional[str]) -> Token:
+    """Bind the tenant id for the current context"""
+    return tenant_id_var.set(tenant_id)
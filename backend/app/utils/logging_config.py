@@ -0,0 +1,202 @@
+"""Structured JSON logging with all I/O on a background thread"""
+import os
+import sys
+import json
+import queue
+import atexit
+import logging
+import logging.handlers
+from datetime import datetime, timezone
+from typing import Any, Dict, Optional
+
+from opentelemetry import trace
+
+from .context import get_session_id, get_deployment_id, get_tenant_id
+from .metrics import observe_log_dropped
+
+# Logger for individual lines of Terraform output, sampled by OutputSampler
+TERRAFORM_OUTPUT_LOGGER = "app.terraform.output"
+
+# Attributes every LogRecord has; anything else was passed through `extra`
+_RECORD_ATTRIBUTES = set(vars(logging.makeLogRecord({}))) | {"message", "asctime", "taskName"}
+_CONTEXT_FIELDS = ("session_id", "deployment_id", "tenant_id", "trace_id", "span_id")
+
+_listener: Optional[logging.handlers.QueueListener] = None
+
+
+class ContextFilter(logging.Filter):
+    """
+    Stamps records with the session, deployment and tenant ids and the
+    current trace, read from contextvars on the calling thread (handler
+    filters run there, before the record is queued)
+    """
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        record.session_id = get_session_id()
+        record.deployment_id = get_deployment_id()
+        record.tenant_id = get_tenant_id()
+
+        span_context = trace.get_current_span().get_span_context()
+        if span_context.is_valid:
+            record.trace_id = format(span_context.trace_id, "032x")
+            record.span_id = format(span_context.span_id, "016x")
+        return True
+
+
+class OutputSampler:
+    """
+    Samples the lines of one high-volume output stream, e.g. a Terraform command
+
+    The first `first` lines are kept, then one in `every`. The decision is
+    made before logging, so no LogRecord is built for a dropped line.
+    Warnings and errors should be logged without asking the sampler.
+    """
+
+    def __init__(self, first: Optional[int] = None, every: Optional[int] = None):
+        self.first = first if first is not None else int(os.getenv("LOG_SAMPLE_FIRST", "50"))
+        self.every = max(1, every if every is not None else int(os.getenv("LOG_SAMPLE_EVERY", "100")))
+        self.count = 0
+        self.dropped = 0
+
+    def sample_rate(self) -> int:
+        """Weight of the next line if it is kept (1 or every), 0 if it is dropped"""
+        self.count += 1
+        if self.count <= self.first:
+            return 1
+        if (self.count - self.first) % self.every == 0:
+            return self.every
+        self.dropped += 1
+        return 0
+
+    def close(self) -> None:
+        """Count the dropped lines in the metrics"""
+        if self.dropped:
+            observe_log_dropped("sampled", self.dropped)
+            self.dropped = 0
+
+
+class NonBlockingQueueHandler(logging.handlers.QueueHandler):
+    """
+    Hands records to the listener thread without ever waiting
+
+    Only the message is rendered on the calling thread; when the queue is
+    full the record is dropped and counted instead of blocking the event
+    loop (and with it SSE delivery).
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record.message = record.getMessage()
+        record.msg = record.message
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            observe_log_dropped("queue_full")
+
+
+class _QueueListener(logging.handlers.QueueListener):
+    def enqueue_sentinel(self) -> None:
+        # Wait for room at shutdown instead of failing on a full queue
+        self.queue.put(self._sentinel)
+
+
+class JSONFormatter(logging.Formatter):
+    """One JSON object per line"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry: Dict[str, Any] = {
+            "timestamp": datetime.fromtimestamp(record.created, timezone.utc).isoformat(),
+            "level": record.levelname.lower(),
+            "logger": record.name,
+            "message": record.getMessage()
+        }
+        for field in _CONTEXT_FIELDS:
+            value = getattr(record, field, None)
+            if value is not None:
+                entry[field] = value
+
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRIBUTES and key not in _CONTEXT_FIELDS:
+                entry[key] = value
+
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            entry["exception"] = record.exc_text
+
+        return json.dumps(entry, default=str)
+
+
+def _create_sink() -> logging.Handler:
+    sink = os.getenv("LOG_SINK", "stdout").lower()
+    if sink == "stdout":
+        return logging.StreamHandler(sys.stdout)
+    if sink == "stderr":
+        return logging.StreamHandler(sys.stderr)
+    if sink == "file":
+        return logging.handlers.RotatingFileHandler(
+            os.getenv("LOG_FILE", "./logs/backend.jsonl"),
+            maxBytes=int(float(os.getenv("LOG_FILE_MAX_MB", "100")) * 2 ** 20),
+            backupCount=int(os.getenv("LOG_FILE_BACKUPS", "5")),
+            encoding="utf-8"
+        )
+    raise ValueError(f"Unknown LOG_SINK: {sink}")
+
+
+def configure_logging() -> None:
+    """
+    Route all logging through a queue to a sink on a background thread
+
+    Environment settings:
+        LOG_LEVEL          - root level (default INFO)
+        LOG_FORMAT         - json (default) or text
+        LOG_SINK           - stdout (default), stderr or file
+        LOG_FILE           - path for the file sink, rotated at LOG_FILE_MAX_MB
+        LOG_QUEUE_SIZE     - records buffered before new ones are dropped
+        LOG_SAMPLE_FIRST   - Terraform output lines kept per command in full
+        LOG_SAMPLE_EVERY   - then one in this many lines is kept (see OutputSampler)
+    """
+    global _listener
+    if _listener is not None:
+        return
+
+    sink = _create_sink()
+    if isinstance(sink, logging.FileHandler):
+        os.makedirs(os.path.dirname(os.path.abspath(sink.baseFilename)), exist_ok=True)
+    if os.getenv("LOG_FORMAT", "json").lower() == "text":
+        sink.setFormatter(logging.Formatter(
+            "%(asctime)s %(levelname)s %(name)s [%(session_id)s %(deployment_id)s] %(message)s"
+        ))
+    else:
+        sink.setFormatter(JSONFormatter())
+
+    records: queue.Queue = queue.Queue(maxsize=int(os.getenv("LOG_QUEUE_SIZE", "10000")))
+    handler = NonBlockingQueueHandler(records)
+    # Filters run on the calling thread, where the contextvars are set
+    handler.addFilter(ContextFilter())
+
+    root = logging.getLogger()
+    for existing in root.handlers[:]:
+        root.removeHandler(existing)
+    root.addHandler(handler)
+    root.setLevel(os.getenv("LOG_LEVEL", "INFO").upper())
+
+    _listener = _QueueListener(records, sink)
+    _listener.start()
+    atexit.register(shutdown_logging)
+
+
+def shutdown_logging() -> None:
+    """Write out queued records and stop the background thread"""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        for handler in _listener.handlers:
+            handler.close()
+        _listener = None
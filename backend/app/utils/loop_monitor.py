@@ -0,0 +1,171 @@
+"""Event loop lag monitor that reports stalls caused by blocking calls"""
+import asyncio
+import logging
+import os
+import sys
+import threading
+import time
+import traceback
+from typing import Any, Dict, Optional
+from .metrics import observe_loop_lag, record_loop_stall
+
+logger = logging.getLogger(__name__)
+
+
+class EventLoopMonitor:
+    """
+    Samples event loop latency and reports stalls above a threshold
+
+    A heartbeat task measures how late the loop wakes up from a short sleep.
+    A watchdog thread notices when the heartbeat stops beating and captures
+    the stack of the loop thread, i.e. the code that is blocking the loop.
+    """
+
+    def __init__(
+        self,
+        interval: float = 0.1,
+        stall_threshold: float = 0.25
+    ):
+        self.interval = interval
+        self.stall_threshold = stall_threshold
+
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._loop_thread_id: Optional[int] = None
+        self._heartbeat_task: Optional[asyncio.Task] = None
+        self._watchdog: Optional[threading.Thread] = None
+        self._stopping = threading.Event()
+        self._last_beat = time.monotonic()
+
+        self.last_lag = 0.0
+        self.recent_lag = 0.0      # exponentially weighted, for load shedding
+        self.max_lag = 0.0
+        self.stall_count = 0
+
+    @property
+    def running(self) -> bool:
+        return self._heartbeat_task is not None and not self._heartbeat_task.done()
+
+    def start(self) -> None:
+        """Start monitoring the running event loop"""
+        if self.running:
+            return
+
+        self._loop = asyncio.get_running_loop()
+        self._loop_thread_id = threading.get_ident()
+        self._last_beat = time.monotonic()
+        self._stopping.clear()
+
+        self._heartbeat_task = self._loop.create_task(self._heartbeat())
+        self._watchdog = threading.Thread(
+            target=self._watch,
+            name="event-loop-watchdog",
+            daemon=True
+        )
+        self._watchdog.start()
+
+    async def stop(self) -> None:
+        """Stop monitoring"""
+        self._stopping.set()
+
+        if self._heartbeat_task:
+            self._heartbeat_task.cancel()
+            try:
+                await self._heartbeat_task
+            except asyncio.CancelledError:
+                pass
+            self._heartbeat_task = None
+
+        if self._watchdog:
+            await asyncio.to_thread(self._watchdog.join, self.interval * 2)
+            self._watchdog = None
+
+    def stats(self) -> Dict[str, Any]:
+        """Current lag statistics"""
+        return {
+            "running": self.running,
+            "last_lag_ms": round(self.last_lag * 1000, 2),
+            "recent_lag_ms": round(self.recent_lag * 1000, 2),
+            "max_lag_ms": round(self.max_lag * 1000, 2),
+            "stall_count": self.stall_count,
+            "stall_threshold_ms": round(self.stall_threshold * 1000, 2)
+        }
+
+    async def _heartbeat(self) -> None:
+        """Measure how late the loop resumes from a fixed sleep"""
+        loop = asyncio.get_running_loop()
+
+        while True:
+            expected = loop.time() + self.interval
+            await asyncio.sleep(self.interval)
+            lag = max(0.0, loop.time() - expected)
+
+            self._last_beat = time.monotonic()
+            self.last_lag = lag
+            self.recent_lag = 0.7 * self.recent_lag + 0.3 * lag
+            self.max_lag = max(self.max_lag, lag)
+            observe_loop_lag(lag)
+
+            if lag >= self.stall_threshold:
+                logger.warning(
+                    "Event loop stall ended after %.0f ms",
+                    lag * 1000,
+                    extra={"loop_lag_ms": round(lag * 1000, 2)}
+                )
+
+    def _watch(self) -> None:
+        """Watchdog thread: capture the blocking stack while a stall is ongoing"""
+        reported_beat = None
+
+        while not self._stopping.wait(self.interval / 2):
+            last_beat = self._last_beat
+            stalled_for = time.monotonic() - last_beat - self.interval
+
+            # Report each stall once, while the offending code is still on the stack
+            if stalled_for < self.stall_threshold or reported_beat == last_beat:
+                continue
+
+            reported_beat = last_beat
+            self.stall_count += 1
+            record_loop_stall()
+
+            logger.warning(
+                "Event loop blocked for over %.0f ms in task %s\n%s",
+                stalled_for * 1000,
+                self._current_task_name(),
+                self._loop_stack(),
+                extra={"loop_stalled_ms": round(stalled_for * 1000, 2)}
+            )
+
+    def _current_task_name(self) -> str:
+        """Name of the task currently running on the monitored loop"""
+        try:
+            task = asyncio.current_task(self._loop)
+        except RuntimeError:
+            task = None
+        if task is None:
+            return "<no task>"
+
+        coro = task.get_coro()
+        return f"{task.get_name()} ({getattr(coro, '__qualname__', coro)})"
+
+    def _loop_stack(self) -> str:
+        """Formatted stack of the event loop thread"""
+        frame = sys._current_frames().get(self._loop_thread_id)
+        if frame is None:
+            return "<stack unavailable>"
+        return "".join(traceback.format_stack(frame))
+
+
+# Singleton instance
+_event_loop_monitor: Optional[EventLoopMonitor] = None
+
+
+def get_event_loop_monitor() -> EventLoopMonitor:
+    """Get or create the event loop monitor singleton"""
+    global _event_loop_monitor
+    if _event_loop_monitor is None:
+        _event_loop_monitor = EventLoopMonitor(
+            interval=float(os.getenv("LOOP_MONITOR_INTERVAL_MS", "100")) / 1000,
+            stall_threshold=float(os.getenv("LOOP_STALL_THRESHOLD_MS", "250")) / 1000
+        )
+    return _event_loop_monitor
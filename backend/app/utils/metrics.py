@@ -0,0 +1,357 @@
+"""Prometheus metrics for agent stages, LLM calls, Terraform and GCP APIs"""
+from typing import Optional, Tuple
+from prometheus_client import (
+    Counter,
+    Gauge,
+    Histogram,
+    CONTENT_TYPE_LATEST,
+    generate_latest
+)
+
+# Latency buckets spanning fast API calls up to multi-minute applies
+LATENCY_BUCKETS = (
+    0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 20.0, 30.0, 60.0,
+    120.0, 300.0, 600.0, 1200.0
+)
+
+# Buckets for event loop lag, which should normally stay in the low milliseconds
+LOOP_LAG_BUCKETS = (
+    0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0
+)
+
+# Pre-flight checks take milliseconds; repairs add LLM round trips
+PREFLIGHT_BUCKETS = (
+    0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0
+)
+
+# Size buckets (characters) for prompts and responses
+SIZE_BUCKETS = (
+    256, 1024, 4096, 8192, 16384, 32768, 65536, 131072, 262144
+)
+
+
+# Agent stages
+STAGE_DURATION = Histogram(
+    "vibe_agent_stage_duration_seconds",
+    "Duration of each orchestrator stage",
+    ["stage", "outcome"],
+    buckets=LATENCY_BUCKETS
+)
+
+# Vertex AI
+LLM_REQUEST_DURATION = Histogram(
+    "vibe_llm_request_duration_seconds",
+    "Latency of Vertex AI requests",
+    ["model", "outcome"],
+    buckets=LATENCY_BUCKETS
+)
+LLM_REQUESTS = Counter(
+    "vibe_llm_requests_total",
+    "Vertex AI requests by outcome",
+    ["model", "outcome"]
+)
+LLM_PROMPT_SIZE = Histogram(
+    "vibe_llm_prompt_chars",
+    "Size of prompts sent to Vertex AI in characters",
+    ["model"],
+    buckets=SIZE_BUCKETS
+)
+LLM_RESPONSE_SIZE = Histogram(
+    "vibe_llm_response_chars",
+    "Size of Vertex AI responses in characters",
+    ["model"],
+    buckets=SIZE_BUCKETS
+)
+LLM_TOKENS = Counter(
+    "vibe_llm_tokens_total",
+    "Tokens consumed by Vertex AI requests",
+    ["model", "direction"]
+)
+LLM_REPAIRS = Counter(
+    "vibe_llm_repairs_total",
+    "Repairs of invalid LLM output by kind and outcome",
+    ["template", "kind", "outcome"]
+)
+LLM_RETRIES = Counter(
+    "vibe_llm_retries_total",
+    "Retried Vertex AI requests by error type",
+    ["model", "error"]
+)
+LLM_HEDGES = Counter(
+    "vibe_llm_hedges_total",
+    "Hedged Vertex AI requests by outcome",
+    ["model", "outcome"]
+)
+LLM_ROUTES = Counter(
+    "vibe_llm_route_total",
+    "Model routing decisions and their outcomes per prompt template",
+    ["template", "tier", "model", "outcome"]
+)
+LLM_QUOTA_WAIT = Histogram(
+    "vibe_llm_quota_wait_seconds",
+    "Time Vertex AI requests waited for RPM/TPM quota",
+    ["model"],
+    buckets=PREFLIGHT_BUCKETS
+)
+LLM_QUOTA_REQUESTS = Counter(
+    "vibe_llm_quota_requests_total",
+    "Vertex AI requests by rate limiter outcome",
+    ["model", "outcome"]
+)
+LLM_QUOTA_QUEUE = Gauge(
+    "vibe_llm_quota_queue_depth",
+    "Vertex AI requests waiting for quota",
+    ["model"]
+)
+
+# Terraform
+TERRAFORM_COMMAND_DURATION = Histogram(
+    "vibe_terraform_command_duration_seconds",
+    "Duration of Terraform subcommands",
+    ["command"],
+    buckets=LATENCY_BUCKETS
+)
+TERRAFORM_COMMANDS = Counter(
+    "vibe_terraform_commands_total",
+    "Terraform subcommands by exit code",
+    ["command", "exit_code"]
+)
+IAC_PREFLIGHT_DURATION = Histogram(
+    "vibe_iac_preflight_duration_seconds",
+    "Duration of pre-flight validation of generated Terraform, including repairs",
+    buckets=PREFLIGHT_BUCKETS
+)
+IAC_PREFLIGHT = Counter(
+    "vibe_iac_preflight_total",
+    "Pre-flight validations by outcome",
+    ["outcome"]
+)
+WORKSPACE_GC = Counter(
+    "vibe_workspace_gc_total",
+    "Workspace lifecycle actions",
+    ["action"]
+)
+WORKSPACE_GC_FREED = Counter(
+    "vibe_workspace_gc_freed_bytes_total",
+    "Disk space freed by compacting and deleting workspaces"
+)
+
+# Admission control
+ADMISSIONS = Counter(
+    "vibe_admission_decisions_total",
+    "Admission decisions for chat requests and event streams",
+    ["decision"]
+)
+ADMISSION_QUEUE_WAIT = Histogram(
+    "vibe_admission_queue_wait_seconds",
+    "Time chat pipelines waited in the admission queue",
+    buckets=LATENCY_BUCKETS
+)
+ADMISSION_IN_FLIGHT = Gauge(
+    "vibe_admission_in_flight",
+    "Pipelines, queued chats, applies and event streams in progress",
+    ["resource"]
+)
+
+# Logging
+LOG_RECORDS_DROPPED = Counter(
+    "vibe_log_records_dropped_total",
+    "Log records not written, because they were sampled out or the log queue was full",
+    ["reason"]
+)
+
+# Start-up
+WARMUP_DURATION = Histogram(
+    "vibe_warmup_step_duration_seconds",
+    "Duration of warm-up steps after start-up",
+    ["step", "outcome"],
+    buckets=LATENCY_BUCKETS
+)
+
+# GCP APIs
+GCP_API_DURATION = Histogram(
+    "vibe_gcp_api_duration_seconds",
+    "Latency of GCP API listings",
+    ["operation", "outcome"],
+    buckets=LATENCY_BUCKETS
+)
+GCP_API_CALLS = Counter(
+    "vibe_gcp_api_calls_total",
+    "GCP API listings by outcome",
+    ["operation", "outcome"]
+)
+
+# Drift detection
+DRIFT_SWEEP_DURATION = Histogram(
+    "vibe_drift_sweep_duration_seconds",
+    "Duration of drift sweeps",
+    ["outcome"],
+    buckets=LATENCY_BUCKETS
+)
+DRIFT_CHECKS = Counter(
+    "vibe_drift_checks_total",
+    "Resources visited by drift sweeps, by result (unchanged ones are skipped)",
+    ["result"]
+)
+DRIFT_RESOURCES = Gauge(
+    "vibe_drift_resources",
+    "Tracked resources by drift status",
+    ["status"]
+)
+
+# Event loop
+EVENT_LOOP_LAG = Histogram(
+    "vibe_event_loop_lag_seconds",
+    "Delay between scheduled and actual event loop wake-ups",
+    buckets=LOOP_LAG_BUCKETS
+)
+EVENT_LOOP_STALLS = Counter(
+    "vibe_event_loop_stalls_total",
+    "Event loop stalls above the configured threshold"
+)
+
+
+def observe_stage(stage: str, duration: float, outcome: str) -> None:
+    """Record the duration of an orchestrator stage"""
+    STAGE_DURATION.labels(stage=stage, outcome=outcome).observe(duration)
+
+
+def observe_llm_call(
+    model: str,
+    duration: float,
+    outcome: str,
+    prompt_chars: int = 0,
+    response_chars: int = 0,
+    input_tokens: Optional[int] = None,
+    output_tokens: Optional[int] = None
+) -> None:
+    """Record a single Vertex AI request"""
+    LLM_REQUEST_DURATION.labels(model=model, outcome=outcome).observe(duration)
+    LLM_REQUESTS.labels(model=model, outcome=outcome).inc()
+    LLM_PROMPT_SIZE.labels(model=model).observe(prompt_chars)
+
+    if outcome == "success":
+        LLM_RESPONSE_SIZE.labels(model=model).observe(response_chars)
+
+    if input_tokens:
+        LLM_TOKENS.labels(model=model, direction="input").inc(input_tokens)
+    if output_tokens:
+        LLM_TOKENS.labels(model=model, direction="output").inc(output_tokens)
+
+
+def observe_llm_route(template: str, tier: str, model: str, outcome: str) -> None:
+    """Record a model routing decision and its outcome"""
+    LLM_ROUTES.labels(template=template, tier=tier, model=model, outcome=outcome).inc()
+
+
+def observe_llm_repair(template: str, kind: str, outcome: str) -> None:
+    """Record a repair of invalid LLM output ('syntax' or 'schema')"""
+    LLM_REPAIRS.labels(template=template, kind=kind, outcome=outcome).inc()
+
+
+def observe_llm_retry(model: str, error: str) -> None:
+    """Record a retried Vertex AI request"""
+    LLM_RETRIES.labels(model=model, error=error).inc()
+
+
+def observe_llm_hedge(model: str, outcome: str) -> None:
+    """Record a hedging decision ('won', 'lost', 'budget_exhausted' or 'rate_limited')"""
+    LLM_HEDGES.labels(model=model, outcome=outcome).inc()
+
+
+def observe_llm_quota_wait(model: str, duration: float, outcome: str) -> None:
+    """Record a wait for LLM quota ('immediate', 'queued', 'timeout' or 'cancelled')"""
+    LLM_QUOTA_WAIT.labels(model=model).observe(duration)
+    LLM_QUOTA_REQUESTS.labels(model=model, outcome=outcome).inc()
+
+
+def set_llm_quota_queue(model: str, depth: int) -> None:
+    """Set the number of requests waiting for a model's quota"""
+    LLM_QUOTA_QUEUE.labels(model=model).set(depth)
+
+
+def observe_terraform_command(
+    command: str,
+    duration: float,
+    exit_code: Optional[int]
+) -> None:
+    """Record a Terraform subcommand run (exit_code None means cancelled)"""
+    TERRAFORM_COMMAND_DURATION.labels(command=command).observe(duration)
+    TERRAFORM_COMMANDS.labels(
+        command=command,
+        exit_code="cancelled" if exit_code is None else str(exit_code)
+    ).inc()
+
+
+def observe_preflight(duration: float, outcome: str) -> None:
+    """Record a pre-flight validation ('passed', 'repaired' or 'rejected')"""
+    IAC_PREFLIGHT_DURATION.observe(duration)
+    IAC_PREFLIGHT.labels(outcome=outcome).inc()
+
+
+def observe_workspace_gc(action: str, freed_bytes: int) -> None:
+    """Record a workspace lifecycle action ('compacted', 'deleted', 'destroyed', 'destroy_failed')"""
+    WORKSPACE_GC.labels(action=action).inc()
+    WORKSPACE_GC_FREED.inc(freed_bytes)
+
+
+def observe_admission(decision: str) -> None:
+    """Record an admission decision ('admitted', 'queued', 'shed', 'rejected_queue_full', 'rejected_streams')"""
+    ADMISSIONS.labels(decision=decision).inc()
+
+
+def observe_admission_wait(duration: float) -> None:
+    """Record how long a chat waited in the admission queue"""
+    ADMISSION_QUEUE_WAIT.observe(duration)
+
+
+def set_admission_in_flight(resource: str, value: int) -> None:
+    """Set the current number of pipelines, queued chats, applies or streams"""
+    ADMISSION_IN_FLIGHT.labels(resource=resource).set(value)
+
+
+def observe_log_dropped(reason: str, count: int = 1) -> None:
+    """Record dropped log records ('sampled' or 'queue_full')"""
+    LOG_RECORDS_DROPPED.labels(reason=reason).inc(count)
+
+
+def observe_warmup(step: str, duration: float, outcome: str) -> None:
+    """Record a warm-up step ('done', 'failed' or 'timeout')"""
+    WARMUP_DURATION.labels(step=step, outcome=outcome).observe(duration)
+
+
+def observe_gcp_call(operation: str, duration: float, outcome: str) -> None:
+    """Record a GCP API listing"""
+    GCP_API_DURATION.labels(operation=operation, outcome=outcome).observe(duration)
+    GCP_API_CALLS.labels(operation=operation, outcome=outcome).inc()
+
+
+def observe_drift_sweep(duration: float, outcome: str) -> None:
+    """Record a drift sweep ('success' or 'error')"""
+    DRIFT_SWEEP_DURATION.labels(outcome=outcome).observe(duration)
+
+
+def observe_drift_checks(result: str, count: int) -> None:
+    """Count resources visited by a sweep ('unchanged', 'in_sync', 'drifted', 'missing', 'unknown')"""
+    if count:
+        DRIFT_CHECKS.labels(result=result).inc(count)
+
+
+def set_drift_resources(status: str, count: int) -> None:
+    """Set the number of tracked resources with a drift status"""
+    DRIFT_RESOURCES.labels(status=status).set(count)
+
+
+def observe_loop_lag(lag: float) -> None:
+    """Record a single event loop lag sample"""
+    EVENT_LOOP_LAG.observe(lag)
+
+
+def record_loop_stall() -> None:
+    """Count an event loop stall"""
+    EVENT_LOOP_STALLS.inc()
+
+
+def render_metrics() -> Tuple[bytes, str]:
+    """Render all metrics in the Prometheus text exposition format"""
+    return generate_latest(), CONTENT_TYPE_LATEST
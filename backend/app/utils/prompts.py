@@ -109,6 +109,74 @@ Ensure all Terraform is valid and follows GCP provider syntax.
 """
 
 
+CONVERSATION_SUMMARY_PROMPT = """You maintain a running summary of a conversation about cloud infrastructure requirements.
+
+Current Summary:
+{summary}
+
+New Messages:
+{messages}
+
+Update the summary so it also covers the new messages. Keep every requirement, constraint,
+decision and open question; drop pleasantries, pasted logs and repeated content.
+Keep it under {max_words} words and respond with the updated summary text only.
+"""
+
+
+JSON_SYNTAX_REPAIR_PROMPT = """A JSON document you generated failed to parse.
+
+Parse Error:
+{error}
+
+Lines around the error (characters {start}-{end} of {length}):
+{fragment}
+
+Fix only the JSON syntax of these lines (quoting, escaping, commas, brackets, truncation) without changing the content.
+If the document was truncated, complete it so that it closes every open object and array.
+Respond with the corrected lines only; they replace the lines above verbatim.
+"""
+
+
+OUTPUT_REPAIR_PROMPT = """Some fields of a JSON document you generated failed schema validation.
+
+Fields to fix (JSON path -> current value, null if missing):
+{fragments}
+
+Validation Errors:
+{errors}
+
+Expected Schema for the affected top-level fields:
+{schema}
+
+Respond with a JSON object containing one fix per path listed above:
+{{
+  "fixes": [
+    {{"path": ["field", "key or index"], "value": "corrected value"}}
+  ]
+}}
+
+Only return fixes for the listed paths and keep everything that was valid unchanged.
+"""
+
+
+TERRAFORM_REPAIR_PROMPT = """Terraform files you generated failed pre-flight validation against the Google provider schema.
+
+Errors (file:line: problem):
+{errors}
+
+Files:
+{files}
+
+Fix every error while keeping the rest of each file unchanged.
+Respond with JSON containing the corrected content of each file listed above:
+{{
+  "files": {{
+    "main.tf": "corrected terraform file content..."
+  }}
+}}
+"""
+
+
 DEPLOYMENT_PROMPT = """You are a Deployment Agent responsible for safely deploying GCP infrastructure.
 
 Terraform Configuration:
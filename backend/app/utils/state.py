@@ -6,6 +6,7 @@ class ConversationState(TypedDict):
     """State object that flows through the LangGraph workflow"""
 
     # User input
+    session_id: str
     user_message: str
     conversation_history: List[Dict[str, Any]]
 
@@ -22,6 +23,7 @@ class ConversationState(TypedDict):
     deployment_id: Optional[str]
     deployment_status: Optional[str]
     deployment_logs: Annotated[List[str], add]
+    ttl_hours: Optional[float]    # ephemeral deployments are destroyed after this
 
     # Live Architecture
     gcp_architecture: Optional[Dict[str, Any]]
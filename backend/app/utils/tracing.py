@@ -0,0 +1,118 @@
+"""OpenTelemetry tracing for agents, LLM calls, Terraform and GCP APIs"""
+import os
+import threading
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, Optional, Sequence
+from opentelemetry import trace
+from opentelemetry import context as otel_context
+from opentelemetry.sdk.resources import Resource
+from opentelemetry.sdk.trace import ReadableSpan, TracerProvider
+from opentelemetry.sdk.trace.export import (
+    BatchSpanProcessor,
+    SpanExporter,
+    SpanExportResult
+)
+
+TRACER_NAME = "vibe-devops"
+
+_configured = False
+
+
+class FileSpanExporter(SpanExporter):
+    """Exports finished spans as JSON lines to a local file"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+
+    def export(self, spans: Sequence[ReadableSpan]) -> SpanExportResult:
+        lines = "".join(span.to_json(indent=None) + "\n" for span in spans)
+        try:
+            with self._lock, open(self.path, "a") as f:
+                f.write(lines)
+            return SpanExportResult.SUCCESS
+        except OSError:
+            return SpanExportResult.FAILURE
+
+    def shutdown(self) -> None:
+        pass
+
+
+def configure_tracing() -> None:
+    """
+    Install the global tracer provider based on environment settings
+
+    TRACING_EXPORTER selects the exporter:
+        none (default) - spans are not recorded
+        file           - JSON lines appended to TRACING_FILE
+        otlp           - OTLP/HTTP to OTEL_EXPORTER_OTLP_ENDPOINT (local collector)
+    """
+    global _configured
+    if _configured:
+        return
+    _configured = True
+
+    exporter_name = os.getenv("TRACING_EXPORTER", "none").lower()
+    if exporter_name == "none":
+        return
+
+    if exporter_name == "file":
+        exporter = FileSpanExporter(os.getenv("TRACING_FILE", "./traces.jsonl"))
+    elif exporter_name == "otlp":
+        # Optional dependency: opentelemetry-exporter-otlp-proto-http
+        from opentelemetry.exporter.otlp.proto.http.trace_exporter import OTLPSpanExporter
+        exporter = OTLPSpanExporter(
+            endpoint=os.getenv(
+                "OTEL_EXPORTER_OTLP_ENDPOINT", "http://localhost:4318"
+            ).rstrip("/") + "/v1/traces"
+        )
+    else:
+        raise ValueError(f"Unknown TRACING_EXPORTER: {exporter_name}")
+
+    provider = TracerProvider(
+        resource=Resource.create({"service.name": "vibe-devops-backend"})
+    )
+    provider.add_span_processor(BatchSpanProcessor(exporter))
+    trace.set_tracer_provider(provider)
+
+
+def get_tracer() -> trace.Tracer:
+    """Get the application tracer"""
+    return trace.get_tracer(TRACER_NAME)
+
+
+def set_span_attributes(span: trace.Span, attributes: Dict[str, Any]) -> None:
+    """Set span attributes, skipping unset values"""
+    for key, value in attributes.items():
+        if value is not None:
+            span.set_attribute(key, value)
+
+
+def record_span_error(span: trace.Span, error: BaseException) -> None:
+    """Mark a span as failed for errors that are handled rather than raised"""
+    span.record_exception(error)
+    span.set_status(trace.Status(trace.StatusCode.ERROR, str(error)))
+
+
+@contextmanager
+def start_span(
+    name: str,
+    attributes: Optional[Dict[str, Any]] = None,
+    new_trace: bool = False
+) -> Iterator[trace.Span]:
+    """
+    Start a span as the current span
+
+    Args:
+        name: Span name
+        attributes: Span attributes (None values are skipped)
+        new_trace: Start a fresh trace instead of joining the current one
+
+    Yields:
+        The active span
+    """
+    parent: Optional[otel_context.Context] = otel_context.Context() if new_trace else None
+
+    with get_tracer().start_as_current_span(name, context=parent) as span:
+        set_span_attributes(span, attributes or {})
+        yield span
@@ -0,0 +1,219 @@
+"""Stand-ins for Terraform and the GCP APIs used by the benchmarks"""
+import os
+import sys
+import stat
+import time
+from pathlib import Path
+from typing import Any, AsyncGenerator, Dict, List
+
+from app.services import GCPClientService, PlanDecision
+from app.services import gcp_client, terraform
+
+# Fake `terraform` executable. It prints output shaped like the real CLI with
+# a delay per line and writes a terraform.tfstate on apply.
+#   FAKE_TF_RESOURCES      resources in the plan (default 5)
+#   FAKE_TF_LINE_DELAY_MS  delay between output lines (default 5)
+#   FAKE_TF_STARTUP_MS     process start-up delay (default 50)
+FAKE_TERRAFORM = '''#!{python}
+import json, os, sys, time
+
+resources = int(os.getenv("FAKE_TF_RESOURCES", "5"))
+line_delay = float(os.getenv("FAKE_TF_LINE_DELAY_MS", "5")) / 1000
+time.sleep(float(os.getenv("FAKE_TF_STARTUP_MS", "50")) / 1000)
+addresses = ["google_storage_bucket.bucket_%d" % i for i in range(resources)]
+
+
+def emit(lines):
+    for line in lines:
+        print(line, flush=True)
+        time.sleep(line_delay)
+
+
+command = sys.argv[1] if len(sys.argv) > 1 else ""
+
+if command == "version":
+    print("Terraform v1.7.5")
+elif command == "init":
+    emit([
+        "Initializing the backend...",
+        "Initializing provider plugins...",
+        "- Finding hashicorp/google versions matching \\"~> 5.0\\"...",
+        "- Installing hashicorp/google v5.21.0...",
+        "- Installed hashicorp/google v5.21.0 (signed by HashiCorp)",
+        "Terraform has been successfully initialized!",
+    ])
+    open(".terraform.lock.hcl", "w").write(
+        'provider "registry.terraform.io/hashicorp/google" {{\\n  version = "5.21.0"\\n}}\\n'
+    )
+elif command == "providers" and sys.argv[2:3] == ["schema"]:
+    bucket = {{
+        "attributes": {{
+            "name": {{"type": "string", "required": True}},
+            "location": {{"type": "string", "required": True}},
+            "force_destroy": {{"type": "bool", "optional": True}},
+            "uniform_bucket_level_access": {{"type": "bool", "optional": True, "computed": True}},
+            "labels": {{"type": ["map", "string"], "optional": True}},
+            "self_link": {{"type": "string", "computed": True}},
+        }},
+        "block_types": {{
+            "versioning": {{"nesting_mode": "list", "max_items": 1,
+                           "block": {{"attributes": {{"enabled": {{"type": "bool", "required": True}}}}}}}},
+        }},
+    }}
+    print(json.dumps({{
+        "format_version": "1.0",
+        "provider_schemas": {{
+            "registry.terraform.io/hashicorp/google": {{
+                "resource_schemas": {{"google_storage_bucket": {{"version": 0, "block": bucket}}}},
+                "data_source_schemas": {{}},
+            }}
+        }},
+    }}))
+elif command == "plan":
+    lines = ["Terraform used the selected providers to generate the following execution plan."]
+    for address in addresses:
+        lines += [
+            "  # %s will be created" % address,
+            "  + resource \\"google_storage_bucket\\" \\"%s\\" {{" % address.split(".")[1],
+            "      + location = \\"US-CENTRAL1\\"",
+            "      + name     = (known after apply)",
+            "    }}",
+        ]
+    lines.append("Plan: %d to add, 0 to change, 0 to destroy." % resources)
+    emit(lines)
+    open("tfplan", "w").write("fake plan")
+elif command == "apply":
+    lines = []
+    for address in addresses:
+        lines += [
+            "%s: Creating..." % address,
+            "%s: Still creating... [10s elapsed]" % address,
+            "%s: Creation complete after 11s [id=%s]" % (address, address.replace(".", "-")),
+        ]
+    lines.append("Apply complete! Resources: %d added, 0 changed, 0 destroyed." % resources)
+    emit(lines)
+    state = {{
+        "version": 4,
+        "serial": 1,
+        "outputs": {{"bucket": {{"value": "bucket-0", "type": "string"}}}},
+        "resources": [
+            {{
+                "mode": "managed",
+                "type": "google_storage_bucket",
+                "name": address.split(".")[1],
+                "provider": "provider[\\"registry.terraform.io/hashicorp/google\\"]",
+                "instances": [{{"attributes": {{"name": address.split(".")[1], "location": "US-CENTRAL1"}}}}],
+            }}
+            for address in addresses
+        ],
+    }}
+    json.dump(state, open("terraform.tfstate", "w"))
+elif command == "destroy":
+    emit(["%s: Destroying..." % address for address in addresses]
+         + ["Destroy complete! Resources: %d destroyed." % resources])
+    json.dump({{"version": 4, "serial": 2, "outputs": {{}}, "resources": []}}, open("terraform.tfstate", "w"))
+elif command == "output":
+    print(json.dumps({{"bucket": {{"sensitive": False, "type": "string", "value": "bucket-0"}}}}))
+else:
+    print("Terraform has no command named \\"%s\\"." % command, file=sys.stderr)
+    sys.exit(1)
+'''
+
+
+def install_fake_terraform(bin_dir: Path) -> Path:
+    """Write the fake terraform executable to bin_dir and put it first on PATH"""
+    bin_dir.mkdir(parents=True, exist_ok=True)
+    path = bin_dir / "terraform"
+    path.write_text(FAKE_TERRAFORM.format(python=sys.executable))
+    path.chmod(path.stat().st_mode | stat.S_IXUSR | stat.S_IXGRP | stat.S_IXOTH)
+
+    os.environ["PATH"] = f"{bin_dir}{os.pathsep}{os.environ.get('PATH', '')}"
+    return path
+
+
+class FakeGCPClientService(GCPClientService):
+    """GCP client whose listings return synthetic resources after a delay"""
+
+    def __init__(self, latency_ms: float = 100.0, resources: int = 20):
+        super().__init__()
+        self.project_id = self.project_id or "benchmark-project"
+        self.latency = latency_ms / 1000
+        self.resources = resources
+
+    async def warm_up(self) -> None:
+        """No clients to create"""
+
+    def _fetch_compute_instances(self, zone: str) -> List[Dict]:
+        time.sleep(self.latency)
+        return [
+            {
+                "id": f"instance-{i}",
+                "name": f"instance-{i}",
+                "type": "compute-engine",
+                "status": "running",
+                "machine_type": "e2-small",
+                "zone": zone,
+                "labels": {"managed_by": "vibe-devops"},
+                "created": "2024-01-01T00:00:00Z"
+            }
+            for i in range(self.resources)
+        ]
+
+    def _fetch_all_compute_instances(self) -> List[Dict]:
+        return self._fetch_compute_instances(f"{self.region}-a")
+
+    def _fetch_storage_buckets(self) -> List[Dict]:
+        time.sleep(self.latency)
+        return [
+            {
+                "id": f"bucket-{i}",
+                "name": f"bucket-{i}",
+                "type": "cloud-storage",
+                "status": "running",
+                "location": "US-CENTRAL1",
+                "storage_class": "STANDARD",
+                "labels": {"managed_by": "vibe-devops"},
+                "created": "2024-01-01T00:00:00Z"
+            }
+            for i in range(self.resources)
+        ]
+
+
+def install_fake_gcp_client(latency_ms: float = 100.0, resources: int = 20) -> FakeGCPClientService:
+    """Replace the GCP client singleton with the fake"""
+    gcp_client._gcp_client_service = FakeGCPClientService(latency_ms, resources)
+    return gcp_client._gcp_client_service
+
+
+class ScriptedTerraformService:
+    """In-process Terraform stand-in that replays fixed output lines"""
+
+    def __init__(self, apply_lines: List[str], outputs: Dict[str, Any] = None):
+        self.workspace_dir = Path("benchmark-workspaces")
+        self.apply_lines = apply_lines
+        self.outputs = outputs or {}
+
+    async def terraform_init(self, workspace: Path) -> AsyncGenerator[str, None]:
+        yield "Terraform has been successfully initialized!"
+
+    async def plan_decision(self, workspace: Path) -> PlanDecision:
+        return PlanDecision("full", "")
+
+    async def terraform_plan(self, workspace: Path, decision: PlanDecision = None) -> AsyncGenerator[str, None]:
+        yield f"Plan: {len(self.apply_lines) // 3} to add, 0 to change, 0 to destroy."
+
+    async def terraform_apply(self, workspace: Path) -> AsyncGenerator[str, None]:
+        for line in self.apply_lines:
+            yield line
+
+    async def get_terraform_outputs(self, workspace: Path) -> Dict[str, Any]:
+        return self.outputs
+
+    async def read_state(self, workspace: Path) -> None:
+        return None
+
+
+def install_scripted_terraform(apply_lines: List[str]) -> ScriptedTerraformService:
+    """Replace the Terraform service singleton with the scripted stand-in"""
+    terraform._terraform_service = ScriptedTerraformService(apply_lines)
+    return terraform._terraform_service
@@ -0,0 +1,112 @@
+"""
+Import-time report for the backend
+
+Imports a module in a fresh interpreter with `python -X importtime` and
+reports the total time, the slowest top-level packages (cumulative) and the
+slowest individual modules (self time). With --max-ms the run fails (exit
+code 1) when the import takes longer, so SDKs creeping back onto the import
+path of app.main are caught.
+
+    cd backend
+    python -m benchmarks.import_time                     # report for app.main
+    python -m benchmarks.import_time --max-ms 1000       # fail above 1 s
+    python -m benchmarks.import_time --module app.services --top 10
+"""
+import os
+import sys
+import json
+import argparse
+import subprocess
+from collections import defaultdict
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+
+
+def measure_imports(module: str) -> List[Dict[str, Any]]:
+    """
+    Import a module in a subprocess and parse its -X importtime output
+
+    Returns:
+        One entry per imported module with name, depth, self_us and cumulative_us
+    """
+    env = dict(os.environ)
+    env["PYTHONPATH"] = f"{BACKEND_DIR}{os.pathsep}{env.get('PYTHONPATH', '')}"
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=str(BACKEND_DIR), env=env, capture_output=True, text=True
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"Importing {module} failed:\n{result.stderr[-2000:]}")
+
+    entries = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|", 2)
+        entries.append({
+            "name": name.strip(),
+            "depth": (len(name) - len(name.lstrip())) // 2,
+            "self_us": int(self_us),
+            "cumulative_us": int(cumulative_us)
+        })
+    return entries
+
+
+def build_report(module: str, entries: List[Dict[str, Any]], top: int) -> Dict[str, Any]:
+    """Total import time of module and its slowest packages and modules"""
+    total = next((e["cumulative_us"] for e in entries if e["name"] == module), 0)
+
+    packages: Dict[str, int] = defaultdict(int)
+    for entry in entries:
+        packages[entry["name"].split(".")[0]] += entry["self_us"]
+
+    slowest_packages = sorted(packages.items(), key=lambda item: item[1], reverse=True)[:top]
+    slowest_modules = sorted(entries, key=lambda e: e["self_us"], reverse=True)[:top]
+
+    return {
+        "module": module,
+        "total_ms": round(total / 1000, 1),
+        "modules_imported": len(entries),
+        "packages_ms": {name: round(us / 1000, 1) for name, us in slowest_packages},
+        "modules_ms": {e["name"]: round(e["self_us"] / 1000, 1) for e in slowest_modules}
+    }
+
+
+def print_report(report: Dict[str, Any]) -> None:
+    print(f"import {report['module']}: {report['total_ms']} ms, "
+          f"{report['modules_imported']} modules")
+    print("slowest packages (self time of all their modules):")
+    for name, ms in report["packages_ms"].items():
+        print(f"  {ms:>8.1f} ms  {name}")
+    print("slowest modules (self time):")
+    for name, ms in report["modules_ms"].items():
+        print(f"  {ms:>8.1f} ms  {name}")
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--module", default="app.main", help="Module to import")
+    parser.add_argument("--top", type=int, default=15, help="Entries per list")
+    parser.add_argument("--max-ms", type=float, help="Fail when the import takes longer")
+    parser.add_argument("--output", help="Write the JSON report to this file")
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    args = parse_args(argv)
+    report = build_report(args.module, measure_imports(args.module), args.top)
+
+    print_report(report)
+    if args.output:
+        Path(args.output).write_text(json.dumps(report, indent=2))
+        print(f"report written to {args.output}")
+
+    if args.max_ms is not None and report["total_ms"] > args.max_ms:
+        print(f"FAIL: import took {report['total_ms']} ms (limit {args.max_ms} ms)")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,512 @@
+"""
+End-to-end load test for /api/chat
+
+Starts the backend in a subprocess with stand-ins for everything external
+(the fake LLM backend, a fake `terraform` on PATH and fake GCP listings),
+drives concurrent chat sessions over SSE and writes a JSON report that can be
+compared across commits.
+
+    cd backend
+    python -m benchmarks.load_test --concurrency 20 --sessions 100 --output load.json
+
+With --workers N the server runs N uvicorn workers sharing the session
+store (SQLite in the work directory, or Redis with --session-store redis and
+REDIS_URL); --replay additionally re-reads every session's events through
+/api/sessions/{id}/events, which usually lands on a different worker.
+
+Admission limits apply per worker (ADMISSION_MAX_PIPELINES etc. are passed
+through the environment); sessions that waited in the queue are counted
+under sessions.queued, rejected ones as HTTP 429/503 errors.
+"""
+import os
+import sys
+import json
+import time
+import socket
+import asyncio
+import argparse
+import subprocess
+import tempfile
+from collections import defaultdict
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+import httpx
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+CHAT_MESSAGE = "Deploy a containerized web API on Cloud Run with a private bucket for uploads"
+# Deployment progress the server coalesces, so live and replayed counts differ
+PROGRESS_STATUSES = ("planning", "applying")
+
+
+def is_progress(event: Dict[str, Any]) -> bool:
+    return (
+        event.get("type") == "deployment_status"
+        and (event.get("data") or {}).get("status") in PROGRESS_STATUSES
+    )
+
+
+def percentiles(values: List[float]) -> Dict[str, Optional[float]]:
+    """Nearest-rank percentiles of a sample"""
+    if not values:
+        return {"count": 0, "p50": None, "p90": None, "p99": None, "max": None}
+
+    ordered = sorted(values)
+
+    def rank(q: float) -> float:
+        return round(ordered[min(len(ordered) - 1, int(q * len(ordered)))], 2)
+
+    return {
+        "count": len(ordered),
+        "p50": rank(0.50),
+        "p90": rank(0.90),
+        "p99": rank(0.99),
+        "max": round(ordered[-1], 2)
+    }
+
+
+def read_tree_rss_kb(pid: int) -> Optional[int]:
+    """Resident set size of a process and its descendants in KiB (Linux only)"""
+    total = read_rss_kb(pid)
+    if total is None:
+        return None
+    try:
+        with open(f"/proc/{pid}/task/{pid}/children") as f:
+            children = [int(child) for child in f.read().split()]
+    except OSError:
+        children = []
+    for child in children:
+        total += read_tree_rss_kb(child) or 0
+    return total
+
+
+def read_rss_kb(pid: int) -> Optional[int]:
+    """Resident set size of a process in KiB (Linux only)"""
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1])
+    except OSError:
+        return None
+    return None
+
+
+def parse_histogram(metrics_text: str, name: str) -> Dict[float, float]:
+    """Cumulative bucket counts of an unlabelled Prometheus histogram"""
+    buckets = {}
+    prefix = f'{name}_bucket{{le="'
+    for line in metrics_text.splitlines():
+        if line.startswith(prefix):
+            bound, value = line[len(prefix):].split('"}')
+            buckets[float(bound)] = float(value)
+    return buckets
+
+
+def histogram_quantile(before: Dict[float, float], after: Dict[float, float], q: float) -> Optional[float]:
+    """Upper bucket bound containing quantile q of the samples taken between two scrapes"""
+    counts = {bound: after[bound] - before.get(bound, 0.0) for bound in after}
+    total = counts.get(float("inf"), 0.0)
+    if total <= 0:
+        return None
+
+    for bound in sorted(counts):
+        if counts[bound] >= q * total:
+            return bound
+    return None
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def serve(args: argparse.Namespace) -> None:
+    """Run the app with fakes installed (executed in the server subprocess)"""
+    os.environ.setdefault("LLM_BACKEND", "fake")
+    os.environ["LLM_FAKE_LATENCY_MS"] = str(args.llm_latency_ms)
+    os.environ["LLM_FAKE_LATENCY_JITTER_MS"] = str(args.llm_latency_ms / 4)
+    os.environ.setdefault("TRACING_EXPORTER", "none")
+    os.environ.setdefault("GCP_PROJECT_ID", "benchmark-project")
+
+    os.environ["LOAD_TEST_GCP_LATENCY_MS"] = str(args.gcp_latency_ms)
+    os.environ["SESSION_STORE"] = args.session_store
+
+    from .fakes import install_fake_terraform
+
+    install_fake_terraform(Path.cwd() / "bin")
+
+    import uvicorn
+
+    uvicorn.run(
+        "benchmarks.load_test:create_app",
+        factory=True,
+        workers=args.workers,
+        host="127.0.0.1",
+        port=args.port,
+        log_level="warning"
+    )
+
+
+def create_app():
+    """App factory run in every worker process: installs the fake GCP client"""
+    from .fakes import install_fake_gcp_client
+
+    install_fake_gcp_client(latency_ms=float(os.environ["LOAD_TEST_GCP_LATENCY_MS"]))
+
+    from app.main import app
+    return app
+
+
+class LoadTest:
+    """Drives concurrent chat sessions against a server subprocess"""
+
+    def __init__(self, args: argparse.Namespace):
+        self.args = args
+        self.base_url = f"http://127.0.0.1:{args.port}"
+        self.process: Optional[subprocess.Popen] = None
+        self.rss_samples: List[int] = []
+
+    def start_server(self, workdir: Path) -> None:
+        env = dict(os.environ)
+        env["PYTHONPATH"] = f"{BACKEND_DIR}{os.pathsep}{env.get('PYTHONPATH', '')}"
+        env["FAKE_TF_RESOURCES"] = str(self.args.tf_resources)
+        env["FAKE_TF_LINE_DELAY_MS"] = str(self.args.tf_line_delay_ms)
+
+        self.process = subprocess.Popen(
+            [
+                sys.executable, "-m", "benchmarks.load_test", "--serve",
+                "--port", str(self.args.port),
+                "--llm-latency-ms", str(self.args.llm_latency_ms),
+                "--gcp-latency-ms", str(self.args.gcp_latency_ms),
+                "--workers", str(self.args.workers),
+                "--session-store", self.args.session_store
+            ],
+            cwd=str(workdir),
+            env=env
+        )
+
+    def stop_server(self) -> None:
+        if self.process and self.process.poll() is None:
+            self.process.terminate()
+            try:
+                self.process.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                self.process.kill()
+
+    async def wait_until_ready(self, client: httpx.AsyncClient, timeout: float = 30.0) -> None:
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            if self.process.poll() is not None:
+                raise RuntimeError("Server exited during start-up")
+            try:
+                response = await client.get(f"{self.base_url}/api/health")
+                if response.status_code == 200:
+                    return
+            except httpx.TransportError:
+                pass
+            await asyncio.sleep(0.2)
+        raise RuntimeError("Server did not become ready")
+
+    async def run_session(self, client: httpx.AsyncClient, index: int) -> Dict[str, Any]:
+        """Run one chat session and collect its timings"""
+        result = {
+            "ok": False,
+            "ttfe_ms": None,
+            "duration_ms": None,
+            "events": 0,
+            "stages": {},
+            "resources_ms": [],
+            "replay_ms": None,
+            "queued": False,
+            "error": None
+        }
+        payload = {
+            "content": CHAT_MESSAGE,
+            "metadata": {"session_id": f"load-{index}", "conversation_history": []}
+        }
+        started = time.perf_counter()
+        milestones = 0
+        last_seq = None
+
+        try:
+            async with client.stream("POST", f"{self.base_url}/api/chat", json=payload) as response:
+                if response.status_code != 200:
+                    result["error"] = f"HTTP {response.status_code}"
+                    return result
+
+                async for line in response.aiter_lines():
+                    if not line.startswith("data: "):
+                        continue
+                    data = line[len("data: "):]
+                    if data == "[DONE]":
+                        break
+
+                    if result["ttfe_ms"] is None:
+                        result["ttfe_ms"] = (time.perf_counter() - started) * 1000
+                    result["events"] += 1
+
+                    event = json.loads(data)
+                    last_seq = event.get("seq", last_seq)
+                    if not is_progress(event):
+                        milestones += 1
+                    if event.get("type") == "timing":
+                        result["stages"][event["stage"]] = event["duration_ms"]
+                    elif event.get("type") == "queue":
+                        result["queued"] = True
+                    elif event.get("type") == "error":
+                        result["error"] = event.get("message")
+
+            result["duration_ms"] = (time.perf_counter() - started) * 1000
+
+            if self.args.replay and result["error"] is None:
+                replayed = time.perf_counter()
+                replay_milestones, replay_seq = await self.replay_session(
+                    client, payload["metadata"]["session_id"]
+                )
+                result["replay_ms"] = (time.perf_counter() - replayed) * 1000
+                if replay_milestones != milestones or replay_seq != last_seq:
+                    result["error"] = (
+                        f"Replay returned {replay_milestones} of {milestones} non-progress events, "
+                        f"ending at seq {replay_seq} instead of {last_seq}"
+                    )
+
+            # The dashboard refreshes the resource inventory after a chat
+            for _ in range(self.args.resource_polls):
+                polled = time.perf_counter()
+                response = await client.get(f"{self.base_url}/api/gcp/resources")
+                response.raise_for_status()
+                result["resources_ms"].append((time.perf_counter() - polled) * 1000)
+
+            result["ok"] = result["error"] is None
+        except httpx.HTTPError as e:
+            result["error"] = f"{type(e).__name__}: {e}"
+        finally:
+            if result["duration_ms"] is None:
+                result["duration_ms"] = (time.perf_counter() - started) * 1000
+
+        return result
+
+    async def replay_session(
+        self,
+        client: httpx.AsyncClient,
+        session_id: str
+    ) -> Tuple[int, Optional[int]]:
+        """
+        Replay a session's latest job from /api/sessions
+
+        Returns:
+            Number of non-progress events and the seq of the last event
+        """
+        milestones = 0
+        last_seq = None
+        url = f"{self.base_url}/api/sessions/{session_id}/events"
+        async with client.stream("GET", url) as response:
+            response.raise_for_status()
+            async for line in response.aiter_lines():
+                if not line.startswith("data: ") or line == "data: [DONE]":
+                    continue
+                event = json.loads(line[len("data: "):])
+                last_seq = event.get("seq", last_seq)
+                if not is_progress(event):
+                    milestones += 1
+        return milestones, last_seq
+
+    async def sample_memory(self, stop: asyncio.Event) -> None:
+        while not stop.is_set():
+            rss = read_tree_rss_kb(self.process.pid)
+            if rss is not None:
+                self.rss_samples.append(rss)
+            try:
+                await asyncio.wait_for(stop.wait(), timeout=0.1)
+            except asyncio.TimeoutError:
+                pass
+
+    async def run(self) -> Dict[str, Any]:
+        args = self.args
+        limits = httpx.Limits(max_connections=args.concurrency + 5)
+
+        async with httpx.AsyncClient(timeout=None, limits=limits) as client:
+            await self.wait_until_ready(client)
+
+            # Warm up imports, pools and caches outside the measurement
+            for i in range(args.warmup):
+                await self.run_session(client, -1 - i)
+
+            baseline_rss = read_tree_rss_kb(self.process.pid)
+            lag_before = parse_histogram(
+                (await client.get(f"{self.base_url}/metrics")).text,
+                "vibe_event_loop_lag_seconds"
+            )
+
+            semaphore = asyncio.Semaphore(args.concurrency)
+
+            async def bounded(index: int) -> Dict[str, Any]:
+                async with semaphore:
+                    return await self.run_session(client, index)
+
+            stop = asyncio.Event()
+            sampler = asyncio.create_task(self.sample_memory(stop))
+            started = time.perf_counter()
+            results = await asyncio.gather(*(bounded(i) for i in range(args.sessions)))
+            wall_time = time.perf_counter() - started
+            stop.set()
+            await sampler
+
+            lag_after = parse_histogram(
+                (await client.get(f"{self.base_url}/metrics")).text,
+                "vibe_event_loop_lag_seconds"
+            )
+            health = (await client.get(f"{self.base_url}/api/health")).json()
+
+        return self.report(results, wall_time, baseline_rss, lag_before, lag_after, health)
+
+    def report(
+        self,
+        results: List[Dict[str, Any]],
+        wall_time: float,
+        baseline_rss: Optional[int],
+        lag_before: Dict[float, float],
+        lag_after: Dict[float, float],
+        health: Dict[str, Any]
+    ) -> Dict[str, Any]:
+        args = self.args
+        completed = [result for result in results if result["ok"]]
+
+        stages = defaultdict(list)
+        for result in completed:
+            for stage, duration in result["stages"].items():
+                stages[stage].append(duration)
+
+        errors = defaultdict(int)
+        for result in results:
+            if result["error"]:
+                errors[result["error"][:200]] += 1
+
+        peak_rss = max(self.rss_samples) if self.rss_samples else None
+        per_session_kb = None
+        if baseline_rss is not None and peak_rss is not None:
+            per_session_kb = round(max(0, peak_rss - baseline_rss) / args.concurrency, 1)
+
+        def lag_ms(q: float) -> Optional[float]:
+            bound = histogram_quantile(lag_before, lag_after, q)
+            return None if bound is None else round(bound * 1000, 2)
+
+        return {
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "commit": git_commit(),
+            "config": {
+                "sessions": args.sessions,
+                "concurrency": args.concurrency,
+                "llm_latency_ms": args.llm_latency_ms,
+                "gcp_latency_ms": args.gcp_latency_ms,
+                "tf_resources": args.tf_resources,
+                "tf_line_delay_ms": args.tf_line_delay_ms,
+                "resource_polls": args.resource_polls,
+                "workers": args.workers,
+                "session_store": args.session_store
+            },
+            "sessions": {
+                "completed": len(completed),
+                "failed": len(results) - len(completed),
+                "queued": sum(1 for result in results if result["queued"]),
+                "errors": dict(errors)
+            },
+            "wall_time_s": round(wall_time, 3),
+            "throughput": {
+                "sessions_per_s": round(len(completed) / wall_time, 3),
+                "events_per_s": round(sum(result["events"] for result in results) / wall_time, 1)
+            },
+            "ttfe_ms": percentiles([r["ttfe_ms"] for r in results if r["ttfe_ms"] is not None]),
+            "session_ms": percentiles([r["duration_ms"] for r in completed]),
+            "stages_ms": {stage: percentiles(values) for stage, values in sorted(stages.items())},
+            "gcp_resources_ms": percentiles([ms for r in results for ms in r["resources_ms"]]),
+            "replay_ms": percentiles([r["replay_ms"] for r in results if r["replay_ms"] is not None]),
+            "event_loop": {
+                "lag_p50_ms_upper_bound": lag_ms(0.50),
+                "lag_p99_ms_upper_bound": lag_ms(0.99),
+                "max_lag_ms": health.get("event_loop", {}).get("max_lag_ms"),
+                "stall_count": health.get("event_loop", {}).get("stall_count")
+            },
+            "memory": {
+                "baseline_rss_kb": baseline_rss,
+                "peak_rss_kb": peak_rss,
+                "per_session_kb": per_session_kb
+            }
+        }
+
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=str(BACKEND_DIR), capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def print_summary(report: Dict[str, Any]) -> None:
+    sessions = report["sessions"]
+    print(f"sessions: {sessions['completed']} completed, {sessions['failed']} failed, {sessions['queued']} queued "
+          f"in {report['wall_time_s']}s ({report['throughput']['sessions_per_s']}/s)")
+    print(f"time to first event: {report['ttfe_ms']}")
+    print(f"session duration:    {report['session_ms']}")
+    for stage, stats in report["stages_ms"].items():
+        print(f"  {stage:<24} {stats}")
+    print(f"gcp resources:       {report['gcp_resources_ms']}")
+    if report["replay_ms"]["count"]:
+        print(f"event replay:        {report['replay_ms']}")
+    print(f"event loop: {report['event_loop']}")
+    print(f"memory:     {report['memory']}")
+    for error, count in sessions["errors"].items():
+        print(f"error x{count}: {error}")
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sessions", type=int, default=50, help="Total chat sessions")
+    parser.add_argument("--concurrency", type=int, default=10, help="Concurrent sessions")
+    parser.add_argument("--warmup", type=int, default=1, help="Unmeasured warm-up sessions")
+    parser.add_argument("--llm-latency-ms", type=float, default=500.0, help="Fake LLM latency per call")
+    parser.add_argument("--gcp-latency-ms", type=float, default=100.0, help="Fake GCP listing latency")
+    parser.add_argument("--tf-resources", type=int, default=5, help="Resources in the fake plan")
+    parser.add_argument("--tf-line-delay-ms", type=float, default=5.0, help="Fake terraform delay per line")
+    parser.add_argument("--resource-polls", type=int, default=1, help="GCP resource polls per session")
+    parser.add_argument("--workers", type=int, default=1, help="Uvicorn worker processes")
+    parser.add_argument("--session-store", choices=("sqlite", "redis"), default="sqlite",
+                        help="Session store shared by the workers")
+    parser.add_argument("--replay", action="store_true",
+                        help="Re-read each session's events through /api/sessions")
+    parser.add_argument("--port", type=int, default=0, help="Server port (default: random)")
+    parser.add_argument("--output", help="Write the JSON report to this file")
+    parser.add_argument("--serve", action="store_true", help=argparse.SUPPRESS)
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    args = parse_args(argv)
+    if args.serve:
+        serve(args)
+        return
+
+    args.port = args.port or free_port()
+    load_test = LoadTest(args)
+
+    with tempfile.TemporaryDirectory(prefix="vibe-load-") as workdir:
+        load_test.start_server(Path(workdir))
+        try:
+            report = asyncio.run(load_test.run())
+        finally:
+            load_test.stop_server()
+
+    print_summary(report)
+    if args.output:
+        Path(args.output).write_text(json.dumps(report, indent=2))
+        print(f"report written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,462 @@
+"""
+Microbenchmarks for per-event and per-line hot paths
+
+Each benchmark reports the best per-iteration time over several repeats and
+is compared with benchmarks/baselines.json. The run fails (exit code 1) when
+a benchmark is slower than its baseline by more than the tolerance.
+Baselines are machine-specific, so record them on the machine that runs the
+comparison.
+
+    cd backend
+    python -m benchmarks.microbench                      # compare with baselines
+    python -m benchmarks.microbench --update-baselines   # record new baselines
+    python -m benchmarks.microbench -k json              # run matching benchmarks only
+"""
+import os
+import sys
+import json
+import time
+import asyncio
+import argparse
+import tempfile
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+BASELINES_FILE = Path(__file__).resolve().parent / "baselines.json"
+
+# name -> factory returning a zero-argument callable (sync or async) to time
+BENCHMARKS: Dict[str, Callable[[], Callable]] = {}
+
+
+def benchmark(name: str):
+    """Register a benchmark factory"""
+    def decorator(factory: Callable[[], Callable]) -> Callable[[], Callable]:
+        BENCHMARKS[name] = factory
+        return factory
+    return decorator
+
+
+def make_terraform_config(files: int, lines_per_file: int) -> Dict[str, Any]:
+    """A large IaC agent response"""
+    body = "\n".join(
+        f'resource "google_storage_bucket" "bucket_{i}" {{ name = "bucket-{i}" location = "US" }}'
+        for i in range(lines_per_file)
+    )
+    return {
+        "files": {f"module_{n}.tf": body for n in range(files)},
+        "variables": {"region": "us-central1"},
+        "outputs": {},
+        "summary": "Generated configuration"
+    }
+
+
+def make_resources(count: int) -> List[Dict[str, Any]]:
+    """Architecture plan resources cycling through the costed types"""
+    templates = [
+        ("cloud-run", {"memory": "512Mi", "cpu": "1"}),
+        ("compute-engine", {"instance_type": "e2-medium"}),
+        ("cloud-sql", {"tier": "db-g1-small"}),
+        ("cloud-storage", {"storage_gb": 100, "storage_class": "nearline"}),
+        ("memorystore", {"tier": "basic"})
+    ]
+    return [
+        {
+            "type": templates[i % len(templates)][0],
+            "name": f"resource-{i}",
+            "config": dict(templates[i % len(templates)][1]),
+            "estimated_monthly_cost": 10.0
+        }
+        for i in range(count)
+    ]
+
+
+@benchmark("sse_framing_10k_events")
+def bench_sse_framing():
+    from app.api.streaming import create_sse_stream
+
+    events = [
+        {
+            "type": "deployment_status",
+            "agent_id": "deployment",
+            "status": "applying",
+            "progress": 60 + i / 1000,
+            "logs": [f"google_storage_bucket.bucket_{j}: Creating..." for j in range(10)],
+            "timestamp": "2024-01-01T00:00:00"
+        }
+        for i in range(10_000)
+    ]
+
+    async def generate():
+        for event in events:
+            yield event
+
+    async def run():
+        async for _ in create_sse_stream(generate()):
+            pass
+
+    return run
+
+
+@benchmark("json_extract_fenced_1mb")
+def bench_json_fenced():
+    from app.services.vertex_ai import extract_json_block, parse_json_response
+
+    response = "```json\n" + json.dumps(make_terraform_config(10, 1000), indent=2) + "\n```"
+
+    def run():
+        parse_json_response(extract_json_block(response))
+
+    return run
+
+
+@benchmark("json_extract_unfenced_1mb")
+def bench_json_unfenced():
+    from app.services.vertex_ai import extract_json_block, parse_json_response
+
+    # Prose around the JSON forces the regex fallback
+    response = (
+        "Here is the Terraform configuration you asked for:\n"
+        + json.dumps(make_terraform_config(10, 1000), indent=2)
+        + "\nLet me know if you need any changes."
+    )
+
+    def run():
+        parse_json_response(extract_json_block(response))
+
+    return run
+
+
+@benchmark("deploy_events_10k_apply_lines")
+def bench_deploy_events():
+    from .fakes import install_scripted_terraform
+    from app.agents import DeploymentAgent
+
+    apply_lines = []
+    for i in range(10_000 // 3):
+        address = f"google_storage_bucket.bucket_{i}"
+        apply_lines += [
+            f"{address}: Creating...",
+            f"{address}: Still creating... [10s elapsed]",
+            f"{address}: Creation complete after 11s [id={address}]"
+        ]
+    install_scripted_terraform(apply_lines)
+    agent = DeploymentAgent()
+    resources = make_resources(5)
+
+    async def run():
+        state = {
+            "deployment_id": "deploy-benchmark",
+            "terraform_config": {"files": {}},
+            "architecture_plan": {"resources": resources, "region": "us-central1"},
+            "project_id": "benchmark-project",
+            "errors": []
+        }
+        async for _ in agent.deploy(state):
+            pass
+
+    return run
+
+
+@benchmark("log_terraform_output_10k_lines")
+def bench_log_terraform_output():
+    import queue
+    import logging
+    from app.utils.logging_config import (
+        TERRAFORM_OUTPUT_LOGGER, ContextFilter, OutputSampler, NonBlockingQueueHandler
+    )
+
+    # Cost on the event loop only: records go to a queue nobody drains
+    records: queue.Queue = queue.Queue(maxsize=1000)
+    handler = NonBlockingQueueHandler(records)
+    handler.addFilter(ContextFilter())
+
+    output_logger = logging.getLogger(f"{TERRAFORM_OUTPUT_LOGGER}.benchmark")
+    output_logger.propagate = False
+    output_logger.setLevel(logging.INFO)
+    output_logger.addHandler(handler)
+    lines = [f"google_storage_bucket.bucket_{i}: Creating..." for i in range(10_000)]
+
+    def run():
+        while not records.empty():
+            records.get_nowait()
+        # As TerraformService._run_command samples each command's output
+        sampler = OutputSampler(first=50, every=100)
+        for line in lines:
+            sample_rate = sampler.sample_rate()
+            if sample_rate == 1:
+                output_logger.info(line, extra={"command": "apply"})
+            elif sample_rate:
+                output_logger.info(line, extra={"command": "apply", "sample_rate": sample_rate})
+        sampler.close()
+
+    return run
+
+
+@benchmark("estimate_cost_10k_resources")
+def bench_estimate_cost():
+    from app.services import GCPClientService
+
+    client = GCPClientService()
+    resources = make_resources(10_000)
+
+    def run():
+        for resource in resources:
+            client.estimate_resource_cost(resource["type"], resource["config"])
+
+    return run
+
+
+@benchmark("build_architecture_500_resources")
+def bench_build_architecture():
+    from .fakes import install_scripted_terraform
+    from app.agents import DeploymentAgent
+
+    install_scripted_terraform([])
+    agent = DeploymentAgent()
+    state = {
+        "deployment_id": "deploy-benchmark",
+        "architecture_plan": {"resources": make_resources(500), "region": "us-central1"},
+        "project_id": "benchmark-project",
+        "region": "us-central1",
+        "current_step": datetime(2024, 1, 1).isoformat()
+    }
+
+    async def run():
+        await agent._build_architecture_from_deployment(state, {})
+
+    return run
+
+
+@benchmark("gcp_architecture_serialize_1k_services")
+def bench_architecture_serialization():
+    from app.models import GCPArchitecture
+
+    services = [
+        {
+            "id": f"service-{i}",
+            "name": f"service-{i}",
+            "type": "cloud-run",
+            "status": "running",
+            "region": "us-central1",
+            "project_id": "benchmark-project",
+            "description": "Benchmark service",
+            "configuration": {"memory": "512Mi", "cpu": "1"},
+            "cost_estimate": {"monthly": 10.0, "breakdown": "cloud-run monthly cost"},
+            "labels": {"deployment_id": "deploy-benchmark", "managed_by": "vibe-devops"},
+            "connections": [f"service-{i + 1}"]
+        }
+        for i in range(1000)
+    ]
+    architecture = GCPArchitecture.model_validate({
+        "id": "deploy-benchmark",
+        "name": "Benchmark",
+        "description": "Benchmark architecture",
+        "project_id": "benchmark-project",
+        "application_stacks": [
+            {
+                "id": f"stack-{n}",
+                "name": f"stack-{n}",
+                "description": "Benchmark stack",
+                "services": services[n * 100:(n + 1) * 100],
+                "primary_service": f"service-{n * 100}",
+                "labels": {},
+                "total_cost": 1000.0,
+                "health_status": "healthy"
+            }
+            for n in range(10)
+        ],
+        "connections": [],
+        "total_cost": 10000.0,
+        "cost_breakdown": {f"stack-{n}": 1000.0 for n in range(10)},
+        "last_refresh": datetime(2024, 1, 1)
+    })
+
+    def run():
+        architecture.model_dump_json()
+
+    return run
+
+
+@benchmark("catalog_list_50k_deployments")
+def bench_catalog_list():
+    from app.services import DeploymentCatalog
+
+    catalog = DeploymentCatalog(str(Path(tempfile.mkdtemp()) / "deployments.db"))
+    statuses = ("completed", "completed", "completed", "failed", "destroyed")
+    asyncio.run(catalog.backfill([
+        {"deployment_id": f"deploy-{i:06d}", "status": statuses[i % len(statuses)], "created_at": 1.7e9 + i * 60}
+        for i in range(50_000)
+    ]))
+
+    async def run():
+        # First page with its total, then a page deep into the listing
+        page = await catalog.list(status=["failed"], limit=50)
+        for _ in range(50):
+            page = await catalog.list(status=["failed"], limit=50, cursor=page["next_cursor"])
+
+    return run
+
+
+@benchmark("drift_sweep_1k_workspaces_unchanged")
+def bench_drift_sweep():
+    from .fakes import FakeGCPClientService
+    from app.services import DriftEngine, SQLiteSessionStore
+
+    workdir = Path(tempfile.mkdtemp())
+    for i in range(1000):
+        workspace = workdir / "outputs" / f"deploy-{i:04d}"
+        workspace.mkdir(parents=True)
+        (workspace / "terraform.tfstate").write_text(json.dumps({
+            "version": 4, "serial": 1, "lineage": "benchmark", "outputs": {},
+            "resources": [
+                {"mode": "managed", "type": "google_compute_instance", "name": "vm",
+                 "instances": [{"attributes": {"name": f"instance-{i}", "zone": "us-central1-a",
+                                               "machine_type": "e2-small", "current_status": "RUNNING",
+                                               "labels": {"managed_by": "vibe-devops"}}}]},
+                {"mode": "managed", "type": "google_storage_bucket", "name": "bucket",
+                 "instances": [{"attributes": {"name": f"bucket-{i}", "location": "US-CENTRAL1",
+                                               "storage_class": "STANDARD",
+                                               "labels": {"managed_by": "vibe-devops"}}}]}
+            ]
+        }))
+
+    engine = DriftEngine(
+        FakeGCPClientService(latency_ms=0, resources=1000),
+        SQLiteSessionStore(str(workdir / "sessions.db")),
+        workdir / "outputs",
+        db_path=str(workdir / "drift.db")
+    )
+    # The first sweep parses every state; the timed ones only compare fingerprints
+    asyncio.run(engine.sweep())
+
+    async def run():
+        await engine.sweep()
+
+    return run
+
+
+@benchmark("parse_state_5k_resources")
+def bench_parse_state():
+    from app.services import parse_state_file, build_services, build_connections
+
+    resources = []
+    for i in range(1000):
+        resources += [
+            {"mode": "managed", "type": "google_service_account", "name": f"sa_{i}",
+             "instances": [{"attributes": {"email": f"sa-{i}@benchmark.iam"}}]},
+            {"mode": "managed", "type": "google_cloud_run_v2_service", "name": f"api_{i}",
+             "instances": [{"attributes": {"name": f"api-{i}", "location": "us-central1"},
+                            "dependencies": [f"google_service_account.sa_{i}"]}]},
+            {"mode": "managed", "type": "google_storage_bucket", "name": f"bucket_{i}",
+             "instances": [{"attributes": {"name": f"bucket-{i}", "location": "US",
+                                           "storage_class": "STANDARD"}}]},
+            {"mode": "managed", "type": "google_storage_bucket_iam_member", "name": f"member_{i}",
+             "instances": [{"attributes": {"role": "roles/storage.objectAdmin"},
+                            "dependencies": [f"google_storage_bucket.bucket_{i}",
+                                             f"google_service_account.sa_{i}"]}]},
+            {"mode": "managed", "type": "google_sql_database_instance", "name": f"db_{i}",
+             "instances": [{"attributes": {"name": f"db-{i}", "region": "us-central1",
+                                           "settings": [{"tier": "db-f1-micro"}]}}]}
+        ]
+    path = Path(tempfile.mkdtemp()) / "terraform.tfstate"
+    path.write_text(json.dumps({"version": 4, "serial": 1, "outputs": {}, "resources": resources}))
+
+    def run():
+        state = parse_state_file(path)
+        build_services(state, "benchmark-project", "us-central1", {})
+        build_connections(state)
+
+    return run
+
+
+def time_benchmark(fn: Callable, loop: asyncio.AbstractEventLoop, repeat: int, min_time: float) -> float:
+    """Best per-iteration time in seconds over `repeat` samples"""
+    is_async = asyncio.iscoroutinefunction(fn)
+
+    def call():
+        if is_async:
+            loop.run_until_complete(fn())
+        else:
+            fn()
+
+    # Warm up, then size each sample to take at least min_time
+    started = time.perf_counter()
+    call()
+    single = max(time.perf_counter() - started, 1e-9)
+    number = max(1, int(min_time / single))
+
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        for _ in range(number):
+            call()
+        best = min(best, (time.perf_counter() - started) / number)
+    return best
+
+
+def load_baselines() -> Dict[str, Any]:
+    if BASELINES_FILE.exists():
+        return json.loads(BASELINES_FILE.read_text())
+    return {"tolerance": 0.25, "benchmarks": {}}
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("-k", dest="pattern", help="Only run benchmarks whose name contains this")
+    parser.add_argument("--repeat", type=int, default=5, help="Samples per benchmark")
+    parser.add_argument("--min-time", type=float, default=0.2, help="Minimum seconds per sample")
+    parser.add_argument("--tolerance", type=float, help="Allowed slowdown (default: from baselines)")
+    parser.add_argument("--update-baselines", action="store_true", help="Store results as baselines")
+    parser.add_argument("--output", help="Write results as JSON to this file")
+    args = parser.parse_args(argv)
+
+    baselines = load_baselines()
+    tolerance = args.tolerance if args.tolerance is not None else baselines.get("tolerance", 0.25)
+    names = [name for name in BENCHMARKS if not args.pattern or args.pattern in name]
+
+    # Services create workspaces and databases relative to the working directory
+    os.environ.setdefault("TRACING_EXPORTER", "none")
+    os.chdir(tempfile.mkdtemp(prefix="vibe-microbench-"))
+
+    loop = asyncio.new_event_loop()
+    results: Dict[str, float] = {}
+    regressions = []
+
+    print(f"{'benchmark':<40} {'time':>12} {'baseline':>12} {'change':>8}")
+    for name in names:
+        seconds = time_benchmark(BENCHMARKS[name](), loop, args.repeat, args.min_time)
+        results[name] = seconds
+
+        baseline = baselines["benchmarks"].get(name)
+        change = ""
+        if baseline:
+            ratio = seconds / baseline - 1
+            change = f"{ratio:+.1%}"
+            if ratio > tolerance:
+                regressions.append(name)
+                change += " !"
+
+        baseline_text = f"{baseline * 1000:.3f}ms" if baseline else "-"
+        print(f"{name:<40} {seconds * 1000:>10.3f}ms {baseline_text:>12} {change:>8}")
+
+    loop.close()
+
+    if args.output:
+        Path(args.output).write_text(json.dumps(results, indent=2))
+
+    if args.update_baselines:
+        baselines["tolerance"] = tolerance
+        baselines["benchmarks"].update({name: round(seconds, 9) for name, seconds in results.items()})
+        BASELINES_FILE.write_text(json.dumps(baselines, indent=2, sort_keys=True) + "\n")
+        print(f"baselines written to {BASELINES_FILE}")
+        return 0
+
+    if regressions:
+        print(f"regressed beyond {tolerance:.0%}: {', '.join(regressions)}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,139 @@
+"""
+Start-up time benchmark for the API server
+
+Starts uvicorn with the app several times and measures, from process start:
+
+- first_response_ms: until `/` answers (the server accepts traffic)
+- health_ms: until `/api/health` answers
+- orchestrator_ready_ms: until the health check reports the agents built
+- ready_ms: until the readiness probe passes (warm-up finished)
+
+The LLM runs on the fake backend, so only the app's own start-up and SDK
+imports are measured, not network round trips.
+
+    cd backend
+    python -m benchmarks.startup --runs 5 --output startup.json
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import subprocess
+import tempfile
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+import httpx
+
+from .load_test import BACKEND_DIR, free_port, git_commit, percentiles
+
+MILESTONES = ("first_response_ms", "health_ms", "orchestrator_ready_ms", "ready_ms")
+
+
+def wait_for(
+    client: httpx.Client,
+    process: subprocess.Popen,
+    url: str,
+    ready=lambda response: True,
+    timeout: float = 60.0
+) -> httpx.Response:
+    """Poll url until it answers 200 and ready(response) holds"""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError("Server exited during start-up")
+        try:
+            response = client.get(url)
+            if response.status_code == 200 and ready(response):
+                return response
+        except httpx.TransportError:
+            pass
+        time.sleep(0.01)
+    raise RuntimeError(f"{url} did not become ready")
+
+
+def measure_startup(workdir: Path) -> Dict[str, float]:
+    """Start the server once and time its start-up milestones"""
+    port = free_port()
+    base_url = f"http://127.0.0.1:{port}"
+    env = dict(os.environ)
+    env["PYTHONPATH"] = f"{BACKEND_DIR}{os.pathsep}{env.get('PYTHONPATH', '')}"
+    env.setdefault("LLM_BACKEND", "fake")
+    env.setdefault("TRACING_EXPORTER", "none")
+    env.setdefault("GCP_PROJECT_ID", "benchmark-project")
+
+    started = time.perf_counter()
+    process = subprocess.Popen(
+        [
+            sys.executable, "-m", "uvicorn", "app.main:app",
+            "--host", "127.0.0.1", "--port", str(port), "--log-level", "warning"
+        ],
+        cwd=str(workdir),
+        env=env
+    )
+
+    def elapsed_ms() -> float:
+        return round((time.perf_counter() - started) * 1000, 1)
+
+    try:
+        with httpx.Client(timeout=5.0) as client:
+            wait_for(client, process, f"{base_url}/")
+            first_response = elapsed_ms()
+            wait_for(client, process, f"{base_url}/api/health")
+            health = elapsed_ms()
+            wait_for(
+                client, process, f"{base_url}/api/health",
+                ready=lambda response: response.json().get("orchestrator") == "ready"
+            )
+            orchestrator_ready = elapsed_ms()
+            wait_for(client, process, f"{base_url}/api/health/ready")
+            ready = elapsed_ms()
+    finally:
+        process.terminate()
+        try:
+            process.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            process.kill()
+
+    return {
+        "first_response_ms": first_response,
+        "health_ms": health,
+        "orchestrator_ready_ms": orchestrator_ready,
+        "ready_ms": ready
+    }
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5, help="Server starts to measure")
+    parser.add_argument("--output", help="Write the JSON report to this file")
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    args = parse_args(argv)
+
+    runs: List[Dict[str, float]] = []
+    with tempfile.TemporaryDirectory(prefix="vibe-startup-") as workdir:
+        for _ in range(args.runs):
+            runs.append(measure_startup(Path(workdir)))
+
+    report: Dict[str, Any] = {
+        "commit": git_commit(),
+        "runs": len(runs),
+        **{
+            milestone: percentiles([run[milestone] for run in runs])
+            for milestone in MILESTONES
+        }
+    }
+
+    for milestone in MILESTONES:
+        print(f"{milestone:<24} {report[milestone]}")
+    if args.output:
+        Path(args.output).write_text(json.dumps(report, indent=2))
+        print(f"report written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+"""Tests for the structural HCL parser"""
+import pytest
+
+from app.services.hcl_parser import HCLSyntaxError, parse_hcl
+
+
+def argument_kind(expression):
+    block = parse_hcl(f'locals {{\n  value = {expression}\n}}\n')[0]
+    return block.attributes["value"].kind
+
+
+def test_blocks_labels_and_nesting():
+    blocks = parse_hcl('''
+resource "google_compute_instance" "vm" {
+  name = "vm"
+
+  boot_disk {
+    initialize_params {
+      image = "debian-cloud/debian-12"
+    }
+  }
+}
+
+variable "region" {}
+''')
+    assert [(block.type, block.labels, block.line) for block in blocks] == [
+        ("resource", ["google_compute_instance", "vm"], 2),
+        ("variable", ["region"], 12),
+    ]
+    boot_disk = blocks[0].blocks[0]
+    assert boot_disk.type == "boot_disk"
+    assert boot_disk.blocks[0].attributes["image"].value == "debian-cloud/debian-12"
+
+
+@pytest.mark.parametrize("expression, kind", [
+    ('"us-central1"', "string"),
+    ('"${var.prefix}-bucket"', "string"),
+    ("<<EOT\nhello\nEOT", "string"),
+    ("10", "number"),
+    ("-1.5", "number"),
+    ("true", "bool"),
+    ("null", "null"),
+    ('["a", "b"]', "list"),
+    ("[[1], [2]]", "list"),
+    ("[]", "list"),
+    ('{ a = 1, b = "x" }', "object"),
+    ("{}", "object"),
+])
+def test_literal_kinds(expression, kind):
+    assert argument_kind(expression) == kind
+
+
+@pytest.mark.parametrize("expression", [
+    '"${var.region}"',
+    "var.region",
+    '["a", "b"][0]',
+    "[for x in var.names : upper(x)]",
+    "[for x in var.names : x][0]",
+    '{ a = 1 }["a"]',
+    "{ for k, v in var.tags : k => v }",
+    "[1] == [1]",
+    'merge({}, { a = 1 })',
+    "var.enabled ? 1 : 0",
+])
+def test_expressions_have_no_literal_kind(expression):
+    assert argument_kind(expression) is None
+
+
+def test_multiline_expressions():
+    block = parse_hcl('''
+resource "google_storage_bucket" "b" {
+  labels = {
+    env = "dev"
+  }
+  cors = [
+    { origin = ["*"] },
+  ]
+}
+''')[0]
+    assert block.attributes["labels"].kind == "object"
+    assert block.attributes["cors"].kind == "list"
+
+
+def test_comments_are_ignored():
+    blocks = parse_hcl('''
+# resource "ignored" "a" {
+// variable "ignored" {}
+/* locals {
+} */
+output "name" {
+  value = "x" # trailing
+}
+''')
+    assert [block.type for block in blocks] == ["output"]
+
+
+@pytest.mark.parametrize("text, line, message", [
+    ('resource "x" "y" {\n  name = "a"\n', 3, "Unclosed block resource"),
+    ('variable "x" {}\n}\n', 2, "Unexpected '}'"),
+    ('locals {\n  a = 1\n  a = 2\n}\n', 3, "defined twice"),
+    ('locals {\n  a = [1, 2\n', 2, "Unclosed '['"),
+    ('locals {\n  a = [1, 2\n}\n', 3, "Unexpected '}'"),
+    ('locals {\n  a = (1]\n}\n', 2, "Unexpected ']'"),
+    ('locals {\n  a = "x\n}\n', 2, ""),
+    ('locals {\n  a = <<EOT\nx\n}\n', 2, "Unterminated heredoc"),
+    ('name = "x"\n', 1, "outside a block"),
+    ('resource "x" "y"\n{\n}\n', 1, "Expected '=' or '{'"),
+])
+def test_syntax_errors(text, line, message):
+    with pytest.raises(HCLSyntaxError) as error:
+        parse_hcl(text)
+    assert error.value.line == line
+    assert message in error.value.message
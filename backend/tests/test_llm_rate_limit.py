@@ -0,0 +1,174 @@
+"""Tests for the quota limiter's budgets and fair queue"""
+import asyncio
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from app.services import llm_rate_limit
+from app.services.llm_rate_limit import QuotaLimiter, estimate_request_tokens
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    # Only the limiter's clock: the event loop keeps real time for timeouts
+    monkeypatch.setattr(llm_rate_limit, "time", SimpleNamespace(
+        monotonic=clock, perf_counter=time.perf_counter
+    ))
+    return clock
+
+
+async def settle_tasks():
+    for _ in range(5):
+        await asyncio.sleep(0)
+
+
+async def enqueue(limiter, granted, flow, tokens=1, timeout=None):
+    """Start an acquire in the background, recording flow in granted once it succeeds"""
+    async def acquire():
+        reservation = await limiter.acquire(flow, tokens, timeout)
+        granted.append(flow)
+        return reservation
+
+    task = asyncio.create_task(acquire())
+    await settle_tasks()
+    return task
+
+
+def test_estimate_counts_prompt_and_output_cap():
+    assert estimate_request_tokens(400, 2048) == 2148
+    assert estimate_request_tokens(401, 0) == 101
+
+
+def test_disabled_limiter_never_waits(clock):
+    limiter = QuotaLimiter("model")
+
+    async def run():
+        return [await limiter.acquire("a", 10_000) for _ in range(100)]
+
+    assert len(asyncio.run(run())) == 100
+    assert not limiter.enabled
+
+
+def test_requests_within_budget_start_immediately(clock):
+    limiter = QuotaLimiter("model", rpm=2)
+
+    async def run():
+        await limiter.acquire("a", 1)
+        await limiter.acquire("a", 1)
+        assert limiter.try_acquire("b", 1) is None
+
+    asyncio.run(run())
+
+
+def test_waiters_are_served_in_fair_order(clock):
+    limiter = QuotaLimiter("model", rpm=2)
+
+    async def run():
+        granted = []
+        await limiter.acquire("a", 1)
+        await limiter.acquire("a", 1)
+        tasks = [await enqueue(limiter, granted, "a") for _ in range(3)]
+        tasks.append(await enqueue(limiter, granted, "b"))
+        assert limiter.queued == 4
+
+        # One request is refilled every 30 seconds
+        for _ in range(4):
+            clock.now += 30
+            limiter._dispatch()
+            await settle_tasks()
+        await asyncio.gather(*tasks)
+        return granted
+
+    # b's first request goes ahead of a's backlog
+    assert asyncio.run(run()) == ["b", "a", "a", "a"]
+
+
+def test_flows_alternate_under_contention(clock):
+    limiter = QuotaLimiter("model", rpm=1)
+
+    async def run():
+        granted = []
+        await limiter.acquire("warm-up", 1)
+        tasks = [await enqueue(limiter, granted, "a") for _ in range(3)]
+        tasks += [await enqueue(limiter, granted, "b") for _ in range(3)]
+        for _ in range(6):
+            clock.now += 60
+            limiter._dispatch()
+            await settle_tasks()
+        await asyncio.gather(*tasks)
+        return granted
+
+    assert asyncio.run(run()) == ["a", "b", "a", "b", "a", "b"]
+
+
+def test_timed_out_waiter_leaves_the_queue_and_gives_back_its_share(clock):
+    limiter = QuotaLimiter("model", rpm=1)
+
+    async def run():
+        await limiter.acquire("a", 1)
+        finish = limiter._flow_finish["a"]
+        with pytest.raises(asyncio.TimeoutError):
+            await limiter.acquire("a", 1, timeout=0.01)
+        assert limiter.queued == 0
+        assert limiter._flow_finish["a"] == finish
+
+    asyncio.run(run())
+
+
+def test_settle_returns_unused_tokens(clock):
+    limiter = QuotaLimiter("model", tpm=100)
+
+    async def run():
+        reservation = await limiter.acquire("a", 100)
+        assert limiter.try_acquire("a", 60) is None
+        limiter.settle(reservation, used_tokens=40)
+        assert limiter.try_acquire("a", 60) is not None
+
+    asyncio.run(run())
+
+
+def test_oversized_request_is_clamped_to_the_budget(clock):
+    limiter = QuotaLimiter("model", tpm=100)
+
+    async def run():
+        return await limiter.acquire("a", 500)
+
+    assert asyncio.run(run()).tokens == 100
+
+
+def test_pause_holds_requests(clock):
+    limiter = QuotaLimiter("model", rpm=10)
+
+    async def run():
+        granted = []
+        limiter.pause(5)
+        task = await enqueue(limiter, granted, "a")
+        assert granted == []
+        clock.now += 5
+        limiter._dispatch()
+        await settle_tasks()
+        await task
+        return granted
+
+    assert asyncio.run(run()) == ["a"]
+
+
+def test_tiers_sharing_a_model_share_a_limiter(monkeypatch):
+    monkeypatch.setenv("VERTEX_AI_RPM", "60")
+    monkeypatch.setenv("VERTEX_AI_FAST_RPM", "600")
+    limiters = llm_rate_limit.quota_limiters({
+        "strong": {"model_name": "gemini"},
+        "fast": {"model_name": "gemini"},
+    })
+    assert list(limiters) == ["gemini"]
+    assert limiters["gemini"].requests.capacity == 60
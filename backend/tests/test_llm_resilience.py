@@ -0,0 +1,159 @@
+"""Tests for LLM retry, deadline and hedging helpers"""
+import asyncio
+
+import pytest
+
+from app.services import vertex_ai
+from app.services.llm_backends import LLMBackend
+from app.services.llm_resilience import HedgeBudget, LatencyTracker, RetryPolicy, is_quota_error, is_retryable
+
+
+class ServiceUnavailable(Exception):
+    pass
+
+
+class ResourceExhausted(Exception):
+    pass
+
+
+class StatusError(Exception):
+    def __init__(self, code):
+        super().__init__(code)
+        self.code = code
+
+
+class FlakyStreamBackend(LLMBackend):
+    """Fails the first `failures` streams before their first chunk, then streams `chunks`"""
+
+    def __init__(self, chunks, failures=0, error=ServiceUnavailable):
+        super().__init__("test-model")
+        self.chunks = chunks
+        self.failures = failures
+        self.error = error
+        self.calls = 0
+
+    async def ainvoke(self, messages, template=None):
+        raise NotImplementedError
+
+    async def astream(self, messages, template=None):
+        self.calls += 1
+        if self.calls <= self.failures:
+            raise self.error("unavailable")
+        for chunk in self.chunks:
+            yield chunk
+
+
+@pytest.fixture
+def service(monkeypatch, tmp_path):
+    monkeypatch.setenv("LLM_BACKEND", "fake")
+    monkeypatch.setenv("LLM_FIXTURES_DIR", str(tmp_path))
+    monkeypatch.setattr(vertex_ai, "get_usage_ledger", lambda: None)
+    service = vertex_ai.VertexAIService()
+    service.retry_policy = RetryPolicy(max_attempts=3, base_delay=0.001, max_delay=0.002)
+
+    async def record_usage(**kwargs):
+        pass
+
+    service._record_usage = record_usage
+    return service
+
+
+def collect(stream):
+    async def run():
+        return [chunk async for chunk in stream]
+    return asyncio.run(run())
+
+
+def test_backoff_is_jittered_and_capped():
+    policy = RetryPolicy(base_delay=1.0, max_delay=4.0)
+    for attempt, ceiling in [(1, 1.0), (2, 2.0), (3, 4.0), (6, 4.0)]:
+        delay = policy.backoff(attempt)
+        assert ceiling / 2 <= delay <= ceiling
+
+
+def test_retryable_errors_match_by_name_and_status():
+    assert is_retryable(ServiceUnavailable())
+    assert is_retryable(TimeoutError())
+    assert is_retryable(StatusError(503))
+    assert not is_retryable(ValueError())
+    assert not is_retryable(StatusError(400))
+
+
+def test_quota_errors():
+    assert is_quota_error(ResourceExhausted())
+    assert is_quota_error(StatusError(429))
+    assert not is_quota_error(ServiceUnavailable())
+
+
+def test_latency_tracker_needs_min_samples():
+    tracker = LatencyTracker(window=10, min_samples=3)
+    tracker.observe(1.0)
+    tracker.observe(3.0)
+    assert tracker.percentile(0.5) is None
+    tracker.observe(2.0)
+    assert tracker.percentile(0.5) == 2.0
+
+
+def test_hedge_budget_is_earned_by_primary_requests():
+    budget = HedgeBudget(ratio=0.5, burst=1.0)
+    assert budget.try_spend()
+    assert not budget.try_spend()
+    budget.earn()
+    assert not budget.try_spend()
+    budget.earn()
+    assert budget.try_spend()
+
+
+def test_stream_retries_until_first_chunk(service):
+    backend = FlakyStreamBackend(["a", "b", "c"], failures=2)
+    service._get_backend = lambda tier: backend
+
+    assert collect(service.stream_response("hello")) == ["a", "b", "c"]
+    assert backend.calls == 3
+
+
+def test_stream_gives_up_after_max_attempts(service):
+    backend = FlakyStreamBackend(["a"], failures=5)
+    service._get_backend = lambda tier: backend
+
+    with pytest.raises(ServiceUnavailable):
+        collect(service.stream_response("hello"))
+    assert backend.calls == 3
+
+
+def test_stream_does_not_retry_permanent_errors(service):
+    backend = FlakyStreamBackend(["a"], failures=1, error=ValueError)
+    service._get_backend = lambda tier: backend
+
+    with pytest.raises(ValueError):
+        collect(service.stream_response("hello"))
+    assert backend.calls == 1
+
+
+def test_stream_settles_every_quota_reservation(service, monkeypatch):
+    backend = FlakyStreamBackend(["a", "b"], failures=1)
+    service._get_backend = lambda tier: backend
+    limiter = service.limiters[service.tiers["strong"]["model_name"]]
+    acquired, settled = [], []
+    acquire, settle = limiter.acquire, limiter.settle
+
+    async def spy_acquire(flow, tokens, timeout=None):
+        reservation = await acquire(flow, tokens, timeout)
+        acquired.append(reservation)
+        return reservation
+
+    def spy_settle(reservation, used_tokens, requests=1):
+        settled.append(reservation)
+        settle(reservation, used_tokens, requests)
+
+    monkeypatch.setattr(limiter, "acquire", spy_acquire)
+    monkeypatch.setattr(limiter, "settle", spy_settle)
+
+    async def run():
+        stream = service.stream_response("hello")
+        assert await stream.__anext__() == "a"
+        await stream.aclose()
+
+    asyncio.run(run())
+    assert len(acquired) == 2
+    assert settled == acquired
@@ -0,0 +1,155 @@
+"""Tests for plan fingerprints and plan decisions"""
+import json
+
+import pytest
+
+from app.services.terraform_plan import PLAN_FILE, decide_plan, record_apply, record_plan, split_blocks
+
+MAIN_TF = '''
+provider "google" {
+  project = "demo"
+}
+
+provider "google" {
+  alias   = "eu"
+  project = "demo"
+  region  = "europe-west1"
+}
+
+locals {
+  prefix = "demo"
+}
+
+resource "google_storage_bucket" "a" {
+  name     = "${local.prefix}-a"
+  location = "US"
+}
+'''
+
+STORAGE_TF = '''
+locals {
+  suffix = "data"
+}
+
+resource "google_storage_bucket" "b" {
+  name     = "demo-b"
+  location = "US"
+}
+
+resource "google_storage_bucket_object" "readme" {
+  bucket  = google_storage_bucket.b.name
+  name    = "README"
+  content = "hello"
+}
+'''
+
+
+def write_state(workspace, serial):
+    (workspace / "terraform.tfstate").write_text(json.dumps({
+        "version": 4,
+        "serial": serial,
+        "lineage": "test",
+        "outputs": {},
+        "resources": []
+    }))
+
+
+def edit(workspace, name, old, new):
+    path = workspace / name
+    text = path.read_text()
+    assert old in text
+    path.write_text(text.replace(old, new))
+
+
+@pytest.fixture
+def workspace(tmp_path):
+    (tmp_path / "main.tf").write_text(MAIN_TF)
+    (tmp_path / "storage.tf").write_text(STORAGE_TF)
+    write_state(tmp_path, 1)
+    record_apply(tmp_path)
+    return tmp_path
+
+
+def test_split_blocks_keys_unlabeled_and_repeated_headers_by_position():
+    blocks = split_blocks(MAIN_TF)
+    assert list(blocks) == [
+        "provider.google",
+        "provider.google#1",
+        "locals#2",
+        "resource.google_storage_bucket.a",
+    ]
+
+
+def test_split_blocks_ignores_braces_in_strings_comments_and_heredocs():
+    text = '''
+# resource "ignored" "comment" {
+resource "null_resource" "a" {
+  triggers = { value = "}" }
+  script   = <<EOT
+  }
+EOT
+}
+/* } */
+variable "region" {}
+'''
+    assert list(split_blocks(text)) == ["resource.null_resource.a", "variable.region"]
+
+
+def test_unchanged_workspace_is_skipped(workspace):
+    assert decide_plan(workspace).action == "skip"
+
+
+def test_saved_plan_is_reused(workspace):
+    edit(workspace, "storage.tf", '"hello"', '"hello again"')
+    decision = decide_plan(workspace)
+    (workspace / PLAN_FILE).write_text("plan")
+    record_plan(workspace, decision)
+
+    reused = decide_plan(workspace)
+    assert reused.action == "reuse"
+    assert reused.targets == decision.targets
+
+
+def test_resource_change_targets_it_and_its_dependents(workspace):
+    edit(workspace, "storage.tf", 'name     = "demo-b"', 'name     = "demo-b2"')
+    decision = decide_plan(workspace)
+    assert decision.action == "targeted"
+    assert decision.targets == [
+        "google_storage_bucket.b",
+        "google_storage_bucket_object.readme",
+    ]
+
+
+def test_locals_change_in_another_file_forces_full_plan(workspace):
+    edit(workspace, "main.tf", 'prefix = "demo"', 'prefix = "prod"')
+    edit(workspace, "storage.tf", 'location = "US"', 'location = "EU"')
+    assert decide_plan(workspace).action == "full"
+
+
+def test_aliased_provider_change_forces_full_plan(workspace):
+    edit(workspace, "main.tf", '"europe-west1"', '"europe-west4"')
+    assert decide_plan(workspace).action == "full"
+
+
+def test_new_non_resource_block_forces_full_plan(workspace):
+    (workspace / "variables.tf").write_text('variable "region" {\n  default = "us-central1"\n}\n')
+    assert decide_plan(workspace).action == "full"
+
+
+def test_tfvars_change_forces_full_plan(workspace):
+    (workspace / "terraform.tfvars").write_text('region = "us-east1"\n')
+    assert decide_plan(workspace).action == "full"
+
+
+def test_state_change_since_apply_forces_full_plan(workspace):
+    write_state(workspace, 2)
+    edit(workspace, "storage.tf", '"hello"', '"hello again"')
+    assert decide_plan(workspace).action == "full"
+
+
+def test_apply_after_full_plan_is_skipped_next_time(workspace):
+    edit(workspace, "main.tf", 'prefix = "demo"', 'prefix = "prod"')
+    assert decide_plan(workspace).action == "full"
+    write_state(workspace, 2)
+    record_apply(workspace)
+    assert decide_plan(workspace).action == "skip"
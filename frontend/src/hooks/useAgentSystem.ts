@@ -121,6 +121,10 @@ export const useAgentSystem = () => {
               ];
             }
           });
+        } else if (event.type === 'queue') {
+          updateAgentStatus('requirements-analysis', {
+            currentTask: `Waiting for a free slot (position ${event.position} of ${event.queued})`
+          });
         } else if (event.type === 'architecture') {
           setArchitecture(event.data);
         } else if (event.type === 'deployment_status') {
@@ -138,7 +142,9 @@ export const useAgentSystem = () => {
       console.error('Error sending message:', error);
       addMessage({
         role: 'assistant',
-        content: 'I apologize, but I encountered an error processing your request. Please try again.',
+        content: error?.message?.startsWith('The server is busy')
+          ? error.message
+          : 'I apologize, but I encountered an error processing your request. Please try again.',
         type: 'error'
       });
     } finally {
@@ -3,15 +3,17 @@
  */
 
 export interface StreamEvent {
-  type: 'agent_status' | 'text' | 'architecture' | 'deployment_status' | 'error';
+  type: 'agent_status' | 'text' | 'architecture' | 'deployment_status' | 'timing' | 'queue' | 'error';
   [key: string]: any;
 }
 
 export class APIClient {
   private baseURL: string;
+  private sessionId: string;
 
   constructor(baseURL: string = '/api') {
     this.baseURL = baseURL;
+    this.sessionId = crypto.randomUUID();
   }
 
   /**
@@ -30,15 +32,55 @@ export class APIClient {
         content: message,
         type: 'text',
         metadata: {
-          conversation_history: conversationHistory
+          conversation_history: conversationHistory,
+          session_id: this.sessionId
         }
       }),
     });
 
+    if (response.status === 429 || response.status === 503) {
+      const retryAfter = response.headers.get('Retry-After');
+      throw new Error(
+        `The server is busy, please try again${retryAfter ? ` in ${retryAfter} seconds` : ' later'}.`
+      );
+    }
+
     if (!response.ok) {
       throw new Error(`HTTP error! status: ${response.status}`);
     }
 
+    // The chat keeps running on the server if the connection drops;
+    // resume from the last event received
+    let lastSeq: number | undefined;
+    let current: Response = response;
+
+    for (let attempt = 0; ; attempt++) {
+      try {
+        for await (const event of this.readEvents(current)) {
+          if (typeof event.seq === 'number') {
+            lastSeq = event.seq;
+          }
+          yield event;
+        }
+        return;
+      } catch (e) {
+        if (attempt >= 3) {
+          throw e;
+        }
+      }
+
+      const query = lastSeq === undefined ? '' : `?after=${lastSeq}`;
+      current = await fetch(`${this.baseURL}/sessions/${this.sessionId}/events${query}`);
+      if (!current.ok) {
+        throw new Error(`HTTP error! status: ${current.status}`);
+      }
+    }
+  }
+
+  /**
+   * Parse an SSE response into events, stopping at [DONE]
+   */
+  private async *readEvents(response: Response): AsyncGenerator<StreamEvent> {
     const reader = response.body?.getReader();
     if (!reader) {
       throw new Error('No response body');
@@ -78,6 +120,9 @@ export class APIClient {
     } finally {
       reader.releaseLock();
     }
+
+    // The stream ended without [DONE]: the connection dropped
+    throw new Error('Event stream interrupted');
   }
 
   /**
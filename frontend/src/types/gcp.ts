@@ -86,6 +86,9 @@ export interface DeploymentStatus {
   progress: number;
   current_step: string;
   logs: string[];
-  resources_created: string[];
+  log_lines?: number;  // full log: GET /api/deployments/{id}/logs
+  plan_action?: 'full' | 'targeted' | 'reuse' | 'skip';
+  resources_created: string[];  // newest entries; the full list once completed
+  resources_created_count?: number;
   error?: string;
 }